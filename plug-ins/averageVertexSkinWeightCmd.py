@@ -13,13 +13,20 @@
 #                 reload(averageVertexSkinWeightBrush)
 #                 averageVertexSkinWeightBrush.paint()
 #
+# Multi vertex mode : Indices and values flags can be used multiple times.
+#               All vertices are averaged with one getWeights/setWeights and a single undo.
+#                 cmds.averageVertexSkinWeight(i=[0, 1, 2], v=[1.0, 0.5, 0.5])
+#               A single value is used for all indices. Otherwise give a value per index.
+#
 ################################################################################################
 
 
 import sys
-import maya.OpenMaya as om
-import maya.OpenMayaAnim as oma
-import maya.OpenMayaMPx as ompx
+import numpy as np
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+from takTools.utils import weight_smooth
 
 kPluginCmdName = "averageVertexSkinWeight"
 
@@ -28,18 +35,29 @@ kIndexLongFlag = "-index"
 kValueFlag = "-v"
 kValueLongFlag = "-value"
 
+def maya_useNewAPI():
+    """ Say to maya that using api 2.0 """
+    pass
+
 
-class AverageVertexSkinWeightCmd(ompx.MPxCommand):
+def getAdjacency(dagPath):
+    # Cached by topology hash, reused by every brush stroke sample until the topology changes
+    fnMesh = om.MFnMesh(dagPath)
+    polygonCounts, polygonConnects = fnMesh.getVertices()
+    return weight_smooth.getCachedAdjacency(fnMesh.numVertices, np.array(polygonCounts), np.array(polygonConnects))
+
+
+class AverageVertexSkinWeightCmd(om.MPxCommand):
 
     def __init__(self):
-        ompx.MPxCommand.__init__(self)
-        self.index = None
-        self.value = None
+        om.MPxCommand.__init__(self)
+        self.indices = []
+        self.values = []
         self.fnSkin = None
         self.component = None
         self.infIndices = None
 
-        self.dagPath = om.MDagPath()
+        self.dagPath = None
         self.oldWeights = om.MDoubleArray()
 
 
@@ -48,21 +66,18 @@ class AverageVertexSkinWeightCmd(ompx.MPxCommand):
 
     def getSkinCluster(self):
         # selected skinned geo
-        selection = om.MSelectionList()
-        om.MGlobal.getActiveSelectionList(selection)
+        selection = om.MGlobal.getActiveSelectionList()
 
         # get dag path for selection
-        components = om.MObject()
         try:
-            selection.getDagPath( 0, self.dagPath, components )
+            self.dagPath = selection.getDagPath(0)
             self.dagPath.extendToShape()
         except: return
 
         # get skincluster from shape
         itDG = om.MItDependencyGraph(self.dagPath.node(), om.MFn.kSkinClusterFilter, om.MItDependencyGraph.kUpstream)
         while not itDG.isDone():
-            self.fnSkin = oma.MFnSkinCluster(itDG.currentItem())
-            found = True
+            self.fnSkin = oma.MFnSkinCluster(itDG.currentNode())
             break
 
 
@@ -75,10 +90,15 @@ class AverageVertexSkinWeightCmd(ompx.MPxCommand):
 
         argData = om.MArgDatabase(self.syntax(), args)
 
-        if argData.isFlagSet(kIndexFlag):
-            self.index = argData.flagArgumentInt(kIndexFlag, 0)
-        if argData.isFlagSet(kValueFlag):
-            self.value = argData.flagArgumentDouble(kValueFlag, 0)
+        for i in range(argData.numberOfFlagUses(kIndexFlag)):
+            self.indices.append(argData.getFlagArgumentList(kIndexFlag, i).asInt(0))
+        for i in range(argData.numberOfFlagUses(kValueFlag)):
+            self.values.append(argData.getFlagArgumentList(kValueFlag, i).asDouble(0))
+        if not self.indices or not self.values:
+            om.MGlobal.displayError("Give vertex indices and values.")
+            return
+        if len(self.values) not in (1, len(self.indices)):
+            raise ValueError("Give one value or a value per index. {} values are given for {} indices.".format(len(self.values), len(self.indices)))
 
         self.redoIt()
 
@@ -90,71 +110,59 @@ class AverageVertexSkinWeightCmd(ompx.MPxCommand):
                             False)
 
     def redoIt(self):
-        # get the vertex to operating on
-        self.component = om.MFnSingleIndexedComponent().create(om.MFn.kMeshVertComponent)
-        om.MFnSingleIndexedComponent(self.component).addElement(self.index)
+        # get the vertices to operating on
+        indices, firstIds = np.unique(np.array(self.indices, dtype=np.int64), return_index=True)
+        values = np.array(self.values, dtype=np.float64)
+        values = values[firstIds] if len(values) == len(self.indices) else np.full(len(indices), values[0])
 
-        surrWeights = om.MDoubleArray()
-        infCount = om.MScriptUtil()
-        inf = infCount.asUintPtr()
-        surrVtxArray = om.MIntArray()
+        fnComp = om.MFnSingleIndexedComponent()
+        self.component = fnComp.create(om.MFn.kMeshVertComponent)
+        fnComp.addElements(indices.tolist())
 
-        # create mesh iterator and get conneted vertices for averaging
-        mitVtx = om.MItMeshVertex (self.dagPath, self.component)
-        mitVtx.getConnectedVertices(surrVtxArray)
+        # read weights of the vertices and all their neighbours at once
+        adjacency = getAdjacency(self.dagPath)
+        _, neighbours = weight_smooth.getSubAdjacency(adjacency, indices)
+        weightIds = np.union1d(indices, neighbours)
 
-        # get surrounding vertices
-        surrComponents = om.MFnSingleIndexedComponent().create(om.MFn.kMeshVertComponent)
-        om.MFnSingleIndexedComponent(surrComponents).addElements(surrVtxArray)
+        fnWeightComp = om.MFnSingleIndexedComponent()
+        weightComponent = fnWeightComp.create(om.MFn.kMeshVertComponent)
+        fnWeightComp.addElements(weightIds.tolist())
+        weights, influenceCount = self.fnSkin.getWeights(self.dagPath, weightComponent)
+        weights = np.array(weights, dtype=np.float64).reshape(-1, influenceCount)
 
-        # read weight from single vertex (oldWeights) and from the surrounding vertices (surrWeights)
-        self.fnSkin.getWeights(self.dagPath, self.component, self.oldWeights, inf)
-        self.fnSkin.getWeights(self.dagPath, surrComponents, surrWeights, inf)
-        influenceCount = om.MScriptUtil.getUint(inf)
+        # blend the average of the surrounding vertex weights over the original weight with the weight from the artisan brush
+        newWeights = weight_smooth.averageWeights(weights, adjacency, indices, values, weightIds)
 
-        # get counts
-        surrVtxCount = surrVtxArray.length()
-        surrWeightsCount = surrWeights.length()
-
-        # reset variable
-        self.infIndices = om.MIntArray()
-        newWeights = om.MDoubleArray(influenceCount, 0.0)
-
-        invValue = 1.0 - self.value
-
-        # average all the surrounding vertex weights and multiply and blend it over the origWeight with the weight from the artisan brush
-        for i in range(influenceCount):
-            self.infIndices.append(i)
-            oldWeightDivSurrCountByInfValue = (self.oldWeights[i] / surrVtxCount) * invValue
-            for j in range(i, surrWeightsCount, influenceCount):
-                  newWeights[i] += (((surrWeights[j] / surrVtxCount) * self.value) +  oldWeightDivSurrCountByInfValue)
+        self.infIndices = om.MIntArray(list(range(influenceCount)))
+        self.oldWeights = om.MDoubleArray(weights[np.searchsorted(weightIds, indices)].ravel().tolist())
 
         # set the final weights throught the skinCluster again
         self.fnSkin.setWeights(self.dagPath,
                             self.component,
                             self.infIndices,
-                            newWeights,
-                            False,
-                            self.oldWeights)
+                            om.MDoubleArray(newWeights.ravel().tolist()),
+                            False)
 
 
 # Creator
 def cmdCreator():
     # Create the command
-    return ompx.asMPxPtr(AverageVertexSkinWeightCmd())
+    return AverageVertexSkinWeightCmd()
 
 
 # Syntax creator
 def syntaxCreator():
     syntax = om.MSyntax()
     syntax.addFlag(kIndexFlag, kIndexLongFlag, om.MSyntax.kLong)
+    syntax.makeFlagMultiUse(kIndexFlag)
     syntax.addFlag(kValueFlag, kValueLongFlag, om.MSyntax.kDouble)
+    syntax.makeFlagMultiUse(kValueFlag)
     return syntax
 
 
 # Initialize the script plug-in
 def initializePlugin(mobject):
-    mplugin = ompx.MFnPlugin(mobject, "Nuternativ", "1.0", "Any")
+    mplugin = om.MFnPlugin(mobject, "Nuternativ", "1.0", "Any")
     try:
         mplugin.registerCommand(kPluginCmdName, cmdCreator, syntaxCreator)
     except Exception as e:
@@ -164,11 +172,10 @@ def initializePlugin(mobject):
 
 # Uninitialize the script plug-in
 def uninitializePlugin(mobject):
-    mplugin = ompx.MFnPlugin(mobject)
+    mplugin = om.MFnPlugin(mobject)
     try:
         mplugin.deregisterCommand(kPluginCmdName)
     except Exception as e:
         sys.stderr.write('Failed to de-register command:  %s\n' %kPluginCmdName)
         sys.stderr.write('%s\n' %e)
 
-
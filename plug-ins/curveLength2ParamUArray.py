@@ -0,0 +1,152 @@
+"""
+Author: LEE SANGTAK
+Contact: chst27@gmail.com
+
+Array variant of the curveLength2ParamU node.
+Converts many arc lengths or length fractions on one curve to parameters.
+The arc length table of takTools.utils.curve_lut is built once per curve change and shared by every query,
+instead of a findParamFromLength() search per length and node.
+"""
+
+import maya.api.OpenMaya as om
+
+from takTools.utils import curve_lut
+
+VENDOR = 'Tak'
+VERSION = '1.0'
+
+
+def maya_useNewAPI():
+    """ Say to maya that using api 2.0 """
+    pass
+
+
+class CurveLength2ParamUArray(om.MPxNode):
+    name = 'curveLength2ParamUArray'
+    id = om.MTypeId(0x00002751)
+
+    inputCurveAttr = om.MObject()
+    inputLengthsAttr = om.MObject()
+    useFractionAttr = om.MObject()
+    toleranceAttr = om.MObject()
+    outputParamUAttr = om.MObject()
+    outputLengthAttr = om.MObject()
+
+    def __init__(self):
+        super(CurveLength2ParamUArray, self).__init__()
+        self._tableKey = None
+        self._table = None
+
+    def compute(self, plug, dataBlock):
+        if plug.attribute() not in [CurveLength2ParamUArray.outputParamUAttr, CurveLength2ParamUArray.outputLengthAttr]:
+            return None
+
+        curveData = dataBlock.inputValue(CurveLength2ParamUArray.inputCurveAttr).asNurbsCurve()
+        lengthsData = dataBlock.inputValue(CurveLength2ParamUArray.inputLengthsAttr).data()
+        lengths = list(om.MFnDoubleArrayData(lengthsData).array()) if not lengthsData.isNull() else []
+        useFraction = dataBlock.inputValue(CurveLength2ParamUArray.useFractionAttr).asBool()
+        tolerance = dataBlock.inputValue(CurveLength2ParamUArray.toleranceAttr).asDouble()
+
+        params = []
+        curveLength = 0.0
+        if not curveData.isNull():
+            table = self.getTable(curveData, tolerance)
+            params = table.getParams(lengths, useFraction).tolist()
+            curveLength = float(table.length)
+
+        outputParamUHandle = dataBlock.outputArrayValue(CurveLength2ParamUArray.outputParamUAttr)
+        # Elements past the lengths are left from a longer input and removed
+        staleIndices = []
+        for i in range(len(outputParamUHandle)):
+            outputParamUHandle.jumpToPhysicalElement(i)
+            if outputParamUHandle.elementLogicalIndex() >= len(params):
+                staleIndices.append(outputParamUHandle.elementLogicalIndex())
+        builder = outputParamUHandle.builder()
+        for index in staleIndices:
+            builder.removeElement(index)
+        for i, param in enumerate(params):
+            builder.addElement(i).setDouble(param)
+        outputParamUHandle.set(builder)
+        outputParamUHandle.setAllClean()
+
+        outputLengthHandle = dataBlock.outputValue(CurveLength2ParamUArray.outputLengthAttr)
+        outputLengthHandle.setDouble(curveLength)
+        outputLengthHandle.setClean()
+
+        dataBlock.setClean(plug)
+
+    def getTable(self, curveData, tolerance):
+        """Arc length table of the curve, rebuilt only when the curve or tolerance changes."""
+        curveFn = om.MFnNurbsCurve(curveData)
+        cvs = [[point.x, point.y, point.z, point.w] for point in curveFn.cvPositions(om.MSpace.kObject)]
+        knots = list(curveFn.knots())
+        degree = curveFn.degree
+
+        key = curve_lut.getCurveKey(cvs, knots, degree, tolerance)
+        if key != self._tableKey:
+            self._table = curve_lut.ArcLengthTable.fromNurbs(cvs, curve_lut.toFullKnots(knots), degree, tolerance)
+            self._tableKey = key
+        return self._table
+
+    @staticmethod
+    def creator():
+        return CurveLength2ParamUArray()
+
+    @staticmethod
+    def initialize():
+        typedAttrFn = om.MFnTypedAttribute()
+        numericAttrFn = om.MFnNumericAttribute()
+
+        CurveLength2ParamUArray.inputCurveAttr = typedAttrFn.create('inputCurve', 'ic', om.MFnData.kNurbsCurve)
+        CurveLength2ParamUArray.addAttribute(CurveLength2ParamUArray.inputCurveAttr)
+
+        CurveLength2ParamUArray.inputLengthsAttr = typedAttrFn.create(
+            'inputLengths', 'lens', om.MFnData.kDoubleArray, om.MFnDoubleArrayData().create()
+        )
+        CurveLength2ParamUArray.addAttribute(CurveLength2ParamUArray.inputLengthsAttr)
+
+        # Input lengths are fractions of the curve length in [0, 1] when on
+        CurveLength2ParamUArray.useFractionAttr = numericAttrFn.create('useFraction', 'uf', om.MFnNumericData.kBoolean, False)
+        numericAttrFn.keyable = True
+        CurveLength2ParamUArray.addAttribute(CurveLength2ParamUArray.useFractionAttr)
+
+        # Target arc length error of the whole curve
+        CurveLength2ParamUArray.toleranceAttr = numericAttrFn.create('tolerance', 'tol', om.MFnNumericData.kDouble, curve_lut.TOLERANCE)
+        numericAttrFn.setMin(1e-8)
+        numericAttrFn.channelBox = True
+        CurveLength2ParamUArray.addAttribute(CurveLength2ParamUArray.toleranceAttr)
+
+        CurveLength2ParamUArray.outputParamUAttr = numericAttrFn.create('outputParamU', 'otu', om.MFnNumericData.kDouble, 0.0)
+        numericAttrFn.array = True
+        numericAttrFn.usesArrayDataBuilder = True
+        numericAttrFn.writable = False
+        numericAttrFn.storable = False
+        CurveLength2ParamUArray.addAttribute(CurveLength2ParamUArray.outputParamUAttr)
+
+        CurveLength2ParamUArray.outputLengthAttr = numericAttrFn.create('outputLength', 'ol', om.MFnNumericData.kDouble, 0.0)
+        numericAttrFn.writable = False
+        numericAttrFn.storable = False
+        CurveLength2ParamUArray.addAttribute(CurveLength2ParamUArray.outputLengthAttr)
+
+        for inputAttr in [CurveLength2ParamUArray.inputCurveAttr, CurveLength2ParamUArray.inputLengthsAttr,
+                          CurveLength2ParamUArray.useFractionAttr, CurveLength2ParamUArray.toleranceAttr]:
+            CurveLength2ParamUArray.attributeAffects(inputAttr, CurveLength2ParamUArray.outputParamUAttr)
+            CurveLength2ParamUArray.attributeAffects(inputAttr, CurveLength2ParamUArray.outputLengthAttr)
+
+
+def initializePlugin(mObj):
+    pluginFn = om.MFnPlugin(mObj, VENDOR, VERSION)
+    try:
+        pluginFn.registerNode(CurveLength2ParamUArray.name, CurveLength2ParamUArray.id,
+                              CurveLength2ParamUArray.creator, CurveLength2ParamUArray.initialize,
+                              om.MPxNode.kDependNode)
+    except:
+        raise RuntimeError('Failed to register node: %s' % CurveLength2ParamUArray.name)
+
+
+def uninitializePlugin(mObj):
+    pluginFn = om.MFnPlugin(mObj)
+    try:
+        pluginFn.deregisterNode(CurveLength2ParamUArray.id)
+    except:
+        raise RuntimeError('Failed to deregister node: %s' % CurveLength2ParamUArray.name)
@@ -1,6 +1,5 @@
 import sys
 import math
-import random
 import traceback
 import maya.mel as mel
 import pymel.core as pm
@@ -9,6 +8,8 @@ import maya.OpenMayaUI as OpenMayaUI
 import maya.OpenMayaMPx as OpenMayaMPx
 import maya.OpenMayaRender as OpenMayaRender
 
+from takTools.utils import curve_instancer
+
 kPluginVersion = "1.1.0"
 kPluginCmdName = "instanceAlongCurve"
 kPluginCtxCmdName = "instanceAlongCurveCtx"
@@ -154,6 +155,10 @@ class instanceAlongCurveLocator(OpenMayaMPx.MPxLocatorNode):
     def __init__(self):
         OpenMayaMPx.MPxLocatorNode.__init__(self)
 
+        # Curve samples and baked ramps shared by the translation, rotation and scale computes
+        self.curveSampler = curve_instancer.CurveSampler()
+        self.rampTables = {}
+
     def postConstructor(self):
         OpenMaya.MFnDependencyNode(self.thisMObject()).setName("instanceAlongCurveLocatorShape#")
         self.callbackId = OpenMaya.MNodeMessage.addAttributeChangedCallback(self.thisMObject(), self.attrChangeCallback)
@@ -417,12 +422,6 @@ class instanceAlongCurveLocator(OpenMayaMPx.MPxLocatorNode):
         instanceCountPlug = OpenMaya.MPlug(self.thisMObject(), instanceAlongCurveLocator.instanceCountAttr)
         return instanceCountPlug.asInt()
 
-    def getRandomizedValueUnified(self, randomValue, randomAmplitude, value):
-        return (randomValue * 2.0 - 1.0) * randomAmplitude + value
-
-    def getRandomizedValue(self, random, randomAmplitude, value):
-        return (random.random() * 2.0 - 1.0) * randomAmplitude + value
-
     # Calculate expected instances by the instancing mode
     def getIncrementByMode(self, count, effectiveCurveLength):
         instancingModePlug = OpenMaya.MPlug(self.thisMObject(), instanceAlongCurveLocator.instancingModeAttr)
@@ -435,348 +434,124 @@ class instanceAlongCurveLocator(OpenMayaMPx.MPxLocatorNode):
         # Distance driven by count
         return effectiveCurveLength / float(count)
 
-    def updateInstancePositions(self, curveFn, dataBlock, count, distOffset, curveStart, curveEnd, effectiveCurveLength, lengthIncrement, inputTransformPlug, inputTransformFn, axisHandlesSorted):
-
-            # Common data
-            translateArrayHandle = dataBlock.outputArrayValue(instanceAlongCurveLocator.outputTranslationAttr.compound)
-            curveLength = curveFn.length()
-            maxParam = curveFn.findParamFromLength(curveLength)
-            curveForm = curveFn.form()
-
-            # Important: enums are short! If not, the resulting int may be incorrect
-            rotMode = dataBlock.inputValue(instanceAlongCurveLocator.orientationModeAttr).asShort()
-            localRotationAxisMode = dataBlock.inputValue(instanceAlongCurveLocator.inputLocalOrientationAxisAttr).asShort()
-
-            if localRotationAxisMode == 0:
-                forward = OpenMaya.MVector.xAxis
-                up = OpenMaya.MVector.yAxis
-                right = OpenMaya.MVector.zAxis
-            elif localRotationAxisMode == 1:
-                forward = OpenMaya.MVector.yAxis
-                up = OpenMaya.MVector.zAxis
-                right = OpenMaya.MVector.xAxis
-            elif localRotationAxisMode == 2:
-                forward = OpenMaya.MVector.zAxis
-                up = OpenMaya.MVector.yAxis
-                right = OpenMaya.MVector.xAxis
-
-            # We use Z axis as forward, and adjust locally to that axis
-            referenceAxis = OpenMaya.MVector.zAxis
-            referenceUp = OpenMaya.MVector.yAxis
-
-            # Local offset is not considered for position
-            localRotation = forward.rotateTo(referenceAxis)
-
-            # Manipulator data
-            enableManipulators = dataBlock.inputValue(instanceAlongCurveLocator.enableManipulatorsAttr).asBool()
-
-            # Local translation offsets
-            localTranslationOffset = dataBlock.inputValue(instanceAlongCurveLocator.inputLocalTranslationOffsetAttr.compound).asVector()
-            globalTranslationOffset = dataBlock.inputValue(instanceAlongCurveLocator.inputGlobalTranslationOffsetAttr.compound).asVector()
-            
-            # Get pivot
-            rotatePivot = OpenMaya.MVector()
-
-            if inputTransformPlug.isConnected():
-                rotatePivot = OpenMaya.MVector(inputTransformFn.rotatePivot(OpenMaya.MSpace.kTransform ))
-                rotatePivot += OpenMaya.MVector(inputTransformFn.rotatePivotTranslation(OpenMaya.MSpace.kTransform ))
-
-            # Deterministic random
-            random.seed(count)
-            rampValues = instanceAlongCurveLocator.RampValueContainer(self.thisMObject(), dataBlock, instanceAlongCurveLocator.positionRampAttr, False, count)
-
-            inputTransformRotation = OpenMaya.MQuaternion()
-
-            # First, map parameter
-            if inputTransformPlug.isConnected():
-                inputTransformFn.getRotation(inputTransformRotation, OpenMaya.MSpace.kWorld)
-
-            # Make sure there are enough handles...
-            for i in xrange(min(count, translateArrayHandle.elementCount())):
-
-                dist = math.fmod(curveStart + math.fmod(lengthIncrement * i + distOffset, effectiveCurveLength), curveLength)
-                param = max( min( curveFn.findParamFromLength( dist ), maxParam ), 0.0)
-
-                # Ramps are not modified by curve start/end, so objects can "slide"
-                normalizedDistance = dist / curveFn.length()
-                rampValue = self.getRampValueAtNormalizedPosition(rampValues, normalizedDistance)
-                
-                # Get the actual point on the curve...
-                point = OpenMaya.MPoint()
-                curveFn.getPointAtParam(param, point)
-
-                tangent = curveFn.tangent(param)
-                rot = referenceAxis.rotateTo(tangent)
-
-                # If the axis is parallel, but with inverse direction, rotate it PI over the up vector
-                if referenceAxis.isParallel(tangent) and (referenceAxis * tangent < 0):
-                    rot = OpenMaya.MQuaternion(math.pi, referenceUp)
-
-                # Transform rotation so that it is aligned with the tangent. This fixes unintentional twisting
-                rot = localRotation * rot
-                
-                # Modify resulting rotation based on mode
-                if rotMode == 0:                    # Identity
-                    rot = OpenMaya.MQuaternion()
-                elif rotMode == 1:                  # Input rotation
-                    rot = inputTransformRotation;
-                elif rotMode == 3 and i % 2 == 1:   # Chain mode, interesting for position ;)
-                    rot *= OpenMaya.MQuaternion(math.pi * .5, tangent)
+    # Set the curve of the cached sampler. Its arc length table is only rebuilt when the curve changed
+    def setSamplerCurve(self, curveFn):
+        cvs = OpenMaya.MPointArray()
+        curveFn.getCVs(cvs, OpenMaya.MSpace.kObject)
+        knots = OpenMaya.MDoubleArray()
+        curveFn.getKnots(knots)
 
-                # Get the angle from handles, and rotate over tangent axis
-                if enableManipulators:
-                    angle = self.getRotationForParam(param, axisHandlesSorted, curveForm, maxParam)
-                    rot = rot * OpenMaya.MQuaternion(-angle, tangent)
+        cvList = [[cvs[i].x, cvs[i].y, cvs[i].z, cvs[i].w] for i in range(cvs.length())]
+        knotList = [knots[i] for i in range(knots.length())]
+        return self.curveSampler.setCurve(cvList, knotList, curveFn.degree())
 
-                # The curve basis used for twisting
-                basisForward = forward.rotateBy(rot)
-                basisUp = up.rotateBy(rot)
-                basisRight = right.rotateBy(rot)
+    # Ramp baked to a lookup table, rebaked only when the ramp entries change
+    def getRampTable(self, rampAttr, ramp):
+        indices = OpenMaya.MIntArray()
+        positions = OpenMaya.MFloatArray()
+        values = OpenMaya.MFloatArray()
+        interps = OpenMaya.MIntArray()
+        ramp.getEntries(indices, positions, values, interps)
 
-                rampAmplitude = self.getRampAmplitudeForInstance(rampValues, i)
+        key = tuple((positions[i], values[i], interps[i]) for i in range(positions.length()))
+        cachedKey, table = self.rampTables.get(id(rampAttr), (None, None))
 
-                twistNormal = basisRight * self.getRandomizedValue(random, rampValues.rampRandomAmplitude, rampValue * rampAmplitude) * rampValues.rampAxis.x
-                twistTangent = basisUp * self.getRandomizedValue(random, rampValues.rampRandomAmplitude, rampValue * rampAmplitude) * rampValues.rampAxis.y
-                twistBitangent = basisForward * self.getRandomizedValue(random, rampValues.rampRandomAmplitude, rampValue * rampAmplitude) * rampValues.rampAxis.z
+        if table is None or key != cachedKey:
+            table = curve_instancer.RampTable.fromFunction(lambda position: self.getRampValueAtPosition(ramp, position))
+            self.rampTables[id(rampAttr)] = (key, table)
 
-                twist = (twistNormal + twistTangent + twistBitangent)
+        return table
 
-                # Twist + global offset, without pivot
-                point += twist + globalTranslationOffset - rotatePivot
-
-                # Local offset
-                point += basisRight * localTranslationOffset.x + basisUp * localTranslationOffset.y + basisForward * localTranslationOffset.z
-
-                translateArrayHandle.jumpToArrayElement(i)
-                translateHandle = translateArrayHandle.outputValue()
-                translateHandle.set3Double(point.x, point.y, point.z)
-
-            translateArrayHandle.setAllClean()
-            translateArrayHandle.setClean()
-
-    def getRampAmplitudeForInstance(self, rampValues, instanceIndex):
-
-        if rampValues.useDynamicAmplitudeValues:
-
-            if len(rampValues.rampAmplitudeValues) > instanceIndex:
-                return rampValues.rampAmplitudeValues[instanceIndex]
-
-        return rampValues.rampAmplitude
-
-    def getRampValueAtNormalizedPosition(self, rampValues, v):
+    def getRampValueAtPosition(self, ramp, position):
 
         util = OpenMaya.MScriptUtil()
         util.createFromDouble(0.0)
         valuePtr = util.asFloatPtr()
-        
-        position = math.fmod((v * rampValues.rampRepeat) + rampValues.rampOffset, 1.0)
-        rampValues.ramp.getValueAtPosition(position, valuePtr)
 
-        return util.getFloat(valuePtr)
-
-    def updateInstanceScale(self, curveFn, dataBlock, count, distOffset, curveStart, curveEnd, effectiveCurveLength, lengthIncrement):
-
-            point = OpenMaya.MPoint()
-            curveLength = curveFn.length()
-            maxParam = curveFn.findParamFromLength(curveLength)
-            scaleArrayHandle = dataBlock.outputArrayValue(instanceAlongCurveLocator.outputScaleAttr.compound)
-
-            localScaleOffset = dataBlock.inputValue(instanceAlongCurveLocator.inputLocalScaleOffsetAttr.compound).asVector()
+        ramp.getValueAtPosition(position, valuePtr)
 
-            # Deterministic random
-            random.seed(count)
-            rampValues = instanceAlongCurveLocator.RampValueContainer(self.thisMObject(), dataBlock, instanceAlongCurveLocator.scaleRampAttr, False, count)
+        return util.getFloat(valuePtr)
 
-            # Make sure there are enough handles...
-            for i in xrange(min(count, scaleArrayHandle.elementCount())):
+    def getRampSettings(self, dataBlock, rampAttr, normalize, instanceCount):
+        rampValues = instanceAlongCurveLocator.RampValueContainer(self.thisMObject(), dataBlock, rampAttr, normalize, instanceCount)
+        amplitudes = rampValues.rampAmplitudeValues if rampValues.useDynamicAmplitudeValues else None
 
-                dist = math.fmod(curveStart + math.fmod(lengthIncrement * i + distOffset, effectiveCurveLength), curveLength)
-                param = max( min( curveFn.findParamFromLength( dist ), maxParam ), 0.0)
+        return curve_instancer.RampSettings(self.getRampTable(rampAttr, rampValues.ramp),
+                                            [rampValues.rampAxis.x, rampValues.rampAxis.y, rampValues.rampAxis.z],
+                                            rampValues.rampAmplitude, rampValues.rampRandomAmplitude,
+                                            rampValues.rampRepeat, rampValues.rampOffset, amplitudes)
 
-                # Ramps are not modified by curve start/end, so objects can "slide"
-                normalizedDistance = dist / curveFn.length()
-                rampValue = self.getRampValueAtNormalizedPosition(rampValues, normalizedDistance)
+    # Orientation related inputs shared by positions and rotations
+    def getOrientationInputs(self, dataBlock, samples, curveForm, inputTransformPlug, inputTransformFn, axisHandlesSorted):
 
-                unifiedRandom = random.random()
-                rampAmplitude = self.getRampAmplitudeForInstance(rampValues, i)
+        # Important: enums are short! If not, the resulting int may be incorrect
+        rotMode = dataBlock.inputValue(instanceAlongCurveLocator.orientationModeAttr).asShort()
+        localRotationAxisMode = dataBlock.inputValue(instanceAlongCurveLocator.inputLocalOrientationAxisAttr).asShort()
 
-                # Scales are unified... because it makes more sense
-                point.x = localScaleOffset.x + self.getRandomizedValueUnified(unifiedRandom, rampValues.rampRandomAmplitude, rampValue * rampAmplitude) * rampValues.rampAxis.x
-                point.y = localScaleOffset.y + self.getRandomizedValueUnified(unifiedRandom, rampValues.rampRandomAmplitude, rampValue * rampAmplitude) * rampValues.rampAxis.y
-                point.z = localScaleOffset.z + self.getRandomizedValueUnified(unifiedRandom, rampValues.rampRandomAmplitude, rampValue * rampAmplitude) * rampValues.rampAxis.z
+        inputTransformRotation = OpenMaya.MQuaternion()
 
-                scaleArrayHandle.jumpToArrayElement(i)
-                scaleHandle = scaleArrayHandle.outputValue()
-                scaleHandle.set3Double(point.x, point.y, point.z)
+        if inputTransformPlug.isConnected():
+            inputTransformFn.getRotation(inputTransformRotation, OpenMaya.MSpace.kWorld)
 
-            scaleArrayHandle.setAllClean()
-            scaleArrayHandle.setClean()
+        # Manipulator data
+        handleAngles = None
 
-    # TODO: cache this data to prevent recalculating when there is no manipulator being updated
-    def getRotationForParam(self, param, axisHandlesSorted, curveForm, curveMaxParam):
+        if dataBlock.inputValue(instanceAlongCurveLocator.enableManipulatorsAttr).asBool():
+            wrapAround = curveForm != OpenMaya.MFnNurbsCurve.kOpen
+            handleAngles = curve_instancer.getHandleAngles(samples.params,
+                                                           [handle[1] for handle in axisHandlesSorted],
+                                                           [handle[2] for handle in axisHandlesSorted],
+                                                           wrapAround, samples.maxParam)
 
-        indexRange = (-1, -1)
-        wrapAround = not (curveForm is OpenMaya.MFnNurbsCurve.kOpen)
+        inputRotation = [inputTransformRotation.x, inputTransformRotation.y, inputTransformRotation.z, inputTransformRotation.w]
+        return localRotationAxisMode, rotMode, inputRotation, handleAngles
 
-        # Find the range of indices that make up this curve segment
-        for i in xrange(len(axisHandlesSorted)):
+    def updateInstancePositions(self, dataBlock, samples, curveForm, inputTransformPlug, inputTransformFn, axisHandlesSorted):
 
-            # TODO: could use a binary search
-            if param < axisHandlesSorted[i][1]:
+        localRotationAxisMode, rotMode, inputRotation, handleAngles = self.getOrientationInputs(dataBlock, samples, curveForm, inputTransformPlug, inputTransformFn, axisHandlesSorted)
 
-                if i > 0:
-                    indexRange = (i - 1, i)
-                    break
-                elif wrapAround:
-                    indexRange = (len(axisHandlesSorted) - 1, 0)
-                    break
-                else:
-                    indexRange = (0, 0)
-                    break
+        # Local translation offsets
+        localTranslationOffset = dataBlock.inputValue(instanceAlongCurveLocator.inputLocalTranslationOffsetAttr.compound).asVector()
+        globalTranslationOffset = dataBlock.inputValue(instanceAlongCurveLocator.inputGlobalTranslationOffsetAttr.compound).asVector()
 
-        # Edge case
-        if indexRange[0] == -1 and indexRange[1] == -1 and len(axisHandlesSorted) > 0:
-            if wrapAround:
-                indexRange = (len(axisHandlesSorted) - 1, 0)
-            else:
-                indexRange = (len(axisHandlesSorted) - 1, len(axisHandlesSorted) - 1)
-            
-        # Now find the lerp value based on the range
-        if indexRange[0] > -1 and indexRange[1] > -1:
-            minParam = axisHandlesSorted[indexRange[0]][1]
-            maxParam = axisHandlesSorted[indexRange[1]][1]
+        # Get pivot
+        rotatePivot = OpenMaya.MVector()
 
-            minAxis = axisHandlesSorted[indexRange[0]][2]
-            maxAxis = axisHandlesSorted[indexRange[1]][2]
+        if inputTransformPlug.isConnected():
+            rotatePivot = OpenMaya.MVector(inputTransformFn.rotatePivot(OpenMaya.MSpace.kTransform ))
+            rotatePivot += OpenMaya.MVector(inputTransformFn.rotatePivotTranslation(OpenMaya.MSpace.kTransform ))
 
-            if(math.fabs(minParam - maxParam) > 0.001):
+        ramp = self.getRampSettings(dataBlock, instanceAlongCurveLocator.positionRampAttr, False, len(samples))
 
-                if minParam > maxParam and wrapAround:
+        translations = curve_instancer.getTranslations(samples, localRotationAxisMode, rotMode, inputRotation, handleAngles, ramp,
+                                                       toList(localTranslationOffset), toList(globalTranslationOffset), toList(rotatePivot))
 
-                    if param < maxParam:
-                        param = param + curveMaxParam
+        setArrayValues(dataBlock.outputArrayValue(instanceAlongCurveLocator.outputTranslationAttr.compound), translations)
 
-                    maxParam = maxParam + curveMaxParam
-                
-                t = min(max((param - minParam) / (maxParam - minParam), 0.0), 1.0)
+    def updateInstanceScale(self, dataBlock, samples):
 
-                return minAxis + (maxAxis - minAxis) * t
+        localScaleOffset = dataBlock.inputValue(instanceAlongCurveLocator.inputLocalScaleOffsetAttr.compound).asVector()
+        ramp = self.getRampSettings(dataBlock, instanceAlongCurveLocator.scaleRampAttr, False, len(samples))
 
-            return minAxis
+        # Scales are unified... because it makes more sense
+        scales = curve_instancer.getScales(samples, ramp, toList(localScaleOffset))
 
-        return 0.0
+        setArrayValues(dataBlock.outputArrayValue(instanceAlongCurveLocator.outputScaleAttr.compound), scales)
 
-    def updateInstanceRotations(self, curveFn, dataBlock, count, distOffset, curveStart, curveEnd, effectiveCurveLength, lengthIncrement, inputTransformPlug, inputTransformFn, axisHandlesSorted):
+    def updateInstanceRotations(self, dataBlock, samples, curveForm, inputTransformPlug, inputTransformFn, axisHandlesSorted):
 
-        # Common data
-        curveLength = curveFn.length()
-        maxParam = curveFn.findParamFromLength(curveLength)
-        curveForm = curveFn.form()
-        rotationArrayHandle = dataBlock.outputArrayValue(instanceAlongCurveLocator.outputRotationAttr.compound)
+        localRotationAxisMode, rotMode, inputRotation, handleAngles = self.getOrientationInputs(dataBlock, samples, curveForm, inputTransformPlug, inputTransformFn, axisHandlesSorted)
 
         # All offsets are in degrees
         localRotationOffset = dataBlock.inputValue(instanceAlongCurveLocator.inputLocalRotationOffsetAttr.compound).asVector() * math.radians(1)
         globalRotationOffset = dataBlock.inputValue(instanceAlongCurveLocator.inputGlobalRotationOffsetAttr.compound).asVector() * math.radians(1)
 
-        localRotationOffset = OpenMaya.MEulerRotation(localRotationOffset.x, localRotationOffset.y, localRotationOffset.z).asQuaternion()
-        globalRotationOffset = OpenMaya.MEulerRotation(globalRotationOffset.x, globalRotationOffset.y, globalRotationOffset.z).asQuaternion()
-
-        # Important: enums are short! If not, the resulting int may be incorrect
-        rotMode = dataBlock.inputValue(instanceAlongCurveLocator.orientationModeAttr).asShort()
-        localRotationAxisMode = dataBlock.inputValue(instanceAlongCurveLocator.inputLocalOrientationAxisAttr).asShort()
-
-        if localRotationAxisMode == 0:
-            forward = OpenMaya.MVector.xAxis
-            up = OpenMaya.MVector.yAxis
-            right = OpenMaya.MVector.zAxis
-        elif localRotationAxisMode == 1:
-            forward = OpenMaya.MVector.yAxis
-            up = OpenMaya.MVector.zAxis
-            right = OpenMaya.MVector.xAxis
-        elif localRotationAxisMode == 2:
-            forward = OpenMaya.MVector.zAxis
-            up = OpenMaya.MVector.yAxis
-            right = OpenMaya.MVector.xAxis
-
-        # We use Z axis as forward, and adjust locally to that axis
-        referenceAxis = OpenMaya.MVector.zAxis
-        referenceUp = OpenMaya.MVector.yAxis
-
-        # Rotation to align selected (local) forward axis to the reference forward axis (which is aligned with tangent)
-        localRotation = localRotationOffset * forward.rotateTo(referenceAxis)
-
-        # Deterministic random
-        random.seed(count)
-        rampValues = instanceAlongCurveLocator.RampValueContainer(self.thisMObject(), dataBlock, instanceAlongCurveLocator.rotationRampAttr, True, count)
-
-        # Manipulator stuff
-        enableManipulators = dataBlock.inputValue(instanceAlongCurveLocator.enableManipulatorsAttr).asBool()
-
-        # Original transform data
-        inputTransformRotation = OpenMaya.MQuaternion()
-
-        # First, map parameter
-        if inputTransformPlug.isConnected():
-            inputTransformFn.getRotation(inputTransformRotation, OpenMaya.MSpace.kWorld)
-
-        for i in xrange(min(count, rotationArrayHandle.elementCount())):
-            
-            dist = math.fmod(curveStart + math.fmod(lengthIncrement * i + distOffset, effectiveCurveLength), curveLength)
-            param = max( min( curveFn.findParamFromLength( dist ), maxParam ), 0.0)
+        ramp = self.getRampSettings(dataBlock, instanceAlongCurveLocator.rotationRampAttr, True, len(samples))
 
-            # Ramps are not modified by curve start/end, so objects can "slide"
-            normalizedDistance = dist / curveFn.length()
-            rampValue = self.getRampValueAtNormalizedPosition(rampValues, normalizedDistance)
+        rotations = curve_instancer.getRotations(samples, localRotationAxisMode, rotMode, inputRotation, handleAngles, ramp,
+                                                 toList(localRotationOffset), toList(globalRotationOffset))
 
-            tangent = curveFn.tangent(param)
-
-            # Reference axis (Z) is now aligned with tangent
-            rot = referenceAxis.rotateTo(tangent)
-
-            # If the axis is parallel, but with inverse direction, rotate it PI over the up vector
-            if referenceAxis.isParallel(tangent) and (referenceAxis * tangent < 0):
-                rot = OpenMaya.MQuaternion(math.pi, referenceUp)
-
-            # Rotate local axis to align with tangent
-            rot = localRotation * rot
-            
-            # The curve basis used for twisting        
-            basisForward = forward.rotateBy(rot)
-            basisUp = up.rotateBy(rot)
-            basisRight = right.rotateBy(rot)
-
-            rampAmplitude = self.getRampAmplitudeForInstance(rampValues, i)
-
-            twistNormal = self.getRandomizedValue(random, rampValues.rampRandomAmplitude, rampValue * rampAmplitude) * rampValues.rampAxis.x                
-            twistNormal = OpenMaya.MQuaternion(math.radians(twistNormal), basisRight) #X
-
-            twistTangent = self.getRandomizedValue(random, rampValues.rampRandomAmplitude, rampValue * rampAmplitude) * rampValues.rampAxis.y
-            twistTangent = OpenMaya.MQuaternion(math.radians(twistTangent), basisUp) #Y
-
-            twistBitangent = self.getRandomizedValue(random, rampValues.rampRandomAmplitude, rampValue * rampAmplitude) * rampValues.rampAxis.z
-            twistBitangent = OpenMaya.MQuaternion(math.radians(twistBitangent), basisForward) #Z
-
-            # Modify resulting rotation based on mode
-            if rotMode == 0:                    # Identity
-                rot = OpenMaya.MQuaternion()
-            elif rotMode == 1:                  # Input rotation
-                rot = inputTransformRotation;
-            elif rotMode == 3 and i % 2 == 1:   # Chain mode
-                rot *= OpenMaya.MQuaternion(math.pi * .5, tangent)
-
-            # Get the angle from handles, and rotate over tangent axis
-            if enableManipulators:
-                angle = self.getRotationForParam(param, axisHandlesSorted, curveForm, maxParam)
-                rot = rot * OpenMaya.MQuaternion(-angle, tangent)
-
-            rot = ((rot * twistNormal * twistTangent * twistBitangent) * globalRotationOffset).asEulerRotation().asVector()
-
-            rotationArrayHandle.jumpToArrayElement(i)
-            rotationHandle = rotationArrayHandle.outputValue()
-            rotationHandle.set3Double(rot.x, rot.y, rot.z)
-
-        rotationArrayHandle.setAllClean()
-        rotationArrayHandle.setClean()
+        setArrayValues(dataBlock.outputArrayValue(instanceAlongCurveLocator.outputRotationAttr.compound), rotations)
 
     def isBounded(self):
         return True
@@ -800,7 +575,7 @@ class instanceAlongCurveLocator(OpenMayaMPx.MPxLocatorNode):
 
                     instanceCount = self.getInstanceCountByMode()
                     distOffset = dataBlock.inputValue(instanceAlongCurveLocator.distOffsetAttr).asFloat()
-                    curveLength = curveFn.length()
+                    curveLength = self.setSamplerCurve(curveFn)
 
                     # Curve thresholds
                     curveStart = dataBlock.inputValue(instanceAlongCurveLocator.curveStartAttr).asFloat() * curveLength
@@ -821,14 +596,19 @@ class instanceAlongCurveLocator(OpenMayaMPx.MPxLocatorNode):
                     curveAxisHandleArray = dataBlock.inputArrayValue(instanceAlongCurveLocator.curveAxisHandleAttr.compound)
                     axisHandlesSorted = getSortedCurveAxisArray(self.thisMObject(), curveAxisHandleArray, instanceCount)
 
+                    # Samples are reused by the other outputs while the curve and the placement don't change
+                    distances = curve_instancer.getDistances(instanceCount, distOffset, curveStart, curveLength, effectiveCurveLength, lengthIncrement)
+                    samples = self.curveSampler.getSamples(distances)
+                    curveForm = curveFn.form()
+
                     if updateTranslation:
-                        self.updateInstancePositions(curveFn, dataBlock, instanceCount, distOffset, curveStart, curveEnd, effectiveCurveLength, lengthIncrement, inputTransformPlug, inputTransformFn, axisHandlesSorted)
+                        self.updateInstancePositions(dataBlock, samples, curveForm, inputTransformPlug, inputTransformFn, axisHandlesSorted)
 
                     if updateRotation:
-                        self.updateInstanceRotations(curveFn, dataBlock, instanceCount, distOffset, curveStart, curveEnd, effectiveCurveLength, lengthIncrement, inputTransformPlug, inputTransformFn, axisHandlesSorted)
+                        self.updateInstanceRotations(dataBlock, samples, curveForm, inputTransformPlug, inputTransformFn, axisHandlesSorted)
 
                     if updateScale:
-                        self.updateInstanceScale(curveFn, dataBlock, instanceCount, distOffset, curveStart, curveEnd, effectiveCurveLength, lengthIncrement)
+                        self.updateInstanceScale(dataBlock, samples)
 
         except:
             sys.stderr.write('Failed trying to compute locator. stack trace: \n')
@@ -1895,5 +1675,18 @@ def getSortedCurveAxisArray(mObject, curveAxisHandleArray, count):
 
     return sorted(axisHandles, key=getKey)
 
+def toList(vector):
+    return [vector.x, vector.y, vector.z]
+
+# Write (n, 3) values to the existing elements of an output array handle in one pass
+def setArrayValues(arrayHandle, values):
+
+    for i, value in enumerate(values[:arrayHandle.elementCount()].tolist()):
+        arrayHandle.jumpToArrayElement(i)
+        arrayHandle.outputValue().set3Double(value[0], value[1], value[2])
+
+    arrayHandle.setAllClean()
+    arrayHandle.setClean()
+
 def printVector(v, s=None):
     print s + ":" + str(v.x) + ", " + str(v.y) + ", " + str(v.z)
\ No newline at end of file
@@ -16,6 +16,11 @@ motionTrail.points >> node.points
 node.outCurve >> nurbsCurve.create
 
 
+# Fit dense points to a light curve
+node.fitMode.set(2)
+node.tolerance.set(0.05)
+
+
 # Test Remove
 pm.delete(node, nurbsCurve)
 pm.flushUndo()
@@ -27,17 +32,35 @@ import sys
 import maya.OpenMaya as OpenMaya
 import maya.OpenMayaMPx as OpenMayaMPx
 
+import numpy as np
+
+from takTools.utils import curve_fit
+
 
 kPluginNodeName = 'pointsToCurve'
 kPluginNodeId = OpenMaya.MTypeId(0x00002735)
 
+# Fit modes
+EDIT_POINTS = 0
+CV_COUNT = 1
+TOLERANCE = 2
+
+# Incoming points closer than this to the cached ones don't rebuild the curve
+EPSILON = 1e-6
+
 
 class PointsToCurve(OpenMayaMPx.MPxNode):
     points = OpenMaya.MObject()
+    fitMode = OpenMaya.MObject()
+    cvCount = OpenMaya.MObject()
+    tolerance = OpenMaya.MObject()
     outCurve = OpenMaya.MObject()
 
     def __init__(self):
         super(PointsToCurve, self).__init__()
+        self._cachedPoints = None
+        self._cachedSettings = None
+        self._cachedCurve = None
 
     def compute(self, plug, datablock):
         if plug != PointsToCurve.outCurve:
@@ -47,16 +70,65 @@ class PointsToCurve(OpenMayaMPx.MPxNode):
         pointArrayDataFn = OpenMaya.MFnPointArrayData(pointsObj)
         points = pointArrayDataFn.array()
 
+        settings = (
+            datablock.inputValue(PointsToCurve.fitMode).asShort(),
+            datablock.inputValue(PointsToCurve.cvCount).asInt(),
+            datablock.inputValue(PointsToCurve.tolerance).asDouble(),
+        )
+        pointList = np.array([[points[i].x, points[i].y, points[i].z] for i in range(points.length())]).reshape(-1, 3)
+
+        if not self.isCached(pointList, settings):
+            self._cachedCurve = self.buildCurve(points, pointList, settings)
+            self._cachedPoints = pointList
+            self._cachedSettings = settings
+
+        # Output data is created from the cached cvs and knots, which is cheap compared to fitting
         curveDataFn = OpenMaya.MFnNurbsCurveData()
         outCurveData = curveDataFn.create()
 
+        cvs, knots, degree = self._cachedCurve
         curveFn = OpenMaya.MFnNurbsCurve()
-        curveFn.createWithEditPoints(points, 3, OpenMaya.MFnNurbsCurve.kOpen, False, False, True, outCurveData)
+        curveFn.create(cvs, knots, degree, OpenMaya.MFnNurbsCurve.kOpen, False, False, outCurveData)
 
         outputHd = datablock.outputValue(PointsToCurve.outCurve)
         outputHd.setMObject(outCurveData)
         outputHd.setClean()
 
+    def isCached(self, pointList, settings):
+        return (
+            self._cachedCurve is not None and settings == self._cachedSettings and
+            pointList.shape == self._cachedPoints.shape and np.allclose(pointList, self._cachedPoints, rtol=0.0, atol=EPSILON)
+        )
+
+    def buildCurve(self, points, pointList, settings):
+        """Cvs, knots and degree of the output curve.
+
+        Returns:
+            tuple: (OpenMaya.MPointArray, OpenMaya.MDoubleArray, int)
+        """
+        fitMode, cvCount, tolerance = settings
+        curveFn = OpenMaya.MFnNurbsCurve()
+        cvs = OpenMaya.MPointArray()
+        knots = OpenMaya.MDoubleArray()
+
+        if fitMode == EDIT_POINTS or len(pointList) < curve_fit.DEGREE + 1:
+            tempCurveData = OpenMaya.MFnNurbsCurveData().create()
+            curveFn.createWithEditPoints(points, 3, OpenMaya.MFnNurbsCurve.kOpen, False, False, True, tempCurveData)
+            curveFn.getCVs(cvs)
+            curveFn.getKnots(knots)
+            return cvs, knots, curveFn.degree()
+
+        if fitMode == CV_COUNT:
+            cvList, knotList = curve_fit.fitCurve(pointList, cvCount)
+        else:
+            cvList, knotList = curve_fit.fitCurveToTolerance(pointList, tolerance)
+
+        for cv in cvList.tolist():
+            cvs.append(OpenMaya.MPoint(cv[0], cv[1], cv[2]))
+        for knot in knotList.tolist():
+            knots.append(knot)
+        return cvs, knots, curve_fit.DEGREE
+
 
 def nodeCreator():
     return OpenMayaMPx.asMPxPtr(PointsToCurve())
@@ -65,18 +137,41 @@ def nodeCreator():
 def nodeInitializer():
     fnTypeAttr = OpenMaya.MFnTypedAttribute()
 
+    fnEnumAttr = OpenMaya.MFnEnumAttribute()
+    fnNumAttr = OpenMaya.MFnNumericAttribute()
+
     # Create and set attributes properties
     PointsToCurve.points = fnTypeAttr.create('points', 'pts', OpenMaya.MFnPointArrayData.kPointArray)
+
+    # Edit points pass through every point, the other modes fit a lighter curve by least squares
+    PointsToCurve.fitMode = fnEnumAttr.create('fitMode', 'fm', EDIT_POINTS)
+    fnEnumAttr.addField('editPoints', EDIT_POINTS)
+    fnEnumAttr.addField('cvCount', CV_COUNT)
+    fnEnumAttr.addField('tolerance', TOLERANCE)
+    fnEnumAttr.setKeyable(True)
+
+    PointsToCurve.cvCount = fnNumAttr.create('cvCount', 'cvc', OpenMaya.MFnNumericData.kInt, 8)
+    fnNumAttr.setMin(curve_fit.DEGREE + 1)
+    fnNumAttr.setKeyable(True)
+
+    PointsToCurve.tolerance = fnNumAttr.create('tolerance', 'tol', OpenMaya.MFnNumericData.kDouble, curve_fit.TOLERANCE)
+    fnNumAttr.setMin(0.0)
+    fnNumAttr.setKeyable(True)
+
     PointsToCurve.outCurve = fnTypeAttr.create('outCurve', 'oc', OpenMaya.MFnData.kNurbsCurve)
     fnTypeAttr.storable = False
     fnTypeAttr.writable = False
 
     # Add Attributes
     PointsToCurve.addAttribute(PointsToCurve.points)
+    PointsToCurve.addAttribute(PointsToCurve.fitMode)
+    PointsToCurve.addAttribute(PointsToCurve.cvCount)
+    PointsToCurve.addAttribute(PointsToCurve.tolerance)
     PointsToCurve.addAttribute(PointsToCurve.outCurve)
 
     # Attributes Dependency
-    PointsToCurve.attributeAffects(PointsToCurve.points, PointsToCurve.outCurve)
+    for inputAttr in [PointsToCurve.points, PointsToCurve.fitMode, PointsToCurve.cvCount, PointsToCurve.tolerance]:
+        PointsToCurve.attributeAffects(inputAttr, PointsToCurve.outCurve)
 
 
 def initializePlugin(obj):
@@ -1,73 +1,100 @@
 """
 Author: LEE SANGTAK
 Contact: chst27@gmail.com
+
+Blend targetGeo over baseGeo with a weight ramp along X.
+Weights and deltas are computed with numpy in takTools.utils.ramp_blend.
 """
 
-import maya.OpenMaya as OpenMaya
-import maya.OpenMayaMPx as OpenMayaMPx
+import numpy as np
+
+import maya.api.OpenMaya as om
+
+from takTools.utils import ramp_blend
 
 VENDOR = 'Tak'
-VERSION = '1.0'
+VERSION = '2.0'
 
 
-class RampBlendShape(OpenMayaMPx.MPxNode):
-    name = 'rampBlendShape'
-    id = OpenMaya.MTypeId(0x00002734)
+def maya_useNewAPI():
+    """ Say to maya that using api 2.0 """
+    pass
 
-    outGeoAttr = OpenMaya.MObject()
-    baseGeoAttr = OpenMaya.MObject()
-    targetGeoAttr = OpenMaya.MObject()
-    envelopeAttr = OpenMaya.MObject()
-    centerAttr = OpenMaya.MObject()
-    rangeAttr = OpenMaya.MObject()
-    weightRampAttr = OpenMaya.MObject()
-    inverseAttr = OpenMaya.MObject()
+
+class RampBlendShape(om.MPxNode):
+    name = 'rampBlendShape'
+    id = om.MTypeId(0x00002734)
+
+    outGeoAttr = om.MObject()
+    baseGeoAttr = om.MObject()
+    targetGeoAttr = om.MObject()
+    envelopeAttr = om.MObject()
+    centerAttr = om.MObject()
+    rangeAttr = om.MObject()
+    weightRampAttr = om.MObject()
+    # position, value and interpolation children of the ramp
+    weightRampChildAttrs = []
+    inverseAttr = om.MObject()
 
     def __init__(self):
         super(RampBlendShape, self).__init__()
+        # Cached until baseGeo or targetGeo is dirtied
+        self._basePoints = None
+        self._deltas = None
+        # Cached until the ramp is dirtied
+        self._rampLut = None
+
+    def setDependentsDirty(self, plug, affectedPlugs):
+        attr = plug.attribute()
+        if attr == RampBlendShape.baseGeoAttr or attr == RampBlendShape.targetGeoAttr:
+            self._basePoints = None
+            self._deltas = None
+        elif RampBlendShape.isRampPlug(plug):
+            self._rampLut = None
+
+    def preEvaluation(self, context, evaluationNode):
+        # setDependentsDirty is not called under the evaluation manager
+        if evaluationNode.dirtyPlugExists(RampBlendShape.baseGeoAttr) or evaluationNode.dirtyPlugExists(RampBlendShape.targetGeoAttr):
+            self._basePoints = None
+            self._deltas = None
+        rampAttrs = [RampBlendShape.weightRampAttr] + RampBlendShape.weightRampChildAttrs
+        if any(evaluationNode.dirtyPlugExists(attr) for attr in rampAttrs):
+            self._rampLut = None
+
+    @staticmethod
+    def isRampPlug(plug):
+        # Ramp edits dirty the ramp array, its elements or the position/value/interpolation children
+        if plug.isChild:
+            plug = plug.parent()
+        if plug.isElement:
+            plug = plug.array()
+        return plug.attribute() == RampBlendShape.weightRampAttr
 
     def compute(self, plug, dataBlock):
-        if not plug == RampBlendShape.outGeoAttr:
-            raise RuntimeError('Requested plug is wrong')
+        if plug != RampBlendShape.outGeoAttr:
+            return None
 
         baseGeoHandle = dataBlock.inputValue(RampBlendShape.baseGeoAttr)
-        targetGeo = dataBlock.inputValue(RampBlendShape.targetGeoAttr).asMesh()
         envelope = dataBlock.inputValue(RampBlendShape.envelopeAttr).asFloat()
         center = dataBlock.inputValue(RampBlendShape.centerAttr).asFloat()
         range = dataBlock.inputValue(RampBlendShape.rangeAttr).asFloat()
 
-        # Get target geometry points
-        targetGeoFn = OpenMaya.MFnMesh(targetGeo)
-        targetGeoPoints = OpenMaya.MPointArray()
-        targetGeoFn.getPoints(targetGeoPoints)
-
-        # Copy base geometry to create output mesh
-        meshDataFn = OpenMaya.MFnMeshData()
-        outMesh = meshDataFn.create()
-        outMeshFn = OpenMaya.MFnMesh()
-        outMeshFn.copy(baseGeoHandle.asMeshTransformed(), outMesh)
-
-        thisNode = self.thisMObject()
-        weightRamp = OpenMaya.MRampAttribute(thisNode, RampBlendShape.weightRampAttr)
-
-        minRange = center - range
-        maxRange = center + range
+        if self._deltas is None:
+            targetGeo = dataBlock.inputValue(RampBlendShape.targetGeoAttr).asMesh()
+            self._basePoints = RampBlendShape.getPoints(baseGeoHandle.asMesh())
+            self._deltas = RampBlendShape.getPoints(targetGeo) - self._basePoints
 
-        baseGeoIter = OpenMaya.MItGeometry(baseGeoHandle)
-        while not baseGeoIter.isDone():
-            targetGeoPoint = targetGeoPoints[baseGeoIter.index()]
-            deltaVector = targetGeoPoint - baseGeoIter.position()
+        if self._rampLut is None:
+            weightRamp = om.MRampAttribute(self.thisMObject(), RampBlendShape.weightRampAttr)
+            self._rampLut = ramp_blend.sampleRamp(weightRamp.getValueAtPosition)
 
-            if minRange <= baseGeoIter.position().x <= maxRange:
-                normalizedXPosition = RampBlendShape.remapValue(minRange, maxRange, 0, 1, baseGeoIter.position().x)
-                valAtPos = RampBlendShape.getValAtPos(weightRamp, normalizedXPosition)
-                deltaVector = deltaVector * valAtPos
-            else:
-                deltaVector = deltaVector * 0
+        outPoints = ramp_blend.rampBlend(self._basePoints, self._deltas, center, range, self._rampLut, envelope)
 
-            outPoint = baseGeoIter.position() + (deltaVector * envelope)
-            outMeshFn.setPoint(baseGeoIter.index(), outPoint)
-            baseGeoIter.next()
+        # Copy base geometry to create output mesh
+        outMesh = om.MFnMeshData().create()
+        outMeshFn = om.MFnMesh()
+        outMeshFn.copy(baseGeoHandle.asMeshTransformed(), outMesh)
+        outMeshFn.setPoints(om.MPointArray([om.MPoint(point) for point in outPoints.tolist()]))
 
         outGeoHandle = dataBlock.outputValue(RampBlendShape.outGeoAttr)
         outGeoHandle.setMObject(outMesh)
@@ -75,64 +102,56 @@ class RampBlendShape(OpenMayaMPx.MPxNode):
         dataBlock.setClean(plug)
 
     @staticmethod
-    def getValAtPos(rampAttr, position):
-        valAtUtil = OpenMaya.MScriptUtil()
-        valAtUtil.createFromDouble(1.0)
-        valAtPtr = valAtUtil.asFloatPtr()
-        rampAttr.getValueAtPosition(position, valAtPtr)
-        return valAtUtil.getFloat(valAtPtr)
-
-    @staticmethod
-    def remapValue(inMin, inMax, outMin, outMax, inValue):
-        outValue = outMin + ((inValue-inMin)*(outMax-outMin) / (inMax-inMin))
-        return outValue
+    def getPoints(mesh):
+        return np.array(om.MFnMesh(mesh).getPoints(), dtype=np.float64).reshape(-1, 4)[:, :3]
 
     @staticmethod
     def creator():
-        return OpenMayaMPx.asMPxPtr(RampBlendShape())
+        return RampBlendShape()
 
     @staticmethod
     def initialize():
-        typeAttrFn = OpenMaya.MFnTypedAttribute()
-        numericAttrFn = OpenMaya.MFnNumericAttribute()
-        rampAttrFn = OpenMaya.MRampAttribute()
+        typeAttrFn = om.MFnTypedAttribute()
+        numericAttrFn = om.MFnNumericAttribute()
 
-        RampBlendShape.outGeoAttr = typeAttrFn.create('outGeo', 'outGeo', OpenMaya.MFnData.kMesh)
-        typeAttrFn.setWritable(False)
-        typeAttrFn.setStorable(False)
+        RampBlendShape.outGeoAttr = typeAttrFn.create('outGeo', 'outGeo', om.MFnData.kMesh)
+        typeAttrFn.writable = False
+        typeAttrFn.storable = False
         RampBlendShape.addAttribute(RampBlendShape.outGeoAttr)
 
-        RampBlendShape.baseGeoAttr = typeAttrFn.create('baseGeo', 'baseGeo', OpenMaya.MFnData.kMesh)
+        RampBlendShape.baseGeoAttr = typeAttrFn.create('baseGeo', 'baseGeo', om.MFnData.kMesh)
         RampBlendShape.addAttribute(RampBlendShape.baseGeoAttr)
         RampBlendShape.attributeAffects(RampBlendShape.baseGeoAttr, RampBlendShape.outGeoAttr)
 
-        RampBlendShape.targetGeoAttr = typeAttrFn.create('targetGeo', 'targetGeo', OpenMaya.MFnData.kMesh)
+        RampBlendShape.targetGeoAttr = typeAttrFn.create('targetGeo', 'targetGeo', om.MFnData.kMesh)
         RampBlendShape.addAttribute(RampBlendShape.targetGeoAttr)
         RampBlendShape.attributeAffects(RampBlendShape.targetGeoAttr, RampBlendShape.outGeoAttr)
 
-        RampBlendShape.envelopeAttr = numericAttrFn.create('envelope', 'envelope', OpenMaya.MFnNumericData.kFloat, 1.0)
-        numericAttrFn.setKeyable(True)
+        RampBlendShape.envelopeAttr = numericAttrFn.create('envelope', 'envelope', om.MFnNumericData.kFloat, 1.0)
+        numericAttrFn.keyable = True
         numericAttrFn.setMin(0.0)
         numericAttrFn.setMax(1.0)
         RampBlendShape.addAttribute(RampBlendShape.envelopeAttr)
         RampBlendShape.attributeAffects(RampBlendShape.envelopeAttr, RampBlendShape.outGeoAttr)
 
-        RampBlendShape.centerAttr = numericAttrFn.create('center', 'center', OpenMaya.MFnNumericData.kFloat, 0.0)
-        numericAttrFn.setKeyable(True)
+        RampBlendShape.centerAttr = numericAttrFn.create('center', 'center', om.MFnNumericData.kFloat, 0.0)
+        numericAttrFn.keyable = True
         RampBlendShape.addAttribute(RampBlendShape.centerAttr)
         RampBlendShape.attributeAffects(RampBlendShape.centerAttr, RampBlendShape.outGeoAttr)
 
-        RampBlendShape.rangeAttr = numericAttrFn.create('range', 'range', OpenMaya.MFnNumericData.kFloat, 5.0)
-        numericAttrFn.setKeyable(True)
+        RampBlendShape.rangeAttr = numericAttrFn.create('range', 'range', om.MFnNumericData.kFloat, 5.0)
+        numericAttrFn.keyable = True
         numericAttrFn.setMin(0.01)
         RampBlendShape.addAttribute(RampBlendShape.rangeAttr)
         RampBlendShape.attributeAffects(RampBlendShape.rangeAttr, RampBlendShape.outGeoAttr)
 
-        RampBlendShape.weightRampAttr = rampAttrFn.createCurveRamp('weightCurveRamp', 'weightCurveRamp')
+        RampBlendShape.weightRampAttr = om.MRampAttribute.createCurveRamp('weightCurveRamp', 'weightCurveRamp')
         RampBlendShape.addAttribute(RampBlendShape.weightRampAttr)
+        weightRampFn = om.MFnCompoundAttribute(RampBlendShape.weightRampAttr)
+        RampBlendShape.weightRampChildAttrs = [weightRampFn.child(i) for i in range(weightRampFn.numChildren())]
         RampBlendShape.attributeAffects(RampBlendShape.weightRampAttr, RampBlendShape.outGeoAttr)
 
-        RampBlendShape.inverseAttr = numericAttrFn.create('inverse', 'inverse', OpenMaya.MFnNumericData.kBoolean)
+        RampBlendShape.inverseAttr = numericAttrFn.create('inverse', 'inverse', om.MFnNumericData.kBoolean)
         RampBlendShape.addAttribute(RampBlendShape.inverseAttr)
         RampBlendShape.attributeAffects(RampBlendShape.inverseAttr, RampBlendShape.outGeoAttr)
 
@@ -144,7 +163,7 @@ class RampBlendShape(OpenMayaMPx.MPxNode):
 
     @staticmethod
     def initializeCurveRamp(node, rampAttr, index, position, value, interpolation):
-        rampPlug = OpenMaya.MPlug(node, rampAttr)
+        rampPlug = om.MPlug(node, rampAttr)
         elementPlug = rampPlug.elementByLogicalIndex(index)
 
         positionPlug = elementPlug.child(0)
@@ -158,17 +177,17 @@ class RampBlendShape(OpenMayaMPx.MPxNode):
 
 
 def initializePlugin(mObj):
-    pluginFn = OpenMayaMPx.MFnPlugin(mObj, VENDOR, VERSION)
+    pluginFn = om.MFnPlugin(mObj, VENDOR, VERSION)
     try:
         pluginFn.registerNode(RampBlendShape.name, RampBlendShape.id,
                               RampBlendShape.creator, RampBlendShape.initialize,
-                              OpenMayaMPx.MPxNode.kDependNode)
+                              om.MPxNode.kDependNode)
     except:
         raise RuntimeError('Failed to register node: %s' % RampBlendShape.name)
 
 
 def uninitializePlugin(mObj):
-    pluginFn = OpenMayaMPx.MFnPlugin(mObj)
+    pluginFn = om.MFnPlugin(mObj)
     try:
         pluginFn.deregisterNode(RampBlendShape.id)
     except:
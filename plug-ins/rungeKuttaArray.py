@@ -0,0 +1,145 @@
+"""
+Author: LEE SANGTAK
+Contact: chst27@gmail.com
+
+Array variant of the rungeKutta node.
+Simulates a mass spring damper particle per target position. All particles are integrated together
+with takTools.utils.spring_solver and simulated frames are cached, so scrubbing backward doesn't reset to the start frame.
+"""
+
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+from takTools.utils import spring_solver
+
+VENDOR = 'Tak'
+VERSION = '1.0'
+
+
+def maya_useNewAPI():
+    """ Say to maya that using api 2.0 """
+    pass
+
+
+class RungeKuttaArray(om.MPxNode):
+    name = 'rungeKuttaArray'
+    id = om.MTypeId(0x00002750)
+
+    currentTimeAttr = om.MObject()
+    targetPositionsAttr = om.MObject()
+    springConstantsAttr = om.MObject()
+    dampingRatiosAttr = om.MObject()
+    frameIterationsAttr = om.MObject()
+    outPositionsAttr = om.MObject()
+    outVelocitiesAttr = om.MObject()
+
+    def __init__(self):
+        super(RungeKuttaArray, self).__init__()
+        self._stateCache = spring_solver.SpringStateCache()
+
+    def compute(self, plug, dataBlock):
+        if plug != RungeKuttaArray.outPositionsAttr and plug != RungeKuttaArray.outVelocitiesAttr:
+            return None
+
+        currentTime = dataBlock.inputValue(RungeKuttaArray.currentTimeAttr).asTime().value
+        startTime = oma.MAnimControl.animationStartTime().value
+        targetPositions = om.MFnPointArrayData(dataBlock.inputValue(RungeKuttaArray.targetPositionsAttr).data()).array()
+        frameIterations = dataBlock.inputValue(RungeKuttaArray.frameIterationsAttr).asInt()
+
+        count = len(targetPositions)
+        springConstants = spring_solver.broadcastParameter(
+            RungeKuttaArray.getDoubleArray(dataBlock, RungeKuttaArray.springConstantsAttr), count, spring_solver.SPRING_CONSTANT
+        )
+        dampingRatios = spring_solver.broadcastParameter(
+            RungeKuttaArray.getDoubleArray(dataBlock, RungeKuttaArray.dampingRatiosAttr), count, spring_solver.DAMPING_RATIO
+        )
+
+        targets = [[point.x, point.y, point.z] for point in targetPositions]
+        positions, velocities = self._stateCache.evaluate(currentTime, startTime, targets, springConstants, dampingRatios, frameIterations)
+
+        outPositions = om.MPointArray([om.MPoint(position) for position in positions.tolist()])
+        outVelocities = om.MVectorArray([om.MVector(velocity) for velocity in velocities.tolist()])
+
+        outPositionsHandle = dataBlock.outputValue(RungeKuttaArray.outPositionsAttr)
+        outPositionsHandle.setMObject(om.MFnPointArrayData().create(outPositions))
+        outPositionsHandle.setClean()
+
+        outVelocitiesHandle = dataBlock.outputValue(RungeKuttaArray.outVelocitiesAttr)
+        outVelocitiesHandle.setMObject(om.MFnVectorArrayData().create(outVelocities))
+        outVelocitiesHandle.setClean()
+
+        dataBlock.setClean(plug)
+
+    @staticmethod
+    def getDoubleArray(dataBlock, attr):
+        data = dataBlock.inputValue(attr).data()
+        return list(om.MFnDoubleArrayData(data).array()) if not data.isNull() else []
+
+    @staticmethod
+    def creator():
+        return RungeKuttaArray()
+
+    @staticmethod
+    def initialize():
+        unitAttrFn = om.MFnUnitAttribute()
+        typedAttrFn = om.MFnTypedAttribute()
+        numericAttrFn = om.MFnNumericAttribute()
+
+        RungeKuttaArray.currentTimeAttr = unitAttrFn.create('currentTime', 't', om.MFnUnitAttribute.kTime, 1.0)
+        unitAttrFn.keyable = True
+        RungeKuttaArray.addAttribute(RungeKuttaArray.currentTimeAttr)
+
+        RungeKuttaArray.targetPositionsAttr = typedAttrFn.create(
+            'targetPositions', 'tps', om.MFnData.kPointArray, om.MFnPointArrayData().create()
+        )
+        RungeKuttaArray.addAttribute(RungeKuttaArray.targetPositionsAttr)
+
+        # Shorter arrays repeat their last value for the rest of the particles
+        RungeKuttaArray.springConstantsAttr = typedAttrFn.create(
+            'springConstants', 'ks', om.MFnData.kDoubleArray, om.MFnDoubleArrayData().create(om.MDoubleArray([spring_solver.SPRING_CONSTANT]))
+        )
+        RungeKuttaArray.addAttribute(RungeKuttaArray.springConstantsAttr)
+
+        RungeKuttaArray.dampingRatiosAttr = typedAttrFn.create(
+            'dampingRatios', 'drs', om.MFnData.kDoubleArray, om.MFnDoubleArrayData().create(om.MDoubleArray([spring_solver.DAMPING_RATIO]))
+        )
+        RungeKuttaArray.addAttribute(RungeKuttaArray.dampingRatiosAttr)
+
+        RungeKuttaArray.frameIterationsAttr = numericAttrFn.create('frameIterations', 'fi', om.MFnNumericData.kInt, 1)
+        numericAttrFn.setMin(1)
+        numericAttrFn.setMax(5)
+        numericAttrFn.channelBox = True
+        RungeKuttaArray.addAttribute(RungeKuttaArray.frameIterationsAttr)
+
+        RungeKuttaArray.outPositionsAttr = typedAttrFn.create('outPositions', 'ops', om.MFnData.kPointArray)
+        typedAttrFn.writable = False
+        typedAttrFn.storable = False
+        RungeKuttaArray.addAttribute(RungeKuttaArray.outPositionsAttr)
+
+        RungeKuttaArray.outVelocitiesAttr = typedAttrFn.create('outVelocities', 'ovs', om.MFnData.kVectorArray)
+        typedAttrFn.writable = False
+        typedAttrFn.storable = False
+        RungeKuttaArray.addAttribute(RungeKuttaArray.outVelocitiesAttr)
+
+        for inputAttr in [RungeKuttaArray.currentTimeAttr, RungeKuttaArray.targetPositionsAttr, RungeKuttaArray.springConstantsAttr,
+                          RungeKuttaArray.dampingRatiosAttr, RungeKuttaArray.frameIterationsAttr]:
+            RungeKuttaArray.attributeAffects(inputAttr, RungeKuttaArray.outPositionsAttr)
+            RungeKuttaArray.attributeAffects(inputAttr, RungeKuttaArray.outVelocitiesAttr)
+
+
+def initializePlugin(mObj):
+    pluginFn = om.MFnPlugin(mObj, VENDOR, VERSION)
+    try:
+        pluginFn.registerNode(RungeKuttaArray.name, RungeKuttaArray.id,
+                              RungeKuttaArray.creator, RungeKuttaArray.initialize,
+                              om.MPxNode.kDependNode)
+    except:
+        raise RuntimeError('Failed to register node: %s' % RungeKuttaArray.name)
+
+
+def uninitializePlugin(mObj):
+    pluginFn = om.MFnPlugin(mObj)
+    try:
+        pluginFn.deregisterNode(RungeKuttaArray.id)
+    except:
+        raise RuntimeError('Failed to deregister node: %s' % RungeKuttaArray.name)
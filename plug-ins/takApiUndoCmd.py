@@ -0,0 +1,69 @@
+# takApiUndo command
+#
+# Puts API writes of takTools scripts on the undo queue.
+# Call takTools.utils.api_undo.run(doFunc, undoFunc) instead of the command.
+# The command calls doFunc on doIt and redoIt and undoFunc on undoIt.
+#
+################################################################################################
+
+
+import sys
+import maya.api.OpenMaya as om
+
+from takTools.utils import api_undo
+
+kPluginCmdName = api_undo.COMMAND_NAME
+
+
+def maya_useNewAPI():
+    """ Say to maya that using api 2.0 """
+    pass
+
+
+class ApiUndoCmd(om.MPxCommand):
+
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+        self.doFunc = None
+        self.undoFunc = None
+
+    def isUndoable(self):
+        return self.doFunc is not None
+
+    def doIt(self, args):
+        if not api_undo.pending:
+            om.MGlobal.displayError("{} is called by takTools.utils.api_undo.run().".format(kPluginCmdName))
+            return
+        self.doFunc, self.undoFunc = api_undo.pending.pop()
+        self.redoIt()
+
+    def undoIt(self):
+        self.undoFunc()
+
+    def redoIt(self):
+        self.doFunc()
+
+
+# Creator
+def cmdCreator():
+    return ApiUndoCmd()
+
+
+# Initialize the script plug-in
+def initializePlugin(mobject):
+    mplugin = om.MFnPlugin(mobject, "takTools", "1.0", "Any")
+    try:
+        mplugin.registerCommand(kPluginCmdName, cmdCreator)
+    except Exception as e:
+        sys.stderr.write('Failed to register command:  %s\n' %kPluginCmdName)
+        sys.stderr.write('%s\n' %e)
+
+
+# Uninitialize the script plug-in
+def uninitializePlugin(mobject):
+    mplugin = om.MFnPlugin(mobject)
+    try:
+        mplugin.deregisterCommand(kPluginCmdName)
+    except Exception as e:
+        sys.stderr.write('Failed to de-register command:  %s\n' %kPluginCmdName)
+        sys.stderr.write('%s\n' %e)
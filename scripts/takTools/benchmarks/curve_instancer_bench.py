@@ -0,0 +1,91 @@
+"""
+Benchmark the cached instanceAlongCurve evaluation for many instances.
+
+A cold evaluation builds the arc length table and samples the curve. A warm evaluation reuses the samples,
+which is what the rotation and scale outputs and every ramp or offset edit cost.
+Per instance is the cost of one arc length table query and curve evaluation per instance like the legacy loops.
+
+Usage:
+    python -m takTools.benchmarks.curve_instancer_bench [instanceCount ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import curve_instancer
+from takTools.utils import curve_lut
+
+
+DEFAULT_SIZES = [1000, 10000]
+CV_COUNT = 40
+DEGREE = 3
+PER_INSTANCE_LIMIT = 200
+
+
+def makeCurve(rng):
+    """Wavy open cubic curve with Maya knots."""
+    cvs = np.cumsum(rng.uniform(-1.0, 1.0, size=(CV_COUNT, 3)) + [1.0, 0.0, 0.0], axis=0)
+    spanCount = CV_COUNT - DEGREE
+    knots = np.concatenate([np.zeros(DEGREE - 1), np.arange(spanCount + 1), np.full(DEGREE - 1, spanCount)]).astype(np.float64)
+    return cvs, knots
+
+
+def makeRamp():
+    return curve_instancer.RampSettings(curve_instancer.RampTable.fromFunction(lambda position: np.sin(position * np.pi)),
+                                        [0.0, 1.0, 0.0], 1.0, 0.2, 2.0, 0.1)
+
+
+def evaluate(sampler, cvs, knots, count, ramp):
+    length = sampler.setCurve(cvs, knots, DEGREE)
+    samples = sampler.getSamples(curve_instancer.getDistances(count, 0.0, 0.0, length, length, length / count))
+    handleAngles = curve_instancer.getHandleAngles(samples.params, [0.0, 10.0, 20.0], [0.0, 1.0, 0.0], False, samples.maxParam)
+    inputRotation = [0.0, 0.0, 0.0, 1.0]
+
+    translations = curve_instancer.getTranslations(samples, 0, 2, inputRotation, handleAngles, ramp, [0.0, 0.5, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0])
+    rotations = curve_instancer.getRotations(samples, 0, 2, inputRotation, handleAngles, ramp, [0.0, 0.0, 0.0], [0.0, 0.0, 0.0])
+    scales = curve_instancer.getScales(samples, ramp, [1.0, 1.0, 1.0])
+    return translations, rotations, scales
+
+
+def perInstance(cvs, knots, count, limit):
+    """Arc length query and point, tangent evaluation one instance at a time."""
+    fullKnots = curve_lut.toFullKnots(knots)
+    table = curve_lut.ArcLengthTable.fromNurbs(cvs, fullKnots, DEGREE)
+    increment = table.length / count
+    for i in range(limit):
+        param = table.getParams([increment * i])
+        curve_lut.evaluateNurbsTangents(cvs, fullKnots, DEGREE, param)
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rng = np.random.default_rng(0)
+    cvs, knots = makeCurve(rng)
+    ramp = makeRamp()
+    print('{} cvs, degree {}'.format(CV_COUNT, DEGREE))
+    print('{:>10} {:>12} {:>12} {:>16}'.format('instances', 'cold(ms)', 'warm(ms)', 'per instance(ms)'))
+    for count in sizes:
+        sampler = curve_instancer.CurveSampler()
+        coldTime, _ = timeIt(evaluate, sampler, cvs, knots, count, ramp)
+        warmTime, _ = timeIt(evaluate, sampler, cvs, knots, count, ramp)
+
+        limit = min(PER_INSTANCE_LIMIT, count)
+        loopTime, _ = timeIt(perInstance, cvs, knots, count, limit)
+        loopTime *= count / float(limit)
+
+        print('{:>10} {:>12.2f} {:>12.2f} {:>16.2f}'.format(count, coldTime * 1000.0, warmTime * 1000.0, loopTime * 1000.0))
+    print('per instance time is extrapolated from {} instances and has no ramp or rotation work'.format(PER_INSTANCE_LIMIT))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
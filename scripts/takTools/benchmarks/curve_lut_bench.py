@@ -0,0 +1,115 @@
+"""
+Benchmark one shared arc length table answering every query against a search per query,
+which is what N separate curveLength2ParamU nodes on the same curve cost.
+
+A node calls MFnNurbsCurve.findParamFromLength, which integrates the arc length and searches the parameter for its one length.
+findParamFromLength() below does the same with Gauss-Legendre quadrature and Newton steps.
+
+Usage:
+    python -m takTools.benchmarks.curve_lut_bench [queryCount ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import curve_lut
+
+
+DEFAULT_SIZES = [10, 100, 1000]
+CV_COUNT = 40
+DEGREE = 3
+PER_NODE_LIMIT = 100
+REFERENCE_SAMPLES = 2000000
+GAUSS_POINTS, GAUSS_WEIGHTS = np.polynomial.legendre.leggauss(16)
+NEWTON_ITERATIONS = 20
+
+
+def makeCurve(rng):
+    """Wavy open cubic curve with Maya style knots."""
+    cvs = np.cumsum(rng.uniform(-1.0, 1.0, size=(CV_COUNT, 3)) + [1.0, 0.0, 0.0], axis=0)
+    spanCount = CV_COUNT - DEGREE
+    mayaKnots = np.concatenate([np.zeros(DEGREE - 1), np.arange(spanCount + 1), np.full(DEGREE - 1, spanCount)]).astype(np.float64)
+    return cvs, curve_lut.toFullKnots(mayaKnots)
+
+
+def getReferenceLengths(cvs, knots, params):
+    """Arc lengths at params from a dense polyline."""
+    denseParams = np.linspace(knots[DEGREE], knots[CV_COUNT], REFERENCE_SAMPLES)
+    points = curve_lut.evaluateNurbs(cvs, knots, DEGREE, denseParams)
+    denseLengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    return np.interp(params, denseParams, denseLengths)
+
+
+def integrateLengths(cvs, knots, starts, ends):
+    """Arc lengths of parameter intervals by Gauss-Legendre quadrature of the curve speed."""
+    starts, ends = np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64)
+    halfWidths = (ends - starts) * 0.5
+    params = (starts + halfWidths)[:, None] + halfWidths[:, None] * GAUSS_POINTS
+    _, tangents = curve_lut.evaluateNurbsTangents(cvs, knots, DEGREE, params.ravel())
+    speeds = np.linalg.norm(tangents, axis=1).reshape(params.shape)
+    return speeds @ GAUSS_WEIGHTS * halfWidths
+
+
+def findParamFromLength(cvs, knots, fraction):
+    """Parameter of one node without a table: span lengths by quadrature, then Newton steps in the span of the length."""
+    spanKnots = np.unique(knots[DEGREE:CV_COUNT + 1])
+    spanLengths = integrateLengths(cvs, knots, spanKnots[:-1], spanKnots[1:])
+    spanStartLengths = np.concatenate([[0.0], np.cumsum(spanLengths)])
+    length = fraction * spanStartLengths[-1]
+
+    span = min(np.searchsorted(spanStartLengths, length, side='right') - 1, len(spanLengths) - 1)
+    start, end = spanKnots[span], spanKnots[span + 1]
+    spanLength = length - spanStartLengths[span]
+    param = start + (end - start) * spanLength / spanLengths[span]
+    for _ in range(NEWTON_ITERATIONS):
+        error = integrateLengths(cvs, knots, [start], [param])[0] - spanLength
+        if abs(error) <= curve_lut.TOLERANCE * 0.01:
+            break
+        _, tangent = curve_lut.evaluateNurbsTangents(cvs, knots, DEGREE, [param])
+        param = np.clip(param - error / np.linalg.norm(tangent), start, end)
+    return param
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rng = np.random.default_rng(0)
+    cvs, knots = makeCurve(rng)
+    print('{} cvs, degree {}, tolerance {}'.format(CV_COUNT, DEGREE, curve_lut.TOLERANCE))
+    print('{:>10} {:>10} {:>12} {:>14} {:>14} {:>12}'.format('queries', 'samples', 'build(s)', 'query(s)', 'per node(s)', 'max error'))
+    for queryCount in sizes:
+        fractions = np.sort(rng.uniform(size=queryCount))
+
+        buildTime, table = timeIt(curve_lut.ArcLengthTable.fromNurbs, cvs, knots, DEGREE)
+        queryTime, params = timeIt(table.getParams, fractions, True)
+
+        # Every node searches the parameter of its single length
+        nodeCount = min(PER_NODE_LIMIT, queryCount)
+
+        def perNode():
+            return [findParamFromLength(cvs, knots, fraction) for fraction in fractions[:nodeCount]]
+
+        perNodeTime, _ = timeIt(perNode)
+        perNodeTime *= queryCount / float(nodeCount)
+
+        # Distance along the curve between the requested length and the length at the found parameter
+        referenceLengths = getReferenceLengths(cvs, knots, np.append(params, knots[CV_COUNT]))
+        maxError = np.abs(referenceLengths[:-1] - fractions * referenceLengths[-1]).max()
+
+        print('{:>10} {:>10} {:>12.5f} {:>14.6f} {:>14.4f} {:>12.2e}'.format(
+            queryCount, len(table.params), buildTime, queryTime, perNodeTime, maxError))
+        assert maxError <= curve_lut.TOLERANCE, 'Max error {:.2e} is above {:.0e}'.format(maxError, curve_lut.TOLERANCE)
+    print('per node time is extrapolated from {} nodes'.format(PER_NODE_LIMIT))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
@@ -0,0 +1,96 @@
+"""
+Benchmark the icon scan that tak_tools ran at import against the lazy icon catalog on generated icon directories.
+
+With mayapy the import time of takTools.tak_tools is measured as well, before and after the first catalog query.
+
+Usage:
+    python -m takTools.benchmarks.icon_catalog_bench [iconCount ...]
+    mayapy -m takTools.benchmarks.icon_catalog_bench
+"""
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from takTools.utils import icon_catalog
+
+
+DEFAULT_SIZES = [1000, 10000, 50000]
+DIRECTORY_COUNT = 8
+RESOURCE_COUNT = 5000
+QUERY = 'poly'
+
+
+def makeIconDirectories(rootDir, iconCount):
+    paths = []
+    for i in range(DIRECTORY_COUNT):
+        path = os.path.join(rootDir, 'icons{}'.format(i))
+        os.makedirs(path)
+        for j in range(i, iconCount, DIRECTORY_COUNT):
+            open(os.path.join(path, '{}Icon{}.png'.format(['poly', 'skin', 'curve', 'render'][j % 4], j)), 'w').close()
+        paths.append(path)
+    return paths
+
+
+def scanAtImport(paths, resources):
+    """What tak_tools.getAllIcons() did on every import."""
+    allIcons = []
+    for path in paths:
+        if os.path.exists(path):
+            allIcons.extend(os.listdir(path))
+    allIcons.extend(resources)
+    return list(set(allIcons))
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def timeTakToolsImport():
+    """Import time of tak_tools in mayapy. Skipped without Maya."""
+    try:
+        import maya.standalone
+        maya.standalone.initialize()
+    except ImportError:
+        print('tak_tools import: skipped, needs mayapy')
+        return
+    importTime, _ = timeIt(importlib.import_module, 'takTools.tak_tools')
+    queryTime, _ = timeIt(icon_catalog.getCatalog().search, QUERY)
+    print('tak_tools import: {:.3f}s, first icon query: {:.3f}s'.format(importTime, queryTime))
+
+
+def run(sizes=DEFAULT_SIZES):
+    resources = ['resource{}.png'.format(i) for i in range(RESOURCE_COUNT)]
+    print('{:>8} {:>12} {:>12} {:>12} {:>12} {:>12}'.format('icons', 'import(s)', 'scan(s)', 'cold(s)', 'warm(s)', 'query(ms)'))
+    for iconCount in sizes:
+        rootDir = tempfile.mkdtemp()
+        try:
+            paths = makeIconDirectories(rootDir, iconCount)
+            scanTime, _ = timeIt(scanAtImport, paths, resources)
+
+            cachePath = os.path.join(rootDir, 'iconCatalog.json')
+            # Creating the catalog is all an import costs now
+            importTime, catalog = timeIt(icon_catalog.IconCatalog, paths, lambda: resources, 'bench', cachePath)
+            coldTime, _ = timeIt(catalog.build)
+            warmCatalog = icon_catalog.IconCatalog(paths, lambda: resources, 'bench', cachePath)
+            warmTime, _ = timeIt(warmCatalog.build)
+            queryTime, _ = timeIt(warmCatalog.search, QUERY)
+
+            print('{:>8} {:>12.6f} {:>12.4f} {:>12.4f} {:>12.4f} {:>12.3f}'.format(
+                iconCount, importTime, scanTime, coldTime, warmTime, queryTime * 1000.0))
+        finally:
+            shutil.rmtree(rootDir)
+    print('{} resources. Warm builds read the cache and stat {} directories.'.format(RESOURCE_COUNT, DIRECTORY_COUNT))
+    timeTakToolsImport()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
@@ -0,0 +1,110 @@
+"""
+Benchmark streaming ma_edit.editFile() against reading, replacing and writing the whole file,
+which is what tak_editMayaAsciiFile did, on generated Maya ASCII scenes.
+
+Usage:
+    python -m takTools.benchmarks.ma_edit_bench [sizeMb ...]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from takTools.utils import ma_edit
+
+
+DEFAULT_SIZES = [16, 64, 256]
+FILE_COUNT = 4
+WORKERS = 4
+SEARCH = 'D:/assets'
+REPLACE = '//server/assets'
+
+HEADER = (
+    '//Maya ASCII 2022 scene\n'
+    'file -rdi 1 -ns "chr" -rfn "chrRN" -op "v=0;" -typ "mayaAscii" "D:/assets/chr.ma";\n'
+    'file -r -ns "chr" -dr 1 -rfn "chrRN" -op "v=0;" -typ "mayaAscii" "D:/assets/chr.ma";\n'
+    'requires maya "2022";\n'
+)
+NODE = (
+    'createNode mesh -n "bodyShape{0}" -p "body{0}";\n'
+    '\tsetAttr -k off ".v";\n'
+    '\tsetAttr -s 4 ".vt[0:3]"  -0.5 -0.5 0.5 0.5 -0.5 0.5 -0.5 0.5 0.5 0.5 0.5 0.5;\n'
+    '\tsetAttr -s 4 ".ed[0:3]"  0 1 0 2 3 0 0 2 0 1 3 0;\n'
+)
+TEXTURE = '\tsetAttr ".ftn" -type "string" "D:/assets/textures/body{0}.png";\n'
+
+
+def writeScene(path, sizeMb):
+    """Mesh nodes with a texture path every 1000 nodes."""
+    with open(path, 'w') as f:
+        f.write(HEADER)
+        i = 0
+        while f.tell() < sizeMb * 1024 * 1024:
+            f.write(''.join(NODE.format(j) + (TEXTURE.format(j) if j % 1000 == 0 else '') for j in range(i, i + 1000)))
+            i += 1000
+
+
+def replaceWholeFile(path):
+    with open(path, 'r') as f:
+        contents = f.read()
+    newContents = contents.replace(SEARCH, REPLACE)
+    if newContents != contents:
+        with open(path, 'w') as f:
+            f.write(newContents)
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def measure(func, *args, **kwargs):
+    """Time and peak python memory in Mb."""
+    tracemalloc.start()
+    elapsedTime, result = timeIt(func, *args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsedTime, peak / 1024.0 / 1024.0, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rules = [ma_edit.Rule(SEARCH, REPLACE)]
+    tempDir = tempfile.mkdtemp()
+    try:
+        print('{:>8} {:>12} {:>12} {:>14} {:>14} {:>14}'.format('size(Mb)', 'whole(s)', 'whole(Mb)', 'stream(s)', 'stream(Mb)', 'unchanged(s)'))
+        for sizeMb in sizes:
+            path = os.path.join(tempDir, 'scene.ma')
+            writeScene(path, sizeMb)
+            backupPath = os.path.join(tempDir, 'backup.ma')
+            shutil.copyfile(path, backupPath)
+
+            wholeTime, wholePeak, _ = measure(replaceWholeFile, path)
+            shutil.copyfile(backupPath, path)
+            streamTime, streamPeak, _ = measure(ma_edit.editFile, path, rules, False)
+            # Second pass has nothing to replace and only reads
+            unchangedTime, _ = timeIt(ma_edit.editFile, path, rules, False)
+            print('{:>8} {:>12.3f} {:>12.1f} {:>14.3f} {:>14.1f} {:>14.3f}'.format(
+                sizeMb, wholeTime, wholePeak, streamTime, streamPeak, unchangedTime))
+
+        paths = []
+        for i in range(FILE_COUNT):
+            paths.append(os.path.join(tempDir, 'shot{}.ma'.format(i)))
+            shutil.copyfile(backupPath, paths[-1])
+        serialTime, _ = timeIt(ma_edit.editFiles, paths, rules, False)
+        for path in paths:
+            shutil.copyfile(backupPath, path)
+        parallelTime, _ = timeIt(ma_edit.editFiles, paths, rules, False, workers=WORKERS)
+        print('{} files of {}Mb: serial {:.3f}s, {} workers {:.3f}s'.format(FILE_COUNT, sizes[-1], serialTime, WORKERS, parallelTime))
+    finally:
+        shutil.rmtree(tempDir)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
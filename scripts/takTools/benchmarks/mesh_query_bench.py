@@ -0,0 +1,59 @@
+"""
+Benchmark mesh_query.TriangleIndex closest point and overlap queries on a synthetic sphere.
+
+Usage:
+    python -m takTools.benchmarks.mesh_query_bench [queryCount ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import mesh_query
+
+
+DEFAULT_SIZES = [10000, 100000]
+RESOLUTION = 320
+OVERLAP_DISTANCE = 0.05
+
+
+def createSphere(resolution=RESOLUTION, radius=10.0):
+    u, v = np.meshgrid(np.linspace(0, 2 * np.pi, resolution), np.linspace(0.05, np.pi - 0.05, resolution))
+    points = np.stack([np.sin(v) * np.cos(u), np.sin(v) * np.sin(u), np.cos(v)], axis=-1).reshape(-1, 3) * radius
+
+    ids = np.arange(resolution * resolution).reshape(resolution, resolution)
+    quads = np.stack([ids[:-1, :-1], ids[:-1, 1:], ids[1:, 1:], ids[1:, :-1]], axis=-1).reshape(-1, 4)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    triangleFaces = np.concatenate([np.arange(len(quads))] * 2)
+    faceIndptr = np.arange(0, len(quads) * 4 + 1, 4)
+    return points, triangles, triangleFaces, faceIndptr, quads.ravel()
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rng = np.random.default_rng(0)
+    meshData = createSphere()
+    buildTime, index = timeIt(mesh_query.TriangleIndex, *meshData)
+    print('build {} triangles: {:.3f}s'.format(len(index.triangles), buildTime))
+
+    print('{:>10} {:>12} {:>12} {:>12}'.format('queries', 'closest(s)', 'overlap(s)', 'overlapped'))
+    points = meshData[0]
+    for queryCount in sizes:
+        # Points near the surface as in skin copy between overlapping meshes
+        queryPoints = points[rng.integers(0, len(points), queryCount)] * 1.002 + rng.normal(scale=0.02, size=(queryCount, 3))
+        closestTime, _ = timeIt(index.closestVertices, queryPoints)
+        overlapTime, (_, triangleIds, _) = timeIt(index.closestPoints, queryPoints, OVERLAP_DISTANCE)
+        print('{:>10} {:>12.3f} {:>12.3f} {:>12}'.format(queryCount, closestTime, overlapTime, int((triangleIds >= 0).sum())))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
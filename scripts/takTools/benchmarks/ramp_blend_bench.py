@@ -0,0 +1,71 @@
+"""
+Benchmark the rampBlendShape kernel against a per vertex loop like the legacy compute.
+
+Usage:
+    python -m takTools.benchmarks.ramp_blend_bench [vertexCount ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import ramp_blend
+
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+LOOP_LIMIT = 100000
+DIVISIONS = 10
+
+
+def smoothRamp(position):
+    """Stand in for the default 0 -> 1 -> 0 smooth ramp of the node."""
+    return float(np.sin(np.pi * position) ** 2)
+
+
+def loopBlend(basePoints, deltas, center, range, envelope):
+    outPoints = basePoints.copy()
+    minRange = center - range
+    maxRange = center + range
+    for i, (basePoint, delta) in enumerate(zip(basePoints.tolist(), deltas.tolist())):
+        weight = 0.0
+        if minRange <= basePoint[0] <= maxRange:
+            weight = smoothRamp((basePoint[0] - minRange) / (maxRange - minRange))
+        outPoints[i] = [basePoint[axis] + delta[axis] * weight * envelope for axis in (0, 1, 2)]
+    return outPoints
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rng = np.random.default_rng(0)
+    lutTime, lut = timeIt(ramp_blend.sampleRamp, smoothRamp)
+    print('lut {} samples: {:.4f}s'.format(len(lut), lutTime))
+
+    # A split preview evaluates the node once per division with a moving center
+    print('{:>10} {:>14} {:>14} {:>12}'.format('vertices', 'kernel x{}(s)'.format(DIVISIONS), 'loop x{}(s)'.format(DIVISIONS), 'max error'))
+    for vertexCount in sizes:
+        basePoints = rng.uniform(-10.0, 10.0, size=(vertexCount, 3))
+        deltas = rng.normal(size=(vertexCount, 3))
+        centers = np.linspace(-10.0, 10.0, DIVISIONS)
+        range = 20.0 / (DIVISIONS - 1)
+
+        kernelTime, results = timeIt(lambda: [ramp_blend.rampBlend(basePoints, deltas, center, range, lut) for center in centers])
+
+        loopTime = float('nan')
+        maxError = float('nan')
+        if vertexCount <= LOOP_LIMIT:
+            loopTime, expected = timeIt(lambda: [loopBlend(basePoints, deltas, center, range, 1.0) for center in centers])
+            maxError = max(np.abs(result - item).max() for result, item in zip(results, expected))
+        print('{:>10} {:>14.3f} {:>14.3f} {:>12.2e}'.format(vertexCount, kernelTime, loopTime, maxError))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
@@ -0,0 +1,59 @@
+"""
+Benchmark the cached RBF solver against inverting the distance matrix on every evaluation like the legacy takRBF compute.
+
+Usage:
+    python -m takTools.benchmarks.rbf_bench [targetCount ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import rbf
+
+
+DEFAULT_SIZES = [8, 32, 128]
+POSE_COUNT = 1000
+
+
+def inverseEvaluate(poses, targets, values, basisFunc, smoothness):
+    """Per pose loop rebuilding and inverting the distance matrix."""
+    results = []
+    for pose in poses:
+        matrix = rbf.basis(rbf.getDistances(targets, targets), basisFunc, smoothness)
+        poseToTargets = rbf.basis(rbf.getDistances(pose[None], targets), basisFunc, smoothness)
+        results.append(poseToTargets @ np.linalg.inv(matrix) @ values)
+    return np.concatenate(results)
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rng = np.random.default_rng(0)
+    print('{} poses per target count'.format(POSE_COUNT))
+    print('{:>8} {:>22} {:>14} {:>14} {:>12}'.format('targets', 'basis', 'cached(s)', 'inverse(s)', 'max error'))
+    for targetCount in sizes:
+        targets = rng.uniform(-10.0, 10.0, size=(targetCount, 3))
+        values = rng.uniform(size=(targetCount, 3))
+        poses = rng.uniform(-10.0, 10.0, size=(POSE_COUNT, 3))
+
+        for basisFunc in rbf.BASIS_FUNCTIONS:
+            solver = rbf.RBFSolver(targets, basisFunc, rbf.SMOOTHNESS)
+
+            # Poses arrive one per evaluation in the node
+            cachedTime, results = timeIt(lambda: np.array([solver.interpolate(pose, values) for pose in poses]))
+            inverseTime, expected = timeIt(inverseEvaluate, poses, targets, values, basisFunc, rbf.SMOOTHNESS)
+            maxError = np.abs(results - expected).max() / max(np.abs(expected).max(), 1.0)
+            print('{:>8} {:>22} {:>14.4f} {:>14.4f} {:>12.2e}'.format(targetCount, basisFunc, cachedTime, inverseTime, maxError))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
@@ -0,0 +1,138 @@
+"""
+Benchmark the shelf reads and button updates of tak_tools before and after the shelf model,
+on the shelf files of data/shelves repeated to larger button counts.
+
+Maya widget work is counted instead of timed: a rebuild created every button of every tab,
+while the shelf model builds the shown tab and then creates, edits or deletes only the buttons that differ.
+
+Usage:
+    python -m takTools.benchmarks.shelf_model_bench [buttonCount ...]
+"""
+
+import copy
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+from takTools.utils import shelf_model
+
+
+DEFAULT_SIZES = [300, 1000, 3000]
+SHELVES_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data', 'shelves')
+REPEAT = 20
+
+
+def writeShelves(directory, buttonCount):
+    """Copies of the shelf files with about buttonCount buttons in total."""
+    shelfInfos = []
+    for path in sorted(glob.glob(os.path.join(SHELVES_DATA_PATH, '*.json'))):
+        with open(path, 'r') as f:
+            shelfInfos.append(json.load(f, object_pairs_hook=OrderedDict))
+    sourceCount = sum(len(shelfInfo.get('shelfButtonInfos', [])) for shelfInfo in shelfInfos)
+
+    paths = []
+    copyIndex = 0
+    count = 0
+    while count < buttonCount:
+        for shelfInfo in shelfInfos:
+            shelfInfo = copy.deepcopy(shelfInfo)
+            if 'tabName' in shelfInfo:
+                shelfInfo['tabName'] = '{}{}'.format(shelfInfo['tabName'], copyIndex)
+            for shelfButtonInfo in shelfInfo.get('shelfButtonInfos', []):
+                shelfButtonInfo['label'] = '{}{}'.format(shelfButtonInfo.get('label'), copyIndex)
+            paths.append(os.path.join(directory, '{}_{}.json'.format(shelfInfo.get('tabName', 'Common'), len(paths))))
+            with open(paths[-1], 'w') as f:
+                json.dump(shelfInfo, f, indent=4)
+        copyIndex += 1
+        count += sourceCount
+    return paths
+
+
+def readWithJson(paths):
+    infos = []
+    for path in paths:
+        with open(path, 'r') as f:
+            infos.append(json.load(f, object_pairs_hook=OrderedDict))
+    return infos
+
+
+def readWithCache(paths):
+    return [shelf_model.readShelfFile(path) for path in paths]
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def timeRepeated(func, *args):
+    startTime = time.perf_counter()
+    for _ in range(REPEAT):
+        result = func(*args)
+    return (time.perf_counter() - startTime) / REPEAT, result
+
+
+def getScenarios(shelfButtonInfos):
+    """Edits the editor makes to a shelf."""
+    middle = len(shelfButtonInfos) // 2
+    edited = [dict(info) for info in shelfButtonInfos]
+    edited[middle]['image1'] = 'edited.png'
+    return [
+        ('unchanged', shelfButtonInfos),
+        ('edit one', edited),
+        ('delete one', shelfButtonInfos[:middle] + shelfButtonInfos[middle + 1:]),
+        ('add one', shelfButtonInfos + [{'label': 'User_Script', 'image1': 'commandButton.png', 'command': ''}]),
+        ('insert one', shelfButtonInfos[:middle] + [{'label': 'User_Script', 'image1': 'commandButton.png', 'command': ''}] + shelfButtonInfos[middle:]),
+    ]
+
+
+def run(sizes=DEFAULT_SIZES):
+    print('{:>8} {:>8} {:>10} {:>12} {:>12} {:>14}'.format('buttons', 'files', 'tabs', 'json(ms)', 'cached(ms)', 'first build'))
+    rows = []
+    for buttonCount in sizes:
+        tempDir = tempfile.mkdtemp()
+        try:
+            paths = writeShelves(tempDir, buttonCount)
+            shelf_model.clearCache()
+            jsonTime, shelfInfos = timeRepeated(readWithJson, paths)
+            readWithCache(paths)
+            cachedTime, _ = timeRepeated(readWithCache, paths)
+
+            buttonsByTab = {}
+            for shelfInfo in shelfInfos:
+                tabName = shelfInfo.get('tabName', 'Common')
+                buttonsByTab[tabName] = buttonsByTab.get(tabName, 0) + len(shelfInfo.get('shelfButtonInfos', []))
+            total = sum(buttonsByTab.values())
+            firstTab = next(tabName for tabName in buttonsByTab if tabName != 'Common')
+            # The common shelf and the shown tab are built at first
+            firstBuild = buttonsByTab['Common'] + buttonsByTab[firstTab]
+
+            print('{:>8} {:>8} {:>10} {:>12.3f} {:>12.3f} {:>8}/{:<6}'.format(
+                total, len(paths), len(buttonsByTab), jsonTime * 1000.0, cachedTime * 1000.0, firstBuild, total))
+            rows.append((total, shelfInfos))
+        finally:
+            shutil.rmtree(tempDir)
+
+    # One shelf grown to the largest size, like a shelf refreshed by the editor
+    total, shelfInfos = rows[-1]
+    shelfButtonInfos = [info for shelfInfo in shelfInfos for info in shelfInfo.get('shelfButtonInfos', [])]
+    print('\nOne shelf of {} buttons. A rebuild deleted and created {} buttons.'.format(len(shelfButtonInfos), len(shelfButtonInfos)))
+    print('{:>12} {:>10} {:>10} {:>10} {:>10} {:>10}'.format('change', 'deleted', 'edited', 'created', 'moved', 'diff(ms)'))
+    for name, newInfos in getScenarios(shelfButtonInfos):
+        diffTime, (deleted, edits, created) = timeIt(shelf_model.diffShelfButtons, shelfButtonInfos, newInfos)
+        # Created buttons before the last kept button are moved from the end
+        moved = sum(1 for count, (index, _) in enumerate(created) if index < len(newInfos) - len(created) + count)
+        print('{:>12} {:>10} {:>10} {:>10} {:>10} {:>10.3f}'.format(name, len(deleted), len(edits), len(created), moved, diffTime * 1000.0))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
@@ -0,0 +1,61 @@
+"""
+Compare text(.sw) and binary(.swb) skin weights files on synthetic meshes.
+
+Usage:
+    python -m takTools.benchmarks.skin_io_bench [vertexCount:influenceCount ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from takTools.utils import skin_io
+
+
+DEFAULT_SIZES = [(10000, 50), (50000, 100), (150000, 200)]
+
+
+def createMeshWeights(vertexCount, influenceCount, maxInfluences=4, seed=0):
+    """Create random normalized weights with up to maxInfluences influences per vertex."""
+    rng = np.random.default_rng(seed)
+    weights = np.zeros((vertexCount, influenceCount), dtype=np.float32)
+    rows = np.repeat(np.arange(vertexCount), maxInfluences)
+    cols = rng.integers(0, influenceCount, size=vertexCount * maxInfluences)
+    weights[rows, cols] = rng.random(len(rows), dtype=np.float32)
+    weights /= weights.sum(axis=1, keepdims=True)
+    influences = ['joint{}'.format(i) for i in range(influenceCount)]
+    return skin_io.MeshWeights.fromDense('mesh_{}'.format(vertexCount), influences, weights)
+
+
+def timeIt(func, *args):
+    startTime = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    print('{:>10} {:>6} {:>6} {:>10} {:>10} {:>12}'.format('vertices', 'infs', 'format', 'save(s)', 'load(s)', 'size(MB)'))
+    tempDir = tempfile.mkdtemp()
+    for vertexCount, influenceCount in sizes:
+        meshWeights = createMeshWeights(vertexCount, influenceCount)
+        for ext in (skin_io.TEXT_EXT, skin_io.BINARY_EXT):
+            filePath = os.path.join(tempDir, 'bench{}'.format(ext))
+            saveTime, _ = timeIt(skin_io.write, filePath, [meshWeights])
+            # Expand to dense weights as the loader does before applying
+            loadTime, _ = timeIt(lambda: [item.toDense() for item in skin_io.read(filePath)])
+            fileSize = os.path.getsize(filePath) / 1024.0 / 1024.0
+            print('{:>10} {:>6} {:>6} {:>10.3f} {:>10.3f} {:>12.2f}'.format(
+                vertexCount, influenceCount, ext, saveTime, loadTime, fileSize
+            ))
+            os.remove(filePath)
+    os.rmdir(tempDir)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([tuple(int(v) for v in arg.split(':')) for arg in sys.argv[1:]])
+    else:
+        run()
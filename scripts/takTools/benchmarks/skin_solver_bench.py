@@ -0,0 +1,108 @@
+"""
+Benchmark skin_solver.solveInverseWeights on a synthetic rig against a per vertex scipy nnls loop.
+
+Targets are posed with other weights of the influences each vertex already uses,
+so the batch solver must meet them within ERROR_TOLERANCE.
+The loop normalizes its nnls weights afterwards, which misses some targets. Its max error is shown for reference.
+
+Usage:
+    python -m takTools.benchmarks.skin_solver_bench [vertexCount ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import skin_solver
+
+try:
+    from scipy.optimize import nnls
+except ImportError:
+    nnls = None
+
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+INFLUENCE_COUNT = 50
+LOOP_LIMIT = 10000
+ERROR_TOLERANCE = 1e-6
+
+
+def createRig(vertexCount, influenceCount=INFLUENCE_COUNT, seed=0):
+    """Random rigid influences, 4 weights per vertex and a target posed with other weights of the same influences."""
+    rng = np.random.default_rng(seed)
+    influencePositions = rng.normal(scale=5.0, size=(influenceCount, 3))
+
+    skinMatrices = np.tile(np.eye(4), (influenceCount, 1, 1))
+    angles = rng.normal(scale=0.3, size=influenceCount)
+    skinMatrices[:, 0, 0] = skinMatrices[:, 1, 1] = np.cos(angles)
+    skinMatrices[:, 0, 1] = np.sin(angles)
+    skinMatrices[:, 1, 0] = -np.sin(angles)
+    bindPreMatrices = np.tile(np.eye(4), (influenceCount, 1, 1))
+    bindPreMatrices[:, 3, :3] = -influencePositions
+    skinMatrices[:, 3, :3] = influencePositions + rng.normal(scale=0.5, size=(influenceCount, 3))
+    skinMatrices = bindPreMatrices @ skinMatrices
+
+    def randomWeights():
+        weights = np.zeros((vertexCount, influenceCount))
+        np.put_along_axis(weights, columns, rng.random((vertexCount, 4)), axis=1)
+        return weights / weights.sum(axis=1, keepdims=True)
+
+    columns = rng.integers(0, influenceCount, size=(vertexCount, 4))
+    weights = randomWeights()
+    bindPoints = skin_solver.toHomogeneous(rng.normal(scale=5.0, size=(vertexCount, 3)))
+    deformedPoints = np.einsum('vj,vjk->vk', bindPoints, skin_solver.blendSkinMatrices(weights, skinMatrices, epsilon=0.0))[:, :3]
+    targetPoints = np.einsum('vj,vjk->vk', bindPoints, skin_solver.blendSkinMatrices(randomWeights(), skinMatrices, epsilon=0.0))[:, :3]
+    return weights, deformedPoints, targetPoints, skinMatrices, influencePositions
+
+
+def solveLoop(weights, deformedPoints, targetPoints, skinMatrices, influencePositions):
+    """Per vertex scipy nnls as the legacy tool did, on already gathered arrays."""
+    bindPoints, _ = skin_solver.inverseSkinPoints(deformedPoints, weights, skinMatrices)
+    influenceIds = skin_solver.selectInfluences(weights, bindPoints, influencePositions)
+    homogeneous = skin_solver.toHomogeneous(bindPoints)
+    newWeights = np.zeros(weights.shape)
+    for vertex in range(len(weights)):
+        A = np.array([(homogeneous[vertex] @ skinMatrices[i])[:3] for i in influenceIds[vertex]]).T
+        vertexWeights, _ = nnls(A, targetPoints[vertex])
+        if vertexWeights.sum() > 0:
+            vertexWeights /= vertexWeights.sum()
+        newWeights[vertex, influenceIds[vertex]] = vertexWeights
+    return newWeights
+
+
+def getErrors(weights, deformedPoints, targetPoints, skinMatrices, newWeights):
+    """Distances of the solved points to the targets."""
+    bindPoints, _ = skin_solver.inverseSkinPoints(deformedPoints, weights, skinMatrices)
+    solvedPoints = np.einsum('vj,vjk->vk', skin_solver.toHomogeneous(bindPoints), skin_solver.blendSkinMatrices(newWeights, skinMatrices, epsilon=0.0))[:, :3]
+    return np.linalg.norm(solvedPoints - targetPoints, axis=1)
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    print('{:>10} {:>10} {:>12} {:>12} {:>12} {:>12}'.format('vertices', 'batch(s)', 'loop(s)', 'median err', 'max err', 'loop max err'))
+    for vertexCount in sizes:
+        rig = createRig(vertexCount)
+        weights, deformedPoints, targetPoints, skinMatrices, influencePositions = rig
+        batchTime, (newWeights, _) = timeIt(skin_solver.solveInverseWeights, *rig)
+        errors = getErrors(weights, deformedPoints, targetPoints, skinMatrices, newWeights)
+
+        loopTime = loopError = float('nan')
+        if nnls is not None and vertexCount <= LOOP_LIMIT:
+            loopTime, loopWeights = timeIt(solveLoop, *rig)
+            loopError = getErrors(weights, deformedPoints, targetPoints, skinMatrices, loopWeights).max()
+        print('{:>10} {:>10.3f} {:>12.3f} {:>12.2e} {:>12.2e} {:>12.2e}'.format(
+            vertexCount, batchTime, loopTime, np.median(errors), errors.max(), loopError))
+        assert errors.max() <= ERROR_TOLERANCE, 'Max error {:.2e} is above {:.0e}'.format(errors.max(), ERROR_TOLERANCE)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
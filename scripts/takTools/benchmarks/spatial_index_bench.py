@@ -0,0 +1,51 @@
+"""
+Benchmark spatial_index.SpatialIndex build and batch queries with both backends.
+
+Usage:
+    python -m takTools.benchmarks.spatial_index_bench [pointCount ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import spatial_index
+
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+QUERY_COUNT = 10000
+K = 4
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rng = np.random.default_rng(0)
+    backends = [False, True] if spatial_index.cKDTree is not None else [False]
+
+    print('{:>10} {:>8} {:>10} {:>12} {:>12}'.format('points', 'backend', 'build(s)', 'knn(s)', 'radius(s)'))
+    for pointCount in sizes:
+        points = rng.random((pointCount, 3))
+        queryPoints = rng.random((QUERY_COUNT, 3))
+        # Radius that holds about 8 points on average
+        radius = (8.0 / pointCount * 3.0 / (4.0 * np.pi)) ** (1.0 / 3.0)
+
+        for useScipy in backends:
+            buildTime, index = timeIt(spatial_index.SpatialIndex, points, useScipy=useScipy)
+            queryTime, _ = timeIt(index.query, queryPoints, k=K)
+            radiusTime, _ = timeIt(index.queryRadius, queryPoints, radius)
+            print('{:>10} {:>8} {:>10.3f} {:>12.3f} {:>12.3f}'.format(
+                pointCount, index.backend, buildTime, queryTime, radiusTime
+            ))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
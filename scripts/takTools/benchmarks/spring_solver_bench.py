@@ -0,0 +1,111 @@
+"""
+Benchmark the spring particle kernel against one legacy rungeKutta node per particle.
+
+Usage:
+    python -m takTools.benchmarks.spring_solver_bench [particleCount ...]
+"""
+
+import math
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import spring_solver
+
+
+DEFAULT_SIZES = [100, 1000, 10000]
+LOOP_LIMIT = 1000
+FRAME_COUNT = 100
+ITERATIONS = 2
+
+
+class LegacyParticle(object):
+    """Per axis pure Python integration of the rungeKutta node."""
+
+    def __init__(self, position, k, dr):
+        self.k = k
+        self.c = 2.0 * dr * math.sqrt(k)
+        self.lastPos = list(position)
+        self.lastVel = [0.0, 0.0, 0.0]
+
+    def msd(self, x, dx):
+        return -dx * self.c - x * self.k
+
+    def rk4(self, x, dx, h):
+        k1x = dx
+        k1v = self.msd(x, k1x)
+        k2x = dx + k1v * h * 0.5
+        k2v = self.msd(x + k1x * h * 0.5, k2x)
+        k3x = dx + k2v * h * 0.5
+        k3v = self.msd(x + k2x * h * 0.5, k3x)
+        k4x = dx + k3v * h
+        k4v = self.msd(x + k3x * h, k4x)
+        return (x + (k1x + 2 * k2x + 2 * k3x + k4x) * h / 6, dx + (k1v + 2 * k2v + 2 * k3v + k4v) * h / 6)
+
+    def step(self, targetPosition, deltaTime, frameIterations):
+        h = deltaTime / frameIterations
+        for _ in range(frameIterations):
+            deltaPos = [self.lastPos[i] - targetPosition[i] for i in range(3)]
+            for i in range(3):
+                r = self.rk4(deltaPos[i], self.lastVel[i], h)
+                self.lastPos[i] = r[0] + targetPosition[i]
+                self.lastVel[i] = r[1]
+        return self.lastPos
+
+
+def getTargets(basePositions, frame):
+    return basePositions + np.array([np.sin(frame * 0.3), 0.0, np.cos(frame * 0.2)]) * 2.0
+
+
+def simulateLegacy(basePositions, springConstants, dampingRatios):
+    particles = [LegacyParticle(position, k, dr) for position, k, dr in zip(getTargets(basePositions, 0).tolist(), springConstants, dampingRatios)]
+    positions = None
+    for frame in range(1, FRAME_COUNT + 1):
+        targets = getTargets(basePositions, frame).tolist()
+        positions = [particle.step(target, 1.0, ITERATIONS) for particle, target in zip(particles, targets)]
+    return np.array(positions)
+
+
+def simulateCached(cache, basePositions, springConstants, dampingRatios):
+    positions = None
+    for frame in range(0, FRAME_COUNT + 1):
+        positions, _ = cache.evaluate(frame, 0, getTargets(basePositions, frame), springConstants, dampingRatios, ITERATIONS)
+    return positions
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rng = np.random.default_rng(0)
+    print('{} frames, {} iterations per frame'.format(FRAME_COUNT, ITERATIONS))
+    print('{:>10} {:>12} {:>14} {:>12} {:>12}'.format('particles', 'kernel(s)', 'scrub back(s)', 'loop(s)', 'max error'))
+    for particleCount in sizes:
+        basePositions = rng.uniform(-10.0, 10.0, size=(particleCount, 3))
+        springConstants = rng.uniform(0.1, 1.0, size=particleCount)
+        dampingRatios = rng.uniform(0.1, 0.9, size=particleCount)
+
+        cache = spring_solver.SpringStateCache()
+        kernelTime, positions = timeIt(simulateCached, cache, basePositions, springConstants, dampingRatios)
+
+        # Scrubbing back over simulated frames reads the cache
+        scrubTime, _ = timeIt(lambda: [cache.evaluate(frame, 0, getTargets(basePositions, frame), springConstants, dampingRatios, ITERATIONS)
+                                       for frame in range(FRAME_COUNT, 0, -1)])
+
+        loopTime = float('nan')
+        maxError = float('nan')
+        if particleCount <= LOOP_LIMIT:
+            loopTime, expected = timeIt(simulateLegacy, basePositions, springConstants, dampingRatios)
+            maxError = np.abs(positions - expected).max()
+        print('{:>10} {:>12.4f} {:>14.4f} {:>12.4f} {:>12.2e}'.format(particleCount, kernelTime, scrubTime, loopTime, maxError))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
@@ -0,0 +1,109 @@
+"""
+Benchmark the linear scan that tak_tools searched the shelves with against the tool search index,
+on the shelf buttons of data/shelves repeated to larger tool counts.
+
+Usage:
+    python -m takTools.benchmarks.tool_search_bench [toolCount ...]
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+
+from takTools.utils import tool_search
+
+
+DEFAULT_SIZES = [300, 3000, 30000]
+SHELVES_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data', 'shelves')
+QUERIES = ['skin', 'copy weight', 'crv', 'weigth', 'jnt orient', 'shot']
+REPEAT = 20
+
+
+def loadTools():
+    """Tool dicts of every shelf file, like tak_tools.getAllTools()."""
+    tools = []
+    for path in sorted(glob.glob(os.path.join(SHELVES_DATA_PATH, '*.json'))):
+        shelf = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'r') as f:
+            shelfInfo = json.load(f)
+        for shelfButtonInfo in shelfInfo.get('shelfButtonInfos', []):
+            tools.append({'shelf': shelf, 'shelfButtonInfo': shelfButtonInfo})
+    return tools
+
+
+def getToolsByShelf(tools, toolCount):
+    """Tools repeated up to a count. Copies get a numbered shelf and label so their tokens differ."""
+    toolsByShelf = {}
+    for i in range(toolCount):
+        tool = tools[i % len(tools)]
+        copy = i // len(tools)
+        shelfButtonInfo = dict(tool['shelfButtonInfo'])
+        if copy:
+            shelfButtonInfo['label'] = '{} {}'.format(shelfButtonInfo.get('label', ''), copy)
+        shelf = '{}{}'.format(tool['shelf'], copy)
+        toolsByShelf.setdefault(shelf, []).append({'shelf': shelf, 'shelfButtonInfo': shelfButtonInfo})
+    return toolsByShelf
+
+
+def searchLinear(tools, query):
+    """What tak_tools.searchTools() did before the index."""
+    results = []
+    for tool in tools:
+        info = tool['shelfButtonInfo']
+        label = info.get('label', '').lower()
+        annotation = info.get('annotation', '').lower()
+        command = info.get('command', '').lower()
+        if query in label or query in annotation or query in command:
+            results.append((tool, label, annotation, command))
+    results.sort(key=lambda result: tool_search.getLegacyRelevance(result[1], result[2], result[3], query), reverse=True)
+    return [result[0] for result in results[:tool_search.MAX_RESULTS]]
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def timeQueries(func, *args):
+    """Average ms per query and the result counts."""
+    counts = []
+    startTime = time.perf_counter()
+    for _ in range(REPEAT):
+        counts = [len(func(*(args + (query,)))) for query in QUERIES]
+    return (time.perf_counter() - startTime) * 1000.0 / REPEAT / len(QUERIES), counts
+
+
+def run(sizes=DEFAULT_SIZES):
+    tools = loadTools()
+    if not tools:
+        print('No shelf data in {}'.format(os.path.abspath(SHELVES_DATA_PATH)))
+        return
+
+    print('{:>8} {:>12} {:>12} {:>12} {:>12}'.format('tools', 'linear(ms)', 'build(s)', 'index(ms)', 'resync(ms)'))
+    for toolCount in sizes:
+        toolsByShelf = getToolsByShelf(tools, toolCount)
+        allTools = [tool for shelfTools in toolsByShelf.values() for tool in shelfTools]
+
+        linearTime, linearCounts = timeQueries(searchLinear, allTools)
+        index = tool_search.ToolSearchIndex()
+        buildTime, _ = timeIt(index.syncShelves, toolsByShelf)
+        indexTime, indexCounts = timeQueries(lambda query: index.search(query))
+
+        # Editing one button indexes its shelf only
+        shelf = next(iter(toolsByShelf))
+        toolsByShelf[shelf][0]['shelfButtonInfo']['label'] += ' edited'
+        resyncTime, _ = timeIt(index.syncShelves, toolsByShelf)
+
+        print('{:>8} {:>12.3f} {:>12.4f} {:>12.3f} {:>12.3f}'.format(toolCount, linearTime, buildTime, indexTime, resyncTime * 1000.0))
+    print('Results per query, linear: {}, index: {}'.format(linearCounts, indexCounts))
+    print('Queries: {}'.format(QUERIES))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
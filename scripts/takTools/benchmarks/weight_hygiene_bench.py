@@ -0,0 +1,81 @@
+"""
+Benchmark whole matrix weight pruning against the per vertex sort of the legacy pruneSkinInfluences.
+
+Usage:
+    python -m takTools.benchmarks.weight_hygiene_bench [vertexCount ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import weight_hygiene
+
+
+DEFAULT_SIZES = [10000, 100000]
+INFLUENCE_COUNT = 60
+MAX_INFLUENCES = 4
+LOOP_LIMIT = 20000
+
+
+def loopPrune(weights, maxInfs):
+    """Sort and prune per vertex like the legacy pruneSkinInfluences without the skinPercent queries."""
+    infs = list(range(weights.shape[1]))
+    resultMeshWeights = []
+    for vtxWeights in weights.tolist():
+        infWeightMap = dict(zip(infs, vtxWeights))
+        sortedItems = sorted(infWeightMap.items(), key=lambda item: item[1], reverse=True)
+        prunedItems = sortedItems[:maxInfs] + [(jnt, 0.0) for jnt, w in sortedItems[maxInfs:]]
+        totalWeight = sum([item[1] for item in prunedItems])
+        prunedItemsNormalizedMap = dict([(jnt, weight / totalWeight) for jnt, weight in prunedItems])
+        resultMeshWeights.append([prunedItemsNormalizedMap.get(inf) for inf in infs])
+    return np.array(resultMeshWeights)
+
+
+def makeWeights(rng, vertexCount):
+    """Sparse weights with 1 to 12 influences per vertex."""
+    weights = rng.uniform(size=(vertexCount, INFLUENCE_COUNT))
+    counts = rng.integers(1, 13, size=vertexCount)
+    keep = np.argsort(rng.uniform(size=(vertexCount, INFLUENCE_COUNT)), axis=1) < counts[:, None]
+    weights *= keep
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rng = np.random.default_rng(0)
+    print('{} influences, max {} influences'.format(INFLUENCE_COUNT, MAX_INFLUENCES))
+    print('{:>10} {:>12} {:>12} {:>14} {:>12} {:>12}'.format('vertices', 'topK(s)', 'clean(s)', 'histogram(s)', 'loop(s)', 'max error'))
+    for vertexCount in sizes:
+        weights = makeWeights(rng, vertexCount)
+        lockedInfluences = np.zeros(INFLUENCE_COUNT, dtype=bool)
+        lockedInfluences[0] = True
+
+        topKTime, pruned = timeIt(weight_hygiene.pruneTopK, weights, MAX_INFLUENCES)
+        cleanTime, _ = timeIt(weight_hygiene.cleanWeights, weights, MAX_INFLUENCES, weight_hygiene.MIN_WEIGHT, lockedInfluences)
+        histogramTime, histogram = timeIt(weight_hygiene.getInfluenceHistogram, weights)
+
+        loopCount = min(LOOP_LIMIT, vertexCount)
+        loopTime, expected = timeIt(loopPrune, weights[:loopCount], MAX_INFLUENCES)
+        maxError = np.abs(pruned[:loopCount] - expected).max()
+        loopTime *= vertexCount / float(loopCount)
+
+        print('{:>10} {:>12.4f} {:>12.4f} {:>14.4f} {:>12.3f} {:>12.2e}'.format(
+            vertexCount, topKTime, cleanTime, histogramTime, loopTime, maxError))
+
+    print('loop time is extrapolated from {} vertices'.format(LOOP_LIMIT))
+    print('')
+    print('\n'.join(weight_hygiene.formatHistogram(histogram, MAX_INFLUENCES)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
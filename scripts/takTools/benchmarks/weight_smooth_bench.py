@@ -0,0 +1,112 @@
+"""
+Benchmark averaging skin weights of many vertices in one sparse product against the per vertex loop
+of the legacy averageVertexSkinWeight command, and full matrix smoothing iterations.
+
+Usage:
+    python -m takTools.benchmarks.weight_smooth_bench [gridSize ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from takTools.utils import weight_smooth
+
+
+DEFAULT_SIZES = [100, 320]
+INFLUENCE_COUNT = 30
+SMOOTH_COUNT = 10000
+LOOP_LIMIT = 2000
+SMOOTH_ITERATIONS = 10
+MAX_INFLUENCES = 4
+
+
+def makeGrid(size):
+    """Quad grid of size x size vertices."""
+    rows, cols = np.meshgrid(np.arange(size - 1), np.arange(size - 1), indexing='ij')
+    corners = (rows * size + cols).ravel()
+    polygonConnects = np.stack([corners, corners + 1, corners + size + 1, corners + size], axis=1).ravel()
+    polygonCounts = np.full(len(corners), 4)
+    return size * size, polygonCounts, polygonConnects
+
+
+def loopAverage(weights, adjacency, vertexIds, strengths):
+    """Nested loops over neighbours and influences like the legacy command."""
+    indptr, indices = adjacency
+    newWeights = []
+    for vertexId, value in zip(vertexIds.tolist(), strengths.tolist()):
+        surrVtxArray = indices[indptr[vertexId]:indptr[vertexId + 1]].tolist()
+        surrVtxCount = len(surrVtxArray)
+        oldWeights = weights[vertexId].tolist()
+        surrWeights = [weight for surrVtx in surrVtxArray for weight in weights[surrVtx].tolist()]
+        influenceCount = len(oldWeights)
+        row = [0.0] * influenceCount
+        for i in range(influenceCount):
+            oldWeightDivSurrCountByInfValue = (oldWeights[i] / surrVtxCount) * (1.0 - value)
+            for j in range(i, len(surrWeights), influenceCount):
+                row[i] += (surrWeights[j] / surrVtxCount) * value + oldWeightDivSurrCountByInfValue
+        newWeights.append(row)
+    return np.array(newWeights)
+
+
+def timeIt(func, *args, **kwargs):
+    startTime = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - startTime, result
+
+
+def run(sizes=DEFAULT_SIZES):
+    rng = np.random.default_rng(0)
+    print('{} influences, up to {} smoothed vertices'.format(INFLUENCE_COUNT, SMOOTH_COUNT))
+    print('{:>10} {:>10} {:>14} {:>12} {:>14} {:>12}'.format('vertices', 'smoothed', 'adjacency(s)', 'kernel(s)', 'loop(s)', 'max error'))
+    for size in sizes:
+        vertexCount, polygonCounts, polygonConnects = makeGrid(size)
+        weights = rng.uniform(size=(vertexCount, INFLUENCE_COUNT))
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        adjacencyTime, adjacency = timeIt(weight_smooth.getAdjacency, vertexCount, polygonCounts, polygonConnects)
+
+        vertexIds = np.sort(rng.choice(vertexCount, min(SMOOTH_COUNT, vertexCount), replace=False))
+        strengths = rng.uniform(size=len(vertexIds))
+
+        # Gather only the smoothed vertices and their neighbours like the command does
+        def kernel():
+            _, neighbours = weight_smooth.getSubAdjacency(adjacency, vertexIds)
+            weightIds = np.union1d(vertexIds, neighbours)
+            return weight_smooth.averageWeights(weights[weightIds], adjacency, vertexIds, strengths, weightIds)
+
+        kernelTime, newWeights = timeIt(kernel)
+
+        loopCount = min(LOOP_LIMIT, len(vertexIds))
+        loopTime, expected = timeIt(loopAverage, weights, adjacency, vertexIds[:loopCount], strengths[:loopCount])
+        maxError = np.abs(newWeights[:loopCount] - expected).max()
+        loopTime *= len(vertexIds) / float(loopCount)
+
+        print('{:>10} {:>10} {:>14.4f} {:>12.4f} {:>14.3f} {:>12.2e}'.format(
+            vertexCount, len(vertexIds), adjacencyTime, kernelTime, loopTime, maxError))
+    print('loop time is extrapolated from {} vertices'.format(LOOP_LIMIT))
+
+    print('')
+    print('{} smooth iterations of all vertices, 2 locked influences, {} max influences'.format(SMOOTH_ITERATIONS, MAX_INFLUENCES))
+    print('{:>10} {:>14} {:>14} {:>16}'.format('vertices', 'method', 'time(s)', 'locked error'))
+    for size in sizes:
+        vertexCount, polygonCounts, polygonConnects = makeGrid(size)
+        adjacency = weight_smooth.getAdjacency(vertexCount, polygonCounts, polygonConnects)
+        weights = rng.uniform(size=(vertexCount, INFLUENCE_COUNT)) ** 8
+        weights /= weights.sum(axis=1, keepdims=True)
+        lockedInfluences = np.zeros(INFLUENCE_COUNT, dtype=bool)
+        lockedInfluences[:2] = True
+
+        for method in weight_smooth.METHODS:
+            smoothTime, smoothed = timeIt(weight_smooth.smoothWeights, weights, adjacency, SMOOTH_ITERATIONS, weight_smooth.STRENGTH, method,
+                                          lockedInfluences, MAX_INFLUENCES)
+            lockedError = np.abs(smoothed[:, lockedInfluences] - weights[:, lockedInfluences]).max()
+            print('{:>10} {:>14} {:>14.4f} {:>16.2e}'.format(vertexCount, method, smoothTime, lockedError))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run([int(arg) for arg in sys.argv[1:]])
+    else:
+        run()
@@ -11,11 +11,14 @@ import pprint
 import re
 
 import maya.OpenMaya as OpenMaya
-import maya.api.OpenMaya as om2
 import maya.cmds as cmds
 import maya.mel as mel
+import numpy as np
 import pymel.core as pm
 
+from ..utils import mesh_query
+from ..utils import spatial_index
+
 
 def showHUD(widgetName, title, sectionNum = 2, blockNum = 0):
     '''
@@ -281,48 +284,17 @@ def getOverlappedVertices(source, target, searchRadius=5.0):
     '''
     Description
         Get overlapped target mesh's vertices from source mesh.
+        Target vertices within searchRadius from source surface are overlapped.
 
     Retruns
         closestVtxs: string list - Target mesh's closest vertices.
     '''
 
-    selLs = om2.MSelectionList()
-    selLs.add(source)
-    selLs.add(target)
-
-    srcDagPath = selLs.getDagPath(0)
-    trgDagPath = selLs.getDagPath(1)
-
-    trgVtxIt = om2.MItMeshVertex(trgDagPath)
-
-    srcMeshFn = om2.MFnMesh(srcDagPath)
-
-    overlappedVerticesId = []
-    while not trgVtxIt.isDone():
-        trgVtxWsPnt = trgVtxIt.position(om2.MSpace.kWorld)
-        trgVtxNormal = trgVtxIt.getNormal()
-
-        intersectPoint = srcMeshFn.closestIntersection(
-            om2.MFloatPoint(trgVtxWsPnt),
-            om2.MFloatVector(trgVtxNormal),
-            om2.MSpace.kWorld,
-            searchRadius,
-            True
-        )[0]
-
-        if not intersectPoint.isEquivalent(om2.MFloatPoint(0, 0, 0, 1)):
-            overlappedVerticesId.append(trgVtxIt.index())
-
-        trgVtxIt.next()
-
-    # Get vertices name.
-    trgDagPathFullName = trgDagPath.fullPathName()
-    overlappedVertices = []
-    for vtxId in overlappedVerticesId:
-        vtxName = trgDagPathFullName + '.vtx[' + str(vtxId) + ']'
-        overlappedVertices.append(vtxName)
+    srcIndex = mesh_query.buildTriangleIndex(source)
+    trgPoints = spatial_index.getMeshPoints(target)
+    triangleIds = srcIndex.closestPoints(trgPoints, searchRadius)[1]
 
-    return overlappedVertices
+    return mesh_query.getVertexNames(target, np.flatnonzero(triangleIds >= 0), fullPath=True)
 
 
 def rmvRepeatItem(parm_list):
@@ -6,6 +6,8 @@ Description: Searching maya resource images.
 import maya.cmds as cmds
 import maya.OpenMayaUI as omui
 
+from ..utils import icon_catalog
+
 
 MAYA_VERSION = int(cmds.about(version=True))
 if MAYA_VERSION <= 2016:
@@ -21,11 +23,8 @@ elif 2025 <= MAYA_VERSION:
 
 
 def getMayaResourceImages():
-    images = []
-
-    images = cmds.resourceManager(nameFilter='*.png')
-
-    return images
+    # Shared with the tak tools editor, listed once and cached on disk
+    return icon_catalog.getCatalog().getIcons()
 
 def getMayaWin():
     mayaWin = None
@@ -109,16 +108,7 @@ class TakMayaResourceBrowser(QtWidgets.QDialog):
             self.populateImageList()
 
     def getMatchingImages(self, searchStr):
-        images = []
-
-        searchStr = searchStr.lower()
-        self.mayaResourceImages
-
-        for image in self.mayaResourceImages:
-            if searchStr in image.lower():
-                images.append(image)
-
-        return images
+        return icon_catalog.getCatalog().search(searchStr)
 
     @classmethod
     def showUI(cls, *args):
@@ -146,5 +136,5 @@ class ImageItem(QtWidgets.QListWidgetItem):
         super(ImageItem, self).__init__()
 
         self.setText(image)
-        self.setIcon(QtGui.QIcon(':{0}'.format(image)))
+        self.setIcon(QtGui.QIcon(icon_catalog.getCatalog().getPath(image) or ':{0}'.format(image)))
         self.setToolTip(image)
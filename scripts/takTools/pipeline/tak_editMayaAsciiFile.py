@@ -5,6 +5,7 @@ Updated: 12/30/2021
 
 Description:
 This script edit .ma file without opening in maya app.
+Files are streamed by takTools.utils.ma_edit, which also runs headless from the command line.
 
 Usage:
 import tak_editMayaAsciiFile
@@ -16,7 +17,8 @@ tak_editMayaAsciiFile.ui()
 import maya.cmds as cmds
 import os
 import logging
-import shutil
+
+from takTools.utils import ma_edit
 
 logger = logging.getLogger('EditMayaASCII')
 logger.setLevel(logging.WARNING)
@@ -40,6 +42,10 @@ def ui():
 
     cmds.textFieldGrp('srchTxtFldGrp', label='Search String:')
     cmds.textFieldGrp('rplcTxtFldGrp', label='Replace String:')
+    cmds.checkBoxGrp('regexChkBoxGrp', label='Regular Expression:')
+    cmds.optionMenuGrp('scopeOptMenuGrp', label='Apply To:')
+    for scope in ma_edit.SCOPES:
+        cmds.menuItem(label=scope)
     cmds.button(label = 'Apply', c = main, h = 50)
 
     cmds.window(winName, e = True, w = 300, h = 100)
@@ -50,6 +56,8 @@ def main(*args):
     filePathToEditLs = cmds.textScrollList('fileLsTxtScrLs', q = True, allItems = True)
     searchStr = cmds.textFieldGrp('srchTxtFldGrp', q=True, text=True)
     replaceStr = cmds.textFieldGrp('rplcTxtFldGrp', q=True, text=True)
+    isRegex = cmds.checkBoxGrp('regexChkBoxGrp', q=True, v1=True)
+    scope = cmds.optionMenuGrp('scopeOptMenuGrp', q=True, value=True)
 
     # Create progress bar window
     if cmds.window('progWin', exists = True): cmds.deleteUI('progWin')
@@ -60,8 +68,8 @@ def main(*args):
     cmds.window('progWin', e = True, w = 300, h = 10)
     cmds.showWindow('progWin')
 
+    rules = getRules(searchStr, replaceStr, isRegex, scope)
     unchangedFiles = []
-    isUnicode = False
     for filePath in filePathToEditLs:
         # Edit progress bar
         if cmds.progressBar('progBar', q = True, isCancelled = True):
@@ -70,36 +78,14 @@ def main(*args):
         cmds.text('progText', e=True, label=fileName)
         cmds.progressBar('progBar', e = True, step = 1)
 
-        # Make backup file
-        backupFilePath = filePath.replace(fileName, 'old_{0}'.format(fileName))
-        if not os.path.exists(backupFilePath):
-            shutil.copyfile(filePath, backupFilePath)
-
-        # Read file contents
-        with open(filePath, 'r') as f:
-            contents = f.read()
-
-        # Edit file contents
-        try:
-            newContents = contents.replace(searchStr, replaceStr)
-        except UnicodeDecodeError:
-            contents = unicode(contents, 'cp949')
-            newContents = contents.replace(searchStr, replaceStr)
-            isUnicode = True
-
-        # If file is not modified print warning and continue to next file
-        if hash(contents) == hash(newContents):
+        # File is streamed and replaced only when changed, old_<fileName> keeps the original
+        report = ma_edit.editFile(filePath, rules, backup=True)
+        if report['error']:
+            logger.error('Failed to edit {0}. {1}'.format(filePath, report['error']))
+            unchangedFiles.append(filePath)
+        elif not report['changed']:
             logger.warning('Not found search string. {0} is unchanged.'.format(filePath))
             unchangedFiles.append(filePath)
-            continue
-
-        # If file is modified correctly write file with new contents
-        with open(filePath, 'w') as f:
-            if isUnicode:
-                f.write(newContents.encode('cp949'))
-                isUnicode = False
-            else:
-                f.write(newContents)
 
     cmds.progressBar('progBar', e = True, endProgress = True)
     cmds.deleteUI('progWin')
@@ -121,4 +107,15 @@ def addFileToLs(*args):
 def rmvFileFromLs(*args):
     selItemLs = cmds.textScrollList('fileLsTxtScrLs', q = True, selectItem = True)
 
-    cmds.textScrollList('fileLsTxtScrLs', e = True, removeItem = selItemLs)
\ No newline at end of file
+    cmds.textScrollList('fileLsTxtScrLs', e = True, removeItem = selItemLs)
+
+
+def getRules(searchStr, replaceStr, isRegex=False, scope=ma_edit.ALL):
+    """Rules for utf-8 files and, when the strings are not ascii, for cp949 files as well."""
+    rules = [ma_edit.Rule(searchStr, replaceStr, isRegex, scope)]
+    try:
+        searchStr.encode('ascii')
+        replaceStr.encode('ascii')
+    except UnicodeError:
+        rules.append(ma_edit.Rule(searchStr, replaceStr, isRegex, scope, encoding='cp949'))
+    return rules
@@ -21,18 +21,25 @@ Update Note:
 07/02/2014 v1.1
 Create ui.
 
+References are read from the scene head by takTools.utils.ma_ref_index instead of the whole file.
+reportOutdatedRefs() lists the outdated references of every shot in a directory.
+
 '''
 
 import os, re
 import maya.cmds as cmds
 from functools import partial
 
+from takTools.utils import ma_edit, ma_ref_index
+
 # modify file contents depend on options in the ui
-def updateAsset(assetListObjs, contents, filePath, *args):
-    # modify contents depend on options in the ui
+def updateAsset(assetListObjs, filePath, *args):
+    # modify reference paths depend on options in the ui
+    rules = []
     for assetListObj in assetListObjs:
         chkBoxOpt = cmds.checkBox(assetListObj.chkBox, q = True, v = True)
-    if chkBoxOpt:
+        if not chkBoxOpt:
+            continue
         releaseOpt = cmds.optionMenu(assetListObj.releaseOptMenu, q = True, v = True)
         lodOpt = cmds.optionMenu(assetListObj.lodOptMenu, q = True, v = True)
         # substitute current release version to the selected release version
@@ -40,16 +47,20 @@ def updateAsset(assetListObjs, contents, filePath, *args):
         # if lod exists, substitute current lod to the selected lod
         if lodOpt:
             selectedReferencePath = re.sub(r'lod\d\d', lodOpt, selectedReferencePath)
-            # replace current reference path to the selected reference path
-            contents = contents.replace(assetListObj.currentReferencePath, str(selectedReferencePath))
+        if selectedReferencePath != assetListObj.currentReferencePath:
+            rules.append(ma_edit.Rule(assetListObj.currentReferencePath, selectedReferencePath, scope = ma_edit.FILE_REFERENCE))
 
     # set updated file path
     updatedFilePath = filePath.replace('.ma', '_refUpdated.ma')
 
-    # save as updated file
-    fW = open(updatedFilePath, 'w')
-    fW.write(contents)
-    fW.close()
+    # save as updated file, reference paths are replaced while the file is streamed to it
+    report = ma_edit.editFile(filePath, rules, backup = False, outputPath = updatedFilePath)
+    if report['error']:
+        cmds.warning('Failed to save "{0}": {1}'.format(updatedFilePath, report['error']))
+        return
+    if rules and not report['changed']:
+        cmds.warning('No reference path is replaced in "{0}". "{1}" is not opened.'.format(filePath, updatedFilePath))
+        return
 
     # delete the window and open updated file
     cmds.deleteUI('uaWin')
@@ -69,55 +80,54 @@ def localOpen():
 
 # main function #
 def updateRef(filePath):
-    # read the contents from the given file path
-    fR = open(filePath, 'r')
-    contents = fR.read()
-    fR.close()
-
-    # extract referenceDepthInfo of assets from the contents
-    refInfos = re.findall(r'.*-rdi.*Asset/.*', contents)
-
-    # remove develop in refInfos
-    while 'develop' in str(refInfos):
-        for refInfo in refInfos:
-            if 'develop' in refInfo:
-                refInfos.remove(refInfo)
+    # read asset references from the head of the file, develop references are skipped
+    assets = ma_ref_index.resolveReferences(ma_ref_index.scanReferences(filePath))
 
     # check if exists latest release version for assets
-    if chkLatestRelease(refInfos):
+    if chkLatestRelease(assets):
         # if latest release version exists, show update asset ui
-        updateAssetUI(refInfos, contents, filePath)
+        updateAssetUI(assets, filePath)
     else:
         # else all references are latest version, open original file
-        updateAssetUI(refInfos, contents, filePath)
+        updateAssetUI(assets, filePath)
         #cmds.file(filePath, open = True, force = True, prompt = False)
 
 # this function will check if exists latest release version
-def chkLatestRelease(refInfos):
-    for refInfo in refInfos:
-        # in case referencing develop, return false
-        if 'develop' in refInfo:
-            continue
-
-    # release directory
-    releaseDir = re.search(r'\w:/.*/release', refInfo).group()
+def chkLatestRelease(assets):
+    return any(asset['outdated'] for asset in assets)
 
-    # current release version
-    currentRelease = re.search(r'r\d\d\d', refInfo).group()
-
-    # get latest release version
-    releaseList = os.listdir(releaseDir)
-    latestRelease = max(releaseList)
-
-    if currentRelease != latestRelease:
-        return True
-    return False
+# report outdated references of every shot in a directory
+def reportOutdatedRefs(*args):
+    curScenePath = cmds.file(q = True, sceneName = True)
+    shotDir = cmds.fileDialog2(fileMode = 3, caption = 'Select Shot Directory', startingDirectory = os.path.dirname(curScenePath))
+    if not shotDir:
+        return
+    shotDir = shotDir[0]
+
+    # shots unchanged since the last report are not scanned again
+    indexPath = os.path.join(shotDir, ma_ref_index.INDEX_FILE_NAME)
+    index = ma_ref_index.updateIndex([shotDir], indexPath, ma_ref_index.SCAN_WORKERS)
+    outdated = ma_ref_index.getOutdated(index)
+
+    if cmds.window('outdatedRefWin', exists = True):
+        cmds.deleteUI('outdatedRefWin')
+    cmds.window('outdatedRefWin', title = 'Outdated References')
+    cmds.columnLayout(adj = True)
+    cmds.text(label = '{0} outdated references in {1} shots. Index: {2}'.format(len(outdated), len(index['shots']), indexPath))
+    cmds.textScrollList(numberOfRows = 30, allowMultiSelection = True,
+                        append = ['{0}  {1}  {2} -> {3}'.format(os.path.relpath(shotPath, shotDir), refNode, asset['current'], asset['latest'])
+                                  for shotPath, refNode, asset in outdated])
+    cmds.showWindow('outdatedRefWin')
 
 # main ui
-def updateAssetUI(refInfos, contents, filePath):
+def updateAssetUI(assets, filePath):
     if cmds.window('uaWin', exists = True):
         cmds.deleteUI('uaWin')
-    cmds.window('uaWin', title = 'Update Asset UI')
+    cmds.window('uaWin', title = 'Update Asset UI', menuBar = True)
+
+    # batch report of every shot in a directory
+    cmds.menu(label = 'Tools')
+    cmds.menuItem(label = 'Report Outdated References...', c = reportOutdatedRefs)
 
     # main formLayout
     cmds.formLayout('mainForm', nd = 100)
@@ -151,7 +161,7 @@ def updateAssetUI(refInfos, contents, filePath):
     cmds.separator(h = 10, style = 'in')
 
     # populate asset list
-    assetListObjs = populateAssetList(refInfos)
+    assetListObjs = populateAssetList(assets)
 
     # set parent main columnLayout to the subTab
     cmds.setParent('subTab')
@@ -160,7 +170,7 @@ def updateAssetUI(refInfos, contents, filePath):
     cmds.setParent('mainForm')
 
     # apply and cancel button
-    cmds.button('appButton', label = 'Update Selected Asset', c = partial(updateAsset, assetListObjs, contents, filePath))
+    cmds.button('appButton', label = 'Update Selected Asset', c = partial(updateAsset, assetListObjs, filePath))
     cmds.button('cancelButton', label = 'Do Not Update', c = partial(openOrigFile, filePath))
 
     # arrange main formLayout
@@ -174,46 +184,42 @@ def updateAssetUI(refInfos, contents, filePath):
     cmds.showWindow('uaWin')
 
 # create asset list objcts
-def populateAssetList(refInfos):
+def populateAssetList(assets):
     assetListObjs = []
-    for refInfo in refInfos:
-        # asset name
-        assetName = re.search(r'(.*Asset/.*?/)(.*?)(/.*)', refInfo).group(2)
+    for asset in assets:
         # create asset list object
-        assetName = AssetList(refInfo)
+        assetListObj = AssetList(asset)
         # add to the win
-        assetName.addToWin()
+        assetListObj.addToWin()
         # append to the assetListObjs variable
-        assetListObjs.append(assetName)
+        assetListObjs.append(assetListObj)
     return assetListObjs
 
 # This class for create asset list objects.
 class AssetList:
     currentLod = None
     # set initial asset list data
-    def __init__(self, refInfo):
+    def __init__(self, asset):
         # current reference path
-        self.currentReferencePath = re.search(r'\w:/.*.ma', refInfo).group()
+        self.currentReferencePath = asset['path']
 
         # asset name
-        self.assetName = re.search(r'(.*Asset/.*?/)(.*?)(/.*)', refInfo).group(2)
+        self.assetName = asset['asset']
 
         # release directory
-        self.releaseDir = re.search(r'\w:/.*/release/', refInfo).group()
+        self.releaseDir = asset['releaseDir']
 
         # current release version
-        self.currentReleaseVer = re.search(r'r\d\d\d', refInfo).group()
+        self.currentReleaseVer = asset['current']
 
-        # release list
-        self.releaseList = os.listdir(self.releaseDir)
+        # release list, listed again only when the release directory changes
+        self.releaseList = ma_ref_index.DEFAULT_CACHE.getReleases(self.releaseDir)
 
         # get latest release version
-        self.latestReleaseVer = max(self.releaseList)
+        self.latestReleaseVer = asset['latest']
 
         # current lod status
-        match = re.search(r'lod\d\d', refInfo)
-        if match != None:
-            self.currentLod = match.group()
+        self.currentLod = asset['lod']
 
     # add the asset list to the main ui
     def addToWin(self):
@@ -263,17 +269,11 @@ class AssetList:
         cmds.optionMenu(self.releaseOptMenu, e = True, v = self.latestReleaseVer)
 
     def populateLodOptMenu(self, *args):
-        # get release files
+        # get lods of the release files
         selectedRelease = cmds.optionMenu(self.releaseOptMenu, q = True, v = True)
-        releaseDir = self.releaseDir + selectedRelease + '/'
-        releaseFiles = os.listdir(releaseDir)
-
-        lodList = []
-        # if release files contains lod extract lod list else if not exists lod then disable lodOptMenu
-        for releaseFile in releaseFiles:
-                match = re.search(r'lod\w\w', releaseFile)
-                if match != None:
-                    lodList.append(match.group())
+        lodList = ma_ref_index.DEFAULT_CACHE.getLods(self.releaseDir, selectedRelease)
+
+        # if not exists lod then disable lodOptMenu
         if not lodList:
             cmds.optionMenu(self.lodOptMenu, e = True, enable = False)
 
@@ -18,19 +18,34 @@
 #       - Prevent causes bugs
 #       - It works to controllers or components of a deformer
 #       - Improved performance x10
+#       - Batch conversion with numpy and a single setWeights call, optional rotate/scale probes
 #       - etc...
 #   Contact: https://ta-note.com or chst27@gmail.com
 #---------------------------------------------------------------------------------------------------------------
 
 
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
 import math
+import re
 import time
 
+import numpy as np
+
+from ..utils import api_undo
+from ..utils import spatial_index
+
 
 HOLD_JOINT_NAME = 'hold_jnt'
 MIN_WEIGHT = 0.01
 
+# Probe transforms applied to each driver to sample the deformation
+TRANSLATE_PROBE = 1.0
+ROTATE_PROBE = 10.0
+SCALE_PROBE = 1.5
+PROBES = ('translate',)
+
 selVtxs = []
 selDrivers = []
 
@@ -95,13 +110,41 @@ def correctDeformersOrder(geometry, skinCluster):
 
 # Main Procedure which converts deformation information into skincluster weight information
 def convert(*args):
-    startTime = time.time()
-
-    geo = selVtxs[0].split('.')[0]
+    probes = ['translate']
+    if cmds.checkBox('rotateProbeChkBox', exists=True) and cmds.checkBox('rotateProbeChkBox', q=True, v=True):
+        probes.append('rotate')
+    if cmds.checkBox('scaleProbeChkBox', exists=True) and cmds.checkBox('scaleProbeChkBox', q=True, v=True):
+        probes.append('scale')
+    convertToSkin(selVtxs, selDrivers, probes)
+
+
+def convertToSkin(vertices, drivers, probes=PROBES):
+    """Convert deformation of vertices by drivers into skin weights.
+
+    Every driver is moved by the probe transforms and the whole mesh is sampled with one getPoints per probe.
+    Weight of a driver is the least squares ratio between the sampled displacement and
+    the displacement the vertex would have with full weight on the driver.
+    All weights are applied with a single setWeights call.
+
+    Args:
+        vertices (list): Flattened vertex names of a mesh.
+        drivers (list): Transforms or components that deform the vertices.
+        probes (list, optional): Any of 'translate', 'rotate' and 'scale'. Rotate and scale are applied to transforms only.
+            Defaults to PROBES.
+
+    Returns:
+        list: (stage name, seconds) per stage.
+    """
+    stageTimes = []
+    stageStart = time.perf_counter()
+
+    geo = vertices[0].split('.')[0]
+    vtxIds = np.array([int(re.search(r'\[(\d+)\]$', vtx).group(1)) for vtx in vertices])
     skinClst = getSkinCluster(geo)
     # If mesh has no skin cluster bind with a 'hold_jnt'
     if not skinClst:
         if not cmds.objExists(HOLD_JOINT_NAME):
+            cmds.select(cl=1)
             cmds.joint(n=HOLD_JOINT_NAME)
         cmds.select(HOLD_JOINT_NAME, r=True)
         cmds.select(geo, add=1)
@@ -112,45 +155,151 @@ def convert(*args):
 
     # Create joints for the drivers
     joints = []
-    for i in range(0, len(selDrivers)):
-        cmds.select (cl=1)
-        jnt = cmds.joint(n=selDrivers[i] + '_jnt')
+    for driver in drivers:
+        cmds.select(cl=1)
+        jnt = cmds.joint(n=driver.replace('.', '_').replace('[', '_').replace(']', '') + '_jnt')
         joints.append(jnt)
 
         # Match a joint position to a driver
-        driverPos = cmds.xform(selDrivers[i], q=True, t=True, ws=True)
+        driverPos = cmds.xform(driver, q=True, t=True, ws=True)
         if driverPos == [0.0, 0.0, 0.0]:
-            driverPos = cmds.xform(selDrivers[i], q=True, rp=True, ws=True)
+            driverPos = cmds.xform(driver, q=True, rp=True, ws=True)
         cmds.xform(jnt, t=driverPos, ws=True)
+    cmds.skinCluster(skinClst, e=1, dr=4, lw=0, wt=0, ai=joints)  # Add joints to geometry as influences
+    stageTimes.append(('setup', time.perf_counter() - stageStart))
 
-        cmds.select(geo)
-        cmds.skinCluster(e=1, dr=4, lw=0, wt=0, ai=joints[i])  # Add a joint to geometry as influence
-
-    numDrivers = len(selDrivers)
+    # Sample deformed positions per driver and probe
+    stageStart = time.perf_counter()
+    numDrivers = len(drivers)
     cmds.progressWindow(title='Convert 2 Skin', minValue=0, maxValue=numDrivers, progress=0, status='Stand by', isInterruptable=True)
-
-    # Get vertices original positions
-    vtxsOrigPos = [cmds.xform(vtx, q=True, t=True, ws=True) for vtx in selVtxs]
-    for i in range(0, numDrivers):
-        # Get vertices deformed positions
-        driverOrigPos = cmds.getAttr(selDrivers[i] + '.t')[0]
-        cmds.setAttr(selDrivers[i] + '.t', driverOrigPos[0], driverOrigPos[1], driverOrigPos[2] + 1)
-        vtxsDefPos = [cmds.xform(vtx, q=True, t=True, ws=True) for vtx in selVtxs]
-        cmds.setAttr(selDrivers[i] + '.t', driverOrigPos[0], driverOrigPos[1], driverOrigPos[2])
-
-        # Set weights for a driver
-        for j, (vtxOrigPos, vtxDefPos) in enumerate(zip(vtxsOrigPos, vtxsDefPos)):
-            delta = [vtxDefPos[0]-vtxOrigPos[0], vtxDefPos[1]-vtxOrigPos[1], vtxDefPos[2]-vtxOrigPos[2]]
-            weight = math.sqrt(pow(delta[0], 2) + pow(delta[1], 2) + pow(delta[2], 2))  # Since we move a driver 1 unit the weight for a vertex is same as distance of delta
-            if weight < MIN_WEIGHT:
-                continue
-            cmds.skinPercent(skinClst, selVtxs[j], nrm=1, tv=[joints[i], weight])
-
-        cmds.progressWindow(e=True, progress=i, status=selDrivers[i])
-    cmds.progressWindow(endProgress=1)
-
-    elapsedTime = time.time() - startTime
-    print('"{}()" takes time to run {}s.'.format(convert.__name__, round(elapsedTime, 2)))
+    restPoints = spatial_index.getMeshPoints(geo)[vtxIds]
+    projections = np.zeros((len(vtxIds), numDrivers))
+    expectedLengths = np.zeros((len(vtxIds), numDrivers))
+    try:
+        for i, driver in enumerate(drivers):
+            for deformedPoints, expectedDeltas in sampleDriver(geo, vtxIds, restPoints, driver, probes):
+                projections[:, i] += np.einsum('ij,ij->i', deformedPoints - restPoints, expectedDeltas)
+                expectedLengths[:, i] += np.einsum('ij,ij->i', expectedDeltas, expectedDeltas)
+            cmds.progressWindow(e=True, progress=i, status=driver)
+    finally:
+        cmds.progressWindow(endProgress=1)
+    stageTimes.append(('sample', time.perf_counter() - stageStart))
+
+    stageStart = time.perf_counter()
+    driverWeights = solveDriverWeights(projections, expectedLengths)
+    stageTimes.append(('solve', time.perf_counter() - stageStart))
+
+    stageStart = time.perf_counter()
+    setDriverWeights(skinClst, geo, vtxIds, joints, driverWeights)
+    stageTimes.append(('apply', time.perf_counter() - stageStart))
+
+    for stageName, elapsedTime in stageTimes:
+        print('"{}" stage takes time to run {}s.'.format(stageName, round(elapsedTime, 3)))
+    print('"{}()" takes time to run {}s.'.format(convertToSkin.__name__, round(sum(t for _, t in stageTimes), 2)))
+    return stageTimes
+
+
+def getProbeTransforms(probes):
+    """Relative (command, values) pairs applied to a driver for the given probes."""
+    probeTransforms = []
+    for axis in np.eye(3).tolist():
+        if 'translate' in probes:
+            probeTransforms.append((cmds.move, [value * TRANSLATE_PROBE for value in axis]))
+        if 'rotate' in probes:
+            probeTransforms.append((cmds.rotate, [value * ROTATE_PROBE for value in axis]))
+    if 'scale' in probes:
+        probeTransforms.append((cmds.scale, [SCALE_PROBE] * 3))
+    return probeTransforms
+
+
+def sampleDriver(geo, vtxIds, restPoints, driver, probes):
+    """Yield (deformed points, full weight displacements) of vertices for each probe transform of a driver."""
+    isTransform = cmds.objectType(driver, isAType='transform')
+    if isTransform:
+        restState = [(attr, cmds.getAttr('{}.{}'.format(driver, attr))[0]) for attr in ('t', 'r', 's')]
+        restMatrix = getWorldMatrix(driver)
+    else:
+        restPosition = cmds.xform(driver, q=True, t=True, ws=True)
+
+    for command, values in getProbeTransforms(probes):
+        if command is not cmds.move and not isTransform:
+            continue
+        try:
+            if command is cmds.move:
+                command(values[0], values[1], values[2], driver, r=True, ws=True)
+            else:
+                command(values[0], values[1], values[2], driver, r=True)
+
+            deformedPoints = spatial_index.getMeshPoints(geo)[vtxIds]
+            if isTransform:
+                # Displacement of a point rigidly attached to the driver
+                probeMatrix = np.linalg.inv(restMatrix) @ getWorldMatrix(driver)
+                expectedDeltas = np.c_[restPoints, np.ones(len(restPoints))] @ probeMatrix
+                expectedDeltas = expectedDeltas[:, :3] - restPoints
+            else:
+                expectedDeltas = np.tile(values, (len(restPoints), 1))
+        finally:
+            # Restore a driver
+            if isTransform:
+                for attr, value in restState:
+                    cmds.setAttr('{}.{}'.format(driver, attr), *value)
+            else:
+                cmds.xform(driver, t=restPosition, ws=True)
+
+        yield deformedPoints, expectedDeltas
+
+
+def getWorldMatrix(node):
+    return np.array(cmds.getAttr(node + '.worldMatrix[0]')).reshape(4, 4)
+
+
+def solveDriverWeights(projections, expectedLengths):
+    """Driver weights from accumulated probe projections.
+
+    Args:
+        projections (numpy.ndarray): (V, D) sum of dot(sampled displacement, full weight displacement) over probes.
+        expectedLengths (numpy.ndarray): (V, D) sum of squared full weight displacement lengths over probes.
+
+    Returns:
+        numpy.ndarray: (V, D) weights. Weights below MIN_WEIGHT are zero and rows sum to 1 at most.
+    """
+    weights = np.divide(projections, expectedLengths, out=np.zeros_like(projections), where=expectedLengths > 1e-12)
+    weights = np.clip(weights, 0.0, 1.0)
+    weights[weights < MIN_WEIGHT] = 0.0
+
+    sums = weights.sum(axis=1, keepdims=True)
+    return np.divide(weights, sums, out=weights, where=sums > 1.0)
+
+
+def setDriverWeights(skinCluster, geo, vtxIds, joints, driverWeights):
+    """Give driver weights to the driver joints and scale existing weights into the rest with one setWeights call."""
+    selLs = om.MSelectionList()
+    selLs.add(skinCluster)
+    selLs.add(geo)
+    skinFn = oma.MFnSkinCluster(selLs.getDependNode(0))
+    geoDagPath = selLs.getDagPath(1)
+    geoDagPath.extendToShape()
+
+    compFn = om.MFnSingleIndexedComponent()
+    components = compFn.create(om.MFn.kMeshVertComponent)
+    compFn.addElements(vtxIds.tolist())
+
+    oldWeights, infCount = skinFn.getWeights(geoDagPath, components)
+    weights = np.array(oldWeights).reshape(-1, infCount)
+
+    infNames = [om.MFnDagNode(infDagPath).partialPathName() for infDagPath in skinFn.influenceObjects()]
+    jointIds = [infNames.index(cmds.ls(jnt)[0]) for jnt in joints]
+
+    rest = 1.0 - driverWeights.sum(axis=1, keepdims=True)
+    weights[:, jointIds] = 0.0
+    restSums = weights.sum(axis=1, keepdims=True)
+    weights = np.divide(weights, restSums, out=np.zeros_like(weights), where=restSums > 0) * rest
+    weights[:, jointIds] = driverWeights
+
+    infIds = om.MIntArray(list(range(infCount)))
+    newWeights = om.MDoubleArray(weights.ravel().tolist())
+    api_undo.run(lambda: skinFn.setWeights(geoDagPath, components, infIds, newWeights, False),
+                 lambda: skinFn.setWeights(geoDagPath, components, infIds, oldWeights, False))
 
 
 # The Main Window Procedure
@@ -179,6 +328,10 @@ def showGUI(parent=None, *args):
     cmds.setParent('..')
     cmds.setParent('..')
     cmds.separator(h=10)
+    cmds.rowLayout(numberOfColumns=2, columnWidth=[(1,125), (2,125)])
+    cmds.checkBox('rotateProbeChkBox', l='Rotate Probe', ann='Sample rotation of transform drivers as well as translation.')
+    cmds.checkBox('scaleProbeChkBox', l='Scale Probe', ann='Sample scale of transform drivers as well as translation.')
+    cmds.setParent('..')
     cmds.button(ann ='Press the button to Convert. Note:- This will some time according to the number of vertex selected.' ,
                 l='CONVERT',
                 h=40, c=convert)
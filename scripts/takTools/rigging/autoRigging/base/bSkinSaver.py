@@ -16,11 +16,17 @@
 
 import maya.OpenMaya as OpenMaya
 import maya.OpenMayaAnim as OpenMayaAnim
+import maya.api.OpenMaya as om2
 import maya.mel
 import maya.cmds as cmds
 import maya.OpenMayaUI as mui
 import time
 import Qt
+import numpy as np
+
+from takTools.utils import skin_io
+from takTools.rigging.bSkinSaver import getSceneJoints, getInfluenceNames, getCompleteComponents
+from takTools.utils.skin import getSkinClusterFn
 
 
 MAYA_VERSION = int(cmds.about(version=True))
@@ -600,191 +606,68 @@ def bSaveSkinValues(inputFile):
 
 
 
-def bSkinObject(objectName, fileJoints, weights):
+def bSkinObject(objectName, fileJoints, weights, sceneJoints=None):
 
     if not cmds.objExists(objectName):
         print(objectName, " doesn't exist - skipping. ")
         return
 
-
-
-    it = OpenMaya.MItDependencyNodes ( OpenMaya.MFn.kJoint);
-
+    if sceneJoints is None:
+        sceneJoints = getSceneJoints()
 
     # quick check if all the joints are in scene
     #
-    allInfluencesInScene = True;
-    sceneJointTokens = []
-
-    for jointIndex in range(len(fileJoints)):
-        jointHere = False;
-        it = OpenMaya.MItDependencyNodes ( OpenMaya.MFn.kJoint)
-        while not it.isDone():
-            sceneJointTokens = str(OpenMaya.MFnDagNode(it.item()).fullPathName()).split('|')
-            if str(fileJoints[jointIndex]) == str(sceneJointTokens[len(sceneJointTokens) - 1]):
-                jointHere = True;
-
-            it.next()
-
-        if not jointHere:
-            allInfluencesInScene = False;
-            print('missing influence: ', fileJoints[jointIndex])
-
-    if not allInfluencesInScene:
+    missingInfluences = [joint for joint in fileJoints if joint not in sceneJoints]
+    if missingInfluences:
+        for joint in missingInfluences:
+            print('missing influence: ', joint)
         print(objectName, " can't be skinned because of missing influences.")
         return
 
-
-
-
-
-
-    # create some arrays
-    #
-    allJointsHere = False
-    totalJointsCount = len(fileJoints)
-    fileJointsMapArray = range(len(fileJoints))
-    objectEmptyJoints = []
+    if not isinstance(weights, np.ndarray):
+        weights = skin_io.parseWeightLines(weights, len(fileJoints))
 
 
     # let's check if there's already a skinCluster, let's try to use that - if it contains all the needed joints
     #
-    skinCluster = bFindSkinCluster(objectName)
-    if type(skinCluster) != type(True):
-        fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
-        influentsArray = OpenMaya.MDagPathArray()
-        infCount = fnSkinCluster.influenceObjects(influentsArray)
-
-        influenceStringArray = []
-        for i in range(infCount):
-            influenceStringArray.append(OpenMaya.MFnDagNode(influentsArray[i]).name())
-
-        allJointsHere = True
-        for joint in fileJoints:
-            if joint not in influenceStringArray:
-                print('missing a joint (', joint, ', ..)')
-                allJointsHere = False
-                break
-
-        if not allJointsHere:
+    fnSkinCluster = getSkinClusterFn(objectName)
+    if fnSkinCluster:
+        influenceNames = set(getInfluenceNames(fnSkinCluster))
+        missingJoints = [joint for joint in fileJoints if joint not in influenceNames]
+        if missingJoints:
+            print('missing a joint (', missingJoints[0], ', ..)')
             maya.mel.eval("DetachSkin " + objectName)
-        else:
-            objectFoundJointsInFile = [False] * len(influenceStringArray)
-
-            for i in range(len(fileJoints)):
-                for k in range(len(influenceStringArray)):
-                    if fileJoints[i] == influenceStringArray[k]:
-                        fileJointsMapArray[i] = k
-                        objectFoundJointsInFile[k] = True
-
-
-            for i in range(len(influenceStringArray)):
-                if not objectFoundJointsInFile[i]:
-                    objectEmptyJoints.append(i)
-            totalJointsCount = len(fileJointsMapArray) + len(objectEmptyJoints)
-
-            #print('jointMapArray: ', fileJointsMapArray)
+            fnSkinCluster = None
 
-
-    if not allJointsHere:
-        cmd = "select "
-        for i in range(len(fileJoints)):
-            cmd += " " + fileJoints[i]
-
-        cmd += " " + objectName
-        maya.mel.eval(cmd)
-
-        maya.mel.eval("skinCluster -tsb -mi 10");
-        maya.mel.eval("select `listRelatives -p " + objectName + "`");
+    if not fnSkinCluster:
+        cmds.select([sceneJoints[joint].fullPathName() for joint in fileJoints], r=True)
+        cmds.select(objectName, add=True)
+        maya.mel.eval("skinCluster -tsb -mi 10")
+        maya.mel.eval("select `listRelatives -p " + objectName + "`")
         maya.mel.eval("refresh")
-        #maya.mel.eval("undoInfo -st 1")
-
-        skinCluster = bFindSkinCluster(objectName)
-
-
 
-    fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
-    influentsArray = OpenMaya.MDagPathArray()
-    fnSkinCluster.influenceObjects(influentsArray)
-
-    bSkinPath = OpenMaya.MDagPath()
-    fnSkinCluster.getPathAtIndex(fnSkinCluster.indexForOutputConnection(0),bSkinPath)
+        fnSkinCluster = getSkinClusterFn(objectName)
 
-    weightStrings = []
-    vertexIter = OpenMaya.MItGeometry (bSkinPath)
 
-    weightDoubles = OpenMaya.MDoubleArray()
-
-
-    singleIndexed = True;
-    vtxComponents = OpenMaya.MObject()
-    fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
-    fnVtxCompDouble = OpenMaya.MFnDoubleIndexedComponent()
-
-
-    if bSkinPath.node().apiType() == OpenMaya.MFn.kMesh:
-        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kMeshVertComponent )
-    elif bSkinPath.node().apiType() == OpenMaya.MFn.kNurbsSurface:
-        singleIndexed = False
-        vtxComponents = fnVtxCompDouble.create( OpenMaya.MFn.kSurfaceCVComponent )
-    elif bSkinPath.node().apiType() == OpenMaya.MFn.kNurbsCurve:
-        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kCurveCVComponent )
-
-
-
-    # nurbs curves..
-    #
-    counterValue = 0;
-    if not singleIndexed:
-        currentU = 0
-        currentV = 0
-
-        cvsU = OpenMaya.MFnNurbsSurface(bSkinPath.node()).numCVsInU()
-        cvsV = OpenMaya.MFnNurbsSurface(bSkinPath.node()).numCVsInV()
-        formU = OpenMaya.MFnNurbsSurface(bSkinPath.node()).formInU()
-        formV = OpenMaya.MFnNurbsSurface(bSkinPath.node()).formInV()
-
-        if formU == 3:
-            cvsU -= 3
-        if formV == 3:
-            cvsV -= 3
-
-    # go through all vertices and append to the weightDoubles array
-    #
-    vertexIter = OpenMaya.MItGeometry (bSkinPath)
-    while not vertexIter.isDone():
-        weightStrings = []
-        if singleIndexed:
-            fnVtxComp.addElement(counterValue)
-        else:
-            fnVtxCompDouble.addElement(currentU, currentV)
-            currentV += 1;
-            if currentV >= cvsV:
-                currentV = 0
-                currentU += 1
-
-        weightStrings = weights[counterValue].split(' ');
-        for i in range(len(weightStrings)):
-            weightDoubles.append(float(weightStrings[i]))
-        for i in range(len(objectEmptyJoints)):
-            weightDoubles.append(0)
-
-        counterValue += 1
-        vertexIter.next()
-
-    # createing the influence Array
-    #
-    mayafileJointsMapArray = OpenMaya.MIntArray()
-    for i in range(len(fileJointsMapArray)):
-        mayafileJointsMapArray.append(fileJointsMapArray[i])
-    for i in range(len(objectEmptyJoints)):
-        mayafileJointsMapArray.append(objectEmptyJoints[i])
+    skinPath = fnSkinCluster.getPathAtIndex(fnSkinCluster.indexForOutputConnection(0))
+    components, pointCount = getCompleteComponents(skinPath)
+    if pointCount != len(weights):
+        print(objectName, " can't be skinned because point counts don't match ({} in scene, {} in file).".format(pointCount, len(weights)))
+        return
 
+    # Columns of influences that are not in the file stay zero
+    influenceNames = getInfluenceNames(fnSkinCluster)
+    skinWeights = skin_io.remapInfluences(weights, fileJoints, influenceNames)
 
     # set the weights
     #
-    fnSkinCluster.setWeights(bSkinPath, vtxComponents, mayafileJointsMapArray, weightDoubles, 0)
-    #Maya.mel.eval("skinPercent -normalize true " + fnSkinCluster.name() + " " + objectName)
+    fnSkinCluster.setWeights(
+        skinPath,
+        components,
+        om2.MIntArray(range(len(influenceNames))),
+        om2.MDoubleArray(skinWeights.ravel().tolist()),
+        False
+    )
 
 
 
@@ -817,6 +700,8 @@ def bLoadSkinValues(loadOnSelection, inputFile):
         print("You need to select a polygon object")
         return
 
+    sceneJoints = getSceneJoints()
+
     input = open(inputFile, 'r')
 
     FilePosition = 0
@@ -835,7 +720,7 @@ def bLoadSkinValues(loadOnSelection, inputFile):
                     if len(line) > 0:
                         weights.append(line)
                     else:
-                        bSkinObject(PolygonObject, joints, weights)
+                        bSkinObject(PolygonObject, joints, weights, sceneJoints)
                         PolygonObject = ""
                         joints = []
                         weights = []
@@ -4,6 +4,7 @@ import maya.cmds as cmds
 import pymel.core as pm
 
 from takTools.utils import kdTree
+from takTools.utils import spatial_index
 
 
 SKELETON_SUFFIX = '_sk'
@@ -265,10 +266,11 @@ def connectSkeletonToOther(driverRoot, drivenRoot, excludeJoints, maintainOffset
     kdt.buildData(driverJoints)
     kdt.buildTree()
 
+    drivenJntPositions = spatial_index.getTransformPositions(drivenJoints)
+    driverJntDataList = kdt.searchNearestDataList(drivenJntPositions)
+
     cmds.undoInfo(openChunk=True)
-    for drivenJnt in drivenJoints:
-        drivenJntPos = cmds.xform(drivenJnt, q=True, t=True, ws=True)
-        driverJntData = kdt.searchNearestData(drivenJntPos)
+    for drivenJnt, driverJntData in zip(drivenJoints, driverJntDataList):
         cmds.parentConstraint(driverJntData['name'], drivenJnt, mo=maintainOffset)
         cmds.scaleConstraint(driverJntData['name'], drivenJnt, mo=maintainOffset)
         cmds.setAttr('{}.segmentScaleCompensate'.format(drivenJnt), False)
@@ -17,10 +17,16 @@
 import os
 import maya.OpenMaya as OpenMaya
 import maya.OpenMayaAnim as OpenMayaAnim
+import maya.api.OpenMaya as om2
 from maya import cmds, mel
 import maya.OpenMayaUI as mui
 import time
 
+import numpy as np
+
+from ..utils import skin_io
+from ..utils import skin as skinUtil
+
 
 MAYA_VERSION = int(cmds.about(version=True))
 if MAYA_VERSION <= 2016:
@@ -39,7 +45,9 @@ elif 2025 <= MAYA_VERSION:
     import shiboken6 as shiboken
 
 
-EXT = '.sw'
+EXT = skin_io.TEXT_EXT
+BINARY_EXT = skin_io.BINARY_EXT
+DELTA_EXT = skin_io.DELTA_EXT
 
 
 def getSelectedGeometries():
@@ -165,7 +173,7 @@ class bSkinSaverUI(QDialog):
 
     def selectObjectsFile(self):
         startDir = os.path.dirname(self.objectsFileLine.text())
-        fileResult = cmds.fileDialog2(dir=startDir, fileMode=0, fileFilter="All Files (*{})".format(EXT))
+        fileResult = cmds.fileDialog2(dir=startDir, fileMode=0, fileFilter="Skin Weights (*{} *{} *{})".format(EXT, BINARY_EXT, DELTA_EXT))
         if fileResult != None:
             self.objectsFileLine.setText(fileResult[0])
 
@@ -593,7 +601,11 @@ def bSaveSkinValues(inputFile, geometry=False):
 
     timeBefore = time.time()
 
-    output = open(inputFile, 'w')
+    binary = skin_io.isBinaryFile(inputFile)
+    if binary:
+        meshWeightsList = []
+    else:
+        output = open(inputFile, 'w')
 
     cmds.select(selGeos, r=True)
     selection = OpenMaya.MSelectionList()
@@ -609,7 +621,7 @@ def bSaveSkinValues(inputFile, geometry=False):
         if geometry:
             nicePath = inputFile.replace('\\', '/')
             dirPath = os.path.dirname(nicePath)
-            abcFileName = os.path.basename(nicePath).replace(EXT, '.abc')
+            abcFileName = os.path.splitext(os.path.basename(nicePath))[0] + '.abc'
             mel.eval('AbcExport -j "-frameRange 0 0 -stripNamespaces -uvWrite -worldSpace -writeUVSets -dataFormat ogawa -root {0} -file {1}/{2}";'.format(objectName, dirPath, abcFileName))
 
         newTransform = OpenMaya.MFnTransform(node)
@@ -624,15 +636,20 @@ def bSaveSkinValues(inputFile, geometry=False):
                     influenceArray = OpenMaya.MDagPathArray()
                     fnSkinCluster.influenceObjects(influenceArray)
                     influentsCount = influenceArray.length()
-                    output.write(objectName + '\n')
 
+                    influenceNames = []
                     for k in range(influentsCount):
                         jointTokens = str(influenceArray[k].fullPathName()).split('|')
                         jointTokens = jointTokens[len(jointTokens)-1].split(':')
-                        output.write(jointTokens[len(jointTokens)-1] + '\n')
-
-                    output.write('============\n')
+                        influenceNames.append(jointTokens[len(jointTokens)-1])
 
+                    if binary:
+                        # API 2.0 gives all weights in one array that numpy converts at once
+                        geoPath = om2.MSelectionList().add(bSkinPath.fullPathName()).getDagPath(0)
+                        components, _ = getCompleteComponents(geoPath)
+                        weights, _ = skinUtil.getSkinClusterFn(geoPath.fullPathName()).getWeights(geoPath, components)
+                        meshWeightsList.append(skin_io.MeshWeights.fromDense(objectName, influenceNames, np.array(weights, dtype=np.float32)))
+                        continue
 
                     fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
                     vtxComponents = OpenMaya.MObject()
@@ -648,6 +665,11 @@ def bSaveSkinValues(inputFile, geometry=False):
                     fnSkinCluster.getWeights(bSkinPath, vtxComponents, WeightArray, infCountPtr)
                     infCount = OpenMaya.MScriptUtil.getUint(infCountPtr)
 
+                    output.write(objectName + '\n')
+                    for influenceName in influenceNames:
+                        output.write(influenceName + '\n')
+                    output.write('============\n')
+
                     for i in range(vertexCount):
                         saveString = ' '.join(['0' if x == 0 else str(x) for n,x in enumerate(WeightArray[i*infCount : (i+1)*infCount])])
                         output.write(saveString + '\n')
@@ -656,49 +678,86 @@ def bSaveSkinValues(inputFile, geometry=False):
 
         iterate.next()
 
-    output.close()
+    if binary:
+        skin_io.writeBinary(inputFile, meshWeightsList)
+    else:
+        output.close()
     print('done saving weights, it took ', (time.time()-timeBefore), ' seconds.')
 
 
 
 
 
-def bSkinObject(objectName, fileJoints, weights):
+def getSceneJoints():
+    """Map short names of the scene joints to their dag paths with a single pass over the scene."""
+    sceneJoints = {}
+    it = om2.MItDependencyNodes(om2.MFn.kJoint)
+    while not it.isDone():
+        dagPath = om2.MDagPath.getAPathTo(it.thisNode())
+        sceneJoints.setdefault(dagPath.fullPathName().split('|')[-1], dagPath)
+        it.next()
+    return sceneJoints
+
+
+def getInfluenceNames(fnSkinCluster):
+    return [om2.MFnDagNode(dagPath).name() for dagPath in fnSkinCluster.influenceObjects()]
+
+
+def getCompleteComponents(geoPath):
+    """Get components for every point of the geometry in the order of the skin file.
+
+    Returns:
+        tuple: Components MObject and point count.
+    """
+    if geoPath.apiType() == om2.MFn.kNurbsSurface:
+        fnSurface = om2.MFnNurbsSurface(geoPath)
+        cvsU = fnSurface.numCVsInU
+        cvsV = fnSurface.numCVsInV
+        if fnSurface.formInU == om2.MFnNurbsSurface.kPeriodic:
+            cvsU -= 3
+        if fnSurface.formInV == om2.MFnNurbsSurface.kPeriodic:
+            cvsV -= 3
+
+        fnComp = om2.MFnDoubleIndexedComponent()
+        components = fnComp.create(om2.MFn.kSurfaceCVComponent)
+        fnComp.addElements([(u, v) for u in range(cvsU) for v in range(cvsV)])
+        return components, cvsU * cvsV
+
+    componentType = om2.MFn.kCurveCVComponent if geoPath.apiType() == om2.MFn.kNurbsCurve else om2.MFn.kMeshVertComponent
+    pointCount = om2.MItGeometry(geoPath).count()
+    fnComp = om2.MFnSingleIndexedComponent()
+    components = fnComp.create(componentType)
+    fnComp.setCompleteData(pointCount)
+    return components, pointCount
+
+
+def bSkinObject(objectName, fileJoints, weights, sceneJoints=None):
+    """Skin the object with weights from the skin file.
+
+    Args:
+        objectName (str): Geometry to skin.
+        fileJoints (list): Influence names of the weights columns.
+        weights (list or numpy.ndarray): Weight lines of the text file or dense (pointCount, len(fileJoints)) weights.
+        sceneJoints (dict, optional): Result of getSceneJoints() to reuse between objects. Defaults to None.
+    """
     if not cmds.objExists(objectName):
         print(objectName, " doesn't exist - skipping. ")
         return
 
-    it = OpenMaya.MItDependencyNodes ( OpenMaya.MFn.kJoint)
+    if sceneJoints is None:
+        sceneJoints = getSceneJoints()
 
     # quick check if all the joints are in scene
     #
-    allInfluencesInScene = True
-    sceneJointTokens = []
-
-    for jointIndex in range(len(fileJoints)):
-        jointHere = False
-        it = OpenMaya.MItDependencyNodes ( OpenMaya.MFn.kJoint)
-        while not it.isDone():
-            sceneJointTokens = str(OpenMaya.MFnDagNode(it.item()).fullPathName()).split('|')
-            if str(fileJoints[jointIndex]) == str(sceneJointTokens[len(sceneJointTokens) - 1]):
-                jointHere = True
-
-            it.next()
-
-        if not jointHere:
-            allInfluencesInScene = False
-            print('missing influence: ', fileJoints[jointIndex])
-
-    if not allInfluencesInScene:
+    missingInfluences = [joint for joint in fileJoints if joint not in sceneJoints]
+    if missingInfluences:
+        for joint in missingInfluences:
+            print('missing influence: ', joint)
         print(objectName, " can't be skinned because of missing influences.")
         return
 
-    # create some arrays
-    #
-    allJointsHere = False
-    totalJointsCount = len(fileJoints)
-    fileJointsMapArray = list(range(len(fileJoints)))
-    objectEmptyJoints = []
+    if not isinstance(weights, np.ndarray):
+        weights = skin_io.parseWeightLines(weights, len(fileJoints))
 
     # Show shape visibility and store visibility state
     shape = objectName if cmds.nodeType(objectName) == 'mesh' else cmds.listRelatives(objectName, s=True, ni=True)[0]
@@ -707,135 +766,42 @@ def bSkinObject(objectName, fileJoints, weights):
 
     # let's check if there's already a skinCluster, let's try to use that - if it contains all the needed joints
     #
-    skinCluster = bFindSkinCluster(objectName)
-    if type(skinCluster) != type(True):
-        fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
-        influentsArray = OpenMaya.MDagPathArray()
-        infCount = fnSkinCluster.influenceObjects(influentsArray)
-
-        influenceStringArray = []
-        for i in range(infCount):
-            influenceStringArray.append(OpenMaya.MFnDagNode(influentsArray[i]).name())
-
-        allJointsHere = True
-        for joint in fileJoints:
-            if joint not in influenceStringArray:
-                print('missing a joint (', joint, ', ..)')
-                allJointsHere = False
-                break
-
-        if not allJointsHere:
+    fnSkinCluster = skinUtil.getSkinClusterFn(objectName)
+    if fnSkinCluster:
+        influenceNames = set(getInfluenceNames(fnSkinCluster))
+        missingJoints = [joint for joint in fileJoints if joint not in influenceNames]
+        if missingJoints:
+            print('missing a joint (', missingJoints[0], ', ..)')
             mel.eval("DetachSkin " + objectName)
-        else:
-            objectFoundJointsInFile = [False] * len(influenceStringArray)
-
-            for i in range(len(fileJoints)):
-                for k in range(len(influenceStringArray)):
-                    if fileJoints[i] == influenceStringArray[k]:
-                        fileJointsMapArray[i] = k
-                        objectFoundJointsInFile[k] = True
-
-            for i in range(len(influenceStringArray)):
-                if not objectFoundJointsInFile[i]:
-                    objectEmptyJoints.append(i)
-            totalJointsCount = len(fileJointsMapArray) + len(objectEmptyJoints)
-
-            #print('jointMapArray: ', fileJointsMapArray)
-
-    if not allJointsHere:
-        cmd = "select "
-        for i in range(len(fileJoints)):
-            cmd += " " + fileJoints[i]
-
-        cmd += " " + objectName
-        print(cmd)
-        mel.eval(cmd)
+            fnSkinCluster = None
 
+    if not fnSkinCluster:
+        cmds.select([sceneJoints[joint].fullPathName() for joint in fileJoints], r=True)
+        cmds.select(objectName, add=True)
         mel.eval("skinCluster -tsb -mi 10")
         mel.eval("select `listRelatives -p " + objectName + "`")
         mel.eval("refresh")
-        #mel.eval("undoInfo -st 1")
-
-        skinCluster = bFindSkinCluster(objectName)
-
-    fnSkinCluster = OpenMayaAnim.MFnSkinCluster(skinCluster)
-    influentsArray = OpenMaya.MDagPathArray()
-    fnSkinCluster.influenceObjects(influentsArray)
-
-    bSkinPath = OpenMaya.MDagPath()
-    fnSkinCluster.getPathAtIndex(fnSkinCluster.indexForOutputConnection(0),bSkinPath)
-
-    weightStrings = []
-    vertexIter = OpenMaya.MItGeometry (bSkinPath)
-
-    weightDoubles = OpenMaya.MDoubleArray()
-
-    singleIndexed = True
-    vtxComponents = OpenMaya.MObject()
-    fnVtxComp = OpenMaya.MFnSingleIndexedComponent()
-    fnVtxCompDouble = OpenMaya.MFnDoubleIndexedComponent()
-
-
-    if bSkinPath.node().apiType() == OpenMaya.MFn.kMesh:
-        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kMeshVertComponent )
-    elif bSkinPath.node().apiType() == OpenMaya.MFn.kNurbsSurface:
-        singleIndexed = False
-        vtxComponents = fnVtxCompDouble.create( OpenMaya.MFn.kSurfaceCVComponent )
-    elif bSkinPath.node().apiType() == OpenMaya.MFn.kNurbsCurve:
-        vtxComponents = fnVtxComp.create( OpenMaya.MFn.kCurveCVComponent )
-
-    # nurbs curves..
-    #
-    counterValue = 0
-    if not singleIndexed:
-        currentU = 0
-        currentV = 0
 
-        cvsU = OpenMaya.MFnNurbsSurface(bSkinPath.node()).numCVsInU()
-        cvsV = OpenMaya.MFnNurbsSurface(bSkinPath.node()).numCVsInV()
-        formU = OpenMaya.MFnNurbsSurface(bSkinPath.node()).formInU()
-        formV = OpenMaya.MFnNurbsSurface(bSkinPath.node()).formInV()
+        fnSkinCluster = skinUtil.getSkinClusterFn(objectName)
 
-        if formU == 3:
-            cvsU -= 3
-        if formV == 3:
-            cvsV -= 3
-
-    # go through all vertices and append to the weightDoubles array
-    #
-    vertexIter = OpenMaya.MItGeometry (bSkinPath)
-    while not vertexIter.isDone():
-        weightStrings = []
-        if singleIndexed:
-            fnVtxComp.addElement(counterValue)
-        else:
-            fnVtxCompDouble.addElement(currentU, currentV)
-            currentV += 1
-            if currentV >= cvsV:
-                currentV = 0
-                currentU += 1
-
-        weightStrings = weights[counterValue].split(' ')
-        for i in range(len(weightStrings)):
-            weightDoubles.append(float(weightStrings[i]))
-        for i in range(len(objectEmptyJoints)):
-            weightDoubles.append(0)
-
-        counterValue += 1
-        vertexIter.next()
-
-    # createing the influence Array
-    #
-    mayafileJointsMapArray = OpenMaya.MIntArray()
-    for i in range(len(fileJointsMapArray)):
-        mayafileJointsMapArray.append(fileJointsMapArray[i])
-    for i in range(len(objectEmptyJoints)):
-        mayafileJointsMapArray.append(objectEmptyJoints[i])
-
-    # set the weights
-    #
-    fnSkinCluster.setWeights(bSkinPath, vtxComponents, mayafileJointsMapArray, weightDoubles, 0)
-    #mel.eval("skinPercent -normalize true " + fnSkinCluster.name() + " " + objectName)
+    skinPath = fnSkinCluster.getPathAtIndex(fnSkinCluster.indexForOutputConnection(0))
+    components, pointCount = getCompleteComponents(skinPath)
+    if pointCount != len(weights):
+        print(objectName, " can't be skinned because point counts don't match ({} in scene, {} in file).".format(pointCount, len(weights)))
+    else:
+        # Columns of influences that are not in the file stay zero
+        influenceNames = getInfluenceNames(fnSkinCluster)
+        skinWeights = skin_io.remapInfluences(weights, fileJoints, influenceNames)
+
+        # set the weights
+        #
+        fnSkinCluster.setWeights(
+            skinPath,
+            components,
+            om2.MIntArray(range(len(influenceNames))),
+            om2.MDoubleArray(skinWeights.ravel().tolist()),
+            False
+        )
 
     # Restore shape visibility
     cmds.setAttr('{}.visibility'.format(shape), shapeVisState)
@@ -851,7 +817,7 @@ def bLoadSkinValues(loadOnSelection, inputFile, namespace='', geometry=False):
 
     if geometry:
         dirPath = os.path.dirname(inputFile.replace('\\', '/'))
-        abcFileName = os.path.basename(inputFile).replace(EXT, '.abc')
+        abcFileName = os.path.splitext(os.path.basename(inputFile))[0] + '.abc'
         mel.eval('AbcImport -mode import "{}/{}";'.format(dirPath, abcFileName))
 
     if loadOnSelection == True:
@@ -865,6 +831,24 @@ def bLoadSkinValues(loadOnSelection, inputFile, namespace='', geometry=False):
         print("You need to select a polygon object")
         return
 
+    sceneJoints = getSceneJoints()
+
+    if skin_io.isBinaryFile(inputFile):
+        for meshWeights in skin_io.read(inputFile):
+            if not loadOnSelection:
+                PolygonObject = meshWeights.name
+            if cmds.objExists(PolygonObject):
+                cmds.select(PolygonObject, r=True)
+                mel.eval("refresh")
+
+            joints = [namespace+influence for influence in meshWeights.influences]
+            bSkinObject(PolygonObject, joints, meshWeights.toDense(), sceneJoints)
+            if loadOnSelection:
+                break
+
+        print('done loading weights, it took ', (time.time()-timeBefore), ' seconds.')
+        return
+
     input = open(inputFile, 'r')
 
     FilePosition = 0
@@ -883,7 +867,7 @@ def bLoadSkinValues(loadOnSelection, inputFile, namespace='', geometry=False):
                     if len(line) > 0:
                         weights.append(line)
                     else:
-                        bSkinObject(PolygonObject, joints, weights)
+                        bSkinObject(PolygonObject, joints, weights, sceneJoints)
                         PolygonObject = ""
                         joints = []
                         weights = []
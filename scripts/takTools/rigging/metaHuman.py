@@ -4,6 +4,9 @@ from maya.api import OpenMaya as om
 from maya import cmds
 import pymel.core as pm
 
+from ..utils import inverse_skin
+from ..utils import mesh as meshUtil
+
 # Skeleton joints
 SKELETON_ROOT = 'mh_spine_04'
 SKELETON_HEAD = 'mh_head'
@@ -491,28 +494,13 @@ mh.combineTargets(neutralMesh, targetMeshes)
     pm.delete(pm.parentConstraint(targetMeshes, combinedTarget, mo=False))
 
 def getPoints(geo):
-    dagPath = getDagPath(geo)
-    meshFn = om.MFnMesh(dagPath)
-
-    return meshFn.getPoints()
+    return meshUtil.getMeshArrays(geo)[0]
 
 def getDelta(neutralPoints, deformedPoints):
-    pointsDelta = om.MVectorArray()
-
-    numPoints = len(neutralPoints)
-    pointsDelta.setLength(numPoints)
-
-    for i in range(numPoints):
-        pointsDelta[i] = deformedPoints[i] - neutralPoints[i]
-
-    return pointsDelta
+    return inverse_skin.getDeltas(neutralPoints, deformedPoints)
 
 def subtractDelta(geo, pointsDelta):
-    dagPath = getDagPath(geo)
-    vertIt = om.MItMeshVertex(dagPath)
-    while not vertIt.isDone():
-        vertIt.setPosition(vertIt.position() - pointsDelta[vertIt.index()])
-        vertIt.next()
+    meshUtil.setMeshPoints(geo, getPoints(geo) - pointsDelta)
 
 def getDagPath(geo):
     sels = om.MSelectionList()
@@ -1,8 +1,13 @@
 import maya.cmds as cmds
 import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
 import numpy as np
 from scipy.optimize import nnls
 
+from ..utils import api_undo
+from ..utils import inverse_skin
+from ..utils import skin_solver
+
 # 스킨 클러스터 찾기
 def get_skin_cluster(mesh):
     history = cmds.listHistory(mesh)
@@ -122,16 +127,10 @@ def select_joints_for_vertex(joint_weights, all_joints, skin, skinMesh, vtx_inde
 def get_all_vertex_positions(mesh):
     sel_list = om.MSelectionList()
     sel_list.add(mesh)
-    dag_path = sel_list.getDagPath(0)
-    mfn_mesh = om.MFnMesh(dag_path)
-    world_matrix = dag_path.inclusiveMatrix()
-
-    points = mfn_mesh.getPoints(space=om.MSpace.kObject)
-    points_np = np.array([[p.x, p.y, p.z, 1.0] for p in points])  # Nx4
+    mfn_mesh = om.MFnMesh(sel_list.getDagPath(0))
 
-    world_matrix_np = np.array(world_matrix).reshape(4, 4).T  # column-major → row-major
-    world_positions = points_np @ world_matrix_np  # Nx4
-    return world_positions[:, :3]  # Nx3
+    points = mfn_mesh.getPoints(space=om.MSpace.kWorld)
+    return np.array(points, dtype=np.float64).reshape(-1, 4)[:, :3]  # Nx3
 
 def get_modified_vertex_indices(skinMesh, sculptMesh, threshold=1e-4):
     pos_a = get_all_vertex_positions(skinMesh)
@@ -191,7 +190,67 @@ def apply_inverse_weights_limited(skinMesh, sculptMesh, vtx_index, max_influence
     cmds.skinPercent(skin, f"{skinMesh}.vtx[{vtx_index}]", transformValue=transform_weights)
 
 
-def apply_inverse_weights_all(skinMesh, sculptMesh):
-    sculptedVtxIndices = get_modified_vertex_indices(skinMesh, sculptMesh, threshold=1e-4)
-    for vtx_index in sculptedVtxIndices:
-        apply_inverse_weights_limited(skinMesh, sculptMesh, vtx_index, max_influences=4)
+# 스킨 클러스터의 웨이트, bindPreMatrix, 조인트 월드 매트릭스를 한 번에 가져오기
+def get_skin_data(skin_cluster, mesh, vtx_indices):
+    sel_list = om.MSelectionList()
+    sel_list.add(skin_cluster)
+    sel_list.add(mesh)
+    skin_fn = oma.MFnSkinCluster(sel_list.getDependNode(0))
+    mesh_path = sel_list.getDagPath(1)
+    mesh_path.extendToShape()
+
+    components = om.MFnSingleIndexedComponent()
+    components_obj = components.create(om.MFn.kMeshVertComponent)
+    components.addElements([int(index) for index in vtx_indices])
+
+    weights, influence_count = skin_fn.getWeights(mesh_path, components_obj)
+    weights = np.array(weights, dtype=np.float64).reshape(-1, influence_count)
+
+    bind_pre_matrices, world_matrices = inverse_skin.getSkinMatrices(skin_fn)
+    return skin_fn, mesh_path, components_obj, weights, bind_pre_matrices, world_matrices
+
+
+def apply_inverse_weights_all(skinMesh, sculptMesh, max_influences=4, workers=None):
+    """
+    스컬프트된 버텍스 전체의 웨이트를 한 번에 계산하고 setWeights 한 번으로 적용한다.
+
+    Args:
+        skinMesh (str): 스킨 메쉬
+        sculptMesh (str): 스컬프트 메쉬
+        max_influences (int): 버텍스당 최대 인플루언스 수
+        workers (int): 계산에 쓸 스레드 수. None이면 현재 스레드에서 계산
+    """
+    skin = get_skin_cluster(skinMesh)
+    if not skin:
+        om.MGlobal.displayError("Skin cluster not found.")
+        return
+
+    deformed_points = get_all_vertex_positions(skinMesh)
+    target_points = get_all_vertex_positions(sculptMesh)
+    sculptedVtxIndices = np.flatnonzero(np.linalg.norm(deformed_points - target_points, axis=1) > 1e-4)
+    if not len(sculptedVtxIndices):
+        return
+
+    skin_fn, mesh_path, components_obj, weights, bind_pre_matrices, world_matrices = get_skin_data(skin, skinMesh, sculptedVtxIndices)
+    skin_matrices = bind_pre_matrices @ world_matrices
+    bind_positions = np.linalg.inv(bind_pre_matrices)[:, 3, :3]
+
+    new_weights, solved = skin_solver.solveInverseWeights(
+        weights,
+        deformed_points[sculptedVtxIndices],
+        target_points[sculptedVtxIndices],
+        skin_matrices,
+        bind_positions,
+        maxInfluences=max_influences,
+        workers=workers,
+    )
+    if not solved.all():
+        om.MGlobal.displayWarning(f"{int((~solved).sum())} vertices could not be solved and keep their weights.")
+
+    # 언두할 수 있도록 이전 웨이트와 함께 기록
+    influence_indices = om.MIntArray(list(range(weights.shape[1])))
+    old_weights = om.MDoubleArray(weights.ravel().tolist())
+    api_undo.run(
+        lambda: skin_fn.setWeights(mesh_path, components_obj, influence_indices, om.MDoubleArray(new_weights.ravel().tolist()), False),
+        lambda: skin_fn.setWeights(mesh_path, components_obj, influence_indices, old_weights, False),
+    )
@@ -22,6 +22,8 @@ import pymel.core as pm
 import maya.OpenMaya as OpenMaya
 
 from ..common import tak_lib
+from ..utils import inverse_skin
+from ..utils import mesh as meshUtil
 
 
 # ----------------------------------------------------------------
@@ -513,32 +515,10 @@ class Functions(object):
             baseGeo: string, Deformed geometry.
             sculptGeo: string, Sculpted geometry.
         Returns
-            deltaVecArray: MVectorArray
+            deltaVecArray: numpy.ndarray, (vertexCount, 3) delta vectors.
         '''
 
-        selLs = OpenMaya.MSelectionList()
-        selLs.add(baseGeo)
-        selLs.add(sculptGeo)
-
-        baseGeoDagPath = OpenMaya.MDagPath()
-        sculptGeoDagPath = OpenMaya.MDagPath()
-        selLs.getDagPath(0, baseGeoDagPath)
-        selLs.getDagPath(1, sculptGeoDagPath)
-
-        sculptMeshFn = OpenMaya.MFnMesh(sculptGeoDagPath)
-        sculptMeshPoints = OpenMaya.MPointArray()
-        sculptMeshFn.getPoints(sculptMeshPoints)
-
-        deltaVecArray = OpenMaya.MVectorArray()
-        baseGeoIt = OpenMaya.MItGeometry(baseGeoDagPath)
-        while not baseGeoIt.isDone():
-            baseGeoPoint = baseGeoIt.position()
-            deltaVec = sculptMeshPoints[baseGeoIt.index()] - baseGeoPoint
-            deltaVecArray.append(deltaVec)
-
-            baseGeoIt.next()
-
-        return deltaVecArray
+        return inverse_skin.getDeltas(meshUtil.getMeshArrays(baseGeo)[0], meshUtil.getMeshArrays(sculptGeo)[0])
 
 
     @classmethod
@@ -552,41 +532,8 @@ class Functions(object):
             None
         '''
 
-        for i in range(cls.deltaVecArray.length()):
-            # If vertex isn't moved skip calculation.
-            if cls.deltaVecArray[i].length() == 0.0:
-                continue
-
-            # set matrix pallete
-            trsfedMatrix = OpenMaya.MMatrix()
-            matrixPalletInitList = [0.0, 0.0, 0.0, 0.0,
-                                    0.0, 0.0, 0.0, 0.0,
-                                    0.0, 0.0, 0.0, 0.0,
-                                    0.0, 0.0, 0.0, 0.0]
-            OpenMaya.MScriptUtil.createMatrixFromList(matrixPalletInitList, trsfedMatrix)
-
-            # get influences
-            influenceList = cmds.skinCluster('%s.vtx[%d]' %(cls.baseGeo, i), q = True, wi = True)
-
-            # Get influence's transform matrix from bind pose matrix.
-            for influence in influenceList:
-                if cmds.nodeType(influence) != 'joint':
-                    continue
-                infBindMatrixList = cmds.getAttr('%s.bindPose' %influence)
-                infBindMatrix = OpenMaya.MMatrix()
-                OpenMaya.MScriptUtil.createMatrixFromList(infBindMatrixList, infBindMatrix)
-
-                infWorldMatrixList = cmds.getAttr('%s.worldMatrix' %influence)
-                infWorldMatrix = OpenMaya.MMatrix()
-                OpenMaya.MScriptUtil.createMatrixFromList(infWorldMatrixList, infWorldMatrix)
-
-                infWeight = cmds.skinPercent(cls.skinCluster, '%s.vtx[%d]' %(cls.baseGeo, i), q = True, transform = influence, v = True)
-
-                trsfedMatrix += (infBindMatrix.inverse() * infWorldMatrix) * infWeight
-
-            # Reverse delta vector by multipling inverse matrix.
-            revVec = cls.deltaVecArray[i] * trsfedMatrix.inverse()
-            cls.deltaVecArray.set(revVec, i)
+        weights, skinMatrices = inverse_skin.getSkinData(cls.skinCluster, cls.baseGeo)
+        cls.deltaVecArray = inverse_skin.inverseSkinDeltas(cls.deltaVecArray, weights, skinMatrices)
 
 
     @classmethod
@@ -611,23 +558,8 @@ class Functions(object):
 
     @classmethod
     def moveCorGeoVtx(cls):
-        selLs = OpenMaya.MSelectionList()
-        selLs.add(cls.correctiveTrgName)
-
-        dagPath = OpenMaya.MDagPath()
-        selLs.getDagPath(0, dagPath)
-
-        corGeoIt = OpenMaya.MItGeometry(dagPath)
-        while not corGeoIt.isDone():
-            if cls.deltaVecArray[corGeoIt.index()].length() == 0.0:
-                corGeoIt.next()
-
-            corGeoPoint = corGeoIt.position()
-            corGeoPoint += cls.deltaVecArray[corGeoIt.index()]
-
-            corGeoIt.setPosition(corGeoPoint)
-
-            corGeoIt.next()
+        corGeoPoints = meshUtil.getMeshArrays(cls.correctiveTrgName)[0]
+        meshUtil.setMeshPoints(cls.correctiveTrgName, corGeoPoints + cls.deltaVecArray)
 
 
     @classmethod
@@ -1,12 +1,39 @@
+import json
 import logging
+import time
 
+import maya.api.OpenMaya as om
 import pymel.core as pm
+from maya import cmds
+
+from ..utils import api_undo
 
 
 logger = logging.getLogger("Rig Optimizer")
 logger.setLevel(logging.DEBUG)
 
 
+CONVERTIBLE_CONSTRAINTS = ["parentConstraint", "pointConstraint", "orientConstraint", "aimConstraint", "scaleConstraint"]
+
+# Driven channels per constraint type and the decomposeMatrix outputs connected to them
+CONSTRAINT_CHANNELS = {
+    "parentConstraint": ["translate", "rotate"],
+    "pointConstraint": ["translate"],
+    "orientConstraint": ["rotate"],
+    "aimConstraint": ["rotate"],
+    "scaleConstraint": ["scale"],
+}
+
+# aimConstraint.worldUpType to aimMatrix (secondaryMode, use worldUpMatrix)
+AIM_UP_TYPES = {
+    0: (2, False),  # Scene up: align to the scene up axis
+    1: (1, True),  # Object up: aim at world up object
+    2: (2, True),  # Object rotation up: align to world up vector in world up object space
+    3: (2, False),  # Vector: align to world up vector
+    4: (0, False),  # None
+}
+
+
 class RigOptimizer(object):
     NODE_TYPES = ["wrap", "constraint", "skinCluster", "blendShape", "ffd"]
 
@@ -17,71 +44,154 @@ class RigOptimizer(object):
         self.blendShape = None
         self.ffd = None
 
+        self.report = {}
+
     def inspect(self):
+        """Collect nodes that are costly in evaluation and log their count.
+
+        Returns:
+            dict: Node count per node type and per constraint type.
+        """
         for nodeType in RigOptimizer.NODE_TYPES:
             setattr(self, nodeType, pm.ls(type=nodeType))
 
-        for attr in self.__dict__.keys():
-            nodes = getattr(self, attr)
-            logger.info("{0}: {1}".format(attr, len(nodes)))
+        counts = {}
+        for nodeType in RigOptimizer.NODE_TYPES:
+            counts[nodeType] = len(getattr(self, nodeType))
+            logger.info("{0}: {1}".format(nodeType, counts[nodeType]))
 
-    def optimize(self):
-        self.optimizeConstraints()
+        for const in self.constraint:
+            constType = const.nodeType()
+            counts[constType] = counts.get(constType, 0) + 1
 
-    def optimizeConstraints(self):
-        notConvertedConstraints = []
+        return counts
+
+    def optimize(self, startFrame=None, endFrame=None, reportFile=None, measure=True):
+        """Convert constraints to matrix networks subtree by subtree and report the playback gain.
+
+        The conversion of every subtree is undone at once with Maya undo.
+
+        Args:
+            startFrame (float, optional): Measure start frame. Defaults to playback start.
+            endFrame (float, optional): Measure end frame. Defaults to playback end.
+            reportFile (str, optional): Write the report as json when given.
+            measure (bool, optional): Time playback before and after each subtree. Defaults to True.
+
+        Returns:
+            dict: Report.
+        """
+        counts = self.inspect()
+        startFrame, endFrame = getFrameRange(startFrame, endFrame)
+
+        self.report = {
+            "scene": cmds.file(q=True, sceneName=True),
+            "frameRange": [startFrame, endFrame],
+            "evaluationMode": cmds.evaluationManager(q=True, mode=True)[0],
+            "nodeCounts": counts,
+            "baselineFps": measurePlayback(startFrame, endFrame) if measure else None,
+            "subtrees": [],
+            "notConverted": [],
+        }
+
+        fps = self.report["baselineFps"]
+        cmds.undoInfo(openChunk=True)
+        try:
+            for root, consts in self.groupConstraintsBySubtree().items():
+                subtreeReport = self.optimizeConstraints(consts)
+                subtreeReport["root"] = root
+                if measure:
+                    subtreeReport["fpsBefore"] = fps
+                    fps = measurePlayback(startFrame, endFrame)
+                    subtreeReport["fpsAfter"] = fps
+                    subtreeReport["fpsGain"] = fps - subtreeReport["fpsBefore"]
+                self.report["subtrees"].append(subtreeReport)
+                self.report["notConverted"].extend(subtreeReport["notConverted"])
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+        self.report["finalFps"] = fps
+        logger.info("fps: {0} -> {1}".format(self.report["baselineFps"], fps))
+
+        if reportFile:
+            self.writeReport(reportFile)
+        return self.report
+
+    def writeReport(self, filePath):
+        with open(filePath, "w") as f:
+            json.dump(self.report, f, indent=4)
+        logger.info("Report is written to {0}".format(filePath))
+
+    def groupConstraintsBySubtree(self):
+        """Group constraints by the top dag node of their driven.
+
+        Returns:
+            dict: Root name and constraints.
+        """
+        subtrees = {}
         for const in self.constraint:
+            drivens = const.constraintParentInverseMatrix.inputs()
+            root = drivens[0].root().name() if drivens else const.root().name()
+            subtrees.setdefault(root, []).append(const)
+        return subtrees
+
+    def optimizeConstraints(self, constraints=None):
+        """Convert constraints to matrix node networks with a single MDGModifier as one undo step.
+
+        Args:
+            constraints (list, optional): Constraints to convert. Defaults to all inspected constraints.
+
+        Returns:
+            dict: Converted and not converted constraints with the reason.
+        """
+        if constraints is None:
+            constraints = self.constraint
+
+        dgMod = om.MDGModifier()
+        converted = []
+        notConvertedConstraints = []
+        for const in constraints:
             constType = const.nodeType()
-            if not constType in ["parentConstraint", "pointConstraint", "orientConstraint"]:
-                notConvertedConstraints.append(const)
+            if constType not in CONVERTIBLE_CONSTRAINTS:
+                notConvertedConstraints.append({"constraint": const.name(), "reason": "unsupported type"})
                 continue
 
             constInfo = self.getConstraintInfo(const)
-            driven = constInfo["driven"]
-            driverWeights = self.getDriverWeights(constInfo["driverInfos"])
-            wtAddMtx = pm.createNode("wtAddMatrix", n="{}_wtAddMtx".format(driven))
-
-            for i, driverInfo in enumerate(constInfo["driverInfos"]):
-                driverMultMatrix = self.buildDriverMatrix(driverInfo["driver"], driven, constType)
-                driverMultMatrix.matrixSum >> wtAddMtx.wtMatrix[i].matrixIn
-                if driverInfo["weightDriver"]:
-                    driverInfo["weightDriver"] >> wtAddMtx.wtMatrix[i].weightIn
-                else:
-                    wtAddMtx.wtMatrix[i].weightIn.set(float(driverWeights[i])/sum(driverWeights))  # Set normalized weight
-
-            toLocalMultMatrix = pm.createNode("multMatrix", n="{0}_multMtx".format(driven))
-            wtAddMtx.matrixSum >> toLocalMultMatrix.matrixIn[0]
-            if driven.getParent():
-                driven.getParent().worldInverseMatrix >> toLocalMultMatrix.matrixIn[1]
-
-            decomposeMtx = pm.createNode("decomposeMatrix", n="{0}_decMtx".format(driven))
-            toLocalMultMatrix.matrixSum >> decomposeMtx.inputMatrix
-
-            # Connect to driven channels
-            if constType == "parentConstraint":
-                decomposeMtx.outputTranslateX >> driven.translateX
-                decomposeMtx.outputTranslateY >> driven.translateY
-                decomposeMtx.outputTranslateZ >> driven.translateZ
-                decomposeMtx.outputRotateX >> driven.rotateX
-                decomposeMtx.outputRotateY >> driven.rotateY
-                decomposeMtx.outputRotateZ >> driven.rotateZ
-            elif constType == "pointConstraint":
-                decomposeMtx.outputTranslateX >> driven.translateX
-                decomposeMtx.outputTranslateY >> driven.translateY
-                decomposeMtx.outputTranslateZ >> driven.translateZ
-            elif constType == "orientConstraint":
-                decomposeMtx.outputRotateX >> driven.rotateX
-                decomposeMtx.outputRotateY >> driven.rotateY
-                decomposeMtx.outputRotateZ >> driven.rotateZ
-
-            pm.delete(const)
+            reason = self.getSkipReason(const, constInfo)
+            if reason:
+                notConvertedConstraints.append({"constraint": const.name(), "reason": reason})
+                continue
+
+            self.buildConstraintNetwork(dgMod, const, constInfo)
+            converted.append(const.name())
+
+        api_undo.run(dgMod.doIt, dgMod.undoIt)
 
         logger.debug("notConvertedConstraints: {0}".format(notConvertedConstraints))
+        return {"converted": converted, "notConverted": notConvertedConstraints}
+
+    def getSkipReason(self, const, constInfo):
+        driven = constInfo["driven"]
+        if not driven or not constInfo["driverInfos"]:
+            return "no driven or drivers"
+        if not constInfo["channels"]:
+            return "drives no channel directly"
+
+        constType = const.nodeType()
+        if "rotate" in CONSTRAINT_CHANNELS[constType]:
+            # decomposeMatrix doesn't account for joint orient and rotate axis
+            if driven.hasAttr("jointOrient") and any(abs(value) > 1e-6 for value in driven.jointOrient.get()):
+                return "driven has joint orient"
+            if any(abs(value) > 1e-6 for value in driven.rotateAxis.get()):
+                return "driven has rotate axis"
+        if constType == "aimConstraint" and any(abs(value) > 1e-6 for value in const.offset.get()):
+            return "aim offset"
+        return None
 
     def getConstraintInfo(self, const):
         constInfo = {
             "driverInfos": [],
-            "driven": None
+            "driven": None,
+            "channels": [],
         }
 
         # Get drivers
@@ -99,14 +209,24 @@ class RigOptimizer(object):
 
             driverInfo["driver"] = driver
             driverInfo["weight"] = const.target[i].targetWeight.get()
-            weightAttr = const.target[i].targetWeight.inputs(plugs=True)[0]
-            weightDriver = weightAttr.inputs(plugs=True)
+            weightAttrs = const.target[i].targetWeight.inputs(plugs=True)
+            weightDriver = weightAttrs[0].inputs(plugs=True) if weightAttrs else []
             if weightDriver:
                 driverInfo["weightDriver"] = weightDriver[0]
             constInfo["driverInfos"].append(driverInfo)
 
         # Get driven
-        constInfo["driven"] = const.constraintParentInverseMatrix.inputs()[0]
+        drivens = const.constraintParentInverseMatrix.inputs()
+        if drivens:
+            constInfo["driven"] = drivens[0]
+
+            # Only channels connected directly from the constraint are converted, skipped axes stay as they are
+            for channel in CONSTRAINT_CHANNELS.get(const.nodeType(), []):
+                for axis in "XYZ":
+                    drivenAttr = drivens[0].attr(channel + axis)
+                    inputs = drivenAttr.inputs(plugs=True)
+                    if inputs and inputs[0].node() == const:
+                        constInfo["channels"].append((channel, axis))
 
         return constInfo
 
@@ -116,22 +236,190 @@ class RigOptimizer(object):
             driverWeights.append(driverInfo["weight"])
         return driverWeights
 
-    def buildDriverMatrix(self, driver, driven, constraintType):
-        multMtx = pm.createNode("multMatrix", n="{0}_driverMultMtx".format(driver))
-        multMtx.matrixIn[0].set(driven.worldMatrix.get() * driver.worldInverseMatrix.get())
+    def buildConstraintNetwork(self, dgMod, const, constInfo):
+        constType = const.nodeType()
+        driven = constInfo["driven"]
+        driverWeights = self.getDriverWeights(constInfo["driverInfos"])
+        weightSum = sum(driverWeights) or 1.0
+
+        # Weighted sum of driver matrices
+        wtAddMtx = createNode(dgMod, "wtAddMatrix", "{}_wtAddMtx".format(driven))
+        for i, driverInfo in enumerate(constInfo["driverInfos"]):
+            wtMatrixPlug = getPlug(wtAddMtx, "wtMatrix").elementByLogicalIndex(i)
+            if constType == "aimConstraint":
+                driverMatrixPlug = getPlug(driverInfo["driver"], "worldMatrix").elementByLogicalIndex(0)
+            else:
+                driverMultMtx = self.buildDriverMatrix(dgMod, driverInfo["driver"], driven, constType)
+                driverMatrixPlug = getPlug(driverMultMtx, "matrixSum")
+            dgMod.connect(driverMatrixPlug, getChildPlug(wtMatrixPlug, "matrixIn"))
+
+            weightPlug = getChildPlug(wtMatrixPlug, "weightIn")
+            if driverInfo["weightDriver"]:
+                dgMod.connect(getPlug(driverInfo["weightDriver"].node(), driverInfo["weightDriver"].longName(fullPath=True)), weightPlug)
+            else:
+                dgMod.newPlugValueFloat(weightPlug, float(driverInfo["weight"]) / weightSum)  # Set normalized weight
+
+        worldMatrixPlug = getPlug(wtAddMtx, "matrixSum")
+        if constType == "aimConstraint":
+            worldMatrixPlug = self.buildAimMatrix(dgMod, const, driven, worldMatrixPlug)
+
+        toLocalMultMatrix = createNode(dgMod, "multMatrix", "{0}_multMtx".format(driven))
+        dgMod.connect(worldMatrixPlug, getPlug(toLocalMultMatrix, "matrixIn").elementByLogicalIndex(0))
+        if driven.getParent():
+            dgMod.connect(getPlug(driven, "parentInverseMatrix").elementByLogicalIndex(0), getPlug(toLocalMultMatrix, "matrixIn").elementByLogicalIndex(1))
+
+        decomposeMtx = createNode(dgMod, "decomposeMatrix", "{0}_decMtx".format(driven))
+        dgMod.connect(getPlug(toLocalMultMatrix, "matrixSum"), getPlug(decomposeMtx, "inputMatrix"))
+
+        # Connect to driven channels
+        for channel, axis in constInfo["channels"]:
+            drivenPlug = getPlug(driven, channel + axis)
+            dgMod.disconnect(drivenPlug.source(), drivenPlug)
+            outputName = "output" + channel[0].upper() + channel[1:] + axis
+            dgMod.connect(getPlug(decomposeMtx, outputName), drivenPlug)
+
+        dgMod.deleteNode(getMObject(const))
+
+    def buildDriverMatrix(self, dgMod, driver, driven, constraintType):
+        """Driver world matrix filtered to the constrained component with the current offset of the driven."""
+        driverWorldMatrix = toMMatrix(driver.worldMatrix.get())
+        drivenWorldMatrix = toMMatrix(driven.worldMatrix.get())
+
+        multMtx = createNode(dgMod, "multMatrix", "{0}_driverMultMtx".format(driver))
+        matrixInPlug = getPlug(multMtx, "matrixIn")
+
         if constraintType == "parentConstraint":
-            driver.worldMatrix >> multMtx.matrixIn[1]
-        elif constraintType == "pointConstraint":
-            decMtx = pm.createNode("decomposeMatrix", n="{0}_pointDecMtx".format(driver))
-            composeMtx = pm.createNode("composeMatrix", n="{0}_pointComposeMtx".format(driver))
-            driver.worldMatrix >> decMtx.inputMatrix
-            decMtx.outputTranslate >> composeMtx.inputTranslate
-            composeMtx.outputMatrix >> multMtx.matrixIn[1]
-        elif constraintType == "orientConstraint":
-            decMtx = pm.createNode("decomposeMatrix", n="{0}_orientDecMtx".format(driver))
-            composeMtx = pm.createNode("composeMatrix", n="{0}_orientComposeMtx".format(driver))
-            driver.worldMatrix >> decMtx.inputMatrix
-            decMtx.outputRotate >> composeMtx.inputRotate
-            composeMtx.outputMatrix >> multMtx.matrixIn[1]
+            componentMatrix = driverWorldMatrix
+            dgMod.connect(getPlug(driver, "worldMatrix").elementByLogicalIndex(0), matrixInPlug.elementByLogicalIndex(1))
+        else:
+            component = {"pointConstraint": "Translate", "orientConstraint": "Rotate", "scaleConstraint": "Scale"}[constraintType]
+            componentMatrix = getComponentMatrix(driverWorldMatrix, component)
 
+            prefix = {"Translate": "point", "Rotate": "orient", "Scale": "scale"}[component]
+            decMtx = createNode(dgMod, "decomposeMatrix", "{0}_{1}DecMtx".format(driver, prefix))
+            composeMtx = createNode(dgMod, "composeMatrix", "{0}_{1}ComposeMtx".format(driver, prefix))
+            dgMod.connect(getPlug(driver, "worldMatrix").elementByLogicalIndex(0), getPlug(decMtx, "inputMatrix"))
+            if component == "Rotate":
+                # Quaternion keeps rotate order of the driver out of the way
+                dgMod.connect(getPlug(decMtx, "outputQuat"), getPlug(composeMtx, "inputQuat"))
+                dgMod.newPlugValueBool(getPlug(composeMtx, "useEulerRotation"), False)
+            else:
+                dgMod.connect(getPlug(decMtx, "output" + component), getPlug(composeMtx, "input" + component))
+            dgMod.connect(getPlug(composeMtx, "outputMatrix"), matrixInPlug.elementByLogicalIndex(1))
+
+        offsetMatrix = drivenWorldMatrix * componentMatrix.inverse()
+        dgMod.newPlugValue(matrixInPlug.elementByLogicalIndex(0), om.MFnMatrixData().create(offsetMatrix))
         return multMtx
+
+    def buildAimMatrix(self, dgMod, const, driven, targetMatrixPlug):
+        """World matrix of the driven aimed at the weighted target matrix. Returns aimMatrix.outputMatrix plug."""
+        # Driven position without its rotation to avoid a cycle
+        drivenPosMtx = createNode(dgMod, "composeMatrix", "{0}_aimPosComposeMtx".format(driven))
+        drivenWorldPosMtx = createNode(dgMod, "multMatrix", "{0}_aimPosMultMtx".format(driven))
+        for axis in "XYZ":
+            dgMod.connect(getPlug(driven, "translate" + axis), getPlug(drivenPosMtx, "inputTranslate" + axis))
+        dgMod.connect(getPlug(drivenPosMtx, "outputMatrix"), getPlug(drivenWorldPosMtx, "matrixIn").elementByLogicalIndex(0))
+        if driven.getParent():
+            dgMod.connect(getPlug(driven, "parentMatrix").elementByLogicalIndex(0), getPlug(drivenWorldPosMtx, "matrixIn").elementByLogicalIndex(1))
+
+        aimMtx = createNode(dgMod, "aimMatrix", "{0}_aimMtx".format(driven))
+        dgMod.connect(getPlug(drivenWorldPosMtx, "matrixSum"), getPlug(aimMtx, "inputMatrix"))
+        dgMod.connect(targetMatrixPlug, getPlug(aimMtx, "primaryTargetMatrix"))
+        dgMod.newPlugValueInt(getPlug(aimMtx, "primaryMode"), 1)
+        setDouble3(dgMod, aimMtx, "primaryInputAxis", const.aimVector.get())
+
+        worldUpType = const.worldUpType.get()
+        secondaryMode, useUpMatrix = AIM_UP_TYPES[worldUpType]
+        dgMod.newPlugValueInt(getPlug(aimMtx, "secondaryMode"), secondaryMode)
+        setDouble3(dgMod, aimMtx, "secondaryInputAxis", const.upVector.get())
+        secondaryTargetVector = getSceneUpVector() if worldUpType == 0 else const.worldUpVector.get()
+        setDouble3(dgMod, aimMtx, "secondaryTargetVector", secondaryTargetVector)
+        upMatrixInputs = const.worldUpMatrix.inputs(plugs=True)
+        if useUpMatrix and upMatrixInputs:
+            dgMod.connect(getPlug(upMatrixInputs[0].node(), upMatrixInputs[0].longName(fullPath=True)), getPlug(aimMtx, "secondaryTargetMatrix"))
+
+        return getPlug(aimMtx, "outputMatrix")
+
+
+def getFrameRange(startFrame=None, endFrame=None):
+    if startFrame is None:
+        startFrame = cmds.playbackOptions(q=True, minTime=True)
+    if endFrame is None:
+        endFrame = cmds.playbackOptions(q=True, maxTime=True)
+    return startFrame, endFrame
+
+
+def getSceneUpVector():
+    return (0.0, 0.0, 1.0) if cmds.upAxis(q=True, axis=True) == "z" else (0.0, 1.0, 0.0)
+
+
+def measurePlayback(startFrame=None, endFrame=None, repeat=1):
+    """Time evaluation of every frame in the range by stepping the current time.
+
+    Args:
+        startFrame (float, optional): Defaults to playback start.
+        endFrame (float, optional): Defaults to playback end.
+        repeat (int, optional): Number of passes. Defaults to 1.
+
+    Returns:
+        float: Evaluated frames per second.
+    """
+    startFrame, endFrame = getFrameRange(startFrame, endFrame)
+    frames = [startFrame + i for i in range(int(endFrame - startFrame) + 1)]
+    curTime = cmds.currentTime(q=True)
+
+    # Warm up caches with a pass over every frame so the timed pass isn't slower
+    for frame in frames:
+        cmds.currentTime(frame, update=True)
+    startTime = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            cmds.currentTime(frame, update=True)
+    elapsedTime = time.perf_counter() - startTime
+
+    cmds.currentTime(curTime, update=True)
+    return len(frames) * repeat / elapsedTime if elapsedTime > 0 else 0.0
+
+
+def getMObject(node):
+    return om.MSelectionList().add(str(node)).getDependNode(0)
+
+
+def getPlug(node, attrName):
+    """Find a plug on a node name, PyNode or MObject."""
+    if not isinstance(node, om.MObject):
+        node = getMObject(node)
+    return om.MFnDependencyNode(node).findPlug(attrName, False)
+
+
+def getChildPlug(plug, attrName):
+    return plug.child(om.MFnDependencyNode(plug.node()).attribute(attrName))
+
+
+def createNode(dgMod, nodeType, name):
+    node = dgMod.createNode(nodeType)
+    dgMod.renameNode(node, name)
+    return node
+
+
+def setDouble3(dgMod, node, attrName, values):
+    plug = getPlug(node, attrName)
+    for i, value in enumerate(values):
+        dgMod.newPlugValueDouble(plug.child(i), value)
+
+
+def toMMatrix(matrix):
+    return om.MMatrix([value for row in matrix for value in row])
+
+
+def getComponentMatrix(matrix, component):
+    """Matrix with only the translate, rotate or scale of the given matrix."""
+    trsfMatrix = om.MTransformationMatrix(matrix)
+    componentTrsfMatrix = om.MTransformationMatrix()
+    if component == "Translate":
+        componentTrsfMatrix.setTranslation(trsfMatrix.translation(om.MSpace.kWorld), om.MSpace.kWorld)
+    elif component == "Rotate":
+        componentTrsfMatrix.setRotation(trsfMatrix.rotation(asQuaternion=True))
+    elif component == "Scale":
+        componentTrsfMatrix.setScale(trsfMatrix.scale(om.MSpace.kWorld), om.MSpace.kWorld)
+    return componentTrsfMatrix.asMatrix()
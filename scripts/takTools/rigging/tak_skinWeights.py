@@ -118,6 +118,8 @@ class SkinWeights(object):
         # Tools
         self.uiWidgets['toolsMenu'] = cmds.menu(p=self.uiWidgets['mainMenuBarLo'], label='Tools', tearOff=True)
         self.uiWidgets['brSmoothWeightsMenuItem'] = cmds.menuItem(p=self.uiWidgets['toolsMenu'], label='brSmoothWeights', c=runBrSmoothWeights, ann='Run brSmoothWeights tool.')
+        self.uiWidgets['smoothWeightsMenuItem'] = cmds.menuItem(p=self.uiWidgets['toolsMenu'], label='Smooth Weights', c=smoothWeights, ann='Smooth weights of selected meshes or vertices. Locked influences are kept.')
+        cmds.menuItem(optionBox=True, c=smoothWeightsGUI)
         self.uiWidgets['averageSkinWeightsBrushMenuItem'] = cmds.menuItem(p=self.uiWidgets['toolsMenu'], label='Average Weights Brush', c=runAverageWeightsBrush, ann='Run average weights brush tool.')
         self.uiWidgets['hammerWeightsBrushMenuItem'] = cmds.menuItem(p=self.uiWidgets['toolsMenu'], label='Hammer Weights Brush', c=runHammerWeightsBrush, ann='Run hammer weights brush tool.')
 
@@ -387,18 +389,7 @@ class SkinWeights(object):
     def getMaxInfluences(mesh=None, ignoreWeight=MIN_WEIGHT):
         if not mesh:
             mesh = cmds.ls(sl=True)[0]
-        skinClst = mel.eval('findRelatedSkinCluster("{}");'.format(mesh))
-        vertCount = cmds.polyEvaluate(mesh, v=True)
-        numInfsPerVtx = []
-        for i in range(vertCount):
-            try:
-                numInfsPerVtx.append(len(cmds.skinPercent(skinClst, '{}.vtx[{}]'.format(mesh, i), q=True, ignoreBelow=ignoreWeight, v=True)))
-            except:
-                cmds.select('{}.vtx[{}]'.format(mesh, i), r=True)
-                mel.eval('doHammerWeightsArgList 1 { "1" };')
-                cmds.select(mesh, r=True)
-        maxInfs = max(numInfsPerVtx)
-        return maxInfs
+        return skinUtil.getMaxInfluences(mesh, ignoreWeight)
 
     @staticmethod
     def prunSkinWeights(skinCluster=None, mesh=None, threshold=MIN_WEIGHT):
@@ -416,32 +407,7 @@ class SkinWeights(object):
 
     @staticmethod
     def pruneSkinInfluences(mesh, skinClst, maxInfs):
-        if cmds.nodeType(mesh) == 'transform':
-            mesh = cmds.listRelatives(mesh, shapes=True, ni=True)[0]
-
-        vertCount = cmds.polyEvaluate(mesh, vertex=True)
-
-        cmds.progressBar('progBar', e=True, min=0, max=vertCount)
-
-        resultMeshWeights = []
-        for i in range(vertCount):
-            vert = '{}.vtx[{}]'.format(mesh, i)
-            infs = cmds.skinPercent(skinClst, vert, q=True, transform=None)
-            weights = cmds.skinPercent(skinClst, vert, q=True, v=True)
-            infWeightMap = dict(zip(infs, weights))
-
-            sortedItems = sorted(infWeightMap.items(), key=lambda item: item[1], reverse=True)
-            prunedItems = sortedItems[:maxInfs] + [(jnt, 0.0) for jnt, w in sortedItems[maxInfs:]]
-
-            totalWeight = sum([item[1] for item in prunedItems])
-            prunedItemsNormalizedMap = dict([(jnt, weight/totalWeight) for jnt, weight in prunedItems])
-
-            resultVtxWeights = [prunedItemsNormalizedMap.get(inf) for inf in infs]
-            resultMeshWeights.extend(resultVtxWeights)
-
-            cmds.progressBar('progBar', e=True, step=1)
-
-        return resultMeshWeights
+        return skinUtil.pruneSkinInfluences(mesh, maxInfs)
 
     @staticmethod
     def setWeights(mesh, skinClst, weights):
@@ -748,6 +714,42 @@ def runBrSmoothWeights(*args):
     mel.eval('brSmoothWeightsToolCtx;')
 
 
+def smoothWeightsGUI(*args):
+    cmds.window(title='Smooth Weights', tlb=True, p=WIN_NAME)
+    cmds.columnLayout(adj=True)
+    cmds.intSliderGrp('smoothIterSldrGrp', label='Iterations: ', field=True, min=1, max=20, fieldMaxValue=1000, v=3, columnWidth=[(1, 80), (2, 50)])
+    cmds.floatSliderGrp('smoothStrengthSldrGrp', label='Strength: ', field=True, min=0.01, max=1.0, v=skinUtil.weight_smooth.STRENGTH, columnWidth=[(1, 80), (2, 50)])
+    cmds.optionMenu('smoothMethodOptMenu', label='Method:')
+    for method in skinUtil.weight_smooth.METHODS:
+        cmds.menuItem(label=method)
+    cmds.intSliderGrp('smoothMaxInfsSldrGrp', label='Max Influences: ', field=True, min=0, max=12, v=0, ann='0 for no limit.', columnWidth=[(1, 80), (2, 50)])
+    cmds.button(label='Apply', c=smoothWeights)
+    cmds.showWindow()
+
+
+def smoothWeights(*args):
+    iterations = 3
+    strength = skinUtil.weight_smooth.STRENGTH
+    method = skinUtil.weight_smooth.LAPLACIAN
+    maxInfluences = None
+    if cmds.intSliderGrp('smoothIterSldrGrp', exists=True):
+        iterations = cmds.intSliderGrp('smoothIterSldrGrp', q=True, v=True)
+        strength = cmds.floatSliderGrp('smoothStrengthSldrGrp', q=True, v=True)
+        method = cmds.optionMenu('smoothMethodOptMenu', q=True, v=True)
+        maxInfluences = cmds.intSliderGrp('smoothMaxInfsSldrGrp', q=True, v=True) or None
+
+    vertices = cmds.filterExpand(cmds.ls(sl=True), sm=31) or []
+    meshVertexIds = {}
+    for vertex in vertices:
+        mesh, vertexId = vertex.split('.vtx[')
+        meshVertexIds.setdefault(mesh, []).append(int(vertexId[:-1]))
+    for mesh in cmds.filterExpand(cmds.ls(sl=True), sm=12) or []:
+        meshVertexIds[mesh] = None
+
+    for mesh, vertexIds in meshVertexIds.items():
+        skinUtil.smoothSkinWeights(mesh, iterations, strength, method, maxInfluences, vertexIds)
+
+
 def runHammerWeightsBrush(*args):
     weightHammerBrush = cmds.artSelectCtx(beforeStrokeCmd='select -cl;', afterStrokeCmd='if (size(`ls -sl`) > 0){weightHammerVerts;}')
     cmds.setToolTo(weightHammerBrush)
@@ -791,11 +793,16 @@ def maxInfluencesGUI(parent='', *args):
 def checkMaxInfluences(*args):
     meshes = cmds.filterExpand(cmds.ls(sl=True), sm=12)
     for mesh in meshes:
-        maxInfs = SkinWeights.getMaxInfluences(mesh)
-        print('"{}" Max Influences: {}'.format(mesh, maxInfs))
+        histogram = skinUtil.getInfluenceHistogram(mesh, MIN_WEIGHT)
+        if histogram is None:
+            continue
+        print('"{}" Max Influences: {}'.format(mesh, len(histogram) - 1))
+        for line in skinUtil.weight_hygiene.formatHistogram(histogram):
+            print('    ' + line)
 
 
 @decorators.printElapsedTime
+@decorators.undoAtOnce
 def fitMaxInfluence(*args):
     for mesh in cmds.filterExpand(cmds.ls(sl=True), sm=12):
         targetMaxInfs = int(cmds.optionMenu('maxInfsOptMenu', q=True, v=True))
@@ -806,31 +813,20 @@ def fitMaxInfluence(*args):
         cmds.setAttr("{}.maintainMaxInfluences".format(skinClst), True)
         cmds.setAttr("{}.maxInfluences".format(skinClst), targetMaxInfs)
 
-        # Optimize weights and influences to speed up processing
-        SkinWeights.prunSkinWeights(skinClst, mesh)
-        cmds.skinCluster(skinClst, e=True, removeUnusedInfluence=True)
-
-        meshMaxInfs = SkinWeights.getMaxInfluences(mesh)
-        if meshMaxInfs <= targetMaxInfs:
-            print('"{}"s max influence is {} already. Skip processing.'.format(mesh, meshMaxInfs))
+        # Prune small weights and extra influences of all vertices at once
+        report = skinUtil.cleanSkinWeights(mesh, targetMaxInfs, MIN_WEIGHT)
+        if not report:
+            continue
+        if not report['changedVertices']:
+            print('"{}"s max influence is {} already. Skip processing.'.format(mesh, len(report['histogramBefore']) - 1))
             continue
-
-        # Create progress window
-        cmds.window('fitMaxInfProgWin', title='working on "{}"'.format(mesh), mnb=False, mxb=False)
-        cmds.columnLayout(adj=True)
-        cmds.progressBar('progBar', isMainProgressBar=True, beginProgress=True, isInterruptable=True, w=300)
-        cmds.showWindow('fitMaxInfProgWin')
-
-        infPrunedWeights = SkinWeights.pruneSkinInfluences(mesh, skinClst, targetMaxInfs)
-        SkinWeights.setWeights(mesh, skinClst, infPrunedWeights)
 
         # Remove zero weighted influences
         cmds.skinCluster(skinClst, e=True, removeUnusedInfluence=True)
 
-        cmds.progressBar('progBar', e=True, endProgress=True)
-        cmds.deleteUI('fitMaxInfProgWin')
-
-        print('Fitting max influence for the "{}" is done.'.format(mesh))
+        print('Fitting max influence for the "{}" is done. {} vertices are changed.'.format(mesh, report['changedVertices']))
+        for line in skinUtil.weight_hygiene.formatHistogram(report['histogramAfter'], targetMaxInfs):
+            print('    ' + line)
 # ------------
 
 
@@ -841,24 +837,39 @@ def showSkinIOGUI(*args):
     cmds.textFieldButtonGrp('skinDirTxtFldBtnGrp', label='Skin Directory:', buttonLabel='...', bc=setDirectory)
     cmds.button(label='Import', c=lambda x: importSkin(cmds.textFieldButtonGrp('skinDirTxtFldBtnGrp', q=True, text=True)))
     cmds.button(label='Export', c=lambda x: exportSkin(cmds.textFieldButtonGrp('skinDirTxtFldBtnGrp', q=True, text=True)))
+    cmds.button(label='Export Changes Only', c=lambda x: exportSkinDelta(cmds.textFieldButtonGrp('skinDirTxtFldBtnGrp', q=True, text=True)), ann='Export changed vertices on top of the skin files in the directory.')
+    cmds.button(label='Compact Changes', c=lambda x: skinUtil.compactSkinDeltas(cmds.textFieldButtonGrp('skinDirTxtFldBtnGrp', q=True, text=True)), ann='Fold exported changes back into full skin files.')
     cmds.showWindow()
 
 def importSkin(skinDirectory, *args):
+    # Batch import when the directory is exported with a manifest
+    if os.path.isfile(os.path.join(skinDirectory, skinUtil.skin_io.MANIFEST_FILE)):
+        skinUtil.importSkins(skinDirectory)
+        return
+
     for skinFile in os.listdir(skinDirectory):
         skinFilePath = os.path.join(skinDirectory, skinFile)
         if not os.path.isfile(skinFilePath):
             continue
-        if not os.path.splitext(skinFilePath)[-1] == '.sw':
+        if not os.path.splitext(skinFilePath)[-1] in ('.sw', '.swb'):
             continue
 
         skinUtil.importSkin(os.path.join(skinDirectory, skinFile))
 
+@decorators.printElapsedTime
 def exportSkin(skinDirectory, *args):
     meshes = cmds.filterExpand(cmds.ls(sl=True), sm=12)
     if not meshes:
         return
-    for mesh in meshes:
-        skinUtil.exportSkin(mesh, skinDirectory)
+    skinUtil.exportSkins(meshes, skinDirectory)
+    cmds.select(meshes, r=True)
+
+@decorators.printElapsedTime
+def exportSkinDelta(skinDirectory, *args):
+    meshes = cmds.filterExpand(cmds.ls(sl=True), sm=12)
+    if not meshes:
+        return
+    skinUtil.exportSkinDeltas(meshes, skinDirectory)
     cmds.select(meshes, r=True)
 
 def setDirectory(*args):
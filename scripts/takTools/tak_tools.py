@@ -11,16 +11,21 @@ from importlib import reload
 from .pipeline import takMayaResourceBrowser as tmrb; reload(tmrb)
 from .common import iconMaker as im; reload(im)
 from .utils import system as sysUtil
+from .utils import icon_catalog
+from .utils import tool_search
+from .utils import shelf_model
 
 
 def getAllIcons():
-    allIcons = []
-    iconPaths = mel.eval('getenv "XBMLANGPATH";').split(';')
-    for iconPath in iconPaths:
-        if os.path.exists(iconPath):
-            allIcons.extend(os.listdir(iconPath))
-    allIcons.extend(cmds.resourceManager(nameFilter='*.png'))
-    return list(set(allIcons))
+    # Icon catalog lists XBMLANGPATH and Maya resources on its first query and caches them on disk
+    return icon_catalog.getCatalog().getIcons()
+
+
+def __getattr__(name):
+    # ALL_ICONS used to be scanned at import
+    if name == 'ALL_ICONS':
+        return getAllIcons()
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
 
 
 MAYA_VERSION = int(cmds.about(version=True))
@@ -37,7 +42,9 @@ MODULE_PATH = __file__.split(MODULE_NAME, 1)[0] + MODULE_NAME
 PREFERENCES_FILE_PATH = '{}/data/preferences.ini'.format(MODULE_PATH)
 SHELVES_DATA_PATH = '{}/data/shelves'.format(MODULE_PATH.replace('\\', '/'))
 DEFAULT_ICONS_DIR = '{}/icons'.format(MODULE_PATH)
-ALL_ICONS = getAllIcons()
+ICON_SUGGESTIONS_LIMIT = 30
+USAGE_STATS_PATH = '{}/takTools/toolUsageStats.json'.format(cmds.internalVar(userAppDir=True).rstrip('/'))
+MAX_SEARCH_RESULTS = 100
 
 # Version constants
 VERSION_MAJOR = 2
@@ -78,19 +85,32 @@ shelves = ['Common']
 commonShelfInfo = {}
 taskShelvesInfo = {}
 allShelfButtons = {}
+builtShelfButtons = {}  # {shelfName: [(shelfButton, shelfButtonInfo), ...]} of the shelves built in the GUI
+builtTaskTabs = set()  # Task tabs are built when first shown
+taskTabControls = {}
+taskTabsLayout = None  # [(tabName, [frameName, ...]), ...] the task tabs were created with
 maxOrderNum = 0
 searchResults = []  # Global variable to store search results
 searchHistory = []  # Search history
-toolUsageStats = {}  # Tool usage statistics
+toolUsageStats = tool_search.loadUsageStats(USAGE_STATS_PATH)  # Tool usage statistics, kept between sessions
+searchIndex = None  # Built on the first search
 subWindows = []
 
 
 def UI():
+    global taskTabsLayout
+
     if cmds.window(WIN_NAME, exists=True):
         cmds.deleteUI(WIN_NAME)
     if cmds.dockControl(MODULE_NAME, exists=True):
         cmds.deleteUI(MODULE_NAME)
 
+    # Buttons of the previous window are gone with it
+    builtShelfButtons.clear()
+    builtTaskTabs.clear()
+    taskTabControls.clear()
+    taskTabsLayout = None
+
     cmds.window(WIN_NAME, title=TOOL_NAME, tlb=True, cc=closeAllSubWindows)
 
     # Main menu
@@ -151,26 +171,7 @@ def closeAllSubWindows(*args):
 
 # ------------ Load & Save
 def rebuildCommonShelf():
-    global allShelfButtons
-
-    # Remove existing tabs
-    commonShelfButtons = cmds.shelfLayout('Common', query=True, childArray=True)
-    if commonShelfButtons:
-        for commonshelfButton in commonShelfButtons:
-            cmds.shelfLayout('Common', edit=True, remove=commonshelfButton)
-
-    for shelfButtonInfo in commonShelfInfo.get('shelfButtonInfos'):
-        shelfBtn = cmds.shelfButton(
-            label=shelfButtonInfo.get('label'),
-            annotation=shelfButtonInfo.get('annotation'),
-            width=ICON_SIZE, height=ICON_SIZE,
-            image1=shelfButtonInfo.get('image1'),
-            imageOverlayLabel=shelfButtonInfo.get('imageOverlayLabel'),
-            command=shelfButtonInfo.get('command'),
-            sourceType=shelfButtonInfo.get('sourceType'),
-            noDefaultPopup=shelfButtonInfo.get('noDefaultPopup'),
-            p='Common')
-        allShelfButtons[shelfButtonInfo.get('label')] = shelfBtn
+    syncShelfButtons('Common', commonShelfInfo.get('shelfButtonInfos'))
 
     # Resize the common shelf area to fit actual contents to avoid large empty space below the search bar
     try:
@@ -194,59 +195,143 @@ def readCommonShelfInfo(fromGUI=False):
         commonShelfInfo = getShelfInfoFromGUI(shelfName='Common')
     else:
         commonShelfFile = '{}/Common.json'.format(SHELVES_DATA_PATH)
-        with open(commonShelfFile, 'r') as f:
-            commonShelfInfo = json.load(f, object_pairs_hook=OrderedDict)
+        commonShelfInfo = shelf_model.readShelfFile(commonShelfFile)
 
 
 def rebuildTaskShelves(selectTab=DEFAULT_TASK_TAB, *args):
-    global allShelfButtons
     global shelves
+    global taskTabsLayout
+
+    layout = [(tabName, list(frameInfo)) for tabName, frameInfo in taskShelvesInfo.items()]
+    shelves = ['Common'] + ['{}_{}'.format(tabName, frameName) for tabName, frameNames in layout for frameName in frameNames]
+
+    if layout != taskTabsLayout or not cmds.tabLayout('taskTabLo', exists=True):
+        # Shelves were added, removed, renamed or reordered, create empty tabs again
+        _removeTaskTabs()
+        cmds.tabLayout('taskTabLo', p='mainColLo', changeCommand=buildSelectedTaskTab)
+        for tabName in taskShelvesInfo:
+            tabControl = cmds.scrollLayout(tabName, childResizable=True, h=SCROLL_AREA_HEIGHT, p='taskTabLo')
+            cmds.tabLayout('taskTabLo', e=True, tabLabel=[tabControl, tabName])
+            taskTabControls[tabName] = tabControl
+        taskTabsLayout = layout
+    else:
+        # Update the built tabs in place, unchanged buttons are kept
+        for tabName in list(builtTaskTabs):
+            _syncTaskTab(tabName)
+
+    selectTaskTab(selectTab)
+
 
-    # Remove existing tab
+def _removeTaskTabs():
     if cmds.tabLayout('taskTabLo', exists=True):
         cmds.deleteUI('taskTabLo')
 
-    # Build tabs
-    cmds.tabLayout('taskTabLo', p='mainColLo')
-    shelves = ['Common']
-    for tabName, frameInfo in taskShelvesInfo.items():
-        # Create tab for shelves
-        tabControl = cmds.scrollLayout(tabName, childResizable=True, h=SCROLL_AREA_HEIGHT, p='taskTabLo')
-        cmds.tabLayout('taskTabLo', e=True, tabLabel=[tabControl, tabName])
-
-        for frameName, frameData in frameInfo.items():
-            shelfName = '{}_{}'.format(tabName, frameName)
-
-            # Create frame layout with frame data
-            frameLayout = cmds.frameLayout('{}FrameLayout'.format(shelfName), label=frameName, collapsable=True, collapse=frameData.get('collapse'), p=tabControl)
-
-            # Add shelf buttons to the shelf layout in the frame layout
-            shelfButtonInfos = frameData.get('shelfButtonInfos')
-            numRows = int(len(shelfButtonInfos) / NUM_ICONS_PER_ROW) + 1
-            shelf = cmds.shelfLayout(shelfName, ch=((ICON_SIZE + ICON_MARGINE) * numRows), p=frameLayout)
-
-            for shelfButtonInfo in shelfButtonInfos:
-                image = shelfButtonInfo.get('image1')
-                # if not image in ALL_ICONS:
-                #     image = 'noPreview.png'
-
-                shelfBtn = cmds.shelfButton(
-                    label=shelfButtonInfo.get('label'),
-                    annotation=shelfButtonInfo.get('annotation'),
-                    width=ICON_SIZE, height=ICON_SIZE,
-                    image1=image,
-                    imageOverlayLabel=shelfButtonInfo.get('imageOverlayLabel'),
-                    command=shelfButtonInfo.get('command'),
-                    sourceType=shelfButtonInfo.get('sourceType'),
-                    noDefaultPopup=shelfButtonInfo.get('noDefaultPopup'),
-                    p=shelf)
-                allShelfButtons[_getShelfButtonKey(shelfName, shelfButtonInfo.get('label'))] = shelfBtn
-
-            shelves.append(shelfName)
-
-    tabs = cmds.tabLayout('taskTabLo', q=True, tabLabel=True)
-    if tabs and selectTab in tabs:
-        cmds.tabLayout('taskTabLo', e=True, selectTab=selectTab)
+    for shelfName in list(builtShelfButtons):
+        if shelfName == 'Common':
+            continue
+        for shelfButton, shelfButtonInfo in builtShelfButtons.pop(shelfName):
+            allShelfButtons.pop(_getShelfButtonKey(shelfName, shelfButtonInfo.get('label')), None)
+    builtTaskTabs.clear()
+    taskTabControls.clear()
+
+
+def selectTaskTab(tabName):
+    """Select a task tab, building it when it is shown for the first time"""
+    tabNames = list(taskTabControls)
+    if tabName in tabNames:
+        cmds.tabLayout('taskTabLo', e=True, selectTabIndex=tabNames.index(tabName) + 1)
+    buildSelectedTaskTab()
+
+
+def buildSelectedTaskTab(*args):
+    tabNames = list(taskTabControls)
+    index = cmds.tabLayout('taskTabLo', q=True, selectTabIndex=True)
+    if tabNames and 0 < index <= len(tabNames):
+        buildTaskTab(tabNames[index - 1])
+
+
+def buildTaskTab(tabName):
+    """Create frame layouts and shelf buttons of a task tab once"""
+    if tabName in builtTaskTabs or tabName not in taskTabControls:
+        return
+
+    for frameName, frameData in taskShelvesInfo.get(tabName).items():
+        shelfName = '{}_{}'.format(tabName, frameName)
+
+        # Create frame layout with frame data
+        frameLayout = cmds.frameLayout('{}FrameLayout'.format(shelfName), label=frameName, collapsable=True, collapse=frameData.get('collapse'), p=taskTabControls[tabName])
+
+        # Add shelf buttons to the shelf layout in the frame layout
+        shelfButtonInfos = frameData.get('shelfButtonInfos')
+        cmds.shelfLayout(shelfName, ch=_getShelfHeight(shelfButtonInfos), p=frameLayout)
+        syncShelfButtons(shelfName, shelfButtonInfos)
+
+    builtTaskTabs.add(tabName)
+
+
+def _syncTaskTab(tabName):
+    for frameName, frameData in taskShelvesInfo.get(tabName).items():
+        shelfName = '{}_{}'.format(tabName, frameName)
+        shelfButtonInfos = frameData.get('shelfButtonInfos')
+        cmds.frameLayout('{}FrameLayout'.format(shelfName), e=True, collapse=frameData.get('collapse'))
+        cmds.shelfLayout(shelfName, e=True, ch=_getShelfHeight(shelfButtonInfos))
+        syncShelfButtons(shelfName, shelfButtonInfos)
+
+
+def _getShelfHeight(shelfButtonInfos):
+    numRows = int(len(shelfButtonInfos) / NUM_ICONS_PER_ROW) + 1
+    return (ICON_SIZE + ICON_MARGINE) * numRows
+
+
+def syncShelfButtons(shelfName, shelfButtonInfos):
+    """Create, edit and delete only the shelf buttons that differ from the shelf button infos"""
+    if shelfName not in builtShelfButtons:
+        # Remove buttons not made from shelf button infos
+        for shelfButton in cmds.shelfLayout(shelfName, query=True, childArray=True) or []:
+            cmds.deleteUI(shelfButton)
+    oldShelfButtons = builtShelfButtons.get(shelfName, [])
+
+    deleted, edits, created = shelf_model.diffShelfButtons([shelfButtonInfo for _, shelfButtonInfo in oldShelfButtons], shelfButtonInfos)
+    for index in deleted:
+        shelfButton, shelfButtonInfo = oldShelfButtons[index]
+        _forgetShelfButton(shelfName, shelfButton, shelfButtonInfo)
+        cmds.deleteUI(shelfButton)
+    for index, changes in edits:
+        shelfButton, shelfButtonInfo = oldShelfButtons[index]
+        _forgetShelfButton(shelfName, shelfButton, shelfButtonInfo)
+        cmds.shelfButton(shelfButton, e=True, **changes)
+
+    deleted = set(deleted)
+    keptShelfButtons = iter([shelfButton for i, (shelfButton, _) in enumerate(oldShelfButtons) if i not in deleted])
+    createdShelfButtons = {}
+    numChildren = len(oldShelfButtons) - len(deleted)
+    for index, shelfButtonInfo in created:
+        shelfButton = cmds.shelfButton(
+            label=shelfButtonInfo.get('label'),
+            annotation=shelfButtonInfo.get('annotation'),
+            width=ICON_SIZE, height=ICON_SIZE,
+            image1=shelfButtonInfo.get('image1'),
+            imageOverlayLabel=shelfButtonInfo.get('imageOverlayLabel'),
+            command=shelfButtonInfo.get('command'),
+            sourceType=shelfButtonInfo.get('sourceType'),
+            noDefaultPopup=shelfButtonInfo.get('noDefaultPopup'),
+            p=shelfName)
+        # New buttons are added at the end, positions are 1-based
+        if index < numChildren:
+            cmds.shelfLayout(shelfName, e=True, position=(shelfButton, index + 1))
+        numChildren += 1
+        createdShelfButtons[index] = shelfButton
+    shelfButtons = [createdShelfButtons[i] if i in createdShelfButtons else next(keptShelfButtons) for i in range(len(shelfButtonInfos))]
+
+    builtShelfButtons[shelfName] = list(zip(shelfButtons, shelfButtonInfos))
+    for shelfButton, shelfButtonInfo in builtShelfButtons[shelfName]:
+        allShelfButtons[_getShelfButtonKey(shelfName, shelfButtonInfo.get('label'))] = shelfButton
+
+
+def _forgetShelfButton(shelfName, shelfButton, shelfButtonInfo):
+    key = _getShelfButtonKey(shelfName, shelfButtonInfo.get('label'))
+    if allShelfButtons.get(key) == shelfButton:
+        del allShelfButtons[key]
 
 
 def readTaskShelvesInfo(fromGUI=False):
@@ -266,9 +351,7 @@ def readTaskShelvesInfo(fromGUI=False):
         taskShelfFiles = [shelfFile for shelfFile in os.listdir(SHELVES_DATA_PATH) if not 'Common' in shelfFile]
         for taskShelfFile in taskShelfFiles:
             filePath = '{}/{}'.format(SHELVES_DATA_PATH, taskShelfFile)
-            with open(filePath, 'r') as f:
-                shelfInfo = json.load(f, object_pairs_hook=OrderedDict)
-                rawTaskShelvesInfos.append(shelfInfo)
+            rawTaskShelvesInfos.append(shelf_model.readShelfFile(filePath))
 
     if not rawTaskShelvesInfos:
         return
@@ -291,11 +374,16 @@ def readTaskShelvesInfo(fromGUI=False):
 
 
 def writeShelvesToFile(*args):
+    toolsByShelf = OrderedDict()
     for i, shelf in enumerate(shelves):
         shelfInfo = getShelfInfoFromGUI(i, shelf)
         filePath = '{}/{}.json'.format(SHELVES_DATA_PATH, shelf)
-        with open(filePath, 'w') as f:
-            json.dump(shelfInfo, f, indent=4)
+        shelf_model.writeShelfFile(filePath, shelfInfo)
+        toolsByShelf[shelf] = [_getTool(shelf, shelfButtonInfo, shelfInfo.get('tabName'), shelfInfo.get('frameName')) for shelfButtonInfo in shelfInfo.get('shelfButtonInfos', [])]
+
+    # Only the changed shelves are indexed again
+    if searchIndex:
+        searchIndex.syncShelves(toolsByShelf)
 
 
 def restore(*args):
@@ -316,6 +404,14 @@ def getShelfInfoFromGUI(index=0, shelfName=''):
         shelfInfo['order'] = str(index).zfill(2)
         shelfInfo['tabName'] = tabName
         shelfInfo['frameName'] = frameName
+
+        if shelfName not in builtShelfButtons:
+            # Shelf of a tab not shown yet has no buttons in the GUI
+            frameData = taskShelvesInfo[tabName][frameName]
+            shelfInfo['collapse'] = frameData.get('collapse')
+            shelfInfo['shelfButtonInfos'] = list(frameData.get('shelfButtonInfos'))
+            return shelfInfo
+
         shelfInfo['collapse'] = cmds.frameLayout('{}FrameLayout'.format(shelfName), q=True, collapse=True)
 
     shelfButtonInfos = []
@@ -342,6 +438,7 @@ def getShelfInfoFromGUI(index=0, shelfName=''):
             allShelfButtons[_getShelfButtonKey(shelfName, shelfButtonInfo.get('label'))] = shelfButton
 
     shelfInfo['shelfButtonInfos'] = shelfButtonInfos
+    builtShelfButtons[shelfName] = list(zip(shelfButtons or [], shelfButtonInfos))
 
     return shelfInfo
 # ------------
@@ -395,6 +492,7 @@ def editorGUI(*args):
     cmds.text(label='Icon Name: ')
     cmds.rowColumnLayout(numberOfColumns=4)
     cmds.textField('iconNameTxtFld', w=(COLUMN_WIDTH*2)-130, tcc=updateIcon)
+    cmds.popupMenu('iconNamePopupMenu', postMenuCommand=populateIconSuggestions)
     cmds.symbolButton(image='factoryIcon.png', c=lambda x: setIcon(useMayaResource=True))
     cmds.symbolButton(image='UVEditorSnapshot.png', c=lambda x: setIcon(iconMaker=True))
     cmds.symbolButton(image='fileOpen.png', c=setIcon)
@@ -444,6 +542,7 @@ def reorderShelf(direction='up', *args):
     elif direction == 'down':
         shelves[selShelfIndex+1], shelves[selShelfIndex]  = shelves[selShelfIndex], shelves[selShelfIndex+1]
 
+    readTaskShelvesInfo(fromGUI=True)
     refreshEditorShelves(selShelf)
     rebuildTaskShelves(selShelf.split('_')[0])
 
@@ -470,7 +569,7 @@ def shelvesSelectCallback(*args):
     cmds.textFieldGrp('shelfNameTxtFldGrp', e=True, text=selShelf)
 
     if tabName:
-        cmds.tabLayout('taskTabLo', e=True, selectTab=tabName)
+        selectTaskTab(tabName)
 
 
 def shelfContentsSelectCallback(*args):
@@ -651,6 +750,22 @@ def setIcon(useMayaResource=False, iconMaker=False, *args):
         getFromIconsFolder('iconNameTxtFld')
 
 
+def populateIconSuggestions(*args):
+    cmds.popupMenu('iconNamePopupMenu', e=True, deleteAllItems=True)
+    text = cmds.textField('iconNameTxtFld', q=True, text=True)
+    catalog = icon_catalog.getCatalog()
+    # Names starting with the text first, then names containing it
+    icons = catalog.search(text, prefix=True, limit=ICON_SUGGESTIONS_LIMIT)
+    icons += [icon for icon in catalog.search(text, limit=ICON_SUGGESTIONS_LIMIT * 2) if icon not in icons]
+    for icon in icons[:ICON_SUGGESTIONS_LIMIT]:
+        cmds.menuItem(label=icon, image=icon, c=lambda x, icon=icon: _setIconName(icon), p='iconNamePopupMenu')
+
+
+def _setIconName(icon):
+    cmds.textField('iconNameTxtFld', e=True, text=icon)
+    updateIcon()
+
+
 def getFromIconsFolder(widgetName, *args):
     iconImgPath = cmds.fileDialog2(fileMode=1, caption='Select a Image', startingDirectory=DEFAULT_ICONS_DIR)
     if iconImgPath:
@@ -707,12 +822,18 @@ def setCommand(*args):
 
 
 def refreshEditorShelves(shelfName='', shelfButtonLabel='', fromGUI=True):
-    if fromGUI:
+    if fromGUI and shelfName in shelves:
+        # Editor changes one shelf at a time
+        readShelfInfoFromGUI(shelfName)
+    elif fromGUI:
         readCommonShelfInfo(fromGUI=True)
         readTaskShelvesInfo(fromGUI=True)
     else:
         readCommonShelfInfo(fromGUI=False)
         readTaskShelvesInfo(fromGUI=False)
+        # Shelves read from the files can differ from the indexed ones
+        if searchIndex:
+            searchIndex.syncShelves(getToolsByShelf())
 
     populateShelvesTextScrollList()
 
@@ -724,6 +845,19 @@ def refreshEditorShelves(shelfName='', shelfButtonLabel='', fromGUI=True):
         shelfContentsSelectCallback()
 
 
+def readShelfInfoFromGUI(shelfName):
+    """Read a shelf from the GUI in place of every shelf"""
+    if shelfName == 'Common':
+        readCommonShelfInfo(fromGUI=True)
+        return
+
+    tabName, frameName = shelfName.split('_')
+    shelfInfo = getShelfInfoFromGUI(shelves.index(shelfName), shelfName)
+    frameData = taskShelvesInfo[tabName][frameName]
+    frameData['collapse'] = shelfInfo.get('collapse')
+    frameData['shelfButtonInfos'] = shelfInfo.get('shelfButtonInfos')
+
+
 def _findShelfButtonInfo(type='', taskShelf='', shelfButtonLabel=''):
     shelfButtonInfos = None
     if type == 'Common':
@@ -952,38 +1086,20 @@ def searchTools(*args):
     # Add to search history
     addToSearchHistory(searchQuery)
 
-    searchResults = []
+    # Typo tolerant search sorted by relevance and usage, limited to prevent performance issues
+    searchResults = getSearchIndex().search(searchQuery, limit=MAX_SEARCH_RESULTS, usageStats=toolUsageStats)
 
-    # Search in Common shelf
-    for shelfButtonInfo in commonShelfInfo.get('shelfButtonInfos', []):
-        if _matchesSearch(shelfButtonInfo, searchQuery):
-            searchResults.append({
-                'shelf': 'Common',
-                'shelfButtonInfo': shelfButtonInfo,
-                'type': 'Common'
-            })
+    showSearchResults()
 
-    # Search in Task shelves
-    for tabName, tabData in taskShelvesInfo.items():
-        for frameName, frameData in tabData.items():
-            for shelfButtonInfo in frameData.get('shelfButtonInfos', []):
-                if _matchesSearch(shelfButtonInfo, searchQuery):
-                    searchResults.append({
-                        'shelf': f'{tabName}_{frameName}',
-                        'shelfButtonInfo': shelfButtonInfo,
-                        'type': 'Task',
-                        'tabName': tabName,
-                        'frameName': frameName
-                    })
-
-    # Sort search results by relevance
-    searchResults.sort(key=lambda x: _getSearchRelevance(x['shelfButtonInfo'], searchQuery), reverse=True)
-
-    # Limit results to prevent performance issues (max 100 results)
-    if len(searchResults) > 100:
-        searchResults = searchResults[:100]
 
-    showSearchResults()
+def getSearchIndex():
+    """Search index of all tools, built on the first search"""
+    global searchIndex
+
+    if searchIndex is None:
+        searchIndex = tool_search.ToolSearchIndex()
+        searchIndex.syncShelves(getToolsByShelf())
+    return searchIndex
 
 
 def updateToolUsageStats(toolName):
@@ -994,6 +1110,11 @@ def updateToolUsageStats(toolName):
         toolUsageStats[toolName] = 0
     toolUsageStats[toolName] += 1
 
+    try:
+        tool_search.saveUsageStats(toolUsageStats, USAGE_STATS_PATH)
+    except (IOError, OSError) as e:
+        cmds.warning('Failed to save tool usage statistics: {}'.format(e))
+
 
 def addToSearchHistory(searchQuery):
     """Add to search history"""
@@ -1088,46 +1209,6 @@ def searchForTool(toolName):
     searchTools()
 
 
-def _matchesSearch(shelfButtonInfo, searchQuery):
-    """Check if search query matches tool information"""
-    label = shelfButtonInfo.get('label', '').lower()
-    annotation = shelfButtonInfo.get('annotation', '').lower()
-    command = shelfButtonInfo.get('command', '').lower()
-
-    return (searchQuery in label or
-            searchQuery in annotation or
-            searchQuery in command)
-
-
-def _getSearchRelevance(shelfButtonInfo, searchQuery):
-    """Calculate search result relevance"""
-    label = shelfButtonInfo.get('label', '').lower()
-    annotation = shelfButtonInfo.get('annotation', '').lower()
-    command = shelfButtonInfo.get('command', '').lower()
-
-    relevance = 0
-
-    # Highest score for exact match in label
-    if searchQuery == label:
-        relevance += 100
-    elif searchQuery in label:
-        relevance += 50
-
-    # Additional score if label starts with search query
-    if label.startswith(searchQuery):
-        relevance += 30
-
-    # Match in annotation
-    if searchQuery in annotation:
-        relevance += 20
-
-    # Match in command
-    if searchQuery in command:
-        relevance += 10
-
-    return relevance
-
-
 def showSearchResults(*args):
     """Show search results window"""
     global searchResults
@@ -1250,7 +1331,7 @@ def locateTool(result):
     # Navigate to the corresponding tab
     if result['type'] == 'Task':
         tabName = result['tabName']
-        cmds.tabLayout('taskTabLo', e=True, selectTab=tabName)
+        selectTaskTab(tabName)
 
         # Expand the corresponding frame
         frameName = result['frameName']
@@ -1285,26 +1366,41 @@ def toggleSearchResults(*args):
 def getAllTools():
     """Collect all tool information (for search)"""
     allTools = []
+    for tools in getToolsByShelf().values():
+        allTools.extend(tools)
+    return allTools
+
+
+def getToolsByShelf():
+    """Tool information of Common and Task shelves by shelf name"""
+    toolsByShelf = OrderedDict()
 
     # Common shelf tools
-    for shelfButtonInfo in commonShelfInfo.get('shelfButtonInfos', []):
-        allTools.append({
-            'shelf': 'Common',
-            'shelfButtonInfo': shelfButtonInfo,
-            'type': 'Common'
-        })
+    toolsByShelf['Common'] = [_getTool('Common', shelfButtonInfo) for shelfButtonInfo in commonShelfInfo.get('shelfButtonInfos', [])]
 
     # Task shelves tools
     for tabName, tabData in taskShelvesInfo.items():
         for frameName, frameData in tabData.items():
-            for shelfButtonInfo in frameData.get('shelfButtonInfos', []):
-                allTools.append({
-                    'shelf': f'{tabName}_{frameName}',
-                    'shelfButtonInfo': shelfButtonInfo,
-                    'type': 'Task',
-                    'tabName': tabName,
-                    'frameName': frameName
-                })
+            shelf = f'{tabName}_{frameName}'
+            toolsByShelf[shelf] = [_getTool(shelf, shelfButtonInfo, tabName, frameName) for shelfButtonInfo in frameData.get('shelfButtonInfos', [])]
 
-    return allTools
+    return toolsByShelf
+
+
+def _getTool(shelf, shelfButtonInfo, tabName=None, frameName=None):
+    """Tool information of a shelf button. Task shelves give their tab and frame names, names can have '_' in them."""
+    if tabName is None:
+        return {
+            'shelf': 'Common',
+            'shelfButtonInfo': shelfButtonInfo,
+            'type': 'Common'
+        }
+
+    return {
+        'shelf': shelf,
+        'shelfButtonInfo': shelfButtonInfo,
+        'type': 'Task',
+        'tabName': tabName,
+        'frameName': frameName
+    }
 # ------------
@@ -0,0 +1,45 @@
+"""
+Undo for writes made through the Maya API.
+
+MFnMesh.setPoints, MFnSkinCluster.setWeights and other API writes do not go to the undo queue when a script calls them.
+run() makes the write inside the takApiUndo command of plug-ins/takApiUndoCmd.py.
+The command keeps the undo and redo functions of every call on the undo queue, so one run() is one undo step.
+
+Usage:
+    oldPoints = fnMesh.getPoints()
+    api_undo.run(lambda: fnMesh.setPoints(newPoints), lambda: fnMesh.setPoints(oldPoints))
+"""
+
+from maya import cmds
+
+
+PLUGIN_FILE_NAME = 'takApiUndoCmd.py'
+COMMAND_NAME = 'takApiUndo'
+
+# (doFunc, undoFunc) handed to the next takApiUndo command
+pending = []
+
+
+def loadPlugin():
+    if not cmds.pluginInfo(PLUGIN_FILE_NAME, q=True, loaded=True):
+        cmds.loadPlugin(PLUGIN_FILE_NAME, quiet=True)
+
+
+def run(doFunc, undoFunc):
+    """Call doFunc as one undoable step that undoFunc undoes.
+
+    Args:
+        doFunc (callable): The API write. Called again on redo.
+        undoFunc (callable): Restores the state before doFunc.
+
+    Returns:
+        Result of doFunc.
+    """
+    loadPlugin()
+    result = []
+    pending.append((lambda: result.append(doFunc()), undoFunc))
+    try:
+        getattr(cmds, COMMAND_NAME)()
+    finally:
+        del pending[:]
+    return result[0] if result else None
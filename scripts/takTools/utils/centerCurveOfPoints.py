@@ -17,6 +17,8 @@ from maya.api import OpenMaya as om
 import maya.cmds as cmds
 import time
 
+from . import curve_fit
+
 
 DEFAULT_CURVATURE = 3.0  # Default curvature value for the curve creation
 
@@ -152,12 +154,14 @@ def sort_points(points, regression_lines, sorted_point_distance=0.2, search_rati
     return np.array(sort_points_left[::-1] + sort_points_right)
 
 
-def create_nurbs_curve_from_points(points):
+def create_nurbs_curve_from_points(points, cv_count=None, tolerance=None):
     """
     Creates a NURBS curve in Maya from the given points.
 
     Args:
     - points (np.array): Array of points in the format [[x1, y1, z1], [x2, y2, z2], ...].
+    - cv_count (int): Least squares fit to this many cvs instead of using every point as a cv.
+    - tolerance (float): Least squares fit with the fewest cvs within this distance of the points. Used when cv_count is None.
     """
     crv = None
 
@@ -168,8 +172,15 @@ def create_nurbs_curve_from_points(points):
     if len(unique_points) < 4:  # Minimum points required for a degree-3 curve
         return None
 
-    curve_points = [(point[0], point[1], point[2]) for point in points]
-    crv = cmds.curve(p=curve_points, d=3)
+    if cv_count:
+        cvs, knots = curve_fit.fitCurve(points, cv_count)
+    elif tolerance:
+        cvs, knots = curve_fit.fitCurveToTolerance(points, tolerance)
+    else:
+        curve_points = [(point[0], point[1], point[2]) for point in points]
+        return cmds.curve(p=curve_points, d=3)
+
+    crv = cmds.curve(p=[tuple(cv) for cv in cvs.tolist()], k=knots.tolist(), d=curve_fit.DEGREE)
 
     return crv
 
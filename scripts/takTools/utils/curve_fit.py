@@ -0,0 +1,201 @@
+"""
+Least squares NURBS curve fitting of ordered points on numpy arrays.
+
+Points are parameterized by chord length and the control points of a clamped uniform B-spline are solved
+with the end points fixed, so dense inputs like motion trails or sorted point clouds become light curves.
+fitCurveToTolerance() searches the smallest CV count that stays within a distance tolerance.
+The results use Maya knots and feed MFnNurbsCurve.create() or cmds.curve() directly.
+"""
+
+import numpy as np
+
+from . import curve_lut
+
+
+DEGREE = 3
+TOLERANCE = 0.01
+MAX_CV_COUNT = 1000
+PARAM_CORRECTIONS = 2
+
+
+def getChordParams(points):
+    """(n,) chord length parameters of ordered points in [0, 1]."""
+    points = np.asarray(points, dtype=np.float64)
+    lengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    if lengths[-1] <= 0.0:
+        return np.linspace(0.0, 1.0, len(points))
+    return lengths / lengths[-1]
+
+
+def getUniformKnots(cvCount, degree=DEGREE):
+    """Clamped uniform full knots over [0, 1]. Use toMayaKnots() for MFnNurbsCurve."""
+    spanCount = cvCount - degree
+    return np.concatenate([np.zeros(degree), np.linspace(0.0, 1.0, spanCount + 1), np.ones(degree)])
+
+
+def toMayaKnots(knots):
+    """Maya knots without the first and last knot of the full form."""
+    return np.asarray(knots)[1:-1]
+
+
+def getBasisFunctions(params, knots, cvCount, degree=DEGREE):
+    """Non zero B-spline basis values of every parameter.
+
+    Args:
+        params (numpy.ndarray): (n,) parameters.
+        knots (numpy.ndarray): Full knots.
+        cvCount (int): Control point count.
+        degree (int, optional): Curve degree. Defaults to DEGREE.
+
+    Returns:
+        tuple: ((n,) first cv index, (n, degree + 1) basis values of cvs first to first + degree).
+    """
+    params = np.clip(np.asarray(params, dtype=np.float64), knots[degree], knots[cvCount])
+    spans = np.clip(np.searchsorted(knots, params, side='right') - 1, degree, cvCount - 1)
+
+    values = np.zeros((len(params), degree + 1))
+    values[:, 0] = 1.0
+    left = np.zeros((len(params), degree + 1))
+    right = np.zeros((len(params), degree + 1))
+    for j in range(1, degree + 1):
+        left[:, j] = params - knots[spans + 1 - j]
+        right[:, j] = knots[spans + j] - params
+        saved = np.zeros(len(params))
+        for r in range(j):
+            denominators = right[:, r + 1] + left[:, j - r]
+            temp = np.divide(values[:, r], denominators, out=np.zeros_like(saved), where=denominators > 0)
+            values[:, r] = saved + right[:, r + 1] * temp
+            saved = left[:, j - r] * temp
+        values[:, j] = saved
+    return spans - degree, values
+
+
+def fitCurve(points, cvCount, degree=DEGREE, params=None):
+    """Least squares fit of a clamped curve with cvCount control points.
+
+    The first and last cvs are the first and last points. The normal equations are gathered from the
+    degree + 1 non zero basis values of every point instead of a dense (n, cvCount) basis matrix.
+
+    Args:
+        points (numpy.ndarray): (n, 3) ordered points.
+        cvCount (int): Control point count. Clamped to [degree + 1, min(n, MAX_CV_COUNT)].
+        degree (int, optional): Curve degree. Defaults to DEGREE.
+        params (numpy.ndarray, optional): (n,) parameters of the points in [0, 1]. Defaults to chord length parameters.
+
+    Returns:
+        tuple: ((cvCount, 3) cvs, Maya knots).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < degree + 1:
+        raise ValueError('At least {} points are needed for a degree {} curve.'.format(degree + 1, degree))
+    cvCount = int(min(max(cvCount, degree + 1), len(points), MAX_CV_COUNT))
+
+    params = getChordParams(points) if params is None else np.asarray(params, dtype=np.float64)
+    knots = getUniformKnots(cvCount, degree)
+    firstIds, values = getBasisFunctions(params, knots, cvCount, degree)
+    ids = firstIds[:, None] + np.arange(degree + 1)
+
+    flatIds = (ids[:, :, None] * cvCount + ids[:, None, :]).ravel()
+    normal = np.bincount(flatIds, (values[:, :, None] * values[:, None, :]).ravel(), cvCount * cvCount).reshape(cvCount, cvCount)
+    rhs = np.stack([np.bincount(ids.ravel(), (values * points[:, None, axis]).ravel(), cvCount) for axis in range(3)], axis=1)
+
+    # Fixed ends move to the right hand side, the inner cvs are solved
+    cvs = np.empty((cvCount, 3))
+    cvs[0], cvs[-1] = points[0], points[-1]
+    inner = slice(1, -1)
+    rhs = rhs[inner] - np.outer(normal[inner, 0], cvs[0]) - np.outer(normal[inner, -1], cvs[-1])
+    try:
+        cvs[inner] = np.linalg.solve(normal[inner, inner], rhs)
+    except np.linalg.LinAlgError:
+        # Spans without points leave cvs undetermined
+        cvs[inner] = np.linalg.lstsq(normal[inner, inner], rhs, rcond=None)[0]
+    return cvs, toMayaKnots(knots)
+
+
+def evaluateCurve(cvs, fullKnots, degree, params):
+    """Points and tangents of a non rational curve from its basis functions, faster than curve_lut for fitted curves."""
+    cvCount = len(cvs)
+    firstIds, values = getBasisFunctions(params, fullKnots, cvCount, degree)
+    points = np.einsum('ij,ijk->ik', values, cvs[firstIds[:, None] + np.arange(degree + 1)])
+
+    # Tangents are the degree - 1 curve of the scaled cv differences
+    spans = fullKnots[degree + 1:cvCount + degree] - fullKnots[1:cvCount]
+    derivativeCvs = np.diff(cvs, axis=0) * np.divide(degree, spans, out=np.zeros_like(spans), where=spans > 0)[:, None]
+    firstIds, values = getBasisFunctions(params, fullKnots[1:-1], cvCount - 1, degree - 1)
+    tangents = np.einsum('ij,ijk->ik', values, derivativeCvs[firstIds[:, None] + np.arange(degree)])
+    return points, tangents
+
+
+def getFitErrors(points, cvs, knots, degree=DEGREE, params=None, corrections=PARAM_CORRECTIONS):
+    """Distance between every point and the curve.
+
+    Starting from the fit parameters, each correction moves a parameter toward the closest curve point
+    by a Newton step on the tangent, so the result is close to the true point to curve distance.
+
+    Args:
+        points (numpy.ndarray): (n, 3) points.
+        cvs (numpy.ndarray): (m, 3) curve cvs.
+        knots (numpy.ndarray): Maya knots.
+        degree (int, optional): Curve degree. Defaults to DEGREE.
+        params (numpy.ndarray, optional): (n,) start parameters. Defaults to chord length parameters.
+        corrections (int, optional): Parameter correction count. Defaults to PARAM_CORRECTIONS.
+
+    Returns:
+        numpy.ndarray: (n,) distances.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    fullKnots = curve_lut.toFullKnots(knots)
+    params = getChordParams(points) if params is None else np.asarray(params, dtype=np.float64)
+
+    for _ in range(corrections):
+        curvePoints, tangents = evaluateCurve(cvs, fullKnots, degree, params)
+        squaredLengths = np.sum(tangents * tangents, axis=1)
+        steps = np.divide(np.sum((points - curvePoints) * tangents, axis=1), squaredLengths,
+                          out=np.zeros_like(params), where=squaredLengths > 1e-12)
+        params = np.clip(params + steps, fullKnots[degree], fullKnots[len(cvs)])
+
+    curvePoints = evaluateCurve(cvs, fullKnots, degree, params)[0]
+    return np.linalg.norm(curvePoints - points, axis=1)
+
+
+def fitCurveToTolerance(points, tolerance=TOLERANCE, degree=DEGREE, maxCvCount=None):
+    """Fit with the smallest cv count whose fit error is within tolerance.
+
+    The cv count doubles until the fit is within tolerance and is then narrowed down by binary search,
+    assuming the error shrinks as cvs are added. Light curves only cost a few small fits.
+
+    Args:
+        points (numpy.ndarray): (n, 3) ordered points.
+        tolerance (float, optional): Maximum distance of a point from the curve. Defaults to TOLERANCE.
+        degree (int, optional): Curve degree. Defaults to DEGREE.
+        maxCvCount (int, optional): Upper bound of the cv count. Defaults to the point count or MAX_CV_COUNT.
+
+    Returns:
+        tuple: ((m, 3) cvs, Maya knots). The maxCvCount fit when no fit is within tolerance.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    params = getChordParams(points)
+    maxCvCount = max(degree + 1, min(len(points), MAX_CV_COUNT if maxCvCount is None else maxCvCount))
+
+    def fit(cvCount):
+        result = fitCurve(points, cvCount, degree, params)
+        return result, getFitErrors(points, result[0], result[1], degree, params).max() <= tolerance
+
+    low = degree + 1
+    high = low
+    best, isWithin = fit(high)
+    while not isWithin and high < maxCvCount:
+        low = high + 1
+        high = min(high * 2, maxCvCount)
+        best, isWithin = fit(high)
+    if not isWithin:
+        return best
+
+    while low < high:
+        middle = (low + high) // 2
+        result, isWithin = fit(middle)
+        if isWithin:
+            best, high = result, middle
+        else:
+            low = middle + 1
+    return best
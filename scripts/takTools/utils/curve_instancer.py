@@ -0,0 +1,394 @@
+"""
+Per instance transforms of the instanceAlongCurve locator on numpy arrays.
+
+Mirrors the per instance loops of plug-ins/instanceAlongCurve.py for all instances at once.
+Quaternions are (x, y, z, w) arrays and follow the MQuaternion product order,
+a * b applies a first and then b, like the row vector matrices of Maya.
+Ramps are baked into RampTable lookups and random values keep the random.seed(count) sequences of the legacy loops,
+so existing scenes place instances where they did before.
+See benchmarks/curve_instancer_bench.py.
+"""
+
+import math
+import random
+
+import numpy as np
+
+from . import curve_lut
+
+
+X_AXIS = np.array([1.0, 0.0, 0.0])
+Y_AXIS = np.array([0.0, 1.0, 0.0])
+Z_AXIS = np.array([0.0, 0.0, 1.0])
+
+# Forward, up and right axes per localOrientationAxis enum value
+LOCAL_AXES = {
+    0: (X_AXIS, Y_AXIS, Z_AXIS),
+    1: (Y_AXIS, Z_AXIS, X_AXIS),
+    2: (Z_AXIS, Y_AXIS, X_AXIS),
+}
+
+# orientationMode enum values
+IDENTITY = 0
+INPUT_ROTATION = 1
+CHAIN = 3
+
+RAMP_SAMPLES = 512
+PARALLEL_TOLERANCE = 1e-10
+
+
+def normalizeVectors(vectors, fallback=Z_AXIS):
+    vectors = np.asarray(vectors, dtype=np.float64)
+    lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.where(lengths > 1e-12, vectors / np.maximum(lengths, 1e-12), fallback)
+
+
+def quatFromAxisAngle(axes, angles):
+    """(n, 4) quaternions of angles in radians around axes."""
+    axes = normalizeVectors(np.broadcast_to(axes, np.shape(angles) + (3,)))
+    halves = np.asarray(angles, dtype=np.float64)[..., None] * 0.5
+    return np.concatenate([axes * np.sin(halves), np.cos(halves)], axis=-1)
+
+
+def quatMultiply(a, b):
+    """MQuaternion a * b, the rotation a followed by b."""
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    ax, ay, az, aw = np.moveaxis(a, -1, 0)
+    bx, by, bz, bw = np.moveaxis(b, -1, 0)
+    return np.stack([
+        bw * ax + bx * aw + by * az - bz * ay,
+        bw * ay - bx * az + by * aw + bz * ax,
+        bw * az + bx * ay - by * ax + bz * aw,
+        bw * aw - bx * ax - by * ay - bz * az,
+    ], axis=-1)
+
+
+def rotateVectors(vectors, quats):
+    """MVector.rotateBy() for every quaternion."""
+    quats = np.asarray(quats, dtype=np.float64)
+    xyz, w = quats[..., :3], quats[..., 3:]
+    uv = np.cross(xyz, vectors)
+    return vectors + 2.0 * (w * uv + np.cross(xyz, uv))
+
+
+def quatRotateTo(source, targets):
+    """MVector.rotateTo(), the shortest rotation from source to every target.
+
+    Opposite vectors turn PI around the Y axis, which is what the legacy loops did for the Z reference axis.
+    """
+    source = normalizeVectors(source)
+    targets = normalizeVectors(targets)
+    source = np.broadcast_to(source, targets.shape)
+    dots = np.sum(source * targets, axis=-1)
+    crosses = np.cross(source, targets)
+
+    quats = np.concatenate([crosses, (1.0 + dots)[..., None]], axis=-1)
+    isOpposite = (np.linalg.norm(crosses, axis=-1) < PARALLEL_TOLERANCE) & (dots < 0.0)
+    quats[isOpposite] = [0.0, 1.0, 0.0, 0.0]
+    return quats / np.linalg.norm(quats, axis=-1, keepdims=True)
+
+
+def eulerToQuat(rotations):
+    """MEulerRotation(x, y, z).asQuaternion() of xyz order radians."""
+    rotations = np.asarray(rotations, dtype=np.float64)
+    quat = quatFromAxisAngle(X_AXIS, rotations[..., 0])
+    quat = quatMultiply(quat, quatFromAxisAngle(Y_AXIS, rotations[..., 1]))
+    return quatMultiply(quat, quatFromAxisAngle(Z_AXIS, rotations[..., 2]))
+
+
+def quatToEuler(quats):
+    """MQuaternion.asEulerRotation() of xyz order, in radians."""
+    quats = np.asarray(quats, dtype=np.float64)
+    quats = quats / np.linalg.norm(quats, axis=-1, keepdims=True)
+    x, y, z, w = np.moveaxis(quats, -1, 0)
+
+    # Rows of the row vector rotation matrix, which is Rx * Ry * Rz for xyz order
+    m00 = 1.0 - 2.0 * (y * y + z * z)
+    m01 = 2.0 * (x * y + z * w)
+    m02 = 2.0 * (x * z - y * w)
+    m11 = 1.0 - 2.0 * (x * x + z * z)
+    m12 = 2.0 * (y * z + x * w)
+    m21 = 2.0 * (y * z - x * w)
+    m22 = 1.0 - 2.0 * (x * x + y * y)
+
+    ry = np.arcsin(np.clip(-m02, -1.0, 1.0))
+    isGimbal = np.abs(m02) > 1.0 - 1e-12
+    # At gimbal lock z is zero and x takes the whole remaining rotation
+    rx = np.where(isGimbal, np.arctan2(-m21, m11), np.arctan2(m12, m22))
+    rz = np.where(isGimbal, 0.0, np.arctan2(m01, m00))
+    return np.stack([rx, ry, rz], axis=-1)
+
+
+def getDistances(count, distOffset, curveStart, curveLength, effectiveCurveLength, lengthIncrement):
+    """Arc length of every instance, wrapped inside the curve start and end."""
+    steps = lengthIncrement * np.arange(count) + distOffset
+    return np.fmod(curveStart + np.fmod(steps, effectiveCurveLength), curveLength)
+
+
+def getRandomValues(count, valuesPerInstance):
+    """(count, valuesPerInstance) values in [0, 1) in the order the legacy loops drew them after random.seed(count)."""
+    generator = random.Random(count)
+    values = [generator.random() for _ in range(count * valuesPerInstance)]
+    return np.array(values, dtype=np.float64).reshape(count, valuesPerInstance)
+
+
+def getHandleAngles(params, handleParams, handleAngles, wrapAround, curveMaxParam):
+    """Twist angles of the manipulator handles interpolated at params.
+
+    Args:
+        params (numpy.ndarray): (n,) curve parameters.
+        handleParams (numpy.ndarray): (h,) sorted handle parameters.
+        handleAngles (numpy.ndarray): (h,) handle angles.
+        wrapAround (bool): Curve is closed or periodic, so the last handle blends into the first.
+        curveMaxParam (float): Parameter at the curve end.
+
+    Returns:
+        numpy.ndarray: (n,) angles.
+    """
+    params = np.asarray(params, dtype=np.float64)
+    handleCount = len(handleParams)
+    if not handleCount:
+        return np.zeros_like(params)
+    handleParams = np.asarray(handleParams, dtype=np.float64)
+    handleAngles = np.asarray(handleAngles, dtype=np.float64)
+
+    # First handle after each param
+    nextIds = np.searchsorted(handleParams, params, side='right')
+    isInside = (nextIds > 0) & (nextIds < handleCount)
+    if wrapAround:
+        minIds = np.where(isInside, nextIds - 1, handleCount - 1)
+        maxIds = np.where(isInside, nextIds, 0)
+    else:
+        minIds = np.where(nextIds == 0, 0, nextIds - 1)
+        maxIds = np.where(nextIds == 0, 0, np.minimum(nextIds, handleCount - 1))
+
+    minParams, maxParams = handleParams[minIds], handleParams[maxIds]
+    minAngles, maxAngles = handleAngles[minIds], handleAngles[maxIds]
+
+    if wrapAround:
+        isWrapped = minParams > maxParams
+        params = np.where(isWrapped & (params < maxParams), params + curveMaxParam, params)
+        maxParams = np.where(isWrapped, maxParams + curveMaxParam, maxParams)
+
+    spans = maxParams - minParams
+    isBlended = np.abs(spans) > 0.001
+    ratios = np.clip(np.divide(params - minParams, spans, out=np.zeros_like(params), where=isBlended), 0.0, 1.0)
+    return np.where(isBlended, minAngles + (maxAngles - minAngles) * ratios, minAngles)
+
+
+class RampTable(object):
+    """Values of a ramp attribute sampled at evenly spaced positions.
+
+    Args:
+        values (numpy.ndarray): Ramp values at numpy.linspace(0.0, 1.0, len(values)).
+    """
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.positions = np.linspace(0.0, 1.0, len(self.values))
+
+    @classmethod
+    def fromFunction(cls, getValueAtPosition, sampleCount=RAMP_SAMPLES):
+        """Bake a getValueAtPosition(position) callable."""
+        return cls([getValueAtPosition(position) for position in np.linspace(0.0, 1.0, sampleCount).tolist()])
+
+    def getValues(self, normalizedDistances, repeat=1.0, offset=0.0):
+        """Ramp values at normalized curve distances, repeated and offset like the legacy lookup."""
+        positions = np.fmod(np.asarray(normalizedDistances, dtype=np.float64) * repeat + offset, 1.0)
+        return np.interp(positions, self.positions, self.values)
+
+
+class RampSettings(object):
+    """Evaluated ramp related attributes of one of the position, rotation and scale ramps.
+
+    Args:
+        table (RampTable): Baked ramp.
+        axis (list): Ramp axis vector.
+        amplitude (float): Ramp amplitude.
+        randomAmplitude (float): Random amplitude.
+        repeat (float): Ramp repeat.
+        offset (float): Ramp offset.
+        amplitudes (list, optional): Per instance amplitudes sampled from a texture. Replaces amplitude where given.
+    """
+
+    def __init__(self, table, axis, amplitude, randomAmplitude, repeat, offset, amplitudes=None):
+        self.table = table
+        self.axis = np.asarray(axis, dtype=np.float64)
+        self.amplitude = amplitude
+        self.randomAmplitude = randomAmplitude
+        self.repeat = repeat
+        self.offset = offset
+        self.amplitudes = amplitudes
+
+    def getAmplitudes(self, count):
+        amplitudes = np.full(count, self.amplitude, dtype=np.float64)
+        if self.amplitudes is not None:
+            dynamicCount = min(count, len(self.amplitudes))
+            amplitudes[:dynamicCount] = self.amplitudes[:dynamicCount]
+        return amplitudes
+
+    def getRandomized(self, normalizedDistances, randomValues):
+        """(n, k) randomized ramp values for (n, k) random values."""
+        rampValues = self.table.getValues(normalizedDistances, self.repeat, self.offset) * self.getAmplitudes(len(randomValues))
+        return (randomValues * 2.0 - 1.0) * self.randomAmplitude + rampValues[:, None]
+
+
+class CurveSamples(object):
+    """Curve evaluation at the instance distances.
+
+    Args:
+        params (numpy.ndarray): (n,) curve parameters.
+        points (numpy.ndarray): (n, 3) points.
+        tangents (numpy.ndarray): (n, 3) normalized tangents.
+        normalizedDistances (numpy.ndarray): (n,) distance over the curve length.
+        maxParam (float): Parameter at the curve end.
+    """
+
+    def __init__(self, params, points, tangents, normalizedDistances, maxParam):
+        self.params = params
+        self.points = points
+        self.tangents = tangents
+        self.normalizedDistances = normalizedDistances
+        self.maxParam = maxParam
+
+    def __len__(self):
+        return len(self.params)
+
+
+class CurveSampler(object):
+    """Arc length table and instance samples of a curve, reused until the curve or the placement changes.
+
+    Examples:
+        sampler = CurveSampler()
+        length = sampler.setCurve(cvs, mayaKnots, degree)
+        samples = sampler.getSamples(getDistances(count, 0.0, 0.0, length, length, length / count))
+    """
+
+    def __init__(self, tolerance=curve_lut.TOLERANCE):
+        self.tolerance = tolerance
+        self._curve = None
+        self._curveKey = None
+        self._table = None
+        self._samplesKey = None
+        self._samples = None
+
+    def setCurve(self, cvs, knots, degree):
+        """Set the curve with Maya knots. The arc length table is rebuilt only when the curve changed.
+
+        Returns:
+            float: Curve length.
+        """
+        key = curve_lut.getCurveKey(cvs, knots, degree, self.tolerance)
+        if key != self._curveKey:
+            fullKnots = curve_lut.toFullKnots(knots)
+            self._curve = (np.asarray(cvs, dtype=np.float64), fullKnots, degree)
+            self._table = curve_lut.ArcLengthTable.fromNurbs(cvs, fullKnots, degree, self.tolerance)
+            self._curveKey = key
+            self._samplesKey = None
+        return self.length
+
+    @property
+    def length(self):
+        return float(self._table.length) if self._table else 0.0
+
+    def getSamples(self, distances):
+        """CurveSamples at arc lengths, cached for the same distances."""
+        distances = np.asarray(distances, dtype=np.float64)
+        key = distances.tobytes()
+        if key != self._samplesKey:
+            cvs, knots, degree = self._curve
+            params = self._table.getParams(distances)
+            points, tangents = curve_lut.evaluateNurbsTangents(cvs, knots, degree, params)
+            normalizedDistances = distances / self.length if self.length > 0.0 else np.zeros_like(distances)
+            self._samples = CurveSamples(params, points, normalizeVectors(tangents), normalizedDistances, self._table.params[-1])
+            self._samplesKey = key
+        return self._samples
+
+
+def getCurveRotations(samples, forward, localRotation, rotationMode, inputRotation, handleAngles):
+    """Orientation of every instance before ramp twists.
+
+    Args:
+        samples (CurveSamples): Curve samples.
+        forward (numpy.ndarray): Local forward axis.
+        localRotation (numpy.ndarray): Quaternion applied before the tangent alignment.
+        rotationMode (int): orientationMode enum value.
+        inputRotation (numpy.ndarray): World rotation quaternion of the input transform.
+        handleAngles (numpy.ndarray, optional): (n,) manipulator twist angles. None when manipulators are off.
+
+    Returns:
+        tuple: ((n, 4) aligned rotations before the mode is applied, (n, 4) final rotations).
+    """
+    count = len(samples)
+    aligned = quatMultiply(localRotation, quatRotateTo(Z_AXIS, samples.tangents))
+
+    if rotationMode == IDENTITY:
+        rotations = np.tile([0.0, 0.0, 0.0, 1.0], (count, 1))
+    elif rotationMode == INPUT_ROTATION:
+        rotations = np.tile(inputRotation, (count, 1))
+    else:
+        rotations = aligned.copy()
+        if rotationMode == CHAIN:
+            odd = np.arange(count) % 2 == 1
+            rotations[odd] = quatMultiply(rotations[odd], quatFromAxisAngle(samples.tangents[odd], np.full(odd.sum(), math.pi * 0.5)))
+
+    if handleAngles is not None:
+        rotations = quatMultiply(rotations, quatFromAxisAngle(samples.tangents, -handleAngles))
+    return aligned, rotations
+
+
+def getTranslations(samples, localAxisMode, rotationMode, inputRotation, handleAngles, ramp,
+                    localOffset, globalOffset, rotatePivot):
+    """Instance translations, see instanceAlongCurveLocator.updateInstancePositions().
+
+    Returns:
+        numpy.ndarray: (n, 3) translations.
+    """
+    forward, up, right = LOCAL_AXES[localAxisMode]
+    localRotation = quatRotateTo(forward, Z_AXIS)
+    _, rotations = getCurveRotations(samples, forward, localRotation, rotationMode, inputRotation, handleAngles)
+
+    basisForward = rotateVectors(forward, rotations)
+    basisUp = rotateVectors(up, rotations)
+    basisRight = rotateVectors(right, rotations)
+
+    values = ramp.getRandomized(samples.normalizedDistances, getRandomValues(len(samples), 3)) * ramp.axis
+    localOffset = np.asarray(localOffset, dtype=np.float64)
+
+    twists = basisRight * values[:, :1] + basisUp * values[:, 1:2] + basisForward * values[:, 2:]
+    offsets = basisRight * localOffset[0] + basisUp * localOffset[1] + basisForward * localOffset[2]
+    return samples.points + twists + np.asarray(globalOffset) - np.asarray(rotatePivot) + offsets
+
+
+def getRotations(samples, localAxisMode, rotationMode, inputRotation, handleAngles, ramp,
+                 localRotationOffset, globalRotationOffset):
+    """Instance euler rotations, see instanceAlongCurveLocator.updateInstanceRotations().
+
+    Args:
+        localRotationOffset (numpy.ndarray): Local xyz euler offset in radians.
+        globalRotationOffset (numpy.ndarray): Global xyz euler offset in radians.
+
+    Returns:
+        numpy.ndarray: (n, 3) xyz euler rotations in radians.
+    """
+    forward, up, right = LOCAL_AXES[localAxisMode]
+    localRotation = quatMultiply(eulerToQuat(localRotationOffset), quatRotateTo(forward, Z_AXIS))
+    aligned, rotations = getCurveRotations(samples, forward, localRotation, rotationMode, inputRotation, handleAngles)
+
+    # Ramp twists turn around the tangent aligned basis regardless of the mode
+    values = np.radians(ramp.getRandomized(samples.normalizedDistances, getRandomValues(len(samples), 3)) * ramp.axis)
+    rotations = quatMultiply(rotations, quatFromAxisAngle(rotateVectors(right, aligned), values[:, 0]))
+    rotations = quatMultiply(rotations, quatFromAxisAngle(rotateVectors(up, aligned), values[:, 1]))
+    rotations = quatMultiply(rotations, quatFromAxisAngle(rotateVectors(forward, aligned), values[:, 2]))
+    rotations = quatMultiply(rotations, eulerToQuat(globalRotationOffset))
+    return quatToEuler(rotations)
+
+
+def getScales(samples, ramp, localScaleOffset):
+    """Instance scales with one random value per instance for all axes, see instanceAlongCurveLocator.updateInstanceScale().
+
+    Returns:
+        numpy.ndarray: (n, 3) scales.
+    """
+    values = ramp.getRandomized(samples.normalizedDistances, getRandomValues(len(samples), 1))
+    return np.asarray(localScaleOffset, dtype=np.float64) + values * ramp.axis
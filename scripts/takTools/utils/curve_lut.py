@@ -0,0 +1,217 @@
+"""
+Arc length to parameter lookup table of a NURBS curve on numpy arrays.
+
+The curve is evaluated with a vectorized de Boor algorithm and its parameter range is sampled adaptively
+until splitting a sample segment changes neither its length nor the length at its middle by more than the error bound.
+Lengths are then mapped to parameters by binary search and linear interpolation,
+so any number of queries cost one table build per curve change.
+See benchmarks/curve_lut_bench.py.
+"""
+
+import hashlib
+
+import numpy as np
+
+
+TOLERANCE = 1e-4
+INITIAL_SAMPLES_PER_SPAN = 8
+MAX_DEPTH = 12
+
+
+def toFullKnots(knots):
+    """Maya knots lack the first and last knot of the textbook form. Repeat the end knots."""
+    knots = np.asarray(knots, dtype=np.float64)
+    return np.concatenate([knots[:1], knots, knots[-1:]])
+
+
+def toHomogeneous(cvs):
+    """(n, 4) weighted control points from (n, 3) or (n, 4) cvs. The 4th column of the input is the rational weight."""
+    cvs = np.asarray(cvs, dtype=np.float64)
+    if cvs.shape[1] == 3:
+        return np.concatenate([cvs, np.ones((len(cvs), 1))], axis=1)
+    return np.concatenate([cvs[:, :3] * cvs[:, 3:], cvs[:, 3:]], axis=1)
+
+
+def deBoor(controlPoints, knots, degree, params):
+    """Vectorized de Boor evaluation of a non rational B-spline of any dimension.
+
+    Args:
+        controlPoints (numpy.ndarray): (n, d) control points.
+        knots (numpy.ndarray): (n + degree + 1,) knots.
+        degree (int): Curve degree.
+        params (numpy.ndarray): (m,) parameters. Clamped to the curve domain.
+
+    Returns:
+        numpy.ndarray: (m, d) points.
+    """
+    knots = np.asarray(knots, dtype=np.float64)
+    count = len(controlPoints)
+    params = np.clip(np.asarray(params, dtype=np.float64), knots[degree], knots[count])
+    spans = np.clip(np.searchsorted(knots, params, side='right') - 1, degree, count - 1)
+
+    points = controlPoints[spans[:, None] - degree + np.arange(degree + 1)]
+    for r in range(1, degree + 1):
+        for j in range(degree, r - 1, -1):
+            left = knots[spans + j - degree]
+            right = knots[spans + j + 1 - r]
+            denominators = right - left
+            alphas = np.divide(params - left, denominators, out=np.zeros_like(params), where=denominators > 0)[:, None]
+            points[:, j] = (1.0 - alphas) * points[:, j - 1] + alphas * points[:, j]
+    return points[:, degree]
+
+
+def evaluateNurbs(cvs, knots, degree, params):
+    """Points on a NURBS curve.
+
+    Args:
+        cvs (numpy.ndarray): (n, 3) or (n, 4) control points. The 4th column is the rational weight.
+        knots (numpy.ndarray): (n + degree + 1,) knots. Use toFullKnots() for Maya knots.
+        degree (int): Curve degree.
+        params (numpy.ndarray): (m,) parameters.
+
+    Returns:
+        numpy.ndarray: (m, 3) points.
+    """
+    result = deBoor(toHomogeneous(cvs), knots, degree, params)
+    return result[:, :3] / result[:, 3:]
+
+
+def evaluateNurbsTangents(cvs, knots, degree, params):
+    """Points and first derivatives of a NURBS curve.
+
+    The derivative comes from the degree - 1 curve of the control point differences and the quotient rule for the weight.
+
+    Args:
+        cvs (numpy.ndarray): (n, 3) or (n, 4) control points. The 4th column is the rational weight.
+        knots (numpy.ndarray): (n + degree + 1,) knots. Use toFullKnots() for Maya knots.
+        degree (int): Curve degree.
+        params (numpy.ndarray): (m,) parameters.
+
+    Returns:
+        tuple: ((m, 3) points, (m, 3) unnormalized tangents).
+    """
+    homogeneous = toHomogeneous(cvs)
+    knots = np.asarray(knots, dtype=np.float64)
+    count = len(homogeneous)
+
+    spans = knots[degree + 1:count + degree] - knots[1:count]
+    scales = np.divide(degree, spans, out=np.zeros_like(spans), where=spans > 0)
+    derivativePoints = np.diff(homogeneous, axis=0) * scales[:, None]
+
+    result = deBoor(homogeneous, knots, degree, params)
+    derivatives = deBoor(derivativePoints, knots[1:-1], degree - 1, params)
+    points = result[:, :3] / result[:, 3:]
+    return points, (derivatives[:, :3] - derivatives[:, 3:] * points) / result[:, 3:]
+
+
+def getCurveKey(cvs, knots, degree, tolerance=TOLERANCE):
+    """Hash of the curve data to tell when a table needs a rebuild."""
+    hasher = hashlib.sha1()
+    hasher.update(np.ascontiguousarray(cvs, dtype=np.float64).tobytes())
+    hasher.update(np.ascontiguousarray(knots, dtype=np.float64).tobytes())
+    hasher.update(np.array([degree, tolerance], dtype=np.float64).tobytes())
+    return hasher.hexdigest()
+
+
+class ArcLengthTable(object):
+    """Cumulative arc length at adaptively sampled parameters of a curve.
+
+    Args:
+        evaluate (callable): Returns (m, 3) points for (m,) parameters.
+        paramRange (tuple): (min, max) parameter.
+        breakParams (list, optional): Parameters sampled first, usually the knots. Defaults to the range ends.
+        tolerance (float, optional): Bound of the arc length error at a queried parameter. Defaults to TOLERANCE.
+        maxDepth (int, optional): Maximum number of segment splits. Defaults to MAX_DEPTH.
+
+    Examples:
+        table = ArcLengthTable.fromNurbs(cvs, toFullKnots(mayaKnots), degree)
+        params = table.getParams(np.linspace(0.0, 1.0, 20), fraction=True)
+    """
+
+    def __init__(self, evaluate, paramRange, breakParams=None, tolerance=TOLERANCE, maxDepth=MAX_DEPTH):
+        self.tolerance = tolerance
+        self.params, self.lengths = self._build(evaluate, paramRange, breakParams, tolerance, maxDepth)
+
+    @classmethod
+    def fromNurbs(cls, cvs, knots, degree, tolerance=TOLERANCE, maxDepth=MAX_DEPTH):
+        """Table of a NURBS curve with full knots."""
+        knots = np.asarray(knots, dtype=np.float64)
+        spanCount = len(cvs) - degree
+        spanKnots = np.unique(knots[degree:len(cvs) + 1])
+        breakParams = np.concatenate([
+            np.linspace(start, end, INITIAL_SAMPLES_PER_SPAN, endpoint=False) for start, end in zip(spanKnots[:-1], spanKnots[1:])
+        ] + [spanKnots[-1:]]) if spanCount > 0 else spanKnots
+        return cls(lambda params: evaluateNurbs(cvs, knots, degree, params), (spanKnots[0], spanKnots[-1]), breakParams, tolerance, maxDepth)
+
+    @staticmethod
+    def _build(evaluate, paramRange, breakParams, tolerance, maxDepth):
+        params = np.unique(np.concatenate([np.asarray(paramRange, dtype=np.float64), [] if breakParams is None else breakParams]))
+        points = evaluate(params)
+        chords = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        # Segments are split at their middle until the two halves agree with the chord
+        # and the length at the middle agrees with the linear interpolation of getParams()
+        starts, ends = params[:-1], params[1:]
+        startPoints, endPoints = points[:-1], points[1:]
+
+        doneStarts, doneLengths = [], []
+        doneLength = 0.0
+        for depth in range(maxDepth + 1):
+            middles = (starts + ends) * 0.5
+            middlePoints = evaluate(middles)
+            halves = np.linalg.norm(middlePoints - startPoints, axis=1), np.linalg.norm(endPoints - middlePoints, axis=1)
+            refined = halves[0] + halves[1]
+
+            # Half of the tolerance is shared by length for the total length error,
+            # the other half bounds the interpolation error of every segment
+            totalLength = max(np.sum(refined) + doneLength, 1e-12)
+            isLengthDone = refined - chords <= 0.5 * tolerance * refined / totalLength
+            isInterpolationDone = np.abs(halves[0] - halves[1]) * 0.5 <= 0.5 * tolerance
+            isDone = (isLengthDone & isInterpolationDone) | (depth == maxDepth)
+
+            doneStarts.append(np.stack([starts[isDone], middles[isDone]], axis=1).ravel())
+            doneLengths.append(np.stack([halves[0][isDone], halves[1][isDone]], axis=1).ravel())
+            doneLength += np.sum(doneLengths[-1])
+
+            split = ~isDone
+            if not split.any():
+                break
+            starts = np.concatenate([starts[split], middles[split]])
+            ends = np.concatenate([middles[split], ends[split]])
+            startPoints = np.concatenate([startPoints[split], middlePoints[split]])
+            endPoints = np.concatenate([middlePoints[split], endPoints[split]])
+            chords = np.concatenate([halves[0][split], halves[1][split]])
+
+        segmentStarts = np.concatenate(doneStarts)
+        segmentLengths = np.concatenate(doneLengths)
+        order = np.argsort(segmentStarts)
+
+        tableParams = np.append(segmentStarts[order], params[-1])
+        tableLengths = np.zeros(len(tableParams))
+        np.cumsum(segmentLengths[order], out=tableLengths[1:])
+        return tableParams, tableLengths
+
+    @property
+    def length(self):
+        return self.lengths[-1]
+
+    def getParams(self, lengths, fraction=False):
+        """Parameters at arc lengths from the curve start.
+
+        Args:
+            lengths (numpy.ndarray): (m,) lengths. Clamped to the curve length.
+            fraction (bool, optional): Lengths are fractions of the curve length. Defaults to False.
+
+        Returns:
+            numpy.ndarray: (m,) parameters.
+        """
+        lengths = np.asarray(lengths, dtype=np.float64) * (self.length if fraction else 1.0)
+        lengths = np.clip(lengths, 0.0, self.length)
+        ids = np.clip(np.searchsorted(self.lengths, lengths, side='right') - 1, 0, len(self.lengths) - 2)
+
+        segmentLengths = self.lengths[ids + 1] - self.lengths[ids]
+        ratios = np.divide(lengths - self.lengths[ids], segmentLengths, out=np.zeros_like(lengths), where=segmentLengths > 0)
+        return self.params[ids] + (self.params[ids + 1] - self.params[ids]) * ratios
+
+    def getLengths(self, params):
+        """Arc lengths at parameters, the inverse of getParams()."""
+        return np.interp(params, self.params, self.lengths)
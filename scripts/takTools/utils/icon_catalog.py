@@ -0,0 +1,195 @@
+"""
+Catalog of the icon names Maya can show, for the shelf editor and the resource browser.
+
+The catalog is the image files of the XBMLANGPATH directories and the png images of the Maya resources.
+Nothing is listed until the first query. Listings are kept in a json cache per Maya version,
+where a directory is listed again only when its mtime changes and the resources only when the Maya version changes,
+so a Maya session usually builds the catalog from a few stats.
+
+Usage:
+    catalog = icon_catalog.getCatalog()
+    catalog.search('skin')
+    catalog.search('poly', prefix=True, limit=20)
+"""
+
+import bisect
+import json
+import os
+import tempfile
+
+try:
+    from maya import cmds, mel
+except ImportError:
+    cmds = None
+    mel = None
+
+
+CACHE_VERSION = 1
+IMAGE_EXTENSIONS = ('.png', '.svg', '.xpm', '.bmp', '.jpg', '.jpeg', '.gif', '.ico')
+RESOURCE_FILTER = '*.png'
+RESOURCE_PREFIX = ':'
+
+_catalog = None
+
+
+def getMayaVersion():
+    return cmds.about(version=True) if cmds else ''
+
+
+def getSearchPaths():
+    """Icon directories of XBMLANGPATH. The %B suffix of Linux and macOS entries is removed."""
+    value = mel.eval('getenv "XBMLANGPATH";') if mel else os.environ.get('XBMLANGPATH', '')
+    paths = []
+    for path in value.split(os.pathsep):
+        path = path.strip()
+        if path.endswith('%B'):
+            path = path[:-2]
+        path = path.rstrip('/\\')
+        if path and path not in paths:
+            paths.append(path)
+    return paths
+
+
+def getMayaResources():
+    if not cmds:
+        return []
+    return cmds.resourceManager(nameFilter=RESOURCE_FILTER) or []
+
+
+def getDefaultCachePath(mayaVersion):
+    appDir = os.environ.get('MAYA_APP_DIR') or os.path.join(os.path.expanduser('~'), 'maya')
+    return os.path.join(appDir, 'takTools', 'iconCatalog_{}.json'.format(mayaVersion or 'standalone'))
+
+
+class IconCatalog(object):
+    """Icon names built on the first query and searchable by prefix or substring.
+
+    Args:
+        searchPaths (list, optional): Icon directories. Defaults to getSearchPaths() on the first query.
+        getResources (callable, optional): Returns the resource image names. Defaults to getMayaResources.
+        mayaVersion (str, optional): Resources are listed again when it changes. Defaults to getMayaVersion().
+        cachePath (str, optional): Json cache file. Empty string disables the cache. Defaults to getDefaultCachePath().
+    """
+
+    def __init__(self, searchPaths=None, getResources=getMayaResources, mayaVersion=None, cachePath=None):
+        self.searchPaths = searchPaths
+        self.getResources = getResources
+        self.mayaVersion = getMayaVersion() if mayaVersion is None else mayaVersion
+        self.cachePath = getDefaultCachePath(self.mayaVersion) if cachePath is None else cachePath
+        self._icons = None
+        self._lowerIcons = None
+        self._paths = None
+
+    @property
+    def isBuilt(self):
+        return self._icons is not None
+
+    def build(self, force=False):
+        """List the icons, reusing the cached listings that are still valid."""
+        searchPaths = getSearchPaths() if self.searchPaths is None else self.searchPaths
+        cache = {} if force else self._readCache()
+
+        directories = {}
+        for path in searchPaths:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            cached = cache.get('directories', {}).get(path)
+            if cached and cached['mtime'] == mtime:
+                directories[path] = cached
+            else:
+                icons = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+                directories[path] = {'mtime': mtime, 'icons': icons}
+
+        resources = cache.get('resources')
+        if resources is None:
+            resources = sorted(self.getResources())
+
+        # Directory icons come first in XBMLANGPATH order, like Maya finds them
+        self._paths = {}
+        for name in resources:
+            self._paths[name] = RESOURCE_PREFIX + name
+        for path in reversed(list(directories)):
+            for name in directories[path]['icons']:
+                self._paths[name] = os.path.join(path, name)
+        self._icons = sorted(self._paths, key=lambda name: (name.lower(), name))
+        self._lowerIcons = [name.lower() for name in self._icons]
+
+        newCache = {'version': CACHE_VERSION, 'mayaVersion': self.mayaVersion, 'resources': resources, 'directories': directories}
+        if newCache != cache:
+            self._writeCache(newCache)
+
+    def _readCache(self):
+        if not self.cachePath or not os.path.isfile(self.cachePath):
+            return {}
+        try:
+            with open(self.cachePath, 'r') as f:
+                cache = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        if cache.get('version') != CACHE_VERSION or cache.get('mayaVersion') != self.mayaVersion:
+            return {}
+        return cache
+
+    def _writeCache(self, cache):
+        if not self.cachePath:
+            return
+        directory = os.path.dirname(self.cachePath)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            fd, tempPath = tempfile.mkstemp(suffix='.tmp', dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tempPath, self.cachePath)
+        except (IOError, OSError):
+            # A read only home only costs the listing next time
+            pass
+
+    def _ensureBuilt(self):
+        if self._icons is None:
+            self.build()
+
+    def getIcons(self):
+        """All icon names sorted case insensitively."""
+        self._ensureBuilt()
+        return list(self._icons)
+
+    def exists(self, name):
+        self._ensureBuilt()
+        return name in self._paths
+
+    def getPath(self, name):
+        """Image file path of an icon, or :name for a Maya resource. None when unknown."""
+        self._ensureBuilt()
+        return self._paths.get(name)
+
+    def search(self, text, prefix=False, limit=None):
+        """Icon names containing or starting with a text, case insensitive.
+
+        Args:
+            text (str): Search text. Empty text matches every icon.
+            prefix (bool, optional): Match the start of the names only. Defaults to False.
+            limit (int, optional): Maximum count. Defaults to None.
+
+        Returns:
+            list: Matching names in catalog order.
+        """
+        self._ensureBuilt()
+        text = text.lower()
+        if prefix:
+            start = bisect.bisect_left(self._lowerIcons, text)
+            end = bisect.bisect_left(self._lowerIcons, text + '\uffff', start)
+            icons = self._icons[start:end]
+        else:
+            icons = [icon for icon, lowerIcon in zip(self._icons, self._lowerIcons) if text in lowerIcon]
+        return icons[:limit] if limit else icons
+
+
+def getCatalog():
+    """Catalog shared by the tools of the session. Built on its first query."""
+    global _catalog
+    if _catalog is None:
+        _catalog = IconCatalog()
+    return _catalog
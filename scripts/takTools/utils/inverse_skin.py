@@ -0,0 +1,100 @@
+"""
+Point deltas and inverse skinning on whole point buffers.
+
+Corrective shapes are sculpted on a posed skinned mesh. The sculpted delta has to be moved back to the bind pose
+before it is added to a blend shape target, which is done by the inverse of the blended skin matrix
+sum(w_i * bindPreMatrix_i * worldMatrix_i) per vertex. See skin_solver for the matrix convention.
+
+getDeltas(), inverseSkinDeltas() work on numpy arrays only.
+getSkinData() reads the skin cluster with one call per buffer. Mesh points are read and written by mesh.getMeshArrays() and mesh.setMeshPoints().
+"""
+
+import numpy as np
+
+from . import skin_solver
+
+try:
+    import maya.api.OpenMaya as om
+    import maya.api.OpenMayaAnim as oma
+
+    from . import globalUtil
+except ImportError:
+    om = None
+    oma = None
+
+
+def getDeltas(basePoints, targetPoints):
+    return np.asarray(targetPoints, dtype=np.float64) - np.asarray(basePoints, dtype=np.float64)
+
+
+def inverseSkinDeltas(deltas, weights, skinMatrices, tolerance=0.0):
+    """Move posed deltas to the bind pose.
+
+    Args:
+        deltas (numpy.ndarray): (V, 3) deltas in the posed space.
+        weights (numpy.ndarray): (V, I) skin weights.
+        skinMatrices (numpy.ndarray): (I, 4, 4) skin matrices.
+        tolerance (float, optional): Deltas not longer than this are left as they are. Defaults to 0.0.
+
+    Returns:
+        numpy.ndarray: (V, 3) bind pose deltas. Deltas of vertices with a singular skin matrix are left as they are.
+    """
+    deltas = np.array(deltas, dtype=np.float64).reshape(-1, 3)
+    movedIds = np.flatnonzero(np.linalg.norm(deltas, axis=1) > tolerance)
+    if not len(movedIds):
+        return deltas
+
+    # Vectors ignore translation so only the 3x3 part is inverted
+    matrices = skin_solver.blendSkinMatrices(np.asarray(weights)[movedIds], skinMatrices)[:, :3, :3]
+    isValid = np.abs(np.linalg.det(matrices)) > 1e-12
+    movedIds = movedIds[isValid]
+
+    # delta_bind @ M = delta  <=>  M^T @ delta_bind^T = delta^T
+    deltas[movedIds] = np.linalg.solve(np.swapaxes(matrices[isValid], 1, 2), deltas[movedIds][..., None])[..., 0]
+    return deltas
+
+
+def toNumpyMatrix(matrix):
+    return np.array([matrix.getElement(row, col) for row in range(4) for col in range(4)]).reshape(4, 4)
+
+
+def getSkinMatrices(fnSkinCluster):
+    """Get bindPreMatrix and current world matrix of every influence.
+
+    Args:
+        fnSkinCluster (oma.MFnSkinCluster): Skin cluster function set.
+
+    Returns:
+        tuple: ((I, 4, 4) bind pre matrices, (I, 4, 4) world matrices) in influenceObjects() order.
+    """
+    bindPrePlug = fnSkinCluster.findPlug('bindPreMatrix', False)
+    bindPreMatrices = []
+    worldMatrices = []
+    for infDagPath in fnSkinCluster.influenceObjects():
+        bindPreObj = bindPrePlug.elementByLogicalIndex(fnSkinCluster.indexForInfluenceObject(infDagPath)).asMObject()
+        bindPreMatrices.append(toNumpyMatrix(om.MFnMatrixData(bindPreObj).matrix()))
+        worldMatrices.append(toNumpyMatrix(infDagPath.inclusiveMatrix()))
+    return np.array(bindPreMatrices).reshape(-1, 4, 4), np.array(worldMatrices).reshape(-1, 4, 4)
+
+
+def getSkinData(skinCluster, geo):
+    """Get weights of all vertices and skin matrices of a skin cluster.
+
+    Args:
+        skinCluster (str): Skin cluster name.
+        geo (str): Skinned mesh.
+
+    Returns:
+        tuple: ((V, I) weights, (I, 4, 4) skin matrices).
+    """
+    fnSkinCluster = oma.MFnSkinCluster(om.MSelectionList().add(skinCluster).getDependNode(0))
+    meshDagPath = globalUtil.getDagPath(str(geo))
+    meshDagPath.extendToShape()
+
+    fnComp = om.MFnSingleIndexedComponent()
+    components = fnComp.create(om.MFn.kMeshVertComponent)
+    fnComp.setCompleteData(om.MFnMesh(meshDagPath).numVertices)
+
+    weights, infCount = fnSkinCluster.getWeights(meshDagPath, components)
+    bindPreMatrices, worldMatrices = getSkinMatrices(fnSkinCluster)
+    return np.array(weights, dtype=np.float64).reshape(-1, infCount), bindPreMatrices @ worldMatrices
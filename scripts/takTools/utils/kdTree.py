@@ -1,16 +1,20 @@
 import math
-from maya import cmds
+
+import numpy as np
+
+from . import spatial_index
 
 
 class KDTree(object):
+    """Nearest transform search. Wrapper of spatial_index.SpatialIndex kept for the legacy API."""
     def __init__(self):
         self._data = []
         self._tree = None
         self._pointDimension = 3
 
     def buildData(self, transforms):
-        for item in transforms:
-            position = cmds.xform(item, q=True, t=True, ws=True)
+        positions = spatial_index.getTransformPositions(transforms)
+        for item, position in zip(transforms, positions.tolist()):
             self._data.append(
                 {
                     'name': item,
@@ -19,52 +23,29 @@ class KDTree(object):
             )
 
     def buildTree(self):
-        self._tree = self._build(self._data)
+        positions = np.array([data['position'] for data in self._data], dtype=np.float64).reshape(-1, self._pointDimension)
+        self._tree = spatial_index.SpatialIndex(positions)
 
     def searchNearestData(self, searchPoint, tolerance=0.1):
-        bestData, minDist = self._getNearestNeighbor(searchPoint, self._tree)
+        bestData, minDist = self._getNearestNeighbor(searchPoint)
         if minDist > tolerance:
             return False
         return bestData
 
-    def _build(self, data, depth=0):
-        if len(data) <= 0:
-            return None
-
-        axis = depth % self._pointDimension
-
-        dataSorted = sorted(data, key=lambda item: item['position'][axis])
-        median = int(len(data) / 2)
-
-        return {
-            'data': dataSorted[median],
-            'left': self._build(dataSorted[:median], depth + 1),
-            'right': self._build(dataSorted[median + 1:], depth + 1)
-        }
-
-    def _getNearestNeighbor(self, point, node, depth=0, bestData=None, minDist=100000):
-        if node is None:
-            return bestData, minDist
-
-        currentDistance = distance(point, node['data']['position'])
-        if currentDistance < minDist:
-            minDist = currentDistance
-            bestData = node['data']
-
-        axis = depth % self._pointDimension
-
-        if point[axis] < node['data']['position'][axis]:
-            nextNode = node['left']
-            oppositeNode = node['right']
-        else:
-            nextNode = node['right']
-            oppositeNode = node['left']
+    def searchNearestDataList(self, searchPoints, tolerance=0.1):
+        """Batch version of searchNearestData().
 
-        bestData, minDist = self._getNearestNeighbor(point, nextNode, depth+1, bestData, minDist)
-        if abs(point[axis] - node['data']['position'][axis]) < distance(point, bestData['position']):
-            bestData, minDist = self._getNearestNeighbor(point, oppositeNode, depth+1, bestData, minDist)
+        Returns:
+            list: Nearest data or False per search point.
+        """
+        distances, indices = self._tree.query(searchPoints, k=1)
+        return [self._data[index] if distance <= tolerance else False for distance, index in zip(distances, indices)]
 
-        return bestData, minDist
+    def _getNearestNeighbor(self, point):
+        distance, index = self._tree.query(point, k=1)
+        if index >= len(self._data):
+            return None, distance
+        return self._data[index], distance
 
 
 def distance(pointA, pointB):
@@ -72,4 +53,4 @@ def distance(pointA, pointB):
     for point1Component, point2Component in zip(pointA, pointB):
         difference = point2Component - point1Component
         squareSum += math.pow(difference, 2)
-    return math.sqrt(squareSum)
\ No newline at end of file
+    return math.sqrt(squareSum)
@@ -0,0 +1,341 @@
+"""
+Streaming search and replace over Maya ASCII files without Maya.
+
+Files are read in binary chunks cut at line ends, so memory stays around one chunk however large the scene is.
+Matches are searched over a whole chunk and an unmatched chunk passes through untouched.
+Rules can be limited to file reference statements or string setAttr statements,
+so a path replace does not touch node names or other data that happen to contain the same text.
+Edits go to a temp file next to the source, which replaces the source only when something changed,
+or to a temp file next to an output path, which keeps the source and is written in the same pass.
+
+Rules are meant to match within a line. A regular expression that can match a line end, like \\s, can also match across lines.
+
+Usage:
+    python -m takTools.utils.ma_edit scenes/ --replace "D:/assets" "//server/assets" --scope fileReference --workers 4
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+
+ALL = 'all'
+FILE_REFERENCE = 'fileReference'
+STRING_ATTR = 'stringAttr'
+SCOPES = [ALL, FILE_REFERENCE, STRING_ATTR]
+
+CHUNK_SIZE = 4 * 1024 * 1024
+ENCODING = 'utf-8'
+BACKUP_PREFIX = 'old_'
+MAX_REPORT_CHANGES = 100
+MAX_REPORT_TEXT = 200
+
+_FILE_REFERENCE_HEAD = re.compile(br'^file\s(?:.*\s)?-r(?:di)?\s')
+_STRING_ATTR_HEAD = re.compile(br'^\s*setAttr\s.*\s-type\s+"string"')
+_STATEMENT_ENDS = (b';\n', b';\r\n')
+
+
+class Rule(object):
+    """One search and replace.
+
+    Args:
+        search (str): Text or regular expression to find.
+        replace (str): Replacement. Regular expression rules can use group references like \\1.
+        regex (bool, optional): search is a regular expression. ^ and $ match at line ends. Defaults to False.
+        scope (str, optional): ALL, FILE_REFERENCE for file -r statements or STRING_ATTR for setAttr -type "string" statements. Defaults to ALL.
+        encoding (str, optional): Encoding of the files. Defaults to ENCODING.
+
+    Examples:
+        rule = Rule('D:/assets', '//server/assets', scope=FILE_REFERENCE)
+        rule = Rule(r'_v(\\d+)\\.abc', r'_v\\1_fix.abc', regex=True, scope=STRING_ATTR)
+    """
+
+    def __init__(self, search, replace, regex=False, scope=ALL, encoding=ENCODING):
+        if scope not in SCOPES:
+            raise ValueError('Unknown scope "{}". Use one of {}.'.format(scope, SCOPES))
+        self.search = search
+        self.replace = replace
+        self.regex = regex
+        self.scope = scope
+
+        search = search.encode(encoding)
+        replace = replace.encode(encoding)
+        self.pattern = re.compile(search if regex else re.escape(search), re.MULTILINE)
+        # Literal replacements must not expand group references
+        self.replacement = replace if regex else replace.replace(b'\\', b'\\\\')
+
+    def __repr__(self):
+        return 'Rule({!r}, {!r}, regex={}, scope={!r})'.format(self.search, self.replace, self.regex, self.scope)
+
+    def toDict(self):
+        return {'search': self.search, 'replace': self.replace, 'regex': self.regex, 'scope': self.scope}
+
+
+def getStatementScope(line):
+    """Scope of the statement that starts with the line. None when no scoped rule applies to it."""
+    if _FILE_REFERENCE_HEAD.match(line):
+        return FILE_REFERENCE
+    if _STRING_ATTR_HEAD.match(line):
+        return STRING_ATTR
+    return None
+
+
+def isStatementEnd(line):
+    """A statement ends with ; at the line end. Comment lines are statements of their own."""
+    return line.rstrip(b'\r\n').endswith(b';') or line.startswith(b'//')
+
+
+def iterChunks(stream, chunkSize=CHUNK_SIZE):
+    """Read a binary stream in chunks that end at a line end. The last chunk can lack the line end."""
+    rest = b''
+    while True:
+        data = stream.read(chunkSize)
+        if not data:
+            if rest:
+                yield rest
+            return
+        data = rest + data
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            rest = data
+            continue
+        rest = data[end:]
+        yield data[:end]
+
+
+def getScopeAt(chunk, position, scope=None, isStart=True):
+    """Scope of the statement that contains a position of a chunk.
+
+    The statement head is the line after the last statement end before the line of the position.
+
+    Args:
+        chunk (bytes): Chunk starting at a line start.
+        position (int): Byte index in the chunk.
+        scope (str, optional): Scope of the statement open at the chunk start. Defaults to None.
+        isStart (bool, optional): The chunk starts with a new statement. Defaults to True.
+
+    Returns:
+        str: Statement scope or None.
+    """
+    lineStart = chunk.rfind(b'\n', 0, position) + 1
+    headStart = -1
+    for statementEnd in _STATEMENT_ENDS:
+        index = chunk.rfind(statementEnd, 0, lineStart)
+        if index >= 0:
+            headStart = max(headStart, index + len(statementEnd))
+    commentStart = chunk.rfind(b'\n//', 0, lineStart) + 1
+    if commentStart > 0 or (chunk.startswith(b'//') and lineStart > 0):
+        headStart = max(headStart, chunk.find(b'\n', commentStart) + 1)
+
+    if headStart < 0:
+        # The statement started in an earlier chunk, or with the first line of this one
+        if not isStart:
+            return scope
+        headStart = 0
+    return getStatementScope(chunk[headStart:chunk.find(b'\n', headStart) + 1])
+
+
+def _scanChunk(chunk, scope, isStart):
+    """Statement scope and start state after a chunk."""
+    if isStatementEnd(chunk[chunk.rfind(b'\n', 0, len(chunk) - 1) + 1:]):
+        return None, True
+    return getScopeAt(chunk, len(chunk) - 1, scope, isStart), False
+
+
+def _editChunk(chunk, rules, scope, isStart, lineNumber, report):
+    """Apply the rules to a chunk in order. Scoped rules only replace matches in statements of their scope.
+
+    Matches are found over the whole chunk instead of line by line, so a chunk without a match costs one search per rule.
+    """
+    for i, rule in enumerate(rules):
+        pieces = []
+        end = 0
+        countedEnd, lineCount = 0, lineNumber
+        for match in rule.pattern.finditer(chunk):
+            if rule.scope != ALL and getScopeAt(chunk, match.start(), scope, isStart) != rule.scope:
+                continue
+            replacement = match.expand(rule.replacement)
+            pieces.extend([chunk[end:match.start()], replacement])
+            end = match.end()
+            report['replacements'][i] += 1
+
+            if len(report['changes']) < MAX_REPORT_CHANGES:
+                lineCount += chunk.count(b'\n', countedEnd, match.start())
+                countedEnd = match.start()
+                report['changes'].append({'line': lineCount + 1, 'rule': i, 'before': _toReportText(match.group()), 'after': _toReportText(replacement)})
+        if pieces:
+            pieces.append(chunk[end:])
+            chunk = b''.join(pieces)
+    return chunk
+
+
+def _toReportText(data):
+    text = data.decode(ENCODING, 'replace')
+    return text if len(text) <= MAX_REPORT_TEXT else text[:MAX_REPORT_TEXT] + '...'
+
+
+def _copyHead(path, output, size):
+    """Copy the first size bytes of a file, the unchanged part before the first edit."""
+    with open(path, 'rb') as stream:
+        while size > 0:
+            data = stream.read(min(size, CHUNK_SIZE))
+            if not data:
+                break
+            output.write(data)
+            size -= len(data)
+
+
+def _openTempFile(path):
+    directory, fileName = os.path.split(os.path.abspath(path))
+    fd, tempPath = tempfile.mkstemp(prefix='.{}.'.format(fileName), suffix='.tmp', dir=directory)
+    return os.fdopen(fd, 'wb'), tempPath
+
+
+def getBackupPath(path):
+    directory, fileName = os.path.split(path)
+    return os.path.join(directory, BACKUP_PREFIX + fileName)
+
+
+def editFile(path, rules, backup=True, dryRun=False, chunkSize=CHUNK_SIZE, outputPath=None):
+    """Apply rules to a Maya ASCII file.
+
+    The temp file is created at the first edited chunk, so an unchanged file is only read.
+    With outputPath every chunk is written to it, so the edited copy needs no prior copy of the file.
+
+    Args:
+        path (str): .ma file path.
+        rules (list): Rule objects applied in order.
+        backup (bool, optional): Copy the original to old_<name> before replacing it, unless that file exists. Defaults to True.
+        dryRun (bool, optional): Report the changes without writing. Defaults to False.
+        chunkSize (int, optional): Bytes read at a time. Defaults to CHUNK_SIZE.
+        outputPath (str, optional): Write the result here, changed or not, and keep the file of path. Defaults to None.
+
+    Returns:
+        dict: Report with path, changed, replacements per rule, lineCount,
+            the line, rule index and text of the first MAX_REPORT_CHANGES replacements and error.
+    """
+    report = {'path': path, 'changed': False, 'replacements': [0] * len(rules), 'lineCount': 0, 'changes': [], 'error': None}
+    scope, isStart, offset = None, True, 0
+    output, tempPath = None, None
+    try:
+        if outputPath and not dryRun:
+            output, tempPath = _openTempFile(outputPath)
+        with open(path, 'rb') as stream:
+            for chunk in iterChunks(stream, chunkSize):
+                newChunk = _editChunk(chunk, rules, scope, isStart, report['lineCount'], report)
+                scope, isStart = _scanChunk(chunk, scope, isStart)
+                report['lineCount'] += chunk.count(b'\n') + (0 if chunk.endswith(b'\n') else 1)
+
+                if newChunk != chunk and not report['changed']:
+                    report['changed'] = True
+                    if not dryRun and not output:
+                        output, tempPath = _openTempFile(path)
+                        _copyHead(path, output, offset)
+                if output:
+                    output.write(newChunk)
+                offset += len(chunk)
+
+        if output:
+            output.close()
+            shutil.copymode(path, tempPath)
+            if backup and not outputPath and not os.path.exists(getBackupPath(path)):
+                shutil.copy2(path, getBackupPath(path))
+            os.replace(tempPath, outputPath or path)
+            tempPath = None
+    except (IOError, OSError) as e:
+        report['error'] = str(e)
+    finally:
+        if output and not output.closed:
+            output.close()
+        if tempPath and os.path.exists(tempPath):
+            os.remove(tempPath)
+    return report
+
+
+def _editFile(args):
+    return editFile(*args)
+
+
+def editFiles(paths, rules, backup=True, dryRun=False, chunkSize=CHUNK_SIZE, workers=None):
+    """Apply rules to many Maya ASCII files.
+
+    Args:
+        paths (list): .ma file paths.
+        rules (list): Rule objects.
+        backup (bool, optional): Keep old_<name> copies of the originals. Defaults to True.
+        dryRun (bool, optional): Report the changes without writing. Defaults to False.
+        chunkSize (int, optional): Bytes read at a time. Defaults to CHUNK_SIZE.
+        workers (int, optional): Process count. Edit in this process when None or 1. Defaults to None.
+
+    Returns:
+        list: editFile() reports in the order of paths.
+    """
+    tasks = [(path, rules, backup, dryRun, chunkSize) for path in paths]
+    if workers and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            return list(executor.map(_editFile, tasks))
+    return [_editFile(task) for task in tasks]
+
+
+def getMayaAsciiFiles(paths):
+    """.ma files of the paths. Directories are searched recursively, skipping old_ backups."""
+    filePaths = []
+    for path in paths:
+        if not os.path.isdir(path):
+            filePaths.append(path)
+            continue
+        for root, dirNames, fileNames in os.walk(path):
+            dirNames.sort()
+            filePaths.extend(
+                os.path.join(root, fileName) for fileName in sorted(fileNames)
+                if fileName.lower().endswith('.ma') and not fileName.startswith(BACKUP_PREFIX)
+            )
+    return filePaths
+
+
+def loadRules(path, encoding=ENCODING):
+    """Rules from a json list of objects with search, replace and optional regex and scope keys."""
+    with open(path, 'r') as f:
+        return [Rule(encoding=encoding, **data) for data in json.load(f)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m takTools.utils.ma_edit', description='Search and replace in Maya ASCII files.')
+    parser.add_argument('paths', nargs='+', help='.ma files or directories searched for .ma files')
+    parser.add_argument('-r', '--replace', nargs=2, action='append', default=[], metavar=('SEARCH', 'REPLACE'), help='Rule, can repeat')
+    parser.add_argument('--regex', action='store_true', help='SEARCH of --replace rules is a regular expression')
+    parser.add_argument('--scope', choices=SCOPES, default=ALL, help='Statements the --replace rules apply to')
+    parser.add_argument('--rules', help='JSON file of rules, [{"search": ..., "replace": ..., "regex": false, "scope": "all"}]')
+    parser.add_argument('--encoding', default=ENCODING, help='Encoding of rule text in the files')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='Process count')
+    parser.add_argument('--no-backup', dest='backup', action='store_false', help='Do not keep old_<name> copies')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='Report without writing')
+    parser.add_argument('--report', help='Write the json report to this path')
+    args = parser.parse_args(argv)
+
+    rules = [Rule(search, replace, args.regex, args.scope, args.encoding) for search, replace in args.replace]
+    if args.rules:
+        rules.extend(loadRules(args.rules, args.encoding))
+    if not rules:
+        parser.error('No rules. Use --replace or --rules.')
+
+    reports = editFiles(getMayaAsciiFiles(args.paths), rules, args.backup, args.dry_run, workers=args.workers)
+    for report in reports:
+        state = 'error' if report['error'] else 'changed' if report['changed'] else 'unchanged'
+        print('{:<10} {:>8} {}'.format(state, sum(report['replacements']), report['path']))
+        if report['error']:
+            print('    {}'.format(report['error']))
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'rules': [rule.toDict() for rule in rules], 'files': reports}, f, indent=4)
+    return 1 if any(report['error'] for report in reports) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Reference index of Maya ASCII shots without Maya.
+
+Maya writes every file reference at the head of a .ma file, before any node, so scanReferences() reads
+the comment, file and requires statements and stops at the first other statement of the scene body.
+A shot of any size costs a few kilobytes of reading.
+
+Reference paths are matched to the release layout .../Asset/<type>/<asset>/.../release/r###/...
+and the release folders are listed through a DirectoryCache that lists a folder again only when its mtime changes.
+buildIndex() scans whole shot directories in threads, because the work is waiting on the file server,
+and keeps the shots whose mtime and size did not change from the previous index.
+
+Index layout:
+    {'version': 1, 'shots': {shotPath: {'mtime', 'size', 'references': [...], 'assets': {refNode: {
+        'asset', 'path', 'namespace', 'depth', 'releaseDir', 'current', 'latest', 'lod', 'outdated'}}}}}
+
+Usage:
+    python -m takTools.utils.ma_ref_index shots/ --index shots/refIndex.json --outdated
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from . import ma_edit
+
+
+INDEX_VERSION = 1
+INDEX_FILE_NAME = 'refIndex.json'
+SCAN_WORKERS = 8
+HEADER_COMMANDS = (b'file', b'requires')
+EXCLUDE_KEYWORD = 'develop'
+
+RELEASE_PATTERN = re.compile(r'^(?P<releaseDir>.*/release)/(?P<release>r\d{3})(?:/|$)')
+RELEASE_NAME_PATTERN = re.compile(r'^r\d{3}$')
+ASSET_PATTERN = re.compile(r'Asset/[^/]+/(?P<asset>[^/]+)/')
+LOD_PATTERN = re.compile(r'lod\d\d')
+
+_TOKEN = re.compile(br'"((?:[^"\\]|\\.)*)"|(\S+)')
+
+
+def _decode(data):
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('cp949', 'replace')
+
+
+def parseFileStatement(statement):
+    """Reference of a file statement of the scene head.
+
+    Args:
+        statement (bytes): Whole statement with its continuation lines.
+
+    Returns:
+        dict: path, namespace, refNode and depth, or None when the statement is not a reference.
+    """
+    tokens = _TOKEN.findall(statement.strip().rstrip(b';'))
+    flags = [plain for _, plain in tokens]
+    if b'-rdi' not in flags and b'-r' not in flags:
+        return None
+
+    def getValue(flag):
+        if flag not in flags:
+            return None
+        index = flags.index(flag) + 1
+        if index >= len(tokens):
+            return None
+        quoted, plain = tokens[index]
+        return _decode(quoted or plain)
+
+    paths = [quoted for quoted, plain in tokens if not plain]
+    if not paths:
+        return None
+    depth = getValue(b'-rdi')
+    return {
+        'path': _decode(paths[-1]).replace('\\', '/'),
+        'namespace': getValue(b'-ns'),
+        'refNode': getValue(b'-rfn'),
+        'depth': int(depth) if depth and depth.isdigit() else 1,
+    }
+
+
+def scanReferences(path):
+    """References of a .ma file, read from its head only.
+
+    Both the file -rdi statements of every reference and the file -r statements of the top references
+    are read. A reference node listed by both keeps one entry.
+
+    Returns:
+        list: parseFileStatement() results in file order.
+    """
+    references = {}
+    statement = []
+    with open(path, 'rb') as stream:
+        for line in stream:
+            if not statement:
+                if line.startswith(b'//') or not line.strip():
+                    continue
+                if line.split(None, 1)[0] not in HEADER_COMMANDS:
+                    break
+            statement.append(line)
+            if not ma_edit.isStatementEnd(line):
+                continue
+
+            if statement[0].startswith(b'file'):
+                reference = parseFileStatement(b''.join(statement))
+                if reference:
+                    key = reference['refNode'] or reference['path']
+                    references.setdefault(key, reference)
+            statement = []
+    return list(references.values())
+
+
+class DirectoryCache(object):
+    """Directory listings that are listed again only when the directory mtime changes.
+
+    Adding or removing a release folder changes the mtime of its parent, so a new release shows up
+    on the next query while unchanged folders cost one stat.
+    """
+
+    def __init__(self):
+        self._listings = {}
+
+    def listDir(self, path):
+        """Sorted names in a directory. Empty when it does not exist."""
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self._listings.pop(path, None)
+            return []
+        listing = self._listings.get(path)
+        if listing is None or listing[0] != mtime:
+            listing = (mtime, sorted(os.listdir(path)))
+            self._listings[path] = listing
+        return listing[1]
+
+    def getReleases(self, releaseDir):
+        """r### release folder names, oldest first."""
+        return [name for name in self.listDir(releaseDir) if RELEASE_NAME_PATTERN.match(name)]
+
+    def getLods(self, releaseDir, release):
+        """lod## names of the files in a release folder."""
+        return sorted(set(match.group() for match in map(LOD_PATTERN.search, self.listDir(releaseDir + '/' + release)) if match))
+
+    def clear(self):
+        self._listings = {}
+
+
+DEFAULT_CACHE = DirectoryCache()
+
+
+def resolveReference(reference, cache=None):
+    """Release state of a reference.
+
+    Args:
+        reference (dict): scanReferences() entry.
+        cache (DirectoryCache, optional): Defaults to DEFAULT_CACHE.
+
+    Returns:
+        dict: The reference with asset, releaseDir, current, latest, lod and outdated,
+            or None when the path is not a release or is a develop path.
+    """
+    cache = cache or DEFAULT_CACHE
+    path = reference['path']
+    match = RELEASE_PATTERN.match(path)
+    if not match or EXCLUDE_KEYWORD in path:
+        return None
+
+    releases = cache.getReleases(match.group('releaseDir'))
+    current = match.group('release')
+    latest = releases[-1] if releases else current
+    assetMatch = ASSET_PATTERN.search(path)
+    lodMatch = LOD_PATTERN.search(path)
+
+    resolved = dict(reference)
+    resolved.update({
+        'asset': assetMatch.group('asset') if assetMatch else os.path.basename(path).split('.')[0],
+        'releaseDir': match.group('releaseDir'),
+        'current': current,
+        'latest': latest,
+        'lod': lodMatch.group() if lodMatch else None,
+        'outdated': current < latest,
+    })
+    return resolved
+
+
+def resolveReferences(references, cache=None):
+    """resolveReference() of every reference, skipping the ones that are not releases."""
+    return [resolved for resolved in (resolveReference(reference, cache) for reference in references) if resolved]
+
+
+def _getShotKey(path):
+    return os.path.abspath(path).replace('\\', '/')
+
+
+def buildIndex(paths, index=None, workers=None, cache=None):
+    """Index of the references and their release state of every shot.
+
+    Args:
+        paths (list): .ma files or directories searched for .ma files.
+        index (dict, optional): Previous index. Shots with the same mtime and size are not scanned again. Defaults to None.
+        workers (int, optional): Thread count of the scan. Scan in this thread when None or 1. Defaults to None.
+        cache (DirectoryCache, optional): Release listings. Defaults to DEFAULT_CACHE.
+
+    Returns:
+        dict: Index. Release states are resolved again for every shot, so new releases show up.
+    """
+    previousShots = (index or {}).get('shots', {})
+    shots = {}
+    toScan = []
+    for path in ma_edit.getMayaAsciiFiles(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        key = _getShotKey(path)
+        shots[key] = {'mtime': stat.st_mtime, 'size': stat.st_size}
+        previous = previousShots.get(key)
+        if previous and previous['mtime'] == stat.st_mtime and previous['size'] == stat.st_size:
+            shots[key]['references'] = previous['references']
+        else:
+            toScan.append(key)
+
+    if workers and workers > 1 and len(toScan) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            scanned = list(executor.map(scanReferences, toScan))
+    else:
+        scanned = [scanReferences(path) for path in toScan]
+    for key, references in zip(toScan, scanned):
+        shots[key]['references'] = references
+
+    for shot in shots.values():
+        shot['assets'] = dict(
+            (resolved['refNode'] or resolved['path'], resolved) for resolved in resolveReferences(shot['references'], cache)
+        )
+    return {'version': INDEX_VERSION, 'shots': shots}
+
+
+def getOutdated(index):
+    """Outdated references of the index.
+
+    Returns:
+        list: (shotPath, refNode, asset dict) sorted by shot and reference node.
+    """
+    outdated = []
+    for shotPath, shot in sorted(index['shots'].items()):
+        for refNode, asset in sorted(shot['assets'].items()):
+            if asset['outdated']:
+                outdated.append((shotPath, refNode, asset))
+    return outdated
+
+
+def loadIndex(path):
+    """Index saved by saveIndex(). None when the file is missing or of another version."""
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r') as f:
+        index = json.load(f)
+    return index if index.get('version') == INDEX_VERSION else None
+
+
+def saveIndex(index, path):
+    with open(path, 'w') as f:
+        json.dump(index, f, indent=4, sort_keys=True)
+
+
+def updateIndex(paths, indexPath, workers=None, cache=None):
+    """Build the index of the paths on top of the saved index and save it."""
+    index = buildIndex(paths, loadIndex(indexPath), workers, cache)
+    saveIndex(index, indexPath)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m takTools.utils.ma_ref_index', description='Index the asset references of Maya ASCII shots.')
+    parser.add_argument('paths', nargs='+', help='.ma files or shot directories')
+    parser.add_argument('--index', help='Index json to update. Defaults to {} in the first directory'.format(INDEX_FILE_NAME))
+    parser.add_argument('-j', '--workers', type=int, default=SCAN_WORKERS, help='Thread count')
+    parser.add_argument('--outdated', action='store_true', help='Print the references that have a newer release')
+    args = parser.parse_args(argv)
+
+    indexPath = args.index
+    if not indexPath:
+        directories = [path for path in args.paths if os.path.isdir(path)]
+        if not directories:
+            parser.error('Use --index when no directory is given.')
+        indexPath = os.path.join(directories[0], INDEX_FILE_NAME)
+
+    index = updateIndex(args.paths, indexPath, args.workers)
+    print('{} shots indexed to {}'.format(len(index['shots']), indexPath))
+    if args.outdated:
+        outdated = getOutdated(index)
+        for shotPath, refNode, asset in outdated:
+            print('{}  {}  {} -> {}'.format(shotPath, refNode, asset['current'], asset['latest']))
+        print('{} outdated references'.format(len(outdated)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,19 @@
 import re
 
 import maya.api.OpenMaya as om
+import numpy as np
 
 import pymel.core as pm
 from maya import cmds, mel
 
+from . import api_undo
 from . import globalUtil
 from . import name as nameUtil
 from . import vector as vectorUtil
 from . import material as matUtil
+from . import mesh_query
+from . import spatial_index
+from . import symmetry
 from .decorators import printElapsedTime
 
 
@@ -156,83 +161,48 @@ def getFarthestVertexPoint(mesh, point):
     return farthestVertexPoint
 
 
-def getClosestVertices(source, target):
+def getClosestVertices(source, target, asNames=False):
     """Get closest vertices of target mesh from source mesh.
 
+    The closest vertex is the nearest vertex of the target face under each source vertex.
+
     Args:
         source (str): Source mesh name.
         target (str): Target mesh name.
+        asNames (bool, optional): Return target vertex names instead of arrays. Defaults to False.
 
     Returns:
-        list: Closest target vertices name.
+        tuple: (target vertex indices, distances) per source vertex, or a list of target vertex names.
     """
-    srcDagPath = globalUtil.getDagPath(source)
-    trgDagPath = globalUtil.getDagPath(target)
-
-    srcVtxIt = om.MItMeshVertex(srcDagPath)
-    trgMeshFn = om.MFnMesh(trgDagPath)
-
-    closestVerticesId = []
-    while not srcVtxIt.isDone():
-        srcVtxWsPnt = srcVtxIt.position(om.MSpace.kWorld)
-
-        result = trgMeshFn.getClosestPoint(srcVtxWsPnt, om.MSpace.kWorld)  # result is (closestPointID, faceID)
-        trgVtxIds = trgMeshFn.getPolygonVertices(result[1])
-        closestTrgVtxId = None
-        minDist = 99999999.0
-
-        for trgVtxId in trgVtxIds:
-            vtxWsPos = trgMeshFn.getPoint(trgVtxId, om.MSpace.kWorld)
-            trgVtxToSrcVtxDist = vtxWsPos.distanceTo(srcVtxWsPnt)
-
-            if trgVtxToSrcVtxDist < 0.00001:
-                closestTrgVtxId = trgVtxId
-                break
-
-            if trgVtxToSrcVtxDist < minDist:
-                minDist = trgVtxToSrcVtxDist
-                closestTrgVtxId = trgVtxId
-
-        closestVerticesId.append(closestTrgVtxId)
-
-        srcVtxIt.next()
+    srcPoints = spatial_index.getMeshPoints(source)
+    trgIndex = mesh_query.buildTriangleIndex(target)
+    vertexIds, distances = trgIndex.closestVertices(srcPoints)
 
-    closestVertices = [nameUtil.componentNameFromId(id, trgDagPath.partialPathName(), 'vertex') for id in closestVerticesId]
-    return closestVertices
+    if asNames:
+        return mesh_query.getVertexNames(target, vertexIds)
+    return vertexIds, distances
 
 
-def getOverlapVertices(source, target, searchDist=0.001):
+def getOverlapVertices(source, target, searchDist=0.001, asNames=False):
     """Get overlaped vertices of target mesh from source mesh.
 
     Args:
         source (str): Source mesh name.
         target (str): Target mesh name.
-        searchDist (float, optional): Search distance. Defaults to 0.1.
+        searchDist (float, optional): Maximum distance from target vertex to source surface. Defaults to 0.001.
+        asNames (bool, optional): Return target vertex names instead of arrays. Defaults to False.
 
     Returns:
-        list: Overlaped vertices name.
+        tuple: (overlaped target vertex indices, distances to source surface), or a list of overlaped vertex names.
     """
-    srcDagPath = globalUtil.getDagPath(source)
-    trgDagPath = globalUtil.getDagPath(target)
+    srcIndex = mesh_query.buildTriangleIndex(source)
+    trgPoints = spatial_index.getMeshPoints(target)
+    distances, triangleIds, _ = srcIndex.closestPoints(trgPoints, searchDist)
 
-    srcMeshFn = om.MFnMesh(srcDagPath)
-    trgGeoIt = om.MItGeometry(trgDagPath)
-
-    trgLocalToWorldMatrix = om.MFloatMatrix(trgDagPath.inclusiveMatrix())
-    overlapVerticesId = []
-    while not trgGeoIt.isDone():
-        trgVtxWsPnt = om.MFloatPoint(trgGeoIt.position()) * trgLocalToWorldMatrix
-        trgVtxWsNormal = om.MFloatVector(trgGeoIt.normal()) * trgLocalToWorldMatrix
-
-        results = srcMeshFn.closestIntersection(trgVtxWsPnt, trgVtxWsNormal, om.MSpace.kWorld, searchDist, True)
-        if results:
-            closestPnt = results[0]
-            if not closestPnt.isEquivalent(om.MFloatPoint.kOrigin):
-                overlapVerticesId.append(trgGeoIt.index())
-        trgGeoIt.next()
-
-    overlapVertices = [nameUtil.componentNameFromId(id, trgDagPath.partialPathName(), 'vertex') for id in overlapVerticesId]
-    return overlapVertices
+    vertexIds = np.flatnonzero(triangleIds >= 0)
+    if asNames:
+        return mesh_query.getVertexNames(target, vertexIds)
+    return vertexIds, distances[vertexIds]
 
 
 def resetPolygonDisplay(mesh):
@@ -402,73 +372,107 @@ def getFaceNormal(face):
     return pm.dt.Vector(faceNormal)
 
 
-def getVertexMap(mesh):
-    mesh = pm.PyNode(mesh)
+def getMeshArrays(mesh):
+    """Get object space points and face-vertex lists with single MFnMesh calls.
 
-    vertexMap = {}
-    leftVertices = []
-    rightVertices = []
-    centerVertices = []
-
-    for vtx in mesh.vtx:
-        vtxXPos = round(vtx.getPosition().x, 5)
-        if vtxXPos > 0:
-            leftVertices.append(vtx)
-        elif vtxXPos < 0:
-            rightVertices.append(vtx)
-        else:
-            centerVertices.append(vtx)
+    Returns:
+        tuple: ((n, 3) points, polygon counts, polygon connects) as numpy arrays.
+    """
+    fnMesh = om.MFnMesh(globalUtil.getDagPath(str(mesh)))
+    points = np.array(fnMesh.getPoints(om.MSpace.kObject), dtype=np.float64).reshape(-1, 4)[:, :3]
+    polygonCounts, polygonConnects = fnMesh.getVertices()
+    return points, np.array(polygonCounts, dtype=np.int32), np.array(polygonConnects, dtype=np.int32)
+
+
+def setMeshPoints(mesh, points):
+    """Set all object space points with a single MFnMesh.setPoints call as one undo step."""
+    fnMesh = om.MFnMesh(globalUtil.getDagPath(str(mesh)))
+    oldPoints = fnMesh.getPoints(om.MSpace.kObject)
+    newPoints = om.MPointArray([om.MPoint(point) for point in np.asarray(points).tolist()])
 
-    for lfVtx in leftVertices:
-        minDist = 100000
-        symVtx = None
-        lfVtxPos = lfVtx.getPosition()
-        symVtxPos = pm.dt.Vector(-lfVtxPos.x, lfVtxPos.y, lfVtxPos.z)
-        for rtVtx in rightVertices:
-            rtVtxPos = rtVtx.getPosition()
-            deltaDistance = (rtVtxPos - symVtxPos).length()
-            if deltaDistance < minDist:
-                minDist = deltaDistance
-                symVtx = rtVtx
+    def setPoints(meshPoints):
+        fnMesh.setPoints(meshPoints, om.MSpace.kObject)
+        fnMesh.updateSurface()
 
-        vertexMap['{0}'.format(lfVtx.split('.')[-1])] = symVtx.split('.')[-1]
+    api_undo.run(lambda: setPoints(newPoints), lambda: setPoints(oldPoints))
 
-    return vertexMap
+
+def getVertexMap(mesh, axis='x', tolerance=symmetry.TOLERANCE, useCache=True):
+    """Get the self symmetry map of a mesh.
+
+    Args:
+        mesh (str): Mesh name.
+        axis (str, optional): Mirror axis. Defaults to 'x'.
+        tolerance (float, optional): Position match tolerance in object space. Defaults to symmetry.TOLERANCE.
+        useCache (bool, optional): Reuse the map built for the same topology. Defaults to True.
+
+    Returns:
+        numpy.ndarray: int32 array of mirrored vertex index per vertex. Center vertices map to themselves, unmatched to -1.
+    """
+    points, polygonCounts, polygonConnects = getMeshArrays(mesh)
+
+    def build():
+        adjacency = symmetry.getAdjacency(len(points), polygonCounts, polygonConnects)
+        symMap = symmetry.buildSymmetryMap(points, axis=axis, tolerance=tolerance, adjacency=adjacency)
+        _warnUnmatched(mesh, symMap)
+        return symMap
+
+    if not useCache:
+        return build()
+    key = (symmetry.getTopologyHash(polygonCounts, polygonConnects), symmetry.getAxisIndex(axis), tolerance)
+    return symmetry.getCachedMap(key, build)
 
 
 def mirror(vertexMap, targetMesh, side='x'):
-    for leftVtx, rightVtx in vertexMap.items():
-        if side == 'x':
-            srcVtxPos = pm.pointPosition('{0}.{1}'.format(targetMesh, leftVtx), l=True)
-            targetVtx = '{0}.{1}'.format(targetMesh, rightVtx)
-        elif side == '-x':
-            srcVtxPos = pm.pointPosition('{0}.{1}'.format(targetMesh, rightVtx), l=True)
-            targetVtx = '{0}.{1}'.format(targetMesh, leftVtx)
+    """Mirror one side of targetMesh onto the other side.
 
-        pm.xform(targetVtx, os=True, t=[-srcVtxPos[0], srcVtxPos[1], srcVtxPos[2]])
+    Args:
+        vertexMap (numpy.ndarray): getVertexMap() result. A legacy {'vtx[l]': 'vtx[r]'} dict is also accepted.
+        targetMesh (str): Mesh to modify.
+        side (str, optional): 'x' copies +x onto -x and '-x' copies -x onto +x. Defaults to 'x'.
+    """
+    points = getMeshArrays(targetMesh)[0]
+
+    if isinstance(vertexMap, dict):
+        pairs = np.array([[int(re.search(r'\d+', vtx).group()) for vtx in item] for item in vertexMap.items()], dtype=np.int32).reshape(-1, 2)
+        vertexMap = np.full(len(points), -1, dtype=np.int32)
+        vertexMap[pairs[:, 0]] = pairs[:, 1]
+        vertexMap[pairs[:, 1]] = pairs[:, 0]
 
+    setMeshPoints(targetMesh, symmetry.applySelfMap(points, vertexMap, side))
 
-def getSymVertexMap(sourceMesh, symmetryMesh):
-    srcMesh = pm.PyNode(sourceMesh)
-    symMesh = pm.PyNode(symmetryMesh)
 
-    if len(srcMesh.vtx) != len(symMesh.vtx):
+def getSymVertexMap(sourceMesh, symmetryMesh, tolerance=symmetry.TOLERANCE, useCache=True):
+    """Map source mesh vertices to the symmetry mesh vertices at their mirrored positions.
+
+    Returns:
+        numpy.ndarray: int32 array of symmetry mesh vertex index per source vertex. Unmatched vertices are -1.
+    """
+    srcPoints, srcCounts, srcConnects = getMeshArrays(sourceMesh)
+    symPoints, symCounts, symConnects = getMeshArrays(symmetryMesh)
+
+    if len(srcPoints) != len(symPoints):
         pm.error('The number of vertices of symmetry mesh must be same as the number of vertices of the source mesh.')
 
-    symPoints = []
-    for srcVtx in srcMesh.vtx:
-        srcVtxPos = srcVtx.getPosition()
-        symPoint = pm.dt.Point(-srcVtxPos[0], srcVtxPos[1], srcVtxPos[2])
-        symPoints.append(symPoint)
+    def build():
+        symMap = symmetry.buildSymmetryMap(
+            srcPoints, symPoints, tolerance=tolerance,
+            adjacency=symmetry.getAdjacency(len(srcPoints), srcCounts, srcConnects),
+            targetAdjacency=symmetry.getAdjacency(len(symPoints), symCounts, symConnects),
+        )
+        _warnUnmatched(sourceMesh, symMap)
+        return symMap
 
-    symMeshVtxs = [vtx for vtx in symMesh.vtx]
-    symVtxMap = []
-    for symPoint in symPoints:
-        closestVtx = findClosestVtx(symPoint, symMeshVtxs)
-        symVtxMap.append(closestVtx.index())
-        symMeshVtxs.remove(closestVtx)
+    if not useCache:
+        return build()
+    key = (symmetry.getTopologyHash(srcCounts, srcConnects), symmetry.getTopologyHash(symCounts, symConnects), tolerance)
+    return symmetry.getCachedMap(key, build)
 
-    return symVtxMap
+
+def _warnUnmatched(mesh, symMap):
+    unmatchedCount = int((symMap < 0).sum())
+    if unmatchedCount:
+        pm.warning('{} vertices of "{}" have no symmetry vertex.'.format(unmatchedCount, mesh))
 
 
 def findClosestVtx(searchPoint, vertices):
@@ -484,13 +488,10 @@ def findClosestVtx(searchPoint, vertices):
 
 
 def symmeterizeMesh(targetVerticesMap, source, target):
-    source = pm.PyNode(source)
-    target = pm.PyNode(target)
-
-    for index, srcVtx in enumerate(source.vtx):
-        srcVtxPos = srcVtx.getPosition(space='object')
-        trgVtx = pm.PyNode('{}.vtx[{}]'.format(target, targetVerticesMap[index]))
-        trgVtx.setPosition((-srcVtxPos[0], srcVtxPos[1], srcVtxPos[2]), space='object')
+    """Set target vertices to the mirrored source positions with getSymVertexMap() result."""
+    sourcePoints = getMeshArrays(source)[0]
+    targetPoints = getMeshArrays(target)[0]
+    setMeshPoints(target, symmetry.applyMap(sourcePoints, targetPoints, np.asarray(targetVerticesMap, dtype=np.int32)))
 
 
 def getDeformedMeshes():
@@ -0,0 +1,246 @@
+"""
+Batch closest point queries against triangle meshes.
+
+TriangleIndex is built once per mesh and answers closest point queries for whole point arrays.
+Triangles are bucketed by size and each bucket keeps a spatial_index over the triangle centroids,
+so a query only tests the triangles whose bounding sphere can reach the search distance.
+Results are index/distance arrays. Use getVertexNames() only when component names are needed.
+
+Only getMeshTriangles(), buildTriangleIndex() and getVertexNames() need Maya.
+"""
+
+import numpy as np
+
+from . import spatial_index
+
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+
+CHUNK_SIZE = 4096
+
+
+class TriangleIndex(object):
+    def __init__(self, points, triangles, triangleFaces=None, faceIndptr=None, faceVertices=None):
+        """
+        Args:
+            points (array_like): (n, 3) vertex positions.
+            triangles (array_like): (t, 3) vertex indices per triangle.
+            triangleFaces (array_like, optional): Face index per triangle. Defaults to the triangle index.
+            faceIndptr (array_like, optional): CSR offsets of face vertices. Defaults to the triangles.
+            faceVertices (array_like, optional): CSR face vertices. Defaults to the triangles.
+        """
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.triangleFaces = np.arange(len(self.triangles)) if triangleFaces is None else np.asarray(triangleFaces, dtype=np.int64)
+        if faceIndptr is None:
+            faceIndptr = np.arange(0, len(self.triangles) * 3 + 1, 3)
+            faceVertices = self.triangles.ravel()
+        self.faceIndptr = np.asarray(faceIndptr, dtype=np.int64)
+        self.faceVertices = np.asarray(faceVertices, dtype=np.int64)
+
+        corners = self.points[self.triangles]
+        centroids = corners.mean(axis=1)
+        radii = np.linalg.norm(corners - centroids[:, None], axis=2).max(axis=1)
+
+        # Only vertices used by triangles give an upper bound of the surface distance
+        self._usedVertices = np.unique(self.triangles)
+        self._vertexIndex = spatial_index.SpatialIndex(self.points[self._usedVertices])
+
+        # Bucket triangles by power of two radius so a few large triangles don't widen every search
+        self._buckets = []
+        if not len(self.triangles):
+            return
+        bucketIds = np.floor(np.log2(np.maximum(radii, 1e-12))).astype(np.int64)
+        for bucketId in np.unique(bucketIds):
+            triangleIds = np.flatnonzero(bucketIds == bucketId)
+            self._buckets.append((spatial_index.SpatialIndex(centroids[triangleIds]), triangleIds, radii[triangleIds].max()))
+
+    def closestPoints(self, queryPoints, maxDistance=np.inf):
+        """Find the closest surface point for each query point.
+
+        Args:
+            queryPoints (array_like): (m, 3) points.
+            maxDistance (float, optional): Ignore surfaces farther than this. Defaults to np.inf.
+
+        Returns:
+            tuple: (distances, triangleIds, closestPoints). Points without a surface in maxDistance have inf distance and triangle -1.
+        """
+        queryPoints = np.asarray(queryPoints, dtype=np.float64).reshape(-1, 3)
+        distances = np.full(len(queryPoints), np.inf)
+        triangleIds = np.full(len(queryPoints), -1, dtype=np.int64)
+        closestPoints = np.zeros_like(queryPoints)
+        if not len(self.triangles):
+            return distances, triangleIds, closestPoints
+
+        for start in range(0, len(queryPoints), CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            distances[chunk], triangleIds[chunk], closestPoints[chunk] = self._closestPointsChunk(queryPoints[chunk], maxDistance)
+
+        return distances, triangleIds, closestPoints
+
+    def closestVertices(self, queryPoints, maxDistance=np.inf):
+        """Find the closest vertex of the face under the closest surface point.
+
+        Returns:
+            tuple: (vertexIds, distances). Points without a surface in maxDistance have vertex -1 and inf distance.
+        """
+        queryPoints = np.asarray(queryPoints, dtype=np.float64).reshape(-1, 3)
+        _, triangleIds, _ = self.closestPoints(queryPoints, maxDistance)
+
+        vertexIds = np.full(len(queryPoints), -1, dtype=np.int64)
+        distances = np.full(len(queryPoints), np.inf)
+        found = np.flatnonzero(triangleIds >= 0)
+        if not len(found):
+            return vertexIds, distances
+
+        faces = self.triangleFaces[triangleIds[found]]
+        starts = self.faceIndptr[faces]
+        counts = self.faceIndptr[faces + 1] - starts
+        columns = np.arange(counts.max())
+        isValid = columns < counts[:, None]
+        faceVertices = self.faceVertices[np.where(isValid, starts[:, None] + columns, starts[:, None])]
+
+        vertexDistances = np.linalg.norm(self.points[faceVertices] - queryPoints[found, None], axis=2)
+        vertexDistances[~isValid] = np.inf
+        nearest = vertexDistances.argmin(axis=1)
+        vertexIds[found] = faceVertices[np.arange(len(found)), nearest]
+        distances[found] = vertexDistances[np.arange(len(found)), nearest]
+        return vertexIds, distances
+
+    def _closestPointsChunk(self, queryPoints, maxDistance):
+        # The nearest vertex bounds the surface distance from above
+        upperBounds, _ = self._vertexIndex.query(queryPoints, k=1, distanceUpperBound=maxDistance)
+        upperBounds = np.minimum(upperBounds, maxDistance)
+
+        distances = np.full(len(queryPoints), np.inf)
+        triangleIds = np.full(len(queryPoints), -1, dtype=np.int64)
+        closestPoints = np.zeros_like(queryPoints)
+
+        for centroidIndex, bucketTriangleIds, maxRadius in self._buckets:
+            candidates = centroidIndex.queryRadius(queryPoints, upperBounds + maxRadius)
+            counts = np.array([len(item) for item in candidates])
+            if not counts.sum():
+                continue
+
+            queryIds = np.repeat(np.arange(len(queryPoints)), counts)
+            candidateTriangles = bucketTriangleIds[np.concatenate(candidates)]
+            points = closestPointsOnTriangles(queryPoints[queryIds], self.points[self.triangles[candidateTriangles]])
+            candidateDistances = np.linalg.norm(points - queryPoints[queryIds], axis=1)
+
+            # Closest candidate per query
+            order = np.lexsort((candidateDistances, queryIds))
+            firsts = order[np.unique(queryIds[order], return_index=True)[1]]
+            isCloser = candidateDistances[firsts] < distances[queryIds[firsts]]
+            firsts = firsts[isCloser & (candidateDistances[firsts] <= maxDistance)]
+
+            distances[queryIds[firsts]] = candidateDistances[firsts]
+            triangleIds[queryIds[firsts]] = candidateTriangles[firsts]
+            closestPoints[queryIds[firsts]] = points[firsts]
+
+        return distances, triangleIds, closestPoints
+
+
+def _dot(a, b):
+    return np.einsum('ij,ij->i', a, b)
+
+
+def closestPointsOnTriangles(points, corners):
+    """Closest point on each triangle to each point, by Voronoi regions of the triangle.
+
+    Args:
+        points (numpy.ndarray): (m, 3) points.
+        corners (numpy.ndarray): (m, 3, 3) triangle corner positions.
+
+    Returns:
+        numpy.ndarray: (m, 3) closest points.
+    """
+    a, b, c = corners[:, 0], corners[:, 1], corners[:, 2]
+    ab = b - a
+    ac = c - a
+    ap = points - a
+    bp = points - b
+    cp = points - c
+
+    d1, d2 = _dot(ab, ap), _dot(ac, ap)
+    d3, d4 = _dot(ab, bp), _dot(ac, bp)
+    d5, d6 = _dot(ab, cp), _dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = va + vb + vc
+        result = a + ab * (vb / denom)[:, None] + ac * (vc / denom)[:, None]
+
+        # Regions in reverse priority so the earlier tests win
+        isBC = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        result = np.where(isBC[:, None], b + (c - b) * t[:, None], result)
+
+        isAC = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        t = d2 / (d2 - d6)
+        result = np.where(isAC[:, None], a + ac * t[:, None], result)
+
+        result = np.where(((d6 >= 0) & (d5 <= d6))[:, None], c, result)
+
+        isAB = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        t = d1 / (d1 - d3)
+        result = np.where(isAB[:, None], a + ab * t[:, None], result)
+
+        result = np.where(((d3 >= 0) & (d4 <= d3))[:, None], b, result)
+        result = np.where(((d1 <= 0) & (d2 <= 0))[:, None], a, result)
+
+    # Degenerate triangles fall back to the nearest corner
+    isInvalid = ~np.isfinite(result).all(axis=1)
+    if isInvalid.any():
+        cornerDistances = np.linalg.norm(corners[isInvalid] - points[isInvalid, None], axis=2)
+        result[isInvalid] = corners[isInvalid, cornerDistances.argmin(axis=1)]
+    return result
+
+
+def getMeshTriangles(mesh, space=None):
+    """Get triangulated mesh data with single MFnMesh calls.
+
+    Args:
+        mesh (str): Mesh name.
+        space (int, optional): om.MSpace constant. Defaults to om.MSpace.kWorld.
+
+    Returns:
+        tuple: (points, triangles, triangleFaces, faceIndptr, faceVertices) as numpy arrays.
+    """
+    selLs = om.MSelectionList()
+    selLs.add(str(mesh))
+    fnMesh = om.MFnMesh(selLs.getDagPath(0))
+
+    points = np.array(fnMesh.getPoints(om.MSpace.kWorld if space is None else space), dtype=np.float64).reshape(-1, 4)[:, :3]
+    triangleCounts, triangleVertices = fnMesh.getTriangles()
+    polygonCounts, polygonConnects = fnMesh.getVertices()
+
+    triangleFaces = np.repeat(np.arange(len(triangleCounts)), np.array(triangleCounts, dtype=np.int64))
+    faceIndptr = np.concatenate([[0], np.cumsum(np.array(polygonCounts, dtype=np.int64))])
+    return points, np.array(triangleVertices, dtype=np.int64).reshape(-1, 3), triangleFaces, faceIndptr, np.array(polygonConnects, dtype=np.int64)
+
+
+def buildTriangleIndex(mesh, space=None):
+    return TriangleIndex(*getMeshTriangles(mesh, space))
+
+
+def getVertexNames(mesh, vertexIds, fullPath=False):
+    """Get vertex component names for vertex indices.
+
+    Args:
+        mesh (str): Mesh name.
+        vertexIds (array_like): Vertex indices.
+        fullPath (bool, optional): Use the full dag path instead of the partial path. Defaults to False.
+
+    Returns:
+        list: Vertex names.
+    """
+    selLs = om.MSelectionList()
+    selLs.add(str(mesh))
+    dagPath = selLs.getDagPath(0)
+    meshName = dagPath.fullPathName() if fullPath else dagPath.partialPathName()
+    return ['{}.vtx[{}]'.format(meshName, vertexId) for vertexId in np.asarray(vertexIds).tolist()]
@@ -0,0 +1,71 @@
+"""
+Math kernel of the rampBlendShape plug-in node.
+
+The weight ramp is sampled once into a lookup table and every vertex weight is looked up from it
+with linear interpolation, then all weighted deltas are added in one pass.
+Kept free of Maya so it can be benchmarked standalone. See benchmarks/ramp_blend_bench.py.
+"""
+
+import numpy as np
+
+
+LUT_SIZE = 1024
+
+
+def sampleRamp(getValueAtPosition, size=LUT_SIZE):
+    """Sample a ramp evenly over [0, 1].
+
+    Args:
+        getValueAtPosition (callable): Returns the ramp value at a position, e.g. MRampAttribute.getValueAtPosition.
+        size (int, optional): Sample count. Defaults to LUT_SIZE.
+
+    Returns:
+        numpy.ndarray: (size,) ramp values.
+    """
+    return np.array([getValueAtPosition(position) for position in np.linspace(0.0, 1.0, size).tolist()], dtype=np.float64)
+
+
+def getRampWeights(positions, center, range, lut):
+    """Ramp weight per position. The ramp spans [center - range, center + range] and is zero outside of it.
+
+    Args:
+        positions (numpy.ndarray): (V,) positions along the ramp axis.
+        center (float): Ramp center.
+        range (float): Half width of the ramp.
+        lut (numpy.ndarray): sampleRamp() result.
+
+    Returns:
+        numpy.ndarray: (V,) weights.
+    """
+    normalized = (np.asarray(positions, dtype=np.float64) - (center - range)) / (2.0 * range)
+    inRange = (normalized >= 0.0) & (normalized <= 1.0)
+
+    indices = normalized[inRange] * (len(lut) - 1)
+    lower = np.minimum(indices.astype(np.int64), len(lut) - 2) if len(lut) > 1 else np.zeros(len(indices), dtype=np.int64)
+    fraction = indices - lower
+
+    weights = np.zeros(len(normalized))
+    if len(lut) > 1:
+        weights[inRange] = lut[lower] * (1.0 - fraction) + lut[lower + 1] * fraction
+    else:
+        weights[inRange] = lut[0] if len(lut) else 0.0
+    return weights
+
+
+def rampBlend(basePoints, deltas, center, range, lut, envelope=1.0, axis=0):
+    """Add deltas scaled by the ramp weight at each base point position.
+
+    Args:
+        basePoints (numpy.ndarray): (V, 3) base points.
+        deltas (numpy.ndarray): (V, 3) target - base deltas.
+        center (float): Ramp center.
+        range (float): Half width of the ramp.
+        lut (numpy.ndarray): sampleRamp() result.
+        envelope (float, optional): Global weight. Defaults to 1.0.
+        axis (int, optional): Ramp axis. Defaults to 0.
+
+    Returns:
+        numpy.ndarray: (V, 3) output points.
+    """
+    weights = getRampWeights(basePoints[:, axis], center, range, lut) * envelope
+    return basePoints + deltas * weights[:, None]
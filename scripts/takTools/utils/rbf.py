@@ -0,0 +1,158 @@
+"""
+Reference implementation of the takRBF node on numpy arrays.
+
+Values at the targets are interpolated at a pose by
+phi(pose, targets) @ A^-1 @ values, with A = phi(targets, targets).
+A only depends on the targets, basis function and smoothness, so it is factorized once and reused
+for every pose like the cached solver of the node. Several poses are solved in one call.
+See benchmarks/rbf_bench.py.
+"""
+
+import numpy as np
+
+try:
+    import scipy.linalg as sla
+except ImportError:
+    sla = None
+
+
+GAUSSIAN = 0
+MULTI_QUADRATIC = 1
+INVERSE_MULTI_QUADRATIC = 2
+BASIS_FUNCTIONS = ['gaussian', 'multiQuadratic', 'inverseMultiQuadratic']  # takRBF.basisFunc enum order
+SMOOTHNESS = 3.0
+
+
+def basis(distances, basisFunc=GAUSSIAN, smoothness=SMOOTHNESS):
+    """Radial basis function of distances.
+
+    Args:
+        distances (numpy.ndarray): Distances of any shape.
+        basisFunc (int or str, optional): Index or name in BASIS_FUNCTIONS. Defaults to GAUSSIAN.
+        smoothness (float, optional): Defaults to SMOOTHNESS.
+
+    Returns:
+        numpy.ndarray: Basis values with the shape of distances.
+    """
+    if isinstance(basisFunc, str):
+        basisFunc = BASIS_FUNCTIONS.index(basisFunc)
+
+    squaredDistances = np.square(np.asarray(distances, dtype=np.float64))
+    if basisFunc == GAUSSIAN:
+        return np.exp(-squaredDistances / smoothness ** 2)
+    elif basisFunc == MULTI_QUADRATIC:
+        return np.sqrt(squaredDistances + smoothness ** 2)
+    elif basisFunc == INVERSE_MULTI_QUADRATIC:
+        return 1.0 / np.sqrt(squaredDistances + smoothness ** 2)
+    raise ValueError('Unknown basis function: {}'.format(basisFunc))
+
+
+def getDistances(points, targets):
+    """(P, N) distances between points and targets."""
+    points = np.asarray(points, dtype=np.float64).reshape(len(points), -1)
+    targets = np.asarray(targets, dtype=np.float64).reshape(len(targets), -1)
+    return np.linalg.norm(points[:, None, :] - targets[None, :, :], axis=2)
+
+
+class RBFSolver(object):
+    """Interpolate values defined at targets.
+
+    The distance matrix factorization is kept until targets, basis function or smoothness change.
+
+    Args:
+        targets (numpy.ndarray): (N, D) target positions.
+        basisFunc (int or str, optional): Index or name in BASIS_FUNCTIONS. Defaults to GAUSSIAN.
+        smoothness (float, optional): Defaults to SMOOTHNESS.
+
+    Examples:
+        solver = RBFSolver(targets, 'gaussian', 3.0)
+        weights = solver.getWeights(poses)
+        colors = solver.interpolate(poses, targetColors)
+    """
+
+    def __init__(self, targets, basisFunc=GAUSSIAN, smoothness=SMOOTHNESS):
+        self._targets = None
+        self._basisFunc = basisFunc
+        self._smoothness = smoothness
+        self._factor = None
+        self.targets = targets
+
+    @property
+    def targets(self):
+        return self._targets
+
+    @targets.setter
+    def targets(self, targets):
+        targets = np.asarray(targets, dtype=np.float64)
+        self._targets = targets.reshape(len(targets), -1)
+        self._factor = None
+
+    @property
+    def basisFunc(self):
+        return self._basisFunc
+
+    @basisFunc.setter
+    def basisFunc(self, basisFunc):
+        self._basisFunc = basisFunc
+        self._factor = None
+
+    @property
+    def smoothness(self):
+        return self._smoothness
+
+    @smoothness.setter
+    def smoothness(self, smoothness):
+        self._smoothness = smoothness
+        self._factor = None
+
+    def getDistanceMatrix(self):
+        return basis(getDistances(self._targets, self._targets), self._basisFunc, self._smoothness)
+
+    def _solve(self, rhs):
+        """Solve A x = rhs with the cached factorization."""
+        if self._factor is None:
+            matrix = self.getDistanceMatrix()
+            # Multi quadratic matrix is not positive definite so LU is used for all basis functions
+            self._factor = sla.lu_factor(matrix, check_finite=False) if sla else matrix
+        if sla:
+            return sla.lu_solve(self._factor, rhs, check_finite=False)
+        return np.linalg.solve(self._factor, rhs)
+
+    def getWeights(self, poses):
+        """Weight of every target at each pose, the outWeight of the node.
+
+        Args:
+            poses (numpy.ndarray): (P, D) or (D,) poses.
+
+        Returns:
+            numpy.ndarray: (P, N) weights, or (N,) for a single pose.
+        """
+        poses = np.asarray(poses, dtype=np.float64)
+        isSingle = poses.ndim == 1
+        poses = poses.reshape(-1, self._targets.shape[1])
+
+        if not len(self._targets):
+            weights = np.zeros((len(poses), 0))
+        else:
+            # A is symmetric so phi @ A^-1 == (A^-1 @ phi^T)^T
+            weights = self._solve(basis(getDistances(poses, self._targets), self._basisFunc, self._smoothness).T).T
+        return weights[0] if isSingle else weights
+
+    def interpolate(self, poses, values):
+        """Interpolate values at poses, the outColor and outMatrix of the node.
+
+        Args:
+            poses (numpy.ndarray): (P, D) or (D,) poses.
+            values (numpy.ndarray): (N, ...) value per target, e.g. (N, 3) colors or (N, 4, 4) matrices.
+
+        Returns:
+            numpy.ndarray: (P, ...) values, or (...) for a single pose.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) != len(self._targets):
+            raise ValueError('Value count {} does not match target count {}'.format(len(values), len(self._targets)))
+
+        weights = self.getWeights(poses)
+        result = np.atleast_2d(weights) @ values.reshape(len(values), -1)
+        result = result.reshape((-1,) + values.shape[1:])
+        return result[0] if weights.ndim == 1 else result
@@ -0,0 +1,125 @@
+"""
+Shelf data of Tak Tools without Maya.
+
+Shelf json files are parsed once and parsed again only when their mtime or size changes,
+and a shelf file is written only when its contents change, so the files that were not edited keep their cache.
+diffShelfButtons() gives the few button edits that turn a built shelf into new shelf button infos,
+so the shelf GUI is updated in place of being deleted and created again.
+Buttons added in the middle of a shelf are created at its end and moved to their position.
+
+Usage:
+    shelfInfo = shelf_model.readShelfFile('data/shelves/Common.json')
+    deleted, edits, created = shelf_model.diffShelfButtons(oldInfos, shelfInfo['shelfButtonInfos'])
+"""
+
+import copy
+import difflib
+import json
+import os
+from collections import OrderedDict
+
+
+BUTTON_FLAGS = ('label', 'annotation', 'image1', 'imageOverlayLabel', 'command', 'sourceType', 'noDefaultPopup')
+CREATE_ONLY_FLAGS = ('noDefaultPopup',)
+
+_fileCache = {}
+
+
+def _getFileStamp(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def readShelfFile(path):
+    """Shelf info of a json file, parsed again only when the file changes.
+
+    Returns:
+        OrderedDict: A copy of the cached info. Shelf button infos are shared with the cache and are not to be changed.
+    """
+    key = os.path.normpath(path)
+    stamp = _getFileStamp(path)
+    cached = _fileCache.get(key)
+    if cached is None or cached[0] != stamp:
+        with open(path, 'r') as f:
+            shelfInfo = json.load(f, object_pairs_hook=OrderedDict)
+        cached = (stamp, shelfInfo)
+        _fileCache[key] = cached
+    return OrderedDict(cached[1])
+
+
+def writeShelfFile(path, shelfInfo):
+    """Write a shelf info unless the file already has it.
+
+    Returns:
+        bool: True when the file was written.
+    """
+    key = os.path.normpath(path)
+    try:
+        if readShelfFile(path) == shelfInfo:
+            return False
+    except (IOError, OSError, ValueError):
+        pass
+
+    with open(path, 'w') as f:
+        json.dump(shelfInfo, f, indent=4)
+    _fileCache[key] = (_getFileStamp(path), copy.deepcopy(shelfInfo))
+    return True
+
+
+def clearCache():
+    _fileCache.clear()
+
+
+def getButtonKey(shelfButtonInfo):
+    return tuple(shelfButtonInfo.get(flag) for flag in BUTTON_FLAGS)
+
+
+def getChangedFlags(oldInfo, newInfo):
+    """{flag: new value} of the editable flags that differ. None values are given as empty strings."""
+    changes = {}
+    for flag in BUTTON_FLAGS:
+        if flag in CREATE_ONLY_FLAGS:
+            continue
+        value = newInfo.get(flag)
+        if value != oldInfo.get(flag):
+            changes[flag] = '' if value is None else value
+    return changes
+
+
+def diffShelfButtons(oldInfos, newInfos):
+    """Button edits that turn the buttons of the old infos into the buttons of the new infos.
+
+    Removed runs of buttons are deleted and added runs are created, so the buttons around them are kept as they are.
+    A replaced run edits its buttons in place and deletes or creates the buttons left over.
+
+    Args:
+        oldInfos (list): Shelf button infos of the built buttons.
+        newInfos (list): Shelf button infos to show.
+
+    Returns:
+        tuple: Sorted old indices to delete, [(old index, {flag: value})] to edit
+            and [(new index, new info)] to create, sorted by new index.
+    """
+    # Equal infos skip building the keys
+    if oldInfos == newInfos:
+        return [], [], []
+    oldKeys = [getButtonKey(info) for info in oldInfos]
+    newKeys = [getButtonKey(info) for info in newInfos]
+    if oldKeys == newKeys:
+        return [], [], []
+    matcher = difflib.SequenceMatcher(None, oldKeys, newKeys, autojunk=False)
+
+    deleted = []
+    edits = []
+    created = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        count = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+        for oldIndex, newIndex in zip(range(i1, i1 + count), range(j1, j1 + count)):
+            changes = getChangedFlags(oldInfos[oldIndex], newInfos[newIndex])
+            if changes:
+                edits.append((oldIndex, changes))
+        deleted.extend(range(i1 + count, i2))
+        created.extend((newIndex, newInfos[newIndex]) for newIndex in range(j1 + count, j2))
+    return deleted, edits, created
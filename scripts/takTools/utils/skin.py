@@ -1,6 +1,9 @@
 import os
 import maya.OpenMaya as om
 import maya.OpenMayaAnim as oma
+import maya.api.OpenMaya as om2
+import maya.api.OpenMayaAnim as oma2
+import numpy as np
 
 import pymel.core as pm
 from maya import cmds, mel
@@ -9,8 +12,13 @@ from importlib import reload
 from . import globalUtil; reload(globalUtil)
 from . import mesh as meshUtil; reload(meshUtil)
 from . import bifrost as bfUtil; reload(bfUtil)
+from . import skin_io; reload(skin_io)
+from . import api_undo
+from . import weight_smooth
+from . import weight_hygiene
 from ..rigging import bSkinSaver as bsk
 from ..rigging import sculptSkinAPI as ssAPI
+from .decorators import printElapsedTime
 
 
 def removeLockWeightsInputConnection(joints=[]):
@@ -168,7 +176,7 @@ def copySkinSets(sourceSkinMesh, targetSets):
     cmds.select(cl=True)
 
 def copySkinOverlapVertices(sourceSkinMesh, targetMesh, searchDistance=0.001):
-    overlapVtxs = meshUtil.getOverlapVertices(sourceSkinMesh, targetMesh, searchDistance)
+    overlapVtxs = meshUtil.getOverlapVertices(sourceSkinMesh, targetMesh, searchDistance, asNames=True)
     if not overlapVtxs:
         cmds.warning('No overlap vertices found between "{}" and "{}". Increase search distance then try again.'.format(sourceSkinMesh, targetMesh))
         return
@@ -446,9 +454,7 @@ def exportSkin(mesh, outputDir):
 def importSkin(skinFile):
     removeLockWeightsInputConnection()
 
-    with open(skinFile, 'r') as f:
-        fContents = f.readlines()
-        mesh = fContents[0].strip('\n')
+    mesh = skin_io.readMeshNames(skinFile)[0]
     if not cmds.objExists(mesh):
         print('"{}" is not exists. Skip importing skin weights.'.format(mesh))
         return False
@@ -456,33 +462,314 @@ def importSkin(skinFile):
     bsk.bLoadSkinValues(True, skinFile)
 
 
-def pruneSkinInfluences(mesh, skinClst, maxInfs):
-    if cmds.nodeType(mesh) == 'transform':
-        mesh = cmds.listRelatives(mesh, shapes=True, ni=True)[0]
+def getSkinClusterFn(geo):
+    skinClst = mel.eval('findRelatedSkinCluster("{}");'.format(geo))
+    if not skinClst:
+        return None
+    return oma2.MFnSkinCluster(om2.MSelectionList().add(skinClst).getDependNode(0))
 
-    vertCount = cmds.polyEvaluate(mesh, vertex=True)
 
-    cmds.progressBar('progBar', e=True, min=0, max=vertCount)
+def getCompleteVertexComponents(meshDagPath):
+    fnComp = om2.MFnSingleIndexedComponent()
+    components = fnComp.create(om2.MFn.kMeshVertComponent)
+    fnComp.setCompleteData(om2.MFnMesh(meshDagPath).numVertices)
+    return components
 
-    resultMeshWeights = []
-    for i in range(vertCount):
-        vert = '{}.vtx[{}]'.format(mesh, i)
-        infs = cmds.skinPercent(skinClst, vert, q=True, transform=None)
-        weights = cmds.skinPercent(skinClst, vert, q=True, v=True)
-        infWeightMap = dict(zip(infs, weights))
 
-        sortedItems = sorted(infWeightMap.items(), key=lambda item: item[1], reverse=True)
-        prunedItems = sortedItems[:maxInfs] + [(jnt, 0.0) for jnt, w in sortedItems[maxInfs:]]
+def getSkinWeights(mesh):
+    """Get weights of all vertices with a single getWeights call.
 
-        totalWeight = sum([item[1] for item in prunedItems])
-        prunedItemsNormalizedMap = dict([(jnt, weight/totalWeight) for jnt, weight in prunedItems])
+    Args:
+        mesh (str): Skinned mesh.
+
+    Returns:
+        tuple: Skin cluster name, influence names and (vertexCount, influenceCount) weights array.
+            None if the mesh isn't skinned.
+    """
+    fnSkinCluster = getSkinClusterFn(mesh)
+    if not fnSkinCluster:
+        return None
+
+    meshDagPath = globalUtil.getDagPath(mesh)
+    meshDagPath.extendToShape()
+    weights, infCount = fnSkinCluster.getWeights(meshDagPath, getCompleteVertexComponents(meshDagPath))
+    influences = [om2.MFnDagNode(infDagPath).name() for infDagPath in fnSkinCluster.influenceObjects()]
+
+    return fnSkinCluster.name(), influences, np.array(weights, dtype=np.float64).reshape(-1, infCount)
+
+
+def getSkinHash(mesh):
+    """Content hash of the bound weights comparable to the hash in a skin manifest."""
+    skinData = getSkinWeights(mesh)
+    if not skinData:
+        return None
+    _, influences, weights = skinData
+    influences = [influence.split(':')[-1] for influence in influences]
+    return skin_io.contentHash(skin_io.MeshWeights.fromDense(mesh, influences, weights))
+
+
+def exportSkins(meshes, outputDir, ext=skin_io.BINARY_EXT, workers=None):
+    """Export skin weights of meshes to outputDir with a manifest.
+
+    Weights are pulled from Maya on the main thread then compressed and written on a thread pool.
+
+    Args:
+        meshes (list): Skinned meshes.
+        outputDir (str): Output directory.
+        ext (str, optional): Skin file extension. Defaults to skin_io.BINARY_EXT.
+        workers (int, optional): Thread count. Defaults to None.
+
+    Returns:
+        str: Manifest file path.
+    """
+    meshesData = []
+    for mesh in meshes:
+        skinData = getSkinWeights(mesh)
+        if not skinData:
+            print('"{}" has no skin cluster. Skip exporting skin weights.'.format(mesh))
+            continue
+        _, influences, weights = skinData
+        meshesData.append((mesh, [influence.split(':')[-1] for influence in influences], weights))
+
+    return skin_io.writeBatch(outputDir, meshesData, ext, workers)
+
+
+@printElapsedTime
+def importSkins(skinDirectory, namespace='', force=False, workers=None):
+    """Import skin weights listed in the manifest of skinDirectory.
+
+    Files are decoded on a thread pool and applied on the main thread.
+    Meshes already bound with the same weights are skipped unless force is True.
+
+    Args:
+        skinDirectory (str): Directory that has a manifest written by exportSkins().
+        namespace (str, optional): Namespace prefix for the influences. Defaults to ''.
+        force (bool, optional): Apply weights even if the hash matches. Defaults to False.
+        workers (int, optional): Thread count. Defaults to None.
+
+    Returns:
+        list: Meshes the weights are applied.
+    """
+    removeLockWeightsInputConnection()
+
+    meshesInfo = []
+    for meshInfo in skin_io.readManifest(os.path.join(skinDirectory, skin_io.MANIFEST_FILE)):
+        mesh = meshInfo['name']
+        if not cmds.objExists(mesh):
+            print('"{}" is not exists. Skip importing skin weights.'.format(mesh))
+            continue
+        if not force and getSkinHash(mesh) == meshInfo['hash']:
+            print('"{}" is up to date. Skip importing skin weights.'.format(mesh))
+            continue
+        meshesInfo.append(meshInfo)
+
+    sceneJoints = bsk.getSceneJoints()
+    for meshWeights, weights in skin_io.readBatch(skinDirectory, meshesInfo, workers):
+        joints = [namespace + influence for influence in meshWeights.influences]
+        bsk.bSkinObject(meshWeights.name, joints, weights, sceneJoints)
+
+    return [meshInfo['name'] for meshInfo in meshesInfo]
+
+
+def exportSkinDeltas(meshes, skinDirectory, tolerance=1e-5):
+    """Export only the changed vertices of meshes on top of the files in the manifest of skinDirectory.
+
+    Each delta refers to the file currently listed in the manifest and the manifest is updated to the delta.
+
+    Args:
+        meshes (list): Skinned meshes.
+        skinDirectory (str): Directory that has a manifest written by exportSkins().
+        tolerance (float, optional): Weight difference treated as a change. Defaults to 1e-5.
+
+    Returns:
+        list: Written delta files.
+    """
+    manifestFile = os.path.join(skinDirectory, skin_io.MANIFEST_FILE)
+    meshesInfo = skin_io.readManifest(manifestFile)
+    meshInfoMap = dict((meshInfo['name'], meshInfo) for meshInfo in meshesInfo)
+
+    deltaFiles = []
+    for mesh in meshes:
+        meshInfo = meshInfoMap.get(mesh)
+        if not meshInfo:
+            print('"{}" is not in the manifest. Export full skin weights first.'.format(mesh))
+            continue
+        skinData = getSkinWeights(mesh)
+        if not skinData:
+            print('"{}" has no skin cluster. Skip exporting skin weights.'.format(mesh))
+            continue
 
-        resultVtxWeights = [prunedItemsNormalizedMap.get(inf) for inf in infs]
-        resultMeshWeights.extend(resultVtxWeights)
+        _, influences, weights = skinData
+        current = skin_io.MeshWeights.fromDense(mesh, [influence.split(':')[-1] for influence in influences], weights)
+        currentHash = skin_io.contentHash(current)
+        if currentHash == meshInfo['hash']:
+            print('"{}" has no changes. Skip exporting skin weights.'.format(mesh))
+            continue
+
+        parentFile = os.path.join(skinDirectory, meshInfo['file'])
+        delta = skin_io.diffMeshWeights(skin_io.read(parentFile, mmap=False)[0], current, tolerance)
+        deltaFile = skin_io.getNextDeltaFile(parentFile)
+        skin_io.writeDelta(deltaFile, parentFile, [delta])
+        print('"{}": {} of {} vertices are exported to "{}".'.format(mesh, len(delta.rows), delta.vertexCount, deltaFile))
+
+        meshInfo.update({'file': os.path.basename(deltaFile), 'influences': current.influences, 'hash': currentHash})
+        deltaFiles.append(deltaFile)
 
-        cmds.progressBar('progBar', e=True, step=1)
+    skin_io.writeManifest(manifestFile, meshesInfo)
+    return deltaFiles
+
+
+def compactSkinDeltas(skinDirectory):
+    """Fold delta chains in the manifest of skinDirectory back into full skin files and remove the deltas."""
+    manifestFile = os.path.join(skinDirectory, skin_io.MANIFEST_FILE)
+    meshesInfo = skin_io.readManifest(manifestFile)
+    for meshInfo in meshesInfo:
+        deltaFile = os.path.join(skinDirectory, meshInfo['file'])
+        if not skin_io.isDeltaFile(deltaFile):
+            continue
+        fullFile = skin_io.compact(deltaFile, removeDeltas=True)
+        meshInfo['file'] = os.path.basename(fullFile)
+        print('"{}" is compacted to "{}".'.format(deltaFile, fullFile))
+    skin_io.writeManifest(manifestFile, meshesInfo)
 
-    return resultMeshWeights
+
+def getLockedInfluences(fnSkinCluster):
+    """(influenceCount,) bool array of influences with lockInfluenceWeights on."""
+    locked = []
+    for infDagPath in fnSkinCluster.influenceObjects():
+        fnInf = om2.MFnDependencyNode(infDagPath.node())
+        locked.append(fnInf.hasAttribute('lockInfluenceWeights') and fnInf.findPlug('lockInfluenceWeights', False).asBool())
+    return np.array(locked, dtype=bool)
+
+
+def setSkinWeights(mesh, weights, vertexIds=None):
+    """Set weights with a single setWeights call as one undo step.
+
+    Args:
+        mesh (str): Skinned mesh.
+        weights (numpy.ndarray): (n, influenceCount) weights.
+        vertexIds (list, optional): Vertices of the weights rows. Defaults to all vertices.
+    """
+    fnSkinCluster = getSkinClusterFn(mesh)
+    meshDagPath = globalUtil.getDagPath(mesh)
+    meshDagPath.extendToShape()
+
+    if vertexIds is None:
+        components = getCompleteVertexComponents(meshDagPath)
+    else:
+        fnComp = om2.MFnSingleIndexedComponent()
+        components = fnComp.create(om2.MFn.kMeshVertComponent)
+        fnComp.addElements([int(vertexId) for vertexId in vertexIds])
+
+    weights = np.asarray(weights, dtype=np.float64)
+    infIds = om2.MIntArray(list(range(weights.shape[1])))
+    oldWeights, _ = fnSkinCluster.getWeights(meshDagPath, components)
+    newWeights = om2.MDoubleArray(weights.ravel().tolist())
+    api_undo.run(lambda: fnSkinCluster.setWeights(meshDagPath, components, infIds, newWeights, False),
+                 lambda: fnSkinCluster.setWeights(meshDagPath, components, infIds, oldWeights, False))
+
+
+@printElapsedTime
+def smoothSkinWeights(mesh, iterations=3, strength=weight_smooth.STRENGTH, method=weight_smooth.LAPLACIAN, maxInfluences=None, vertexIds=None):
+    """Smooth skin weights with weight_smooth.smoothWeights().
+
+    Weights are read and written with one call each. Locked influences keep their weights.
+
+    Args:
+        mesh (str): Skinned mesh.
+        iterations (int, optional): Iteration count. Defaults to 3.
+        strength (float, optional): Step size. Defaults to weight_smooth.STRENGTH.
+        method (str, optional): weight_smooth.LAPLACIAN or weight_smooth.TAUBIN. Defaults to weight_smooth.LAPLACIAN.
+        maxInfluences (int, optional): Influence limit per smoothed vertex. Defaults to None.
+        vertexIds (list, optional): Vertices to smooth. Defaults to all vertices.
+    """
+    skinData = getSkinWeights(mesh)
+    if not skinData:
+        print('"{}" has no skin cluster. Skip smoothing skin weights.'.format(mesh))
+        return
+    skinCluster, _, weights = skinData
+
+    points, polygonCounts, polygonConnects = meshUtil.getMeshArrays(mesh)
+    adjacency = weight_smooth.getCachedAdjacency(len(points), polygonCounts, polygonConnects)
+
+    mask = None
+    if vertexIds is not None:
+        mask = np.zeros(len(weights))
+        mask[np.asarray(vertexIds, dtype=np.int64)] = 1.0
+
+    lockedInfluences = getLockedInfluences(getSkinClusterFn(mesh))
+    newWeights = weight_smooth.smoothWeights(weights, adjacency, iterations, strength, method, lockedInfluences, maxInfluences, mask)
+
+    changedIds = np.flatnonzero(np.abs(newWeights - weights).max(axis=1) > 0.0)
+    if len(changedIds):
+        setSkinWeights(mesh, newWeights[changedIds], changedIds)
+
+
+def pruneSkinInfluences(mesh, maxInfs):
+    """Weights of all vertices limited to maxInfs influences.
+
+    Locked influences keep their weights.
+
+    Returns:
+        list: Flat weights in vertex, influence order for SkinWeights.setWeights(). None if the mesh isn't skinned.
+    """
+    skinData = getSkinWeights(mesh)
+    if not skinData:
+        return None
+    lockedInfluences = getLockedInfluences(getSkinClusterFn(mesh))
+    return weight_hygiene.pruneTopK(skinData[2], maxInfs, lockedInfluences).ravel().tolist()
+
+
+def getMaxInfluences(mesh, ignoreWeight=weight_hygiene.MIN_WEIGHT):
+    """Largest number of influences above ignoreWeight on a vertex of the mesh. None if the mesh isn't skinned."""
+    skinData = getSkinWeights(mesh)
+    if not skinData:
+        return None
+    return weight_hygiene.getMaxInfluences(skinData[2], ignoreWeight)
+
+
+def getInfluenceHistogram(mesh, ignoreWeight=weight_hygiene.MIN_WEIGHT):
+    """Vertex count per influence count. See weight_hygiene.getInfluenceHistogram()."""
+    skinData = getSkinWeights(mesh)
+    if not skinData:
+        return None
+    return weight_hygiene.getInfluenceHistogram(skinData[2], ignoreWeight)
+
+
+@printElapsedTime
+def cleanSkinWeights(mesh, maxInfluences=None, threshold=weight_hygiene.MIN_WEIGHT, normalize=True, ignoreWeight=weight_hygiene.MIN_WEIGHT):
+    """Prune and normalize skin weights with one read and one write.
+
+    Locked influences keep their weights.
+
+    Args:
+        mesh (str): Skinned mesh.
+        maxInfluences (int, optional): Influences per vertex. Defaults to None for no limit.
+        threshold (float, optional): Weights below are removed. Defaults to weight_hygiene.MIN_WEIGHT.
+        normalize (bool, optional): Make every vertex sum to 1.0. Defaults to True.
+        ignoreWeight (float, optional): Weights below are not counted in the histograms. Defaults to weight_hygiene.MIN_WEIGHT.
+
+    Returns:
+        dict: Changed vertex count and influence histograms before and after. None if the mesh isn't skinned.
+    """
+    skinData = getSkinWeights(mesh)
+    if not skinData:
+        print('"{}" has no skin cluster. Skip cleaning skin weights.'.format(mesh))
+        return None
+    _, _, weights = skinData
+
+    lockedInfluences = getLockedInfluences(getSkinClusterFn(mesh))
+    newWeights = weight_hygiene.cleanWeights(weights, maxInfluences, threshold, lockedInfluences, normalize)
+
+    changedIds = np.flatnonzero(np.abs(newWeights - weights).max(axis=1) > 0.0)
+    if len(changedIds):
+        setSkinWeights(mesh, newWeights[changedIds], changedIds)
+
+    return {
+        'changedVertices': len(changedIds),
+        'histogramBefore': weight_hygiene.getInfluenceHistogram(weights, ignoreWeight).tolist(),
+        'histogramAfter': weight_hygiene.getInfluenceHistogram(newWeights, ignoreWeight).tolist(),
+    }
 
 
 def simplifySkin(*args):
@@ -0,0 +1,666 @@
+"""
+Skin weight file formats.
+
+Text format(.sw) is the format written by bSkinSaver. A file holds one block per geometry:
+geometry name, influence names, separator line and one line of dense weights per vertex.
+
+Binary format(.swb) stores the same data sparse:
+    header      magic, version, metadata size
+    metadata    utf-8 json with geometry names, influence name table and array layout
+    arrays      per geometry CSR arrays(indptr, influence indices, float32 values), 16 byte aligned
+
+Binary files are opened with numpy.memmap so only the pages touched are actually read.
+
+Delta format(.swd) has the binary layout but stores only the changed vertex rows
+and a relative path to its parent file. A chain of deltas is resolved on read.
+
+A batch of geometries is written as one file per geometry plus a json manifest
+holding name, vertex count, influences and content hash of each geometry.
+This module doesn't depend on Maya.
+"""
+
+import hashlib
+import json
+import os
+import re
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+TEXT_EXT = '.sw'
+BINARY_EXT = '.swb'
+DELTA_EXT = '.swd'
+SEPARATOR = '============'
+TEXT_FLOAT_FORMAT = '%.9g'  # Shortest fixed precision that round-trips float32
+MANIFEST_FILE = 'skinManifest.json'
+
+SWB_MAGIC = b'SWB1'
+SWB_VERSION = 1
+
+_HEADER = struct.Struct('<4sII')
+_ALIGN = 16
+
+
+class MeshWeights(object):
+    """Skin weights of a geometry in CSR layout.
+
+    Weights of vertex i are ``values[indptr[i]:indptr[i+1]]`` for the influences
+    ``indices[indptr[i]:indptr[i+1]]``.
+    """
+    def __init__(self, name, influences, indptr, indices, values):
+        self.name = name
+        self.influences = list(influences)
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+
+    def __repr__(self):
+        return '{}({!r}, vertices={}, influences={}, nnz={})'.format(
+            self.__class__.__name__, self.name, self.vertexCount, len(self.influences), self.nnz
+        )
+
+    @property
+    def vertexCount(self):
+        return self.rowCount
+
+    @property
+    def rowCount(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nnz(self):
+        return len(self.values)
+
+    @classmethod
+    def fromDense(cls, name, influences, weights, threshold=0.0):
+        """Create from a dense (vertexCount, influenceCount) weights array.
+
+        Args:
+            name (str): Geometry name.
+            influences (list): Influence names.
+            weights (array_like): Dense weights. Flat arrays are reshaped by the influence count.
+            threshold (float, optional): Weights less than or equal to this are dropped. Defaults to 0.0.
+
+        Returns:
+            MeshWeights
+        """
+        weights = np.asarray(weights, dtype=np.float32).reshape(-1, len(influences))
+        mask = np.abs(weights) > threshold
+        indptr = np.zeros(len(weights) + 1, dtype=np.int64)
+        np.cumsum(mask.sum(axis=1), out=indptr[1:])
+        indices = np.nonzero(mask)[1]
+        return cls(name, influences, indptr, indices, weights[mask])
+
+    def toDense(self, dtype=np.float64, influences=None):
+        """Expand to a dense (vertexCount, influenceCount) weights array.
+
+        Args:
+            dtype (numpy.dtype, optional): Data type of the result. Defaults to np.float64.
+            influences (list, optional): Column order of the result. Influences not in this geometry are zero.
+                Defaults to the geometry's own influences.
+
+        Returns:
+            numpy.ndarray
+        """
+        columns = np.asarray(self.indices, dtype=np.intp)
+        columnCount = len(self.influences)
+        if influences is not None:
+            columns = influenceColumns(self.influences, influences)[columns]
+            columnCount = len(influences)
+
+        dense = np.zeros((self.rowCount, columnCount), dtype=dtype)
+        rows = np.repeat(np.arange(self.rowCount), np.diff(self.indptr))
+        dense[rows, columns] = self.values
+        return dense
+
+    def takeRows(self, rows):
+        """Get weights of the given vertex rows.
+
+        Returns:
+            MeshWeightsDelta
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        indptr = np.asarray(self.indptr, dtype=np.int64)
+        starts = indptr[rows]
+        lengths = indptr[rows + 1] - starts
+
+        rowsIndptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=rowsIndptr[1:])
+        take = np.repeat(starts - rowsIndptr[:-1], lengths) + np.arange(rowsIndptr[-1])
+
+        return MeshWeightsDelta(
+            self.name, self.influences, rowsIndptr, np.asarray(self.indices)[take], np.asarray(self.values)[take],
+            rows, self.vertexCount
+        )
+
+
+class MeshWeightsDelta(MeshWeights):
+    """Weights of the changed vertices of a geometry.
+
+    CSR row i holds the weights of vertex ``rows[i]``, vertexCount is the vertex count of the whole geometry.
+    """
+    def __init__(self, name, influences, indptr, indices, values, rows, vertexCount):
+        super(MeshWeightsDelta, self).__init__(name, influences, indptr, indices, values)
+        self.rows = rows
+        self._vertexCount = vertexCount
+
+    @property
+    def vertexCount(self):
+        return self._vertexCount
+
+
+def diffMeshWeights(base, current, tolerance=1e-5):
+    """Get vertices of current whose weights differ from base.
+
+    Args:
+        base (MeshWeights): Baseline weights.
+        current (MeshWeights): Current weights.
+        tolerance (float, optional): Weight difference treated as a change. Defaults to 1e-5.
+
+    Returns:
+        MeshWeightsDelta: Current weights of the changed vertices.
+    """
+    if base.vertexCount != current.vertexCount:
+        raise ValueError('Vertex counts of "{}" don\'t match ({} in base, {} in current).'.format(
+            current.name, base.vertexCount, current.vertexCount)
+        )
+
+    influences = current.influences + [influence for influence in base.influences if influence not in current.influences]
+    difference = current.toDense(np.float32, influences) - base.toDense(np.float32, influences)
+    changedRows = np.flatnonzero(np.any(np.abs(difference) > tolerance, axis=1))
+    return current.takeRows(changedRows)
+
+
+def applyDelta(base, delta):
+    """Replace the changed vertices of base with the weights in delta.
+
+    Influences of base that aren't in delta are kept only if they still have weights.
+
+    Returns:
+        MeshWeights
+    """
+    if base.vertexCount != delta.vertexCount:
+        raise ValueError('Vertex counts of "{}" don\'t match ({} in base, {} in delta).'.format(
+            delta.name, base.vertexCount, delta.vertexCount)
+        )
+
+    influences = delta.influences + [influence for influence in base.influences if influence not in delta.influences]
+    weights = base.toDense(np.float32, influences)
+    weights[delta.rows] = delta.toDense(np.float32, influences)
+
+    keepColumns = [i for i, influence in enumerate(influences) if i < len(delta.influences) or weights[:, i].any()]
+    return MeshWeights.fromDense(delta.name, [influences[i] for i in keepColumns], weights[:, keepColumns])
+
+
+def contentHash(meshWeights):
+    """Hash of the influences and weights. Geometry name and storage dtypes don't affect the hash."""
+    sha = hashlib.sha1()
+    sha.update(json.dumps(meshWeights.influences).encode('utf-8'))
+    sha.update(np.ascontiguousarray(meshWeights.indptr, dtype='<i8').tobytes())
+    sha.update(np.ascontiguousarray(meshWeights.indices, dtype='<i4').tobytes())
+    sha.update(np.ascontiguousarray(meshWeights.values, dtype='<f4').tobytes())
+    return sha.hexdigest()
+
+
+def parseWeightLines(weightLines, influenceCount):
+    """Parse text format weight lines to a dense (vertexCount, influenceCount) weights array."""
+    weights = np.array(' '.join(weightLines).split(), dtype=np.float64)
+    return weights.reshape(len(weightLines), influenceCount)
+
+
+def influenceColumns(srcInfluences, dstInfluences):
+    """Get column index in dstInfluences for each of srcInfluences.
+
+    Raises:
+        ValueError: Some of srcInfluences are not in dstInfluences.
+    """
+    dstIndex = {}
+    for i, influence in enumerate(dstInfluences):
+        dstIndex.setdefault(influence, i)
+    missingInfluences = [influence for influence in srcInfluences if influence not in dstIndex]
+    if missingInfluences:
+        raise ValueError('Missing influences: {}'.format(missingInfluences))
+    return np.array([dstIndex[influence] for influence in srcInfluences], dtype=np.intp)
+
+
+def remapInfluences(weights, srcInfluences, dstInfluences):
+    """Reorder weights columns from srcInfluences to dstInfluences.
+
+    Args:
+        weights (array_like): Dense (vertexCount, len(srcInfluences)) weights.
+        srcInfluences (list): Influence names of the weights columns.
+        dstInfluences (list): Influence names of the result columns. Columns not in srcInfluences are zero.
+
+    Returns:
+        numpy.ndarray: Dense (vertexCount, len(dstInfluences)) weights.
+    """
+    weights = np.asarray(weights, dtype=np.float64).reshape(-1, len(srcInfluences))
+    remapped = np.zeros((len(weights), len(dstInfluences)), dtype=np.float64)
+    remapped[:, influenceColumns(srcInfluences, dstInfluences)] = weights
+    return remapped
+
+
+def isBinaryFile(filePath):
+    return os.path.splitext(filePath)[-1].lower() in (BINARY_EXT, DELTA_EXT)
+
+
+def isDeltaFile(filePath):
+    return os.path.splitext(filePath)[-1].lower() == DELTA_EXT
+
+
+def read(filePath, mmap=True):
+    """Read a skin weights file. Format is decided by the file extension and delta files are resolved.
+
+    Args:
+        filePath (str): Skin weights file path.
+        mmap (bool, optional): Map binary files instead of reading them. Defaults to True.
+
+    Returns:
+        list: MeshWeights per geometry.
+    """
+    if isDeltaFile(filePath):
+        return resolveDelta(filePath, mmap)
+    if isBinaryFile(filePath):
+        return readBinary(filePath, mmap)
+    return readText(filePath)
+
+
+def write(filePath, meshWeightsList):
+    if isBinaryFile(filePath):
+        writeBinary(filePath, meshWeightsList)
+    else:
+        writeText(filePath, meshWeightsList)
+
+
+def convert(srcFile, dstFile):
+    """Convert between text(.sw) and binary(.swb) skin weights files.
+
+    Args:
+        srcFile (str): Source file path.
+        dstFile (str): Destination file path. Format is decided by the file extension.
+
+    Returns:
+        str: Destination file path.
+    """
+    write(dstFile, read(srcFile))
+    return dstFile
+
+
+def writeDelta(deltaFile, parentFile, deltas):
+    """Write delta weights with a reference to the parent file.
+
+    Args:
+        deltaFile (str): Delta file path.
+        parentFile (str): Parent file path. Stored relative to the delta file.
+        deltas (list): MeshWeightsDelta per geometry.
+    """
+    parent = os.path.relpath(parentFile, os.path.dirname(os.path.abspath(deltaFile))).replace('\\', '/')
+    writeBinary(deltaFile, deltas, parent)
+
+
+def getParentFile(deltaFile):
+    parent = readBinaryInfo(deltaFile)[0].get('parent')
+    if not parent:
+        return None
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(deltaFile)), parent))
+
+
+def getDeltaChain(filePath):
+    """Get files from filePath up to the full weights file it's based on.
+
+    Returns:
+        list: File paths. The last item is the full weights file.
+    """
+    chain = [os.path.normpath(os.path.abspath(filePath))]
+    while isDeltaFile(chain[-1]):
+        parentFile = getParentFile(chain[-1])
+        if not parentFile:
+            break
+        if parentFile in chain:
+            raise ValueError('"{}" has a cyclic parent reference.'.format(filePath))
+        chain.append(parentFile)
+    return chain
+
+
+def resolveDelta(deltaFile, mmap=True):
+    """Resolve a chain of deltas to the full weights.
+
+    Returns:
+        list: MeshWeights per geometry of the delta file.
+    """
+    chain = getDeltaChain(deltaFile)
+    meshWeightsList = read(chain[-1], mmap) if not isDeltaFile(chain[-1]) else readBinary(chain[-1], mmap)
+    for filePath in reversed(chain[:-1]):
+        meshWeightsMap = dict((meshWeights.name, meshWeights) for meshWeights in meshWeightsList)
+        resolvedList = []
+        for delta in readBinary(filePath, mmap):
+            if not isinstance(delta, MeshWeightsDelta):
+                resolvedList.append(delta)
+                continue
+            base = meshWeightsMap.get(delta.name)
+            if base is None and len(meshWeightsList) == 1:
+                base = meshWeightsList[0]
+            if base is None:
+                raise ValueError('"{}" has no "{}" weights in the parent file.'.format(filePath, delta.name))
+            resolvedList.append(applyDelta(base, delta))
+        meshWeightsList = resolvedList
+
+    for meshWeights in meshWeightsList:
+        if isinstance(meshWeights, MeshWeightsDelta):
+            raise ValueError('"{}" has delta weights but no parent file.'.format(chain[-1]))
+
+    return meshWeightsList
+
+
+def getNextDeltaFile(filePath):
+    """Get an unused delta file path to write a delta on top of filePath.
+
+    Deltas are named "<base>.d<n>.swd" where n increases along the chain.
+    """
+    stem = os.path.splitext(filePath)[0]
+    number = 1
+    searchObj = re.search(r'^(.*)\.d(\d+)$', stem)
+    if searchObj and isDeltaFile(filePath):
+        stem = searchObj.group(1)
+        number = int(searchObj.group(2)) + 1
+
+    deltaFile = '{}.d{}{}'.format(stem, number, DELTA_EXT)
+    while os.path.exists(deltaFile):
+        number += 1
+        deltaFile = '{}.d{}{}'.format(stem, number, DELTA_EXT)
+    return deltaFile
+
+
+def compact(filePath, outputFile=None, removeDeltas=False):
+    """Fold a chain of deltas back into one full weights file.
+
+    Args:
+        filePath (str): Delta file path.
+        outputFile (str, optional): Full weights file path.
+            Defaults to the binary file at the root of the chain.
+        removeDeltas (bool, optional): Remove delta files of the chain after writing. Defaults to False.
+
+    Returns:
+        str: Full weights file path.
+    """
+    chain = getDeltaChain(filePath)
+    if not outputFile:
+        outputFile = os.path.splitext(chain[-1])[0] + BINARY_EXT
+
+    # Write to a temp file first since the output may be a file of the chain
+    tempFile = outputFile + '.tmp' + os.path.splitext(outputFile)[-1]
+    write(tempFile, read(filePath, mmap=False))
+    os.replace(tempFile, outputFile)
+
+    if removeDeltas:
+        for chainFile in chain:
+            if isDeltaFile(chainFile) and os.path.normpath(chainFile) != os.path.normpath(os.path.abspath(outputFile)):
+                os.remove(chainFile)
+
+    return outputFile
+
+
+def readMeshNames(filePath):
+    """Get geometry names in a skin weights file without reading the weights."""
+    if isBinaryFile(filePath):
+        return [meshInfo['name'] for meshInfo in readBinaryInfo(filePath)[0]['meshes']]
+
+    meshNames = []
+    isNameLine = True
+    with open(filePath, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if isNameLine:
+                if line:
+                    meshNames.append(line)
+                    isNameLine = False
+            elif not line:
+                isNameLine = True
+    return meshNames
+
+
+def getMeshFileName(meshName, ext=BINARY_EXT):
+    return meshName.strip('|').replace('|', '_').replace(':', '_') + ext
+
+
+def writeBatch(outputDir, meshesData, ext=BINARY_EXT, workers=None):
+    """Compress and write each geometry to its own file on a thread pool and write a manifest.
+
+    Geometries already in the manifest of outputDir keep their entries unless they are written again,
+    so exporting some geometries does not drop the others from the manifest.
+
+    Args:
+        outputDir (str): Output directory.
+        meshesData (list): Tuple of geometry name, influence names and dense weights per geometry.
+        ext (str, optional): File extension that decides the format. Defaults to BINARY_EXT.
+        workers (int, optional): Thread count. Defaults to ThreadPoolExecutor's default.
+
+    Returns:
+        str: Manifest file path.
+    """
+    def writeMesh(meshData):
+        meshWeights = MeshWeights.fromDense(*meshData)
+        fileName = getMeshFileName(meshWeights.name, ext)
+        write(os.path.join(outputDir, fileName), [meshWeights])
+        return {
+            'name': meshWeights.name,
+            'file': fileName,
+            'vertexCount': meshWeights.vertexCount,
+            'influences': meshWeights.influences,
+            'hash': contentHash(meshWeights),
+        }
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        meshesInfo = list(executor.map(writeMesh, meshesData))
+
+    manifestFile = os.path.join(outputDir, MANIFEST_FILE)
+    try:
+        oldMeshesInfo = readManifest(manifestFile)
+    except (IOError, OSError, ValueError, KeyError):
+        oldMeshesInfo = []
+    writeManifest(manifestFile, mergeManifest(oldMeshesInfo, meshesInfo))
+    return manifestFile
+
+
+def mergeManifest(oldMeshesInfo, newMeshesInfo):
+    """Manifest entries with the new entries replacing the old ones of the same geometry in place and the rest appended."""
+    newMeshInfoMap = dict((meshInfo['name'], meshInfo) for meshInfo in newMeshesInfo)
+    meshesInfo = [newMeshInfoMap.pop(meshInfo['name'], meshInfo) for meshInfo in oldMeshesInfo]
+    return meshesInfo + [meshInfo for meshInfo in newMeshesInfo if meshInfo['name'] in newMeshInfoMap]
+
+
+def writeManifest(manifestFile, meshesInfo):
+    with open(manifestFile, 'w') as f:
+        json.dump({'version': 1, 'meshes': meshesInfo}, f, indent=4)
+
+
+def readManifest(manifestFile):
+    """Read a manifest.
+
+    Returns:
+        list: Dictionary per geometry with name, file, vertexCount, influences and hash keys.
+    """
+    with open(manifestFile, 'r') as f:
+        return json.load(f)['meshes']
+
+
+def readBatch(skinDirectory, meshesInfo, workers=None):
+    """Read and expand files listed in a manifest on a thread pool.
+
+    Args:
+        skinDirectory (str): Directory of the manifest.
+        meshesInfo (list): Manifest entries to read.
+        workers (int, optional): Thread count. Defaults to ThreadPoolExecutor's default.
+
+    Returns:
+        list: Tuple of MeshWeights and its dense weights array per manifest entry.
+    """
+    def readMesh(meshInfo):
+        meshWeights = read(os.path.join(skinDirectory, meshInfo['file']), mmap=False)[0]
+        return meshWeights, meshWeights.toDense()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(readMesh, meshesInfo))
+
+
+def readText(filePath):
+    meshWeightsList = []
+
+    name = None
+    influences = []
+    weightLines = []
+    filePosition = 0
+    with open(filePath, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if filePosition == 0:
+                if not line:
+                    continue
+                name = line
+                filePosition = 1
+            elif filePosition == 1:
+                if line.startswith(SEPARATOR):
+                    filePosition = 2
+                else:
+                    influences.append(line)
+            elif line:
+                weightLines.append(line)
+            else:
+                meshWeightsList.append(_textBlockToMeshWeights(name, influences, weightLines))
+                influences = []
+                weightLines = []
+                filePosition = 0
+
+    if filePosition == 2:
+        meshWeightsList.append(_textBlockToMeshWeights(name, influences, weightLines))
+
+    return meshWeightsList
+
+
+def _textBlockToMeshWeights(name, influences, weightLines):
+    return MeshWeights.fromDense(name, influences, parseWeightLines(weightLines, len(influences)))
+
+
+def writeText(filePath, meshWeightsList):
+    with open(filePath, 'w') as f:
+        for meshWeights in meshWeightsList:
+            f.write(meshWeights.name + '\n')
+            for influence in meshWeights.influences:
+                f.write(influence + '\n')
+            f.write(SEPARATOR + '\n')
+
+            for row in meshWeights.toDense(dtype=np.float32).tolist():
+                f.write(' '.join(['0' if x == 0 else TEXT_FLOAT_FORMAT % x for x in row]) + '\n')
+
+            f.write('\n')
+
+
+def writeBinary(filePath, meshWeightsList, parent=None):
+    arrays = []
+    meshesInfo = []
+    offset = 0
+    for meshWeights in meshWeightsList:
+        meshArrays = {
+            'indptr': np.asarray(meshWeights.indptr, dtype='<u4' if meshWeights.nnz < 2**32 else '<u8'),
+            'rows': np.asarray(getattr(meshWeights, 'rows', []), dtype='<u4'),
+            'indices': np.asarray(meshWeights.indices, dtype='<u2' if len(meshWeights.influences) <= 2**16 else '<u4'),
+            'values': np.asarray(meshWeights.values, dtype='<f4'),
+        }
+        meshInfo = {
+            'name': meshWeights.name,
+            'influences': meshWeights.influences,
+            'vertexCount': meshWeights.vertexCount,
+            'nnz': meshWeights.nnz,
+        }
+        arrayKeys = ('indptr', 'indices', 'values', 'rows') if isinstance(meshWeights, MeshWeightsDelta) else ('indptr', 'indices', 'values')
+        for key in arrayKeys:
+            array = meshArrays[key]
+            meshInfo[key] = {'offset': offset, 'dtype': array.dtype.str, 'count': len(array)}
+            arrays.append((offset, array))
+            offset = _align(offset + array.nbytes)
+        meshesInfo.append(meshInfo)
+
+    metadata = {'meshes': meshesInfo}
+    if parent:
+        metadata['parent'] = parent
+    metadata = json.dumps(metadata, separators=(',', ':')).encode('utf-8')
+    dataStart = _align(_HEADER.size + len(metadata))
+
+    with open(filePath, 'wb') as f:
+        f.write(_HEADER.pack(SWB_MAGIC, SWB_VERSION, len(metadata)))
+        f.write(metadata)
+        for arrayOffset, array in arrays:
+            f.write(b'\0' * (dataStart + arrayOffset - f.tell()))
+            f.write(array.tobytes())
+
+
+def readBinaryInfo(filePath):
+    """Read header and metadata of a binary skin weights file without touching the weight arrays.
+
+    Returns:
+        tuple: Metadata dictionary and byte offset where the arrays start.
+    """
+    with open(filePath, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError('"{}" is not a binary skin weights file.'.format(filePath))
+        magic, version, metadataSize = _HEADER.unpack(header)
+        if magic != SWB_MAGIC:
+            raise ValueError('"{}" is not a binary skin weights file.'.format(filePath))
+        if version > SWB_VERSION:
+            raise ValueError('"{}" has unsupported version {}.'.format(filePath, version))
+        metadata = json.loads(f.read(metadataSize).decode('utf-8'))
+    return metadata, _align(_HEADER.size + metadataSize)
+
+
+def readBinary(filePath, mmap=True):
+    """Read a binary skin weights file.
+
+    Args:
+        filePath (str): Binary skin weights file path.
+        mmap (bool, optional): Map the file instead of reading it. Returned arrays are read only views
+            and keep the file open while they are alive. Defaults to True.
+
+    Returns:
+        list: MeshWeights per geometry.
+    """
+    metadata, dataStart = readBinaryInfo(filePath)
+    if os.path.getsize(filePath) > dataStart:
+        if mmap:
+            data = np.memmap(filePath, dtype=np.uint8, mode='r', offset=dataStart)
+        else:
+            with open(filePath, 'rb') as f:
+                f.seek(dataStart)
+                data = np.frombuffer(f.read(), dtype=np.uint8)
+    else:
+        data = np.zeros(0, dtype=np.uint8)
+
+    meshWeightsList = []
+    for meshInfo in metadata['meshes']:
+        meshArrays = {}
+        for key in ('indptr', 'indices', 'values', 'rows'):
+            arrayInfo = meshInfo.get(key)
+            if arrayInfo is None:
+                continue
+            meshArrays[key] = np.frombuffer(
+                data, dtype=np.dtype(arrayInfo['dtype']), count=arrayInfo['count'], offset=arrayInfo['offset']
+            )
+
+        if 'rows' in meshArrays:
+            meshWeights = MeshWeightsDelta(
+                meshInfo['name'], meshInfo['influences'], meshArrays['indptr'], meshArrays['indices'], meshArrays['values'],
+                meshArrays['rows'], meshInfo['vertexCount']
+            )
+        else:
+            meshWeights = MeshWeights(
+                meshInfo['name'], meshInfo['influences'], meshArrays['indptr'], meshArrays['indices'], meshArrays['values']
+            )
+        meshWeightsList.append(meshWeights)
+
+    return meshWeightsList
+
+
+def _align(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
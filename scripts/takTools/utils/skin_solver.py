@@ -0,0 +1,212 @@
+"""
+Batch linear blend skinning solvers on plain numpy arrays.
+
+Matrices use the Maya row vector convention, point @ matrix.
+A skin matrix is bindPreMatrix @ worldMatrix of an influence, so a bind point p deforms to
+p @ sum(w_i * skinMatrices[i]).
+
+solveInverseWeights() finds skin weights that move bind points onto sculpted target points.
+Every vertex is a small non negative least squares problem. They are stacked and solved together by
+enumerating the supports of the few influences per vertex, which gives the same result as scipy.optimize.nnls
+without a Python call per vertex. Chunks can be spread over a thread pool,
+since numpy releases the GIL in the solves and extra processes would start extra Maya interpreters.
+
+Every influence a vertex already uses is solved, so a target reachable with those influences is met
+to solver precision when the vertex has at most maxInfluences of them.
+"""
+
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+CHUNK_SIZE = 8192
+MAX_INFLUENCES = 4
+WEIGHT_EPSILON = 1e-4
+
+
+def blendSkinMatrices(weights, skinMatrices, epsilon=WEIGHT_EPSILON):
+    """Weighted sum of skin matrices per vertex.
+
+    Args:
+        weights (numpy.ndarray): (V, I) skin weights.
+        skinMatrices (numpy.ndarray): (I, 4, 4) skin matrices.
+        epsilon (float, optional): Weights below it are ignored. Defaults to WEIGHT_EPSILON.
+
+    Returns:
+        numpy.ndarray: (V, 4, 4) blended matrices.
+    """
+    if epsilon:
+        weights = np.where(weights < epsilon, 0.0, weights)
+    return np.einsum('vi,ijk->vjk', weights, skinMatrices)
+
+
+def toHomogeneous(points):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    return np.concatenate([points, np.ones((len(points), 1))], axis=1)
+
+
+def inverseSkinPoints(points, weights, skinMatrices):
+    """Move deformed points back to the bind pose.
+
+    Args:
+        points (numpy.ndarray): (V, 3) deformed points.
+        weights (numpy.ndarray): (V, I) skin weights.
+        skinMatrices (numpy.ndarray): (I, 4, 4) skin matrices.
+
+    Returns:
+        tuple: ((V, 3) bind points, (V,) bool valid mask). Vertices with a singular blended matrix are invalid and nan.
+    """
+    # Maya deforms with every weight, so none is cut here
+    matrices = blendSkinMatrices(weights, skinMatrices, epsilon=0.0)
+    isValid = np.abs(np.linalg.det(matrices)) > 1e-12
+
+    bindPoints = np.full((len(matrices), 3), np.nan)
+    if isValid.any():
+        # p_bind @ M = p  <=>  M^T @ p_bind^T = p^T
+        solved = np.linalg.solve(np.swapaxes(matrices[isValid], 1, 2), toHomogeneous(points)[isValid][..., None])[..., 0]
+        bindPoints[isValid] = solved[:, :3]
+    return bindPoints, isValid
+
+
+def selectInfluences(weights, bindPoints, influencePositions, maxInfluences=MAX_INFLUENCES):
+    """Pick influences to solve per vertex.
+
+    Influences with any weight come first, heaviest first, so small weights are solved too.
+    Remaining slots are filled with the influences closest to the bind point.
+
+    Args:
+        weights (numpy.ndarray): (V, I) current weights.
+        bindPoints (numpy.ndarray): (V, 3) bind points.
+        influencePositions (numpy.ndarray): (I, 3) influence positions in the bind pose.
+        maxInfluences (int, optional): Influences per vertex. Defaults to MAX_INFLUENCES.
+
+    Returns:
+        numpy.ndarray: (V, min(maxInfluences, I)) influence indices.
+    """
+    distances = np.linalg.norm(bindPoints[:, None, :] - influencePositions[None], axis=2)
+    # Weights map to [-2, -1) so they sort before any distance
+    keys = np.where(weights > 0.0, -1.0 - weights, distances)
+
+    count = min(maxInfluences, weights.shape[1])
+    selected = np.argpartition(keys, count - 1, axis=1)[:, :count] if count < weights.shape[1] else np.tile(np.arange(count), (len(keys), 1))
+    order = np.argsort(np.take_along_axis(keys, selected, axis=1), axis=1)
+    return np.take_along_axis(selected, order, axis=1)
+
+
+def batchNnls(A, b):
+    """Solve min |A x - b| subject to x >= 0 for stacked small systems.
+
+    Every support of the columns is solved by least squares and the feasible one with the smallest residual is kept.
+    Supports are tried from small to large so the sparsest of equally good solutions wins.
+
+    Args:
+        A (numpy.ndarray): (N, m, k) systems. k should be small, 2^k - 1 supports are solved.
+        b (numpy.ndarray): (N, m) targets.
+
+    Returns:
+        numpy.ndarray: (N, k) solutions.
+    """
+    count, _, columnCount = A.shape
+    best = np.zeros((count, columnCount))
+    bestResiduals = np.linalg.norm(b, axis=1)
+
+    for size in range(1, columnCount + 1):
+        for columns in itertools.combinations(range(columnCount), size):
+            columns = list(columns)
+            subA = A[:, :, columns]
+            # Normal equations with a tiny ridge so degenerate supports stay solvable
+            gram = np.matmul(np.swapaxes(subA, 1, 2), subA)
+            ridge = np.trace(gram, axis1=1, axis2=2) * 1e-15 + 1e-300
+            gram += ridge[:, None, None] * np.eye(size)
+            x = np.linalg.solve(gram, np.matmul(np.swapaxes(subA, 1, 2), b[..., None]))[..., 0]
+            residuals = np.linalg.norm(np.matmul(subA, x[..., None])[..., 0] - b, axis=1)
+
+            isBetter = (x >= -1e-9).all(axis=1) & (residuals < bestResiduals - 1e-12)
+            if not isBetter.any():
+                continue
+            best[isBetter] = 0.0
+            best[np.ix_(isBetter, columns)] = np.maximum(x[isBetter], 0.0)
+            bestResiduals[isBetter] = residuals[isBetter]
+
+    return best
+
+
+def _solveChunk(args):
+    bindPoints, targetPoints, influenceMatrices = args
+    # Column c of vertex v is the bind point moved by influence c alone
+    A = np.einsum('vj,vcjk->vkc', toHomogeneous(bindPoints), influenceMatrices)[:, :3]
+
+    # Extra row keeps the weights close to a partition of unity, scaled to the size of the positions
+    scales = np.maximum(np.linalg.norm(A, axis=1).mean(axis=1), 1.0)
+    A = np.concatenate([A, np.repeat(scales[:, None, None], A.shape[2], axis=2)], axis=1)
+    b = np.concatenate([targetPoints, scales[:, None]], axis=1)
+    return batchNnls(A, b)
+
+
+def solveWeights(bindPoints, targetPoints, skinMatrices, influenceIds, chunkSize=CHUNK_SIZE, workers=None):
+    """Solve normalized non negative weights of the given influences per vertex.
+
+    Args:
+        bindPoints (numpy.ndarray): (V, 3) bind points.
+        targetPoints (numpy.ndarray): (V, 3) target points.
+        skinMatrices (numpy.ndarray): (I, 4, 4) skin matrices.
+        influenceIds (numpy.ndarray): (V, k) influences to solve per vertex.
+        chunkSize (int, optional): Vertices per solve. Defaults to CHUNK_SIZE.
+        workers (int, optional): Thread count. Solve in this thread when None or 1. Defaults to None.
+
+    Returns:
+        numpy.ndarray: (V, k) weights matching influenceIds.
+    """
+    chunks = [
+        (bindPoints[start:start + chunkSize], targetPoints[start:start + chunkSize], skinMatrices[influenceIds[start:start + chunkSize]])
+        for start in range(0, len(bindPoints), chunkSize)
+    ]
+    if workers and workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_solveChunk, chunks))
+    else:
+        results = [_solveChunk(chunk) for chunk in chunks]
+
+    weights = np.concatenate(results) if results else np.zeros(influenceIds.shape)
+    sums = weights.sum(axis=1, keepdims=True)
+    return np.divide(weights, sums, out=weights, where=sums > 0)
+
+
+def solveInverseWeights(weights, deformedPoints, targetPoints, skinMatrices, influencePositions,
+                        maxInfluences=MAX_INFLUENCES, chunkSize=CHUNK_SIZE, workers=None):
+    """Find weights that move the deformed points onto the target points in the current pose.
+
+    Args:
+        weights (numpy.ndarray): (V, I) current weights.
+        deformedPoints (numpy.ndarray): (V, 3) current world positions.
+        targetPoints (numpy.ndarray): (V, 3) sculpted world positions.
+        skinMatrices (numpy.ndarray): (I, 4, 4) skin matrices.
+        influencePositions (numpy.ndarray): (I, 3) influence positions in the bind pose.
+        maxInfluences (int, optional): Influences per vertex. Defaults to MAX_INFLUENCES.
+        chunkSize (int, optional): Vertices per solve. Defaults to CHUNK_SIZE.
+        workers (int, optional): Thread count. Defaults to None.
+
+    Returns:
+        tuple: ((V, I) new weights, (V,) bool solved mask). Unsolved vertices keep their weights.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    bindPoints, isValid = inverseSkinPoints(deformedPoints, weights, skinMatrices)
+
+    newWeights = weights.copy()
+    validIds = np.flatnonzero(isValid)
+    if not len(validIds):
+        return newWeights, isValid
+
+    influenceIds = selectInfluences(weights[validIds], bindPoints[validIds], influencePositions, maxInfluences)
+    solved = solveWeights(bindPoints[validIds], np.asarray(targetPoints, dtype=np.float64)[validIds], skinMatrices, influenceIds, chunkSize, workers)
+
+    # All zero solutions keep the current weights
+    isSolved = solved.sum(axis=1) > 0
+    isValid[validIds[~isSolved]] = False
+
+    rows = np.zeros((len(validIds), weights.shape[1]))
+    np.put_along_axis(rows, influenceIds, solved, axis=1)
+    newWeights[validIds[isSolved]] = rows[isSolved]
+    return newWeights, isValid
@@ -0,0 +1,323 @@
+"""
+Array backed spatial index for batch nearest and radius queries.
+
+The tree is an implicit balanced KD-tree stored in flat numpy arrays. Node i has children 2i+1 and 2i+2
+and every node covers a contiguous range of the point order, so build and queries run level by level
+over all points/queries at once instead of recursing per node.
+scipy.spatial.cKDTree is used instead when scipy is available.
+
+Points are loaded in bulk with getMeshPoints() and getTransformPositions().
+Only those two functions need Maya.
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+
+LEAF_SIZE = 16
+CHUNK_SIZE = 4096
+
+
+class SpatialIndex(object):
+    """KD-tree over 3D points.
+
+    Args:
+        points (array_like): (n, 3) points.
+        leafSize (int, optional): Maximum point count of a leaf. Defaults to LEAF_SIZE.
+        useScipy (bool, optional): Use scipy.spatial.cKDTree when scipy is available. Defaults to True.
+    """
+    def __init__(self, points, leafSize=LEAF_SIZE, useScipy=True):
+        self.points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+        self.leafSize = max(1, int(leafSize))
+        self._scipyTree = None
+
+        if useScipy and cKDTree is not None:
+            self._scipyTree = cKDTree(self.points, leafsize=self.leafSize)
+        else:
+            self._build()
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def backend(self):
+        return 'scipy' if self._scipyTree is not None else 'numpy'
+
+    def query(self, points, k=1, distanceUpperBound=np.inf):
+        """Find k nearest points for each query point.
+
+        Args:
+            points (array_like): (m, 3) query points or a single point.
+            k (int, optional): Neighbor count. Defaults to 1.
+            distanceUpperBound (float, optional): Ignore neighbors farther than this. Defaults to np.inf.
+
+        Returns:
+            tuple: Distances and indices shaped (m,) when k is 1 otherwise (m, k), or scalars for a single point.
+                Missing neighbors have inf distance and index len(self).
+        """
+        queryPoints = np.asarray(points, dtype=np.float64)
+        isSinglePoint = queryPoints.ndim == 1
+        queryPoints = queryPoints.reshape(-1, 3)
+
+        if self._scipyTree is not None:
+            distances, indices = self._scipyTree.query(queryPoints, k=k, distance_upper_bound=distanceUpperBound)
+            distances = distances.reshape(len(queryPoints), k)
+            indices = indices.reshape(len(queryPoints), k)
+        else:
+            distances = np.full((len(queryPoints), k), np.inf)
+            indices = np.full((len(queryPoints), k), len(self.points), dtype=np.int64)
+            for start in range(0, len(queryPoints), CHUNK_SIZE):
+                chunk = slice(start, start + CHUNK_SIZE)
+                distances[chunk], indices[chunk] = self._queryChunk(queryPoints[chunk], k, distanceUpperBound)
+
+        if k == 1:
+            distances = distances[:, 0]
+            indices = indices[:, 0]
+        if isSinglePoint:
+            return distances[0], indices[0]
+        return distances, indices
+
+    def queryRadius(self, points, radius):
+        """Find all points within radius for each query point.
+
+        Args:
+            points (array_like): (m, 3) query points or a single point.
+            radius (float or array_like): Search radius. Scalar or one per query point.
+
+        Returns:
+            list: Sorted index array per query point, or an index array for a single point.
+        """
+        queryPoints = np.asarray(points, dtype=np.float64)
+        isSinglePoint = queryPoints.ndim == 1
+        queryPoints = queryPoints.reshape(-1, 3)
+        radii = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(queryPoints),))
+
+        if self._scipyTree is not None:
+            result = [np.array(sorted(item), dtype=np.int64) for item in self._scipyTree.query_ball_point(queryPoints, radii)]
+        else:
+            result = []
+            for start in range(0, len(queryPoints), CHUNK_SIZE):
+                chunk = slice(start, start + CHUNK_SIZE)
+                result.extend(self._queryRadiusChunk(queryPoints[chunk], radii[chunk]))
+
+        if isSinglePoint:
+            return result[0]
+        return result
+
+    def _build(self):
+        pointCount = len(self.points)
+        self.depth = int(math.ceil(math.log2(pointCount / float(self.leafSize)))) if pointCount > self.leafSize else 0
+
+        nodeCount = 2 ** (self.depth + 1) - 1
+        self.nodeStart = np.zeros(nodeCount, dtype=np.int64)
+        self.nodeEnd = np.zeros(nodeCount, dtype=np.int64)
+        self.splitAxis = np.zeros(nodeCount, dtype=np.int64)
+        self.splitValue = np.zeros(nodeCount, dtype=np.float64)
+        self.bboxMin = np.full((nodeCount, 3), np.inf)
+        self.bboxMax = np.full((nodeCount, 3), -np.inf)
+
+        order = np.arange(pointCount)
+        starts = np.zeros(1, dtype=np.int64)
+        ends = np.full(1, pointCount, dtype=np.int64)
+        for level in range(self.depth + 1):
+            nodeIds = 2 ** level - 1 + np.arange(2 ** level)
+            self.nodeStart[nodeIds] = starts
+            self.nodeEnd[nodeIds] = ends
+            if not pointCount:
+                break
+
+            sortedPoints = self.points[order]
+            self.bboxMin[nodeIds] = np.minimum.reduceat(sortedPoints, starts, axis=0)
+            self.bboxMax[nodeIds] = np.maximum.reduceat(sortedPoints, starts, axis=0)
+            if level == self.depth:
+                break
+
+            # Sort points of every node along its longest axis and split at the median.
+            # Coordinates are normalized into [0, 0.5] inside the node and offset by the node index
+            # so a single argsort sorts all nodes of the level.
+            extents = self.bboxMax[nodeIds] - self.bboxMin[nodeIds]
+            axes = np.argmax(extents, axis=1)
+            nodeRange = np.arange(len(starts))
+            axisMin = self.bboxMin[nodeIds, axes]
+            axisExtent = np.maximum(extents[nodeRange, axes], 1e-300)
+            segmentIds = np.repeat(nodeRange, ends - starts)
+            keys = (sortedPoints[np.arange(pointCount), axes[segmentIds]] - axisMin[segmentIds]) / axisExtent[segmentIds]
+            order = order[np.argsort(segmentIds + 0.5 * keys, kind='stable')]
+
+            mids = starts + (ends - starts) // 2
+            self.splitAxis[nodeIds] = axes
+            self.splitValue[nodeIds] = self.points[order[mids], axes]
+
+            starts = np.stack([starts, mids], axis=1).ravel()
+            ends = np.stack([mids, ends], axis=1).ravel()
+
+        self.order = order
+
+    def _segmentIndices(self, nodeIds):
+        """Get padded point indices of the nodes. Padding is -1."""
+        starts = self.nodeStart[nodeIds]
+        lengths = self.nodeEnd[nodeIds] - starts
+        width = int(lengths.max()) if len(lengths) else 0
+        offsets = np.arange(width)
+        valid = offsets[None, :] < lengths[:, None]
+        positions = np.where(valid, starts[:, None] + offsets[None, :], 0)
+        return np.where(valid, self.order[positions] if len(self.order) else -1, -1)
+
+    def _distancesSquared(self, queryPoints, pointIndices):
+        """Get squared distances between each query point and its row of padded point indices."""
+        diff = self.points[np.maximum(pointIndices, 0)] - queryPoints[:, None, :]
+        distances = np.einsum('ijk,ijk->ij', diff, diff)
+        distances[pointIndices < 0] = np.inf
+        return distances
+
+    def _descend(self, queryPoints, level):
+        nodeIds = np.zeros(len(queryPoints), dtype=np.int64)
+        rows = np.arange(len(queryPoints))
+        for _ in range(level):
+            goRight = queryPoints[rows, self.splitAxis[nodeIds]] >= self.splitValue[nodeIds]
+            nodeIds = 2 * nodeIds + 1 + goRight
+        return nodeIds
+
+    def _candidateLeaves(self, queryPoints, boundsSquared, skipNodes=None, skipLevel=0):
+        """Walk the tree level by level keeping (query, node) pairs whose box is within the bound.
+
+        Returns:
+            tuple: Query rows and leaf node ids of the pairs that reached leaves.
+        """
+        rows = np.arange(len(queryPoints))
+        nodeIds = np.zeros(len(queryPoints), dtype=np.int64)
+        for level in range(self.depth + 1):
+            if skipNodes is not None and level == skipLevel:
+                keep = nodeIds != skipNodes[rows]
+                rows, nodeIds = rows[keep], nodeIds[keep]
+
+            closest = np.clip(queryPoints[rows], self.bboxMin[nodeIds], self.bboxMax[nodeIds])
+            distances = np.einsum('ij,ij->i', closest - queryPoints[rows], closest - queryPoints[rows])
+            keep = distances <= boundsSquared[rows]
+            rows, nodeIds = rows[keep], nodeIds[keep]
+            if level < self.depth:
+                rows = np.repeat(rows, 2)
+                nodeIds = np.stack([2 * nodeIds + 1, 2 * nodeIds + 2], axis=1).ravel()
+        return rows, nodeIds
+
+    def _queryChunk(self, queryPoints, k, distanceUpperBound):
+        queryCount = len(queryPoints)
+        if not len(self.points):
+            return np.full((queryCount, k), np.inf), np.zeros((queryCount, k), dtype=np.int64)
+
+        # Initial guess from the smallest node around each query that holds at least k points
+        startLevel = self.depth
+        while startLevel > 0 and len(self.points) // 2 ** startLevel < k:
+            startLevel -= 1
+        startNodes = self._descend(queryPoints, startLevel)
+        candidates = self._segmentIndices(startNodes)
+        distances = self._distancesSquared(queryPoints, candidates)
+        bestDistances, bestIndices = _kSmallest(distances, candidates, k)
+
+        boundsSquared = np.minimum(bestDistances[:, -1], distanceUpperBound ** 2)
+        rows, leafIds = self._candidateLeaves(queryPoints, boundsSquared, startNodes, startLevel)
+        if len(rows):
+            candidates = self._segmentIndices(leafIds)
+            distances = self._distancesSquared(queryPoints[rows], candidates)
+            rows = np.repeat(rows, candidates.shape[1])
+            distances = distances.ravel()
+            candidates = candidates.ravel()
+            keep = distances <= boundsSquared[rows]
+
+            rows = np.concatenate([np.repeat(np.arange(queryCount), k), rows[keep]])
+            distances = np.concatenate([bestDistances.ravel(), distances[keep]])
+            candidates = np.concatenate([bestIndices.ravel(), candidates[keep]])
+
+            # Keep k smallest per query
+            sortOrder = np.lexsort((distances, rows))
+            rows, distances, candidates = rows[sortOrder], distances[sortOrder], candidates[sortOrder]
+            groupStarts = np.searchsorted(rows, np.arange(queryCount))
+            ranks = np.arange(len(rows)) - groupStarts[rows]
+            keep = ranks < k
+            bestDistances[rows[keep], ranks[keep]] = distances[keep]
+            bestIndices[rows[keep], ranks[keep]] = candidates[keep]
+
+        outOfBound = bestDistances > distanceUpperBound ** 2
+        bestDistances = np.sqrt(bestDistances)
+        bestDistances[outOfBound] = np.inf
+        bestIndices[outOfBound | (bestIndices < 0)] = len(self.points)
+        return bestDistances, bestIndices
+
+    def _queryRadiusChunk(self, queryPoints, radii):
+        if not len(self.points):
+            return [np.zeros(0, dtype=np.int64) for _ in range(len(queryPoints))]
+
+        boundsSquared = radii ** 2
+        rows, leafIds = self._candidateLeaves(queryPoints, boundsSquared)
+        candidates = self._segmentIndices(leafIds)
+        distances = self._distancesSquared(queryPoints[rows], candidates)
+        rows = np.repeat(rows, candidates.shape[1])
+        candidates = candidates.ravel()
+        keep = distances.ravel() <= boundsSquared[rows]
+        rows, candidates = rows[keep], candidates[keep]
+
+        sortOrder = np.lexsort((candidates, rows))
+        rows, candidates = rows[sortOrder], candidates[sortOrder]
+        return np.split(candidates, np.searchsorted(rows, np.arange(1, len(queryPoints))))
+
+
+def _kSmallest(distances, indices, k):
+    """Get k smallest distances per row sorted ascending, padding with inf/-1 when a row is short."""
+    if distances.shape[1] < k:
+        padWidth = k - distances.shape[1]
+        distances = np.pad(distances, ((0, 0), (0, padWidth)), constant_values=np.inf)
+        indices = np.pad(indices, ((0, 0), (0, padWidth)), constant_values=-1)
+    if distances.shape[1] > k:
+        part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        distances = np.take_along_axis(distances, part, axis=1)
+        indices = np.take_along_axis(indices, part, axis=1)
+    sortOrder = np.argsort(distances, axis=1)
+    return np.take_along_axis(distances, sortOrder, axis=1), np.take_along_axis(indices, sortOrder, axis=1)
+
+
+def getMeshPoints(mesh, space=None):
+    """Get all vertex positions of a mesh with a single MFnMesh.getPoints call.
+
+    Args:
+        mesh (str): Mesh name.
+        space (int, optional): om.MSpace constant. Defaults to om.MSpace.kWorld.
+
+    Returns:
+        numpy.ndarray: (vertexCount, 3) positions.
+    """
+    selLs = om.MSelectionList()
+    selLs.add(str(mesh))
+    fnMesh = om.MFnMesh(selLs.getDagPath(0))
+    points = fnMesh.getPoints(om.MSpace.kWorld if space is None else space)
+    return np.array(points, dtype=np.float64).reshape(-1, 4)[:, :3]
+
+
+def getTransformPositions(transforms):
+    """Get world positions of transforms with a single selection list.
+
+    Args:
+        transforms (list): Transform names or PyNodes.
+
+    Returns:
+        numpy.ndarray: (len(transforms), 3) world positions.
+    """
+    selLs = om.MSelectionList()
+    for transform in transforms:
+        selLs.add(str(transform))
+
+    positions = np.zeros((len(transforms), 3))
+    for i in range(selLs.length()):
+        translation = om.MFnTransform(selLs.getDagPath(i)).translation(om.MSpace.kWorld)
+        positions[i] = (translation.x, translation.y, translation.z)
+    return positions
@@ -0,0 +1,168 @@
+"""
+Mass spring damper particles integrated with fourth order Runge Kutta on numpy arrays.
+
+Kernel of the rungeKuttaArray plug-in node. Each particle is pulled to its target by
+x'' = -k x - c x' where x is the offset from the target and c = 2 * dampingRatio * sqrt(k),
+the same equation as the single particle rungeKutta node. All particles and axes are stepped together.
+See benchmarks/spring_solver_bench.py.
+"""
+
+import numpy as np
+
+
+SPRING_CONSTANT = 0.5
+DAMPING_RATIO = 0.5
+MAX_DELTA_TIME = 1.0  # Larger frame steps are clamped to avoid excessive movement when scrubbing
+
+
+def broadcastParameter(values, count, default):
+    """Per particle parameter from a possibly shorter array. Missing values repeat the last one.
+
+    Args:
+        values (list or numpy.ndarray): Given values.
+        count (int): Particle count.
+        default (float): Value when nothing is given.
+
+    Returns:
+        numpy.ndarray: (count,) values.
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if not len(values):
+        return np.full(count, default)
+    if len(values) >= count:
+        return values[:count].copy()
+    return np.concatenate([values, np.full(count - len(values), values[-1])])
+
+
+def getDampingCoefficients(springConstants, dampingRatios):
+    return 2.0 * np.asarray(dampingRatios) * np.sqrt(np.asarray(springConstants))
+
+
+def rk4Step(offsets, velocities, springConstants, dampingCoefficients, h):
+    """Advance offsets from the targets and velocities by one step.
+
+    Args:
+        offsets (numpy.ndarray): (N, 3) positions - targets.
+        velocities (numpy.ndarray): (N, 3) velocities.
+        springConstants (numpy.ndarray): (N,) k.
+        dampingCoefficients (numpy.ndarray): (N,) c.
+        h (float): Step size.
+
+    Returns:
+        tuple: ((N, 3) offsets, (N, 3) velocities).
+    """
+    k = springConstants[:, None]
+    c = dampingCoefficients[:, None]
+
+    def acceleration(x, dx):
+        return -dx * c - x * k
+
+    k1x = velocities
+    k1v = acceleration(offsets, k1x)
+
+    k2x = velocities + k1v * h * 0.5
+    k2v = acceleration(offsets + k1x * h * 0.5, k2x)
+
+    k3x = velocities + k2v * h * 0.5
+    k3v = acceleration(offsets + k2x * h * 0.5, k3x)
+
+    k4x = velocities + k3v * h
+    k4v = acceleration(offsets + k3x * h, k4x)
+
+    return (offsets + (k1x + 2 * k2x + 2 * k3x + k4x) * h / 6,
+            velocities + (k1v + 2 * k2v + 2 * k3v + k4v) * h / 6)
+
+
+def integrate(positions, velocities, targets, springConstants, dampingRatios, deltaTime, iterations=1):
+    """Advance particles by deltaTime frames in the given number of substeps.
+
+    Args:
+        positions (numpy.ndarray): (N, 3) current positions.
+        velocities (numpy.ndarray): (N, 3) current velocities.
+        targets (numpy.ndarray): (N, 3) target positions, held during the substeps.
+        springConstants (numpy.ndarray): (N,) spring constants.
+        dampingRatios (numpy.ndarray): (N,) damping ratios.
+        deltaTime (float): Frames to advance, clamped to [-MAX_DELTA_TIME, MAX_DELTA_TIME].
+        iterations (int, optional): Substeps. Defaults to 1.
+
+    Returns:
+        tuple: ((N, 3) positions, (N, 3) velocities).
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    springConstants = np.asarray(springConstants, dtype=np.float64)
+    dampingCoefficients = getDampingCoefficients(springConstants, dampingRatios)
+
+    h = np.clip(deltaTime, -MAX_DELTA_TIME, MAX_DELTA_TIME) / iterations
+    offsets = np.asarray(positions, dtype=np.float64) - targets
+    velocities = np.asarray(velocities, dtype=np.float64)
+    for _ in range(iterations):
+        offsets, velocities = rk4Step(offsets, velocities, springConstants, dampingCoefficients, h)
+    return offsets + targets, velocities
+
+
+class SpringStateCache(object):
+    """Particle states keyed by frame.
+
+    Evaluating a frame steps from the closest earlier cached frame, so scrubbing backward returns the
+    simulated state instead of restarting from the start frame. Frames after a newly simulated frame are dropped
+    since they belong to an older history. Changing particle count or parameters clears the cache.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._parameters = None
+        self._lastFrame = None
+        self._lastState = None
+
+    def clear(self):
+        self._states = {}
+        self._parameters = None
+        self._lastFrame = None
+        self._lastState = None
+
+    def evaluate(self, frame, startFrame, targets, springConstants, dampingRatios, iterations=1):
+        """Particle state at a frame.
+
+        Args:
+            frame (float): Current frame.
+            startFrame (float): Frame where particles rest at their targets.
+            targets (numpy.ndarray): (N, 3) target positions at the frame.
+            springConstants (numpy.ndarray): (N,) spring constants.
+            dampingRatios (numpy.ndarray): (N,) damping ratios.
+            iterations (int, optional): Substeps per frame. Defaults to 1.
+
+        Returns:
+            tuple: ((N, 3) positions, (N, 3) velocities). Do not modify, they are cached.
+        """
+        targets = np.asarray(targets, dtype=np.float64).reshape(-1, 3)
+        springConstants = np.asarray(springConstants, dtype=np.float64)
+        dampingRatios = np.asarray(dampingRatios, dtype=np.float64)
+
+        parameters = (len(targets), springConstants.tobytes(), dampingRatios.tobytes(), iterations)
+        if parameters != self._parameters:
+            self._states = {}
+            self._parameters = parameters
+            if self._lastState is not None and len(self._lastState[0]) != len(targets):
+                self._lastFrame = None
+                self._lastState = None
+
+        if frame <= startFrame or (self._lastState is None and not self._states):
+            self._states = {}
+            state = (targets.copy(), np.zeros_like(targets))
+        elif frame in self._states:
+            state = self._states[frame]
+        else:
+            earlierFrames = [cachedFrame for cachedFrame in self._states if cachedFrame < frame]
+            if earlierFrames:
+                prevFrame = max(earlierFrames)
+                prevState = self._states[prevFrame]
+            else:
+                prevFrame, prevState = self._lastFrame, self._lastState
+
+            state = integrate(prevState[0], prevState[1], targets, springConstants, dampingRatios, frame - prevFrame, iterations)
+            self._states = {cachedFrame: cachedState for cachedFrame, cachedState in self._states.items() if cachedFrame < frame}
+
+        self._states[frame] = state
+        self._lastFrame = frame
+        self._lastState = state
+        return state
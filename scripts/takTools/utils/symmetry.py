@@ -0,0 +1,207 @@
+"""
+Mesh symmetry map builder.
+
+A symmetry map is an int32 array where map[i] is the vertex mirrored to vertex i, or -1 when no match was found.
+Mirrored positions are matched with spatial_index in one batch query. Vertices whose match is ambiguous
+(no point within tolerance, several points within tolerance or a point already taken) are resolved
+by walking the mesh topology outward from the matched vertices.
+
+Everything here works on numpy arrays so it runs without Maya.
+utils/mesh.py reads the arrays from Maya and caches maps per topology hash with getCachedMap().
+"""
+
+import hashlib
+
+import numpy as np
+
+from . import spatial_index
+
+
+AXES = {'x': 0, 'y': 1, 'z': 2}
+TOLERANCE = 1e-3
+
+_mapCache = {}
+
+
+def getAxisIndex(axis):
+    """Accept 'x', '-x', 'y', 'z' or an axis index."""
+    if isinstance(axis, str):
+        return AXES[axis.lstrip('-').lower()]
+    return int(axis)
+
+
+def mirrorPoints(points, axis=0):
+    mirrored = np.array(points, dtype=np.float64).reshape(-1, 3)
+    mirrored[:, getAxisIndex(axis)] *= -1.0
+    return mirrored
+
+
+def getTopologyHash(polygonCounts, polygonConnects):
+    """Hash of the face-vertex lists. Vertex count and order changes give a different hash."""
+    hasher = hashlib.sha1()
+    hasher.update(np.ascontiguousarray(polygonCounts, dtype='<i4').tobytes())
+    hasher.update(np.ascontiguousarray(polygonConnects, dtype='<i4').tobytes())
+    return hasher.hexdigest()
+
+
+def getAdjacency(vertexCount, polygonCounts, polygonConnects):
+    """Build vertex adjacency in CSR form from MFnMesh.getVertices() style face lists.
+
+    Returns:
+        tuple: (indptr, indices). Neighbors of vertex i are indices[indptr[i]:indptr[i + 1]].
+    """
+    polygonCounts = np.asarray(polygonCounts, dtype=np.int64)
+    polygonConnects = np.asarray(polygonConnects, dtype=np.int64)
+
+    # Next vertex in the same face, wrapping around at the face end
+    faceStarts = np.repeat(np.cumsum(polygonCounts) - polygonCounts, polygonCounts)
+    positions = np.arange(len(polygonConnects)) - faceStarts
+    nextPositions = faceStarts + (positions + 1) % np.repeat(polygonCounts, polygonCounts)
+
+    starts = polygonConnects
+    ends = polygonConnects[nextPositions]
+    # Unique on a single int64 key is much faster than unique rows
+    keys = np.unique(np.concatenate([starts * vertexCount + ends, ends * vertexCount + starts]))
+    edgeStarts = keys // vertexCount
+
+    indptr = np.zeros(vertexCount + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edgeStarts, minlength=vertexCount), out=indptr[1:])
+    return indptr, (keys - edgeStarts * vertexCount).astype(np.int32)
+
+
+def buildSymmetryMap(points, targetPoints=None, axis=0, tolerance=TOLERANCE, adjacency=None, targetAdjacency=None):
+    """Match every point to the target point at its mirrored position.
+
+    Args:
+        points (array_like): (n, 3) object space positions.
+        targetPoints (array_like, optional): (m, 3) positions to match against. Defaults to points for a self symmetry map.
+        axis (str or int, optional): Mirror axis. Defaults to 0.
+        tolerance (float, optional): Maximum distance of a positional match. Defaults to TOLERANCE.
+        adjacency (tuple, optional): getAdjacency() of points. Enables the topological fallback.
+        targetAdjacency (tuple, optional): getAdjacency() of targetPoints. Defaults to adjacency.
+
+    Returns:
+        numpy.ndarray: (n,) int32 map. Unresolved vertices are -1.
+    """
+    mirrored = mirrorPoints(points, axis)
+    targetPoints = mirrorPoints(mirrored, axis) if targetPoints is None else np.asarray(targetPoints, dtype=np.float64).reshape(-1, 3)
+    if targetAdjacency is None:
+        targetAdjacency = adjacency
+
+    symMap = np.full(len(mirrored), -1, dtype=np.int32)
+    if not len(mirrored) or not len(targetPoints):
+        return symMap
+
+    index = spatial_index.SpatialIndex(targetPoints)
+    distances, indices = index.query(mirrored, k=2, distanceUpperBound=tolerance)
+
+    # A match is unique when exactly one target point is in tolerance
+    isUnique = np.isfinite(distances[:, 0]) & ~np.isfinite(distances[:, 1])
+
+    # One to one: when several points claim the same target keep the closest
+    candidates = np.flatnonzero(isUnique)
+    candidates = candidates[np.argsort(distances[candidates, 0], kind='stable')]
+    _, firstClaims = np.unique(indices[candidates, 0], return_index=True)
+    accepted = candidates[firstClaims]
+    symMap[accepted] = indices[accepted, 0]
+
+    if adjacency is not None and (symMap < 0).any():
+        _resolveByTopology(symMap, mirrored, targetPoints, adjacency, targetAdjacency)
+
+    return symMap
+
+
+def _resolveByTopology(symMap, mirrored, targetPoints, adjacency, targetAdjacency):
+    """Grow the map from matched vertices into unmatched ones.
+
+    An unmatched vertex takes the free target vertex that is adjacent to the most of its mapped neighbors' targets.
+    Ties are broken by distance to the mirrored position. Each round only assigns the best scored claim per target.
+    """
+    indptr, indices = adjacency
+    targetIndptr, targetIndices = targetAdjacency
+    isTaken = np.zeros(len(targetPoints), dtype=bool)
+    isTaken[symMap[symMap >= 0]] = True
+
+    while True:
+        claims = []
+        for vtx in np.flatnonzero(symMap < 0):
+            mappedNeighbors = symMap[indices[indptr[vtx]:indptr[vtx + 1]]]
+            mappedNeighbors = mappedNeighbors[mappedNeighbors >= 0]
+            if not len(mappedNeighbors):
+                continue
+
+            candidates = np.concatenate([targetIndices[targetIndptr[n]:targetIndptr[n + 1]] for n in mappedNeighbors])
+            candidates = candidates[~isTaken[candidates]]
+            if not len(candidates):
+                continue
+
+            candidates, scores = np.unique(candidates, return_counts=True)
+            distances = np.linalg.norm(targetPoints[candidates] - mirrored[vtx], axis=1)
+            best = np.lexsort((distances, -scores))[0]
+            claims.append((-scores[best], distances[best], vtx, candidates[best]))
+
+        assigned = False
+        for _, _, vtx, target in sorted(claims):
+            if isTaken[target]:
+                continue
+            symMap[vtx] = target
+            isTaken[target] = True
+            assigned = True
+
+        if not assigned:
+            break
+
+
+def getCachedMap(key, builder):
+    """Return the cached map for key, building it with builder() on a miss.
+
+    Args:
+        key (hashable): Usually (topology hash, axis, tolerance, ...).
+        builder (callable): Returns the map.
+    """
+    symMap = _mapCache.get(key)
+    if symMap is None:
+        symMap = builder()
+        _mapCache[key] = symMap
+    return symMap
+
+
+def clearCache():
+    _mapCache.clear()
+
+
+def applySelfMap(points, symMap, axis='x'):
+    """Mirror one side of a mesh onto the other side.
+
+    Sides are decided per mapped pair by which of the two vertices is farther along axis,
+    so 'x' copies +x onto -x and '-x' copies -x onto +x. Center and unmapped vertices stay.
+
+    Returns:
+        numpy.ndarray: New (n, 3) positions.
+    """
+    axisIndex = getAxisIndex(axis)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    result = points.copy()
+
+    sources = np.flatnonzero((symMap >= 0) & (symMap != np.arange(len(symMap))))
+    targets = symMap[sources]
+    if isinstance(axis, str) and axis.startswith('-'):
+        isSource = points[sources, axisIndex] < points[targets, axisIndex]
+    else:
+        isSource = points[sources, axisIndex] > points[targets, axisIndex]
+
+    sources = sources[isSource]
+    result[symMap[sources]] = mirrorPoints(points[sources], axisIndex)
+    return result
+
+
+def applyMap(sourcePoints, targetPoints, symMap, axis=0):
+    """Set target vertex symMap[i] to the mirrored position of source vertex i.
+
+    Returns:
+        numpy.ndarray: New (m, 3) target positions. Targets of unmapped vertices stay.
+    """
+    result = np.array(targetPoints, dtype=np.float64).reshape(-1, 3)
+    isMapped = symMap >= 0
+    result[symMap[isMapped]] = mirrorPoints(np.asarray(sourcePoints).reshape(-1, 3)[isMapped], axis)
+    return result
@@ -0,0 +1,291 @@
+"""
+Search index of shelf tools with typo tolerant ranking.
+
+Label, annotation and command of every tool are split into lower case word tokens once, camelCase words included.
+Tokens point to their tools and trigrams of the tokens point to the tokens,
+so a query word is matched to the vocabulary exactly, by substring or by trigram similarity for typos
+without looking at the tools that do not share a trigram with it.
+Tools are grouped by shelf and a shelf is indexed again only when its buttons change.
+
+Usage:
+    index = ToolSearchIndex()
+    index.updateShelf('Rigging_Skin', tools)
+    results = index.search('skn weight', usageStats={'Copy Skin': 12})
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+from collections import defaultdict
+
+
+LABEL = 'label'
+ANNOTATION = 'annotation'
+COMMAND = 'command'
+FIELD_WEIGHTS = {LABEL: 3.0, ANNOTATION: 2.0, COMMAND: 1.0}
+
+EXACT_SIMILARITY = 1.0
+PREFIX_SIMILARITY = 0.9
+SUBSTRING_SIMILARITY = 0.7
+FUZZY_THRESHOLD = 0.4
+EDIT_CANDIDATE_THRESHOLD = 0.2
+MAX_EDITS = 2
+TOKEN_SCORE = 10.0
+USAGE_WEIGHT = 0.2
+MAX_RESULTS = 100
+
+_WORD = re.compile(r'[A-Za-z0-9]+')
+_CAMEL_PART = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+')
+
+
+def getTokens(text):
+    """Lower case words of a text and the parts of camelCase words."""
+    tokens = set()
+    for word in _WORD.findall(text or ''):
+        tokens.add(word.lower())
+        parts = _CAMEL_PART.findall(word)
+        if len(parts) > 1:
+            tokens.update(part.lower() for part in parts)
+    return tokens
+
+
+def getTrigrams(token):
+    """Trigrams of a token padded with spaces, so short tokens and word starts have trigrams too."""
+    padded = ' {} '.format(token)
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def getEditDistance(a, b):
+    """Optimal string alignment distance, where swapping two neighbor letters is one edit."""
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def getLegacyRelevance(label, annotation, command, query):
+    """Score of a whole query found in the lower case fields, the ranking the shelf search had before the index."""
+    relevance = 0
+    if query == label:
+        relevance += 100
+    elif query in label:
+        relevance += 50
+    if label.startswith(query):
+        relevance += 30
+    if query in annotation:
+        relevance += 20
+    if query in command:
+        relevance += 10
+    return relevance
+
+
+class ToolSearchIndex(object):
+    """Inverted index of shelf tools.
+
+    A tool is a dict with a shelfButtonInfo dict of label, annotation and command, like tak_tools search results.
+    The tools are returned as they were given.
+    """
+
+    def __init__(self):
+        self._tools = {}
+        self._fields = {}
+        self._toolTokens = {}
+        self._shelfToolIds = {}
+        self._shelfKeys = {}
+        self._tokenTools = defaultdict(dict)
+        self._gramTokens = defaultdict(set)
+        self._nextId = 0
+
+    def __len__(self):
+        return len(self._tools)
+
+    @staticmethod
+    def getShelfKey(tools):
+        data = json.dumps([tool['shelfButtonInfo'] for tool in tools], sort_keys=True, default=str)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def updateShelf(self, shelf, tools):
+        """Index the tools of a shelf in place of its previous tools.
+
+        Args:
+            shelf (str): Shelf name.
+            tools (list): Tool dicts.
+
+        Returns:
+            bool: False when the shelf buttons did not change and nothing was indexed.
+        """
+        key = self.getShelfKey(tools)
+        if self._shelfKeys.get(shelf) == key:
+            # Search results keep pointing to the current tool dicts
+            for toolId, tool in zip(self._shelfToolIds[shelf], tools):
+                self._tools[toolId] = tool
+            return False
+
+        self.removeShelf(shelf)
+        toolIds = []
+        for tool in tools:
+            toolIds.append(self._addTool(tool))
+        self._shelfToolIds[shelf] = toolIds
+        self._shelfKeys[shelf] = key
+        return True
+
+    def removeShelf(self, shelf):
+        for toolId in self._shelfToolIds.pop(shelf, []):
+            self._removeTool(toolId)
+        self._shelfKeys.pop(shelf, None)
+
+    def syncShelves(self, toolsByShelf):
+        """Index the shelves of a {shelf: tools} dict and drop the shelves missing from it."""
+        for shelf in list(self._shelfToolIds):
+            if shelf not in toolsByShelf:
+                self.removeShelf(shelf)
+        return [shelf for shelf, tools in toolsByShelf.items() if self.updateShelf(shelf, tools)]
+
+    def _addTool(self, tool):
+        toolId = self._nextId
+        self._nextId += 1
+        info = tool['shelfButtonInfo']
+        texts = dict((field, info.get(field) or '') for field in FIELD_WEIGHTS)
+
+        self._tools[toolId] = tool
+        self._fields[toolId] = dict((field, text.lower()) for field, text in texts.items())
+        self._toolTokens[toolId] = set()
+        for field, text in texts.items():
+            for token in getTokens(text):
+                self._toolTokens[toolId].add(token)
+                postings = self._tokenTools[token]
+                if not postings:
+                    for gram in getTrigrams(token):
+                        self._gramTokens[gram].add(token)
+                postings[toolId] = max(postings.get(toolId, 0.0), FIELD_WEIGHTS[field])
+        return toolId
+
+    def _removeTool(self, toolId):
+        self._tools.pop(toolId)
+        self._fields.pop(toolId)
+        for token in self._toolTokens.pop(toolId):
+            postings = self._tokenTools[token]
+            postings.pop(toolId)
+            if not postings:
+                del self._tokenTools[token]
+                for gram in getTrigrams(token):
+                    self._gramTokens[gram].discard(token)
+                    if not self._gramTokens[gram]:
+                        del self._gramTokens[gram]
+
+    def getSimilarTokens(self, word):
+        """Vocabulary tokens similar to a query word.
+
+        Typos are scored by the trigram Dice coefficient and, for tokens close to the word in length,
+        by the edit distance, which works better for short words.
+        A word shorter than a trigram shares no trigram with the tokens it is in the middle of,
+        so the vocabulary is scanned for it instead.
+
+        Returns:
+            dict: {token: similarity} with EXACT_SIMILARITY, PREFIX_SIMILARITY, SUBSTRING_SIMILARITY
+                or the typo similarity, at least FUZZY_THRESHOLD.
+        """
+        grams = getTrigrams(word)
+        counts = defaultdict(int)
+        for gram in grams:
+            for token in self._gramTokens.get(gram, ()):
+                counts[token] += 1
+        if len(word) < 3:
+            for token in self._tokenTools:
+                if word in token and token not in counts:
+                    counts[token] = 0
+
+        similarities = {}
+        for token, count in counts.items():
+            if token == word:
+                similarity = EXACT_SIMILARITY
+            elif token.startswith(word):
+                similarity = PREFIX_SIMILARITY
+            elif word in token:
+                similarity = SUBSTRING_SIMILARITY
+            else:
+                # A padded token has as many trigrams as letters
+                similarity = 2.0 * count / (len(grams) + len(token))
+                if similarity >= EDIT_CANDIDATE_THRESHOLD and abs(len(token) - len(word)) <= MAX_EDITS:
+                    distance = getEditDistance(word, token)
+                    if distance <= MAX_EDITS:
+                        similarity = max(similarity, 1.0 - float(distance) / max(len(word), len(token)))
+            if similarity >= FUZZY_THRESHOLD:
+                similarities[token] = similarity
+        return similarities
+
+    def search(self, query, limit=MAX_RESULTS, usageStats=None):
+        """Tools matching every word of a query, best first.
+
+        A tool scores the similarity of the best token per query word times its field weight,
+        plus the legacy relevance of the whole query, boosted by the log of its usage count.
+
+        Args:
+            query (str): Search text.
+            limit (int, optional): Maximum count. Defaults to MAX_RESULTS.
+            usageStats (dict, optional): {label: use count}. Defaults to None.
+
+        Returns:
+            list: Tool dicts.
+        """
+        query = query.strip().lower()
+        words = sorted(getTokens(query), key=len, reverse=True)
+        if not words:
+            return []
+
+        scores = None
+        for word in words:
+            wordScores = {}
+            for token, similarity in self.getSimilarTokens(word).items():
+                for toolId, fieldWeight in self._tokenTools[token].items():
+                    score = similarity * fieldWeight
+                    if score > wordScores.get(toolId, 0.0):
+                        wordScores[toolId] = score
+            if scores is None:
+                scores = wordScores
+            else:
+                scores = dict((toolId, score + wordScores[toolId]) for toolId, score in scores.items() if toolId in wordScores)
+            if not scores:
+                return []
+
+        usageStats = usageStats or {}
+        ranked = []
+        for toolId, score in scores.items():
+            fields = self._fields[toolId]
+            score = score * TOKEN_SCORE + getLegacyRelevance(fields[LABEL], fields[ANNOTATION], fields[COMMAND], query)
+            label = self._tools[toolId]['shelfButtonInfo'].get(LABEL) or ''
+            score *= 1.0 + USAGE_WEIGHT * math.log1p(usageStats.get(label, 0))
+            ranked.append((-score, fields[LABEL], toolId))
+        ranked.sort()
+        return [self._tools[toolId] for _, _, toolId in ranked[:limit]]
+
+
+def loadUsageStats(path):
+    """{label: use count} saved by saveUsageStats(). Empty when missing or unreadable."""
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return dict((label, int(count)) for label, count in json.load(f).items())
+    except (IOError, OSError, ValueError, AttributeError):
+        return {}
+
+
+def saveUsageStats(usageStats, path):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tempPath = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(usageStats, f, indent=4, sort_keys=True)
+    os.replace(tempPath, path)
@@ -0,0 +1,155 @@
+"""
+Skin weight clean up on a whole (V, I) weight matrix.
+
+Every operation runs over all vertices at once with numpy, e.g. top k pruning with argpartition,
+so a mesh is read and written once instead of querying skinPercent per vertex.
+Locked influences keep their weights and the unlocked weights of a row are scaled to fill the rest.
+See utils/skin.cleanSkinWeights() for the Maya side and benchmarks/weight_hygiene_bench.py.
+"""
+
+import numpy as np
+
+
+MIN_WEIGHT = 0.00001
+
+
+def getLockedMask(influenceCount, lockedInfluences=None):
+    if lockedInfluences is None:
+        return np.zeros(influenceCount, dtype=bool)
+    return np.asarray(lockedInfluences, dtype=bool)
+
+
+def normalize(weights, totals=None, lockedInfluences=None, fallback=None):
+    """Scale unlocked weights so every row sums to its total, with locked weights untouched.
+
+    Args:
+        weights (numpy.ndarray): (V, I) weights. Modified in place.
+        totals (numpy.ndarray, optional): (V,) row sums. Defaults to 1.0.
+        lockedInfluences (numpy.ndarray, optional): (I,) bool locked columns.
+        fallback (numpy.ndarray, optional): (V, I) weights used for rows whose unlocked weights are all zero.
+
+    Returns:
+        numpy.ndarray: weights.
+    """
+    locked = getLockedMask(weights.shape[1], lockedInfluences)
+    totals = np.ones(len(weights)) if totals is None else np.asarray(totals, dtype=np.float64)
+    freeTotals = np.maximum(totals - weights[:, locked].sum(axis=1), 0.0)
+    unlockedSums = weights[:, ~locked].sum(axis=1)
+
+    isScalable = unlockedSums > 1e-12
+    scales = np.divide(freeTotals, unlockedSums, out=np.zeros_like(freeTotals), where=isScalable)
+    weights[:, ~locked] *= scales[:, None]
+    if fallback is not None and not isScalable.all():
+        weights[~isScalable] = fallback[~isScalable]
+    return weights
+
+
+def pruneTopK(weights, maxInfluences, lockedInfluences=None, totals=None):
+    """Keep the largest maxInfluences weights per row and renormalize.
+
+    Locked non zero weights are never removed and use up slots first, so rows with more locked weights than maxInfluences keep all of them.
+    Rows left without unlocked weights keep their weights.
+
+    Args:
+        weights (numpy.ndarray): (V, I) weights.
+        maxInfluences (int): Influences per vertex.
+        lockedInfluences (numpy.ndarray, optional): (I,) bool locked columns.
+        totals (numpy.ndarray, optional): (V,) row sums to restore. Defaults to the current sums.
+
+    Returns:
+        numpy.ndarray: (V, I) new weights.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if maxInfluences is None or maxInfluences >= weights.shape[1]:
+        return weights.copy()
+
+    locked = getLockedMask(weights.shape[1], lockedInfluences)
+    totals = weights.sum(axis=1) if totals is None else totals
+    keys = np.where(locked & (weights > 0.0), np.inf, weights)
+
+    isDropped = np.ones(weights.shape, dtype=bool)
+    if maxInfluences > 0:
+        kept = np.argpartition(-keys, maxInfluences - 1, axis=1)[:, :maxInfluences]
+        np.put_along_axis(isDropped, kept, False, axis=1)
+    # Locked weights past the slots are kept too
+    pruned = np.where(isDropped & ~locked, 0.0, weights)
+    return normalize(pruned, totals, locked, fallback=weights)
+
+
+def pruneThreshold(weights, threshold=MIN_WEIGHT, lockedInfluences=None, totals=None):
+    """Zero unlocked weights below threshold and renormalize.
+
+    Args:
+        weights (numpy.ndarray): (V, I) weights.
+        threshold (float, optional): Defaults to MIN_WEIGHT.
+        lockedInfluences (numpy.ndarray, optional): (I,) bool locked columns.
+        totals (numpy.ndarray, optional): (V,) row sums to restore. Defaults to the current sums.
+
+    Returns:
+        numpy.ndarray: (V, I) new weights.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    locked = getLockedMask(weights.shape[1], lockedInfluences)
+    totals = weights.sum(axis=1) if totals is None else totals
+
+    pruned = np.where((weights < threshold) & ~locked, 0.0, weights)
+    return normalize(pruned, totals, locked, fallback=weights)
+
+
+def getInfluenceCounts(weights, threshold=MIN_WEIGHT):
+    """(V,) number of influences at or above threshold per vertex."""
+    return (np.asarray(weights) >= threshold).sum(axis=1)
+
+
+def getMaxInfluences(weights, threshold=MIN_WEIGHT):
+    counts = getInfluenceCounts(weights, threshold)
+    return int(counts.max()) if len(counts) else 0
+
+
+def getInfluenceHistogram(weights, threshold=MIN_WEIGHT):
+    """Vertex count per influence count.
+
+    Returns:
+        numpy.ndarray: Item i is the number of vertices with i influences.
+    """
+    return np.bincount(getInfluenceCounts(weights, threshold), minlength=1)
+
+
+def formatHistogram(histogram, budget=None):
+    """Readable lines of getInfluenceHistogram(). Counts over budget are marked."""
+    total = max(int(np.sum(histogram)), 1)
+    lines = []
+    for influenceCount, vertexCount in enumerate(histogram):
+        if not vertexCount:
+            continue
+        mark = ' over budget' if budget is not None and influenceCount > budget else ''
+        lines.append('{:>3} influences: {:>8} vertices ({:5.1f}%){}'.format(influenceCount, vertexCount, 100.0 * vertexCount / total, mark))
+    return lines
+
+
+def cleanWeights(weights, maxInfluences=None, threshold=None, lockedInfluences=None, normalizeWeights=True):
+    """Threshold prune, top k prune and normalize in one pass.
+
+    Args:
+        weights (numpy.ndarray): (V, I) weights.
+        maxInfluences (int, optional): Influences per vertex. Defaults to None for no limit.
+        threshold (float, optional): Weights below are removed. Defaults to None for no threshold pruning.
+        lockedInfluences (numpy.ndarray, optional): (I,) bool locked columns.
+        normalizeWeights (bool, optional): Rows sum to 1.0 when True, otherwise they keep their sums. Defaults to True.
+
+    Returns:
+        numpy.ndarray: (V, I) new weights.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    totals = np.ones(len(weights)) if normalizeWeights else weights.sum(axis=1)
+
+    cleaned = weights
+    if threshold:
+        cleaned = pruneThreshold(cleaned, threshold, lockedInfluences, totals)
+    if maxInfluences is not None:
+        cleaned = pruneTopK(cleaned, maxInfluences, lockedInfluences, totals)
+    if cleaned is weights:
+        cleaned = weights.copy()
+    if normalizeWeights:
+        cleaned = normalize(cleaned, totals, lockedInfluences, fallback=weights)
+    return cleaned
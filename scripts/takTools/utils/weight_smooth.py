@@ -0,0 +1,203 @@
+"""
+Skin weight smoothing over mesh vertex adjacency on numpy arrays.
+
+Adjacency is the CSR (indptr, indices) of symmetry.getAdjacency(). A neighbour average is the row normalized
+adjacency multiplied with the weight matrix, so every vertex is averaged in one sparse product.
+
+smoothWeights() relaxes a whole weight matrix with Laplacian or Taubin iterations,
+keeping locked influences, a vertex mask and a max influence count. It has no Maya dependency,
+see utils/skin.smoothSkinWeights() for the Maya side and benchmarks/weight_smooth_bench.py.
+"""
+
+import numpy as np
+
+from . import symmetry
+from . import weight_hygiene
+
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    sparse = None
+
+
+LAPLACIAN = 'laplacian'
+TAUBIN = 'taubin'
+METHODS = [LAPLACIAN, TAUBIN]
+STRENGTH = 0.5
+TAUBIN_PASS_BAND = 0.1
+
+
+def getAdjacency(vertexCount, polygonCounts, polygonConnects):
+    """Vertex adjacency in CSR form. See symmetry.getAdjacency()."""
+    return symmetry.getAdjacency(vertexCount, polygonCounts, polygonConnects)
+
+
+def getCachedAdjacency(vertexCount, polygonCounts, polygonConnects):
+    """getAdjacency() reused for meshes with the same topology."""
+    key = ('adjacency', symmetry.getTopologyHash(polygonCounts, polygonConnects))
+    return symmetry.getCachedMap(key, lambda: getAdjacency(vertexCount, polygonCounts, polygonConnects))
+
+
+def getSubAdjacency(adjacency, vertexIds):
+    """Rows of the adjacency for the given vertices.
+
+    Args:
+        adjacency (tuple): (indptr, indices) CSR.
+        vertexIds (numpy.ndarray): (n,) vertices.
+
+    Returns:
+        tuple: (indptr, indices) with n rows. Columns keep the mesh vertex ids.
+    """
+    indptr, indices = adjacency
+    vertexIds = np.asarray(vertexIds, dtype=np.int64)
+    counts = indptr[vertexIds + 1] - indptr[vertexIds]
+
+    subIndptr = np.zeros(len(vertexIds) + 1, dtype=np.int64)
+    np.cumsum(counts, out=subIndptr[1:])
+    # Position of every neighbour in the full indices array
+    positions = np.arange(subIndptr[-1]) - np.repeat(subIndptr[:-1], counts) + np.repeat(indptr[vertexIds], counts)
+    return subIndptr, indices[positions]
+
+
+def sparseMatMul(indptr, indices, data, matrix):
+    """Multiply a CSR matrix with a dense matrix. Uses scipy.sparse when available.
+
+    Args:
+        indptr (numpy.ndarray): (n + 1,) row pointers.
+        indices (numpy.ndarray): (nnz,) column of every entry.
+        data (numpy.ndarray): (nnz,) value of every entry.
+        matrix (numpy.ndarray): (m, k) dense matrix.
+
+    Returns:
+        numpy.ndarray: (n, k) product.
+    """
+    if sparse:
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(matrix))) @ matrix
+
+    products = matrix[indices] * data[:, None]
+    cumulative = np.zeros((len(products) + 1, matrix.shape[1]))
+    np.cumsum(products, axis=0, out=cumulative[1:])
+    return cumulative[indptr[1:]] - cumulative[indptr[:-1]]
+
+
+def getNeighbourAverages(weights, adjacency, vertexIds, weightIds=None):
+    """Average weights of the neighbours of each vertex.
+
+    Args:
+        weights (numpy.ndarray): (m, I) weights.
+        adjacency (tuple): (indptr, indices) CSR of the mesh.
+        vertexIds (numpy.ndarray): (n,) vertices to average.
+        weightIds (numpy.ndarray, optional): (m,) sorted vertex id of every weights row. Defaults to all vertices.
+
+    Returns:
+        tuple: ((n, I) averages, (n,) bool mask of vertices that have neighbours).
+    """
+    subIndptr, neighbours = getSubAdjacency(adjacency, vertexIds)
+    if weightIds is not None:
+        neighbours = np.searchsorted(weightIds, neighbours)
+
+    counts = np.diff(subIndptr)
+    data = np.repeat(1.0 / np.maximum(counts, 1), counts)
+    return sparseMatMul(subIndptr, neighbours, data, weights), counts > 0
+
+
+def averageWeights(weights, adjacency, vertexIds, strengths=1.0, weightIds=None):
+    """Blend weights of vertices toward the average of their neighbours.
+
+    new = (1 - strength) * old + strength * mean(neighbour weights), as the averageVertexSkinWeight brush does.
+    Vertices without neighbours keep their weights.
+
+    Args:
+        weights (numpy.ndarray): (m, I) weights.
+        adjacency (tuple): (indptr, indices) CSR of the mesh.
+        vertexIds (numpy.ndarray): (n,) vertices to smooth.
+        strengths (float or numpy.ndarray, optional): Scalar or (n,) blend amounts. Defaults to 1.0.
+        weightIds (numpy.ndarray, optional): (m,) sorted vertex id of every weights row. Defaults to all vertices.
+
+    Returns:
+        numpy.ndarray: (n, I) new weights of vertexIds.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    vertexIds = np.asarray(vertexIds, dtype=np.int64)
+    rows = vertexIds if weightIds is None else np.searchsorted(weightIds, vertexIds)
+
+    averages, hasNeighbours = getNeighbourAverages(weights, adjacency, vertexIds, weightIds)
+    strengths = np.broadcast_to(np.asarray(strengths, dtype=np.float64), vertexIds.shape)[:, None] * hasNeighbours[:, None]
+    return weights[rows] * (1.0 - strengths) + averages * strengths
+
+
+def getTaubinShrink(strength, passBand=TAUBIN_PASS_BAND):
+    """Negative factor of the Taubin inflate step, 1 / (passBand - 1 / strength)."""
+    return 1.0 / (passBand - 1.0 / strength)
+
+
+def smoothWeights(weights, adjacency, iterations=1, strength=STRENGTH, method=LAPLACIAN,
+                  lockedInfluences=None, maxInfluences=None, mask=None):
+    """Relax a weight matrix toward neighbour averages.
+
+    Each Laplacian iteration moves weights by strength * (neighbour average - weight).
+    A Taubin iteration follows it with an inflate step of getTaubinShrink(), which smooths with less shrinking of
+    weight regions. Rows are clipped to non negative and renormalized to their original sums after each iteration.
+
+    Args:
+        weights (numpy.ndarray): (V, I) weights of all vertices.
+        adjacency (tuple): (indptr, indices) CSR of the mesh.
+        iterations (int, optional): Iteration count. Defaults to 1.
+        strength (float, optional): Step size in (0, 1]. Defaults to STRENGTH.
+        method (str, optional): LAPLACIAN or TAUBIN. Defaults to LAPLACIAN.
+        lockedInfluences (numpy.ndarray, optional): (I,) bool. Locked columns keep their weights.
+        maxInfluences (int, optional): Influence limit per vertex applied to the smoothed vertices.
+        mask (numpy.ndarray, optional): (V,) per vertex step scale in [0, 1]. Vertices of 0 are unchanged.
+
+    Returns:
+        numpy.ndarray: (V, I) new weights.
+    """
+    if method not in METHODS:
+        raise ValueError('Unknown smoothing method: {}'.format(method))
+
+    weights = np.array(weights, dtype=np.float64)
+    lockedInfluences = np.zeros(weights.shape[1], dtype=bool) if lockedInfluences is None else np.asarray(lockedInfluences, dtype=bool)
+    mask = np.ones(len(weights)) if mask is None else np.clip(np.asarray(mask, dtype=np.float64), 0.0, 1.0)
+
+    vertexIds = np.flatnonzero(mask > 0.0)
+    # Influences without any weight stay zero under averaging
+    columns = np.flatnonzero(~lockedInfluences & (weights > 0.0).any(axis=0))
+    if not len(vertexIds) or not len(columns):
+        return weights
+
+    subIndptr, neighbours = getSubAdjacency(adjacency, vertexIds)
+    counts = np.diff(subIndptr)
+    data = np.repeat(1.0 / np.maximum(counts, 1), counts)
+    # Vertices without neighbours have no Laplacian
+    stepScales = (mask[vertexIds] * (counts > 0))[:, None]
+    isAllVertices = len(vertexIds) == len(weights)
+    rows = slice(None) if isAllVertices else vertexIds
+
+    # Work on the active unlocked columns only. Locked and zero columns don't change so the unlocked total of a row is kept
+    work = weights[:, columns]
+    original = work[rows].copy()
+    freeTotals = original.sum(axis=1)
+    isFree = freeTotals > 1e-12
+
+    steps = [strength, getTaubinShrink(strength)] if method == TAUBIN else [strength]
+    for _ in range(iterations):
+        for step in steps:
+            laplacians = sparseMatMul(subIndptr, neighbours, data, work) - work[rows]
+            laplacians *= step * stepScales
+            work[rows] += laplacians
+
+        smoothed = np.maximum(work[rows], 0.0)
+        sums = smoothed.sum(axis=1)
+        isScalable = isFree & (sums > 1e-12)
+        smoothed *= np.divide(freeTotals, sums, out=np.zeros_like(sums), where=isScalable)[:, None]
+        smoothed[~isScalable] = original[~isScalable]
+        work[rows] = smoothed
+
+    if isAllVertices:
+        weights[:, columns] = work
+    else:
+        weights[np.ix_(vertexIds, columns)] = work[vertexIds]
+
+    if maxInfluences:
+        weights[rows] = weight_hygiene.pruneTopK(weights[rows], maxInfluences, lockedInfluences)
+    return weights
@@ -138,19 +138,6 @@ MatrixXd TakRBF::getPoseToTargetsMatrix(const MPoint& posePos, const MPointArray
     return poseToTargetsMatrix;
 }
 
-void TakRBF::makeIdentityMatrix(MatrixXd& matrix) {
-    for (unsigned i = 0; i < mNumTargets; i++) {
-        for (unsigned j = 0; j < mNumTargets; j++) {
-            if (i == j) {
-                matrix(i, j) = 1;
-            }
-            else {
-                matrix(i, j) = 0;
-            }
-        }
-    }
-}
-
 double TakRBF::RBF(const double& dist) {
     double outVal;
 
@@ -196,10 +183,68 @@ MMatrix TakRBF::doubleArrayToMatrix(const MDoubleArray& flatMatrix) {
     return MMatrix(matrixDouble);
 }
 
-TakRBF::TakRBF() {}
+TakRBF::TakRBF() : mSolverDirty(true) {}
 
 TakRBF::~TakRBF() {}
 
+bool TakRBF::isSolverPlug(const MPlug& plug) {
+    // Target edits dirty the target array, its elements or the x, y, z children
+    MPlug attrPlug(plug);
+    if (attrPlug.isChild()) {
+        attrPlug = attrPlug.parent();
+    }
+    if (attrPlug.isElement()) {
+        attrPlug = attrPlug.array();
+    }
+    return attrPlug == aTarget || plug == aBasisFunc || plug == aSmoothness;
+}
+
+MStatus TakRBF::setDependentsDirty(const MPlug& plug, MPlugArray& plugArray) {
+    if (isSolverPlug(plug)) {
+        mSolverDirty = true;
+    }
+    return MPxNode::setDependentsDirty(plug, plugArray);
+}
+
+MStatus TakRBF::preEvaluation(const MDGContext& context, const MEvaluationNode& evaluationNode) {
+    // setDependentsDirty is not called under the evaluation manager
+    MStatus status;
+    if (evaluationNode.dirtyPlugExists(aTarget, &status) ||
+        evaluationNode.dirtyPlugExists(aBasisFunc, &status) ||
+        evaluationNode.dirtyPlugExists(aSmoothness, &status)) {
+        mSolverDirty = true;
+    }
+    return MPxNode::preEvaluation(context, evaluationNode);
+}
+
+MStatus TakRBF::updateSolver(MDataBlock& dataBlock) {
+    MStatus status;
+
+    mBasisFunc = dataBlock.inputValue(aBasisFunc).asShort();
+    mSmoothness = dataBlock.inputValue(aSmoothness).asDouble();
+
+    // Get targets position.
+    MArrayDataHandle targetsPosHandle = dataBlock.inputArrayValue(aTarget, &status);
+    CHECK_MSTATUS_AND_RETURN_IT(status);
+    mNumTargets = targetsPosHandle.elementCount();
+    mTargetsPos.clear();
+    for (unsigned i = 0; i < mNumTargets; i++) {
+        targetsPosHandle.jumpToArrayElement(i);
+
+        double targetX = targetsPosHandle.inputValue().child(aTargetX).asDouble();
+        double targetY = targetsPosHandle.inputValue().child(aTargetY).asDouble();
+        double targetZ = targetsPosHandle.inputValue().child(aTargetZ).asDouble();
+
+        mTargetsPos.append(MPoint(targetX, targetY, targetZ));
+    }
+
+    // Multi quadratic matrix is not positive definite so LU is used for all basis functions.
+    mSolver.compute(getTargetsDistMatrix(mTargetsPos));
+    mSolverDirty = false;
+
+    return MS::kSuccess;
+}
+
 MStatus TakRBF::compute(const MPlug& plug, MDataBlock& dataBlock) {
     MStatus status;
 
@@ -208,8 +253,10 @@ MStatus TakRBF::compute(const MPlug& plug, MDataBlock& dataBlock) {
         return MS::kUnknownParameter;
     }
 
-    mBasisFunc = dataBlock.inputValue(aBasisFunc).asShort();
-    mSmoothness = dataBlock.inputValue(aSmoothness).asDouble();
+    if (mSolverDirty) {
+        status = updateSolver(dataBlock);
+        CHECK_MSTATUS_AND_RETURN_IT(status);
+    }
 
     // Get pose position.
     MDataHandle poseHndl = dataBlock.inputValue(aPose, &status);
@@ -219,40 +266,24 @@ MStatus TakRBF::compute(const MPlug& plug, MDataBlock& dataBlock) {
     double poseZ = poseHndl.child(aPoseZ).asDouble();
     MPoint posePos = MPoint(poseX, poseY, poseZ);
 
-    // Get distance matrix for targets position.
-    MArrayDataHandle targetsPosHandle = dataBlock.inputArrayValue(aTarget, &status);
-    mNumTargets = targetsPosHandle.elementCount();
-    CHECK_MSTATUS_AND_RETURN_IT(status);
-    MPointArray targetsPos;
-    for (unsigned i = 0; i < mNumTargets; i++) {
-        targetsPosHandle.jumpToArrayElement(i);
-
-        double targetX = targetsPosHandle.inputValue().child(aTargetX).asDouble();
-        double targetY = targetsPosHandle.inputValue().child(aTargetY).asDouble();
-        double targetZ = targetsPosHandle.inputValue().child(aTargetZ).asDouble();
+    // Get pose to targets distance matrix.
+    MatrixXd poseToTargetsMatrix = getPoseToTargetsMatrix(posePos, mTargetsPos);
 
-        targetsPos.append(MPoint(targetX, targetY, targetZ));
+    // poseToTargets * targetsDist^-1 * values == (targetsDist^-1 * poseToTargets^T)^T * values since targetsDist is symmetric.
+    // One vector solve with the cached factorization serves every output.
+    MatrixXd poseWeights;
+    if (mNumTargets > 0) {
+        poseWeights = mSolver.solve(poseToTargetsMatrix.transpose()).transpose();
     }
-    MatrixXd targetsDistMatrix = getTargetsDistMatrix(targetsPos);
-
-    // Get pose to targets distance matrix.
-    MatrixXd poseToTargetsMatrix = getPoseToTargetsMatrix(posePos, targetsPos);
 
     if (plug == aOutWeight) {
-        MatrixXd inWeightsMatrix;
-        inWeightsMatrix.resize(mNumTargets, mNumTargets);
-        makeIdentityMatrix(inWeightsMatrix);
-
-        MatrixXd weightMatrix = targetsDistMatrix.inverse() * inWeightsMatrix;
-        MatrixXd outWeightsMatrix = poseToTargetsMatrix * weightMatrix;
-
         MArrayDataHandle outWeightsArrayHndl = dataBlock.outputArrayValue(aOutWeight);
         MArrayDataBuilder builder = outWeightsArrayHndl.builder(&status);
         CHECK_MSTATUS_AND_RETURN_IT(status);
         for (unsigned i = 0; i < mNumTargets; i++) {
             MDataHandle elementHndl = builder.addElement(i, &status);
             CHECK_MSTATUS_AND_RETURN_IT(status);
-            float weight = float(outWeightsMatrix(0, i));
+            float weight = float(poseWeights(0, i));
             elementHndl.setFloat(weight);
         }
         status = outWeightsArrayHndl.set(builder);
@@ -263,35 +294,30 @@ MStatus TakRBF::compute(const MPlug& plug, MDataBlock& dataBlock) {
         // Get inColors data
         MArrayDataHandle inColorsHndl = dataBlock.inputArrayValue(aInColor, &status);
         CHECK_MSTATUS_AND_RETURN_IT(status);
-        MFloatVectorArray inColors;
         unsigned int numInColors = inColorsHndl.elementCount();
-        for (unsigned int i = 0; i < numInColors; i++) {
-            inColorsHndl.jumpToArrayElement(i);
-            inColors.append(inColorsHndl.inputValue().asFloatVector());
+        if (numInColors != mNumTargets) {
+            return MS::kInvalidParameter;
         }
 
         // Get inColors matrix
-        MatrixXf inColorsMatrix;
         unsigned int numChannel(3);
+        MatrixXd inColorsMatrix;
         inColorsMatrix.resize(numInColors, numChannel);
-        for (unsigned int i = 0; i < inColors.length(); i++) {
+        for (unsigned int i = 0; i < numInColors; i++) {
+            inColorsHndl.jumpToArrayElement(i);
+            MFloatVector inColor = inColorsHndl.inputValue().asFloatVector();
             for (unsigned int j = 0; j < numChannel; j++) {
-                inColorsMatrix(i, j) = inColors[i][j];
+                inColorsMatrix(i, j) = inColor[j];
             }
         }
 
-        // Get weight matrix
-        MatrixXf m_targetsDistMatrixF = targetsDistMatrix.cast<float>();
-        MatrixXf weightMatrix = m_targetsDistMatrixF.inverse() * inColorsMatrix;
-
         // Get result
-        MatrixXf m_poseToTargetsMatrixF = poseToTargetsMatrix.cast<float>();
-        MatrixXf resultColor = m_poseToTargetsMatrixF * weightMatrix;
+        MatrixXd resultColor = mNumTargets > 0 ? MatrixXd(poseWeights * inColorsMatrix) : MatrixXd::Zero(1, numChannel);
 
         // Set out color
         MDataHandle outColorHndl = dataBlock.outputValue(aOutColor, &status);
         CHECK_MSTATUS_AND_RETURN_IT(status);
-        MFloatVector outColor(resultColor(0, 0), resultColor(0, 1), resultColor(0, 2));
+        MFloatVector outColor(float(resultColor(0, 0)), float(resultColor(0, 1)), float(resultColor(0, 2)));
         outColorHndl.setMFloatVector(outColor);
     }
 
@@ -299,27 +325,25 @@ MStatus TakRBF::compute(const MPlug& plug, MDataBlock& dataBlock) {
         // Get inMatrix data
         MArrayDataHandle inMatricesHndl = dataBlock.inputArrayValue(aInMatrix, &status);
         CHECK_MSTATUS_AND_RETURN_IT(status);
-        MMatrixArray inMatrices;
         unsigned int numInMatrices = inMatricesHndl.elementCount();
-        for (unsigned int i = 0; i < numInMatrices; i++) {
-            inMatricesHndl.jumpToArrayElement(i);
-            inMatrices.append(inMatricesHndl.inputValue().asMatrix());
+        if (numInMatrices != mNumTargets) {
+            return MS::kInvalidParameter;
         }
 
         // Get inMatrix matrix
-        MatrixXd inMatrixMatrix;
         unsigned int numChannel = 16;
+        MatrixXd inMatrixMatrix;
         inMatrixMatrix.resize(numInMatrices, numChannel);
         for (unsigned int i = 0; i < numInMatrices; i++) {
+            inMatricesHndl.jumpToArrayElement(i);
+            MDoubleArray flatMatrix = matrixToDoubleArray(inMatricesHndl.inputValue().asMatrix());
             for (unsigned int j = 0; j < numChannel; j++) {
-                MDoubleArray flatMatrix = matrixToDoubleArray(inMatrices[i]);
                 inMatrixMatrix(i, j) = flatMatrix[j];
             }
         }
 
-        MatrixXd weightMatrix = targetsDistMatrix.inverse() * inMatrixMatrix;
-        MatrixXd outMatrixMatrix = poseToTargetsMatrix * weightMatrix;
-        
+        MatrixXd outMatrixMatrix = mNumTargets > 0 ? MatrixXd(poseWeights * inMatrixMatrix) : MatrixXd::Zero(1, numChannel);
+
         MDoubleArray flatMatrix;
         for (unsigned int i = 0; i < numChannel; i++) {
             flatMatrix.append(outMatrixMatrix(0, i));
@@ -19,6 +19,8 @@
 #include <maya/MArrayDataBuilder.h>
 #include <maya/MFloatVectorArray.h>
 #include <maya/MMAtrixArray.h>
+#include <maya/MPlugArray.h>
+#include <maya/MEvaluationNode.h>
 
 
 using namespace Eigen;
@@ -59,10 +61,16 @@ private:
     double mSmoothness;
     unsigned int mNumTargets;
 
+    // Factorization of the targets distance matrix, rebuilt only when targets, basis function or smoothness change.
+    bool mSolverDirty;
+    MPointArray mTargetsPos;
+    PartialPivLU<MatrixXd> mSolver;
+
 private:
+    static bool isSolverPlug(const MPlug& plug);
+    MStatus updateSolver(MDataBlock& dataBlock);
     MatrixXd getTargetsDistMatrix(const MPointArray& targetsPos);
     MatrixXd getPoseToTargetsMatrix(const MPoint& posePos, const MPointArray& targetsPos);
-    void makeIdentityMatrix(MatrixXd& matrix);
     double RBF(const double& dist);
     MDoubleArray matrixToDoubleArray(const MMatrix& matirx);
     MMatrix doubleArrayToMatrix(const MDoubleArray& flatMatrix);
@@ -72,4 +80,6 @@ public:
     virtual ~TakRBF() override;
 
     virtual MStatus compute(const MPlug& plug, MDataBlock& dataBlock) override;
+    virtual MStatus setDependentsDirty(const MPlug& plug, MPlugArray& plugArray) override;
+    virtual MStatus preEvaluation(const MDGContext& context, const MEvaluationNode& evaluationNode) override;
 };
\ No newline at end of file